@@ -28,6 +28,7 @@ from rally.deployment import engine as deploy_engine
 from rally import exceptions
 from rally import objects
 from rally import osclients
+from rally.plugins.openstack.context.keystone import users
 from rally.task import engine
 from rally.verification.tempest import tempest
 
@@ -82,6 +83,7 @@ class Deployment(object):
             deployment["config"]["type"], deployment)
 
         tempest.Tempest(deployment["uuid"]).uninstall()
+        users.UserGenerator.purge_pool(deployment)
         with deployer:
             deployer.make_cleanup()
             deployment.delete()
@@ -95,6 +97,7 @@ class Deployment(object):
         deployment = objects.Deployment.get(deployment)
         deployer = deploy_engine.EngineFactory.get_engine(
             deployment["config"]["type"], deployment)
+        users.UserGenerator.purge_pool(deployment)
         with deployer:
             deployer.make_cleanup()
             endpoints = deployer.make_deploy()
@@ -196,7 +199,8 @@ class Task(object):
         benchmark_engine.validate()
 
     @classmethod
-    def start(cls, deployment, config, task=None, abort_on_sla_failure=False):
+    def start(cls, deployment, config, task=None, abort_on_sla_failure=False,
+              share_contexts=False):
         """Start a task.
 
         Task is a list of benchmarks that will be called one by one, results of
@@ -208,6 +212,9 @@ class Task(object):
         :param abort_on_sla_failure: if True, the execution of a benchmark
                                      scenario will stop when any SLA check
                                      for it fails
+        :param share_contexts: if True, identical contexts of consecutive
+                               benchmark scenarios will be shared instead of
+                               being set up for each of them
         """
         deployment = objects.Deployment.get(deployment)
         task = task or objects.Task(deployment_uuid=deployment["uuid"])
@@ -215,7 +222,8 @@ class Task(object):
                                                          deployment["uuid"]))
         benchmark_engine = engine.BenchmarkEngine(
             config, task, admin=deployment["admin"], users=deployment["users"],
-            abort_on_sla_failure=abort_on_sla_failure)
+            abort_on_sla_failure=abort_on_sla_failure,
+            share_contexts=share_contexts)
 
         try:
             benchmark_engine.validate()
@@ -16,6 +16,7 @@
 """ Rally command: task """
 
 from __future__ import print_function
+import itertools
 import json
 import os
 import sys
@@ -30,6 +31,7 @@ from rally.cli import cliutils
 from rally.cli import envutils
 from rally.common import fileutils
 from rally.common.i18n import _
+from rally.common import json_stream
 from rally.common import junit
 from rally.common import log as logging
 from rally.common import utils as rutils
@@ -39,7 +41,7 @@ from rally import exceptions
 from rally import objects
 from rally import plugins
 from rally.task.processing import plot
-from rally.task.processing import utils
+from rally.task.processing import summary as result_summary
 
 
 class FailedToLoadTask(exceptions.RallyException):
@@ -179,10 +181,16 @@ class TaskCommands(object):
                    dest="abort_on_sla_failure",
                    help="Abort the execution of a benchmark scenario when"
                         "any SLA check for it fails")
+    @cliutils.args("--share-contexts", action="store_true",
+                   dest="share_contexts",
+                   help="Share identical contexts (e.g. users) of consecutive "
+                        "benchmark scenarios instead of creating them for "
+                        "each scenario")
     @envutils.with_default_deployment(cli_arg_name="deployment")
     @plugins.ensure_plugins_are_loaded
     def start(self, task, deployment=None, task_args=None, task_args_file=None,
-              tag=None, do_use=False, abort_on_sla_failure=False):
+              tag=None, do_use=False, abort_on_sla_failure=False,
+              share_contexts=False):
         """Start benchmark task.
 
         :param task: a file with yaml/json task
@@ -198,6 +206,9 @@ class TaskCommands(object):
         :param abort_on_sla_failure: if True, the execution of a benchmark
                                      scenario will stop when any SLA check
                                      for it fails
+        :param share_contexts: if True, identical contexts of consecutive
+                               benchmark scenarios will be shared instead of
+                               being set up for each of them
         """
         try:
             input_task = self._load_task(task, task_args, task_args_file)
@@ -215,7 +226,8 @@ class TaskCommands(object):
             if do_use:
                 self.use(task["uuid"])
             api.Task.start(deployment, input_task, task=task,
-                           abort_on_sla_failure=abort_on_sla_failure)
+                           abort_on_sla_failure=abort_on_sla_failure,
+                           share_contexts=share_contexts)
             self.detailed(task_id=task["uuid"])
         except exceptions.InvalidConfigException:
             return(1)
@@ -249,12 +261,16 @@ class TaskCommands(object):
     @cliutils.args("--iterations-data", dest="iterations_data",
                    action="store_true",
                    help="print detailed results for each iteration")
+    @cliutils.args("--partial", dest="partial", action="store_true",
+                   help="also display results of unfinished scenarios, e.g. "
+                        "if Rally crashed and left the task running")
     @envutils.with_default_task_id
-    def detailed(self, task_id=None, iterations_data=False):
+    def detailed(self, task_id=None, iterations_data=False, partial=False):
         """Display results table.
 
         :param task_id: Task uuid
         :param iterations_data: print detailed results for each iteration
+        :param partial: display results of unfinished scenarios too
         Prints detailed information of task.
         """
 
@@ -289,7 +305,34 @@ class TaskCommands(object):
                                 formatters=formatters)
             print()
 
-        task = db.task_get_detailed(task_id)
+        def _get_stats_row(stats):
+            if stats is None:
+                return [None] * 6
+            return [round(stats[k], 3) for k in ("min", "median", "90%ile",
+                                                 "95%ile", "max", "avg")]
+
+        def _print_stages_data(stages):
+            headers = ["stage", "min", "median", "90%ile", "95%ile", "max",
+                       "avg", "success", "count"]
+            float_cols = ["min", "median", "90%ile", "95%ile", "max", "avg"]
+            formatters = dict(zip(float_cols,
+                                  [cliutils.pretty_float_formatter(col, 3)
+                                   for col in float_cols]))
+            table_rows = []
+            for stage in stages:
+                data = ([stage["stage"]] + _get_stats_row(stage["stats"]) +
+                        ["%.1f%%" % (stage["success"] * 100.0 /
+                                     stage["count"]),
+                         stage["count"]])
+                table_rows.append(rutils.Struct(**dict(zip(headers, data))))
+            cliutils.print_list(table_rows, fields=headers,
+                                formatters=formatters,
+                                table_label="Stages (sec)",
+                                sortby_index=None)
+
+        # NOTE: Raw data is loaded only if it is printed, otherwise
+        #       precomputed summaries of the results are used.
+        task = db.task_get_detailed(task_id, with_raw=iterations_data)
 
         if task is None:
             print("The task %s can not be found" % task_id)
@@ -314,7 +357,12 @@ class TaskCommands(object):
                 print(yaml.safe_load(verification[2]))
             return
 
+        task_obj = objects.Task(task=task)
         for result in task["results"]:
+            # NOTE: Results of running scenarios are not shown, like before
+            #       they were stored while scenarios ran, unless asked for.
+            if not (partial or task_obj.is_result_finished(result)):
+                continue
             key = result["key"]
             print("-" * 80)
             print()
@@ -324,6 +372,8 @@ class TaskCommands(object):
             print(json.dumps(key["kw"], indent=2))
 
             raw = result["data"]["raw"]
+            summary = (result["data"].get("summary") or
+                       result_summary.summarize(raw))
             table_cols = ["action", "min", "median",
                           "90%ile", "95%ile", "max",
                           "avg", "success", "count"]
@@ -335,22 +385,15 @@ class TaskCommands(object):
                                    for col in float_cols]))
             table_rows = []
 
-            actions_data = utils.get_atomic_actions_data(raw)
-            for action in actions_data:
-                durations = actions_data[action]
-                if durations:
-                    data = [action,
-                            round(min(durations), 3),
-                            round(utils.median(durations), 3),
-                            round(utils.percentile(durations, 0.90), 3),
-                            round(utils.percentile(durations, 0.95), 3),
-                            round(max(durations), 3),
-                            round(utils.mean(durations), 3),
-                            "%.1f%%" % (len(durations) * 100.0 / len(raw)),
-                            len(raw)]
+            iterations = summary["iterations"]
+            for action in summary["atomic"]:
+                if action["count"]:
+                    success = "%.1f%%" % (action["count"] * 100.0 /
+                                          iterations)
                 else:
-                    data = [action, None, None, None, None, None, None,
-                            "0.0%", len(raw)]
+                    success = "0.0%"
+                data = ([action["name"]] + _get_stats_row(action["stats"]) +
+                        [success, iterations])
                 table_rows.append(rutils.Struct(**dict(zip(table_cols, data))))
 
             cliutils.print_list(table_rows, fields=table_cols,
@@ -358,6 +401,9 @@ class TaskCommands(object):
                                 table_label="Response Times (sec)",
                                 sortby_index=None)
 
+            if summary["stages"]:
+                _print_stages_data(summary["stages"])
+
             if iterations_data:
                 _print_iterations_data(raw)
 
@@ -365,15 +411,7 @@ class TaskCommands(object):
             print(_("Full duration: %s") % result["data"]["full_duration"])
 
             # NOTE(hughsaunders): ssrs=scenario specific results
-            ssrs = []
-            for result in raw:
-                data = result["scenario_output"].get("data")
-                if data:
-                    ssrs.append(data)
-            if ssrs:
-                keys = set()
-                for ssr in ssrs:
-                    keys.update(ssr.keys())
+            if summary["output"]:
                 headers = ["key", "min", "median",
                            "90%ile", "95%ile", "max",
                            "avg"]
@@ -383,19 +421,11 @@ class TaskCommands(object):
                                   [cliutils.pretty_float_formatter(col, 3)
                                    for col in float_cols]))
                 table_rows = []
-                for key in keys:
-                    values = [float(ssr[key]) for ssr in ssrs if key in ssr]
-
-                    if values:
-                        row = [str(key),
-                               round(min(values), 3),
-                               round(utils.median(values), 3),
-                               round(utils.percentile(values, 0.90), 3),
-                               round(utils.percentile(values, 0.95), 3),
-                               round(max(values), 3),
-                               round(utils.mean(values), 3)]
+                for ssr in summary["output"]:
+                    if ssr["stats"]:
+                        row = [str(ssr["key"])] + _get_stats_row(ssr["stats"])
                     else:
-                        row = [str(key)] + ["n/a"] * 6
+                        row = [str(ssr["key"])] + ["n/a"] * 6
                     table_rows.append(rutils.Struct(**dict(zip(headers, row))))
                 print("\nScenario Specific Results\n")
                 cliutils.print_list(table_rows,
@@ -403,10 +433,8 @@ class TaskCommands(object):
                                     formatters=formatters,
                                     table_label="Response Times (sec)")
 
-                for result in raw:
-                    errors = result["scenario_output"].get("errors")
-                    if errors:
-                        print(errors)
+                for errors in summary["output_errors"]:
+                    print(errors)
 
         print()
         print("HINTS:")
@@ -421,28 +449,53 @@ class TaskCommands(object):
         print("\trally task results %s\n" % task["uuid"])
 
     @cliutils.args("--uuid", type=str, dest="task_id", help="uuid of task")
+    @cliutils.args("--ndjson", dest="ndjson", action="store_true",
+                   help="output newline-delimited JSON, with results of "
+                        "each scenario on a separate line")
+    @cliutils.args("--partial", dest="partial", action="store_true",
+                   help="also output results of unfinished scenarios, e.g. "
+                        "if Rally crashed and left the task running")
     @envutils.with_default_task_id
     @cliutils.suppress_warnings
-    def results(self, task_id=None):
+    def results(self, task_id=None, ndjson=False, partial=False):
         """Display raw task results.
 
         This will produce a lot of output data about every iteration.
+        Results are written while they are read from the database, so
+        the output starts immediately and memory usage doesn't depend on
+        the number of iterations.
 
         :param task_id: Task uuid
+        :param ndjson: output newline-delimited JSON
+        :param partial: output results of unfinished scenarios too
         """
-        results = [{"key": x["key"], "result": x["data"]["raw"],
-                    "sla": x["data"]["sla"],
-                    "load_duration": x["data"]["load_duration"],
-                    "full_duration": x["data"]["full_duration"]}
-                   for x in objects.Task.get(task_id).get_results()]
+        task = objects.Task.get(task_id)
 
-        if results:
-            print(json.dumps(results, sort_keys=True, indent=4))
-        else:
+        results = task.iter_results(with_raw=False, partial=partial)
+        first = next(results, None)
+        if first is None:
             print(_("The task %s is still running, results will become "
-                    "available when it is finished.") % task_id)
+                    "available when it is finished. Use --partial to get "
+                    "results stored so far.") % task_id)
             return(1)
 
+        def _get_results():
+            for x in itertools.chain([first], results):
+                raw = x["data"]["raw"]
+                if "summary" in x["data"]:
+                    raw = task.iter_results_raw(x["id"])
+                yield {"key": x["key"], "result": raw,
+                       "sla": x["data"]["sla"],
+                       "load_duration": x["data"]["load_duration"],
+                       "full_duration": x["data"]["full_duration"]}
+
+        if ndjson:
+            json_stream.dump_lines(_get_results(), sys.stdout, sort_keys=True)
+        else:
+            json_stream.dump(_get_results(), sys.stdout, sort_keys=True,
+                             indent=4)
+            print()
+
     @cliutils.args("--deployment", type=str, dest="deployment",
                    help="List tasks from specified deployment."
                    "By default tasks listed from active deployment.")
@@ -509,7 +562,8 @@ class TaskCommands(object):
                         "\trally task start"))
 
     @cliutils.args("--tasks", dest="tasks", nargs="+",
-                   help="uuids of tasks or json files with task results")
+                   help="uuids of tasks or json files with task results "
+                        "(JSON arrays or newline-delimited JSON)")
     @cliutils.args("--out", type=str, dest="out", required=True,
                    help="Path to output file.")
     @cliutils.args("--open", dest="open_it", action="store_true",
@@ -520,9 +574,13 @@ class TaskCommands(object):
     @cliutils.args("--junit", dest="out_format",
                    action="store_const", const="junit",
                    help="Generate the report in the JUnit format.")
+    @cliutils.args("--partial", dest="partial", action="store_true",
+                   help="Also report results of unfinished scenarios, e.g. "
+                        "if Rally crashed and left the task running.")
     @envutils.default_from_global("tasks", envutils.ENV_TASK, "--uuid")
     @cliutils.suppress_warnings
-    def report(self, tasks=None, out=None, open_it=False, out_format="html"):
+    def report(self, tasks=None, out=None, open_it=False, out_format="html",
+               partial=False):
         """Generate report file for specified task.
 
         :param task_id: UUID, task identifier
@@ -530,81 +588,109 @@ class TaskCommands(object):
         :param out: str, output file name
         :param open_it: bool, whether to open output file in web browser
         :param out_format: output format (junit or html)
+        :param partial: bool, whether to report results of unfinished
+                        scenarios of tasks too
         """
 
         tasks = isinstance(tasks, list) and tasks or [tasks]
 
-        results = []
-        message = []
-        processed_names = {}
         for task_file_or_uuid in tasks:
-            if os.path.exists(os.path.expanduser(task_file_or_uuid)):
-                with open(os.path.expanduser(task_file_or_uuid),
-                          "r") as inp_js:
-                    tasks_results = json.load(inp_js)
-                    for result in tasks_results:
-                        try:
-                            jsonschema.validate(
-                                result,
-                                objects.task.TASK_RESULT_SCHEMA)
-                        except jsonschema.ValidationError as e:
-                            print(_("ERROR: Invalid task result format in %s")
-                                  % task_file_or_uuid, file=sys.stderr)
-                            if logging.is_debug():
-                                print(e, file=sys.stderr)
-                            else:
-                                print(e.message, file=sys.stderr)
-                            return 1
-
-            elif uuidutils.is_uuid_like(task_file_or_uuid):
-                tasks_results = map(
-                    lambda x: {"key": x["key"],
-                               "sla": x["data"]["sla"],
-                               "result": x["data"]["raw"],
-                               "load_duration": x["data"]["load_duration"],
-                               "full_duration": x["data"]["full_duration"]},
-                    objects.Task.get(task_file_or_uuid).get_results())
-            else:
+            if not (os.path.exists(os.path.expanduser(task_file_or_uuid)) or
+                    uuidutils.is_uuid_like(task_file_or_uuid)):
                 print(_("ERROR: Invalid UUID or file name passed: %s"
                         ) % task_file_or_uuid,
                       file=sys.stderr)
                 return 1
 
-            for task_result in tasks_results:
-                if task_result["key"]["name"] in processed_names:
-                    processed_names[task_result["key"]["name"]] += 1
-                    task_result["key"]["pos"] = processed_names[
-                        task_result["key"]["name"]]
+        def _load_file(task_file):
+            with open(os.path.expanduser(task_file), "r") as inp_js:
+                for result in json_stream.load(inp_js):
+                    try:
+                        jsonschema.validate(
+                            result,
+                            objects.task.TASK_RESULT_SCHEMA)
+                    except jsonschema.ValidationError as e:
+                        print(_("ERROR: Invalid task result format in %s")
+                              % task_file, file=sys.stderr)
+                        if logging.is_debug():
+                            print(e, file=sys.stderr)
+                        else:
+                            print(e.message, file=sys.stderr)
+                        raise
+                    yield result
+
+        def _load_task(task_uuid):
+            task = objects.Task.get(task_uuid)
+            for x in task.get_results(with_raw=False, partial=partial):
+                task_result = {
+                    "key": x["key"],
+                    "sla": x["data"]["sla"],
+                    "result": x["data"]["raw"],
+                    "load_duration": x["data"]["load_duration"],
+                    "full_duration": x["data"]["full_duration"]}
+                if "summary" in x["data"]:
+                    task_result["summary"] = x["data"]["summary"]
+                    # NOTE: Raw data of results with a summary is read
+                    #       while the report is generated, the JUnit
+                    #       report doesn't need it at all.
+                    if out_format != "junit":
+                        task_result["result"] = task.iter_results_raw(
+                            x["id"])
+                yield task_result
+
+        def _load_results():
+            # NOTE: Results are loaded one by one while the report is
+            #       generated, so results files are never kept in memory
+            #       as a whole.
+            processed_names = {}
+            for task_file_or_uuid in tasks:
+                if os.path.exists(os.path.expanduser(task_file_or_uuid)):
+                    tasks_results = _load_file(task_file_or_uuid)
                 else:
-                    processed_names[task_result["key"]["name"]] = 0
-                results.append(task_result)
+                    tasks_results = _load_task(task_file_or_uuid)
+
+                for task_result in tasks_results:
+                    if task_result["key"]["name"] in processed_names:
+                        processed_names[task_result["key"]["name"]] += 1
+                        task_result["key"]["pos"] = processed_names[
+                            task_result["key"]["name"]]
+                    else:
+                        processed_names[task_result["key"]["name"]] = 0
+                    yield task_result
 
         output_file = os.path.expanduser(out)
 
-        if out_format == "html":
-            with open(output_file, "w+") as f:
-                f.write(plot.plot(results))
-            if open_it:
-                webbrowser.open_new_tab("file://" + os.path.realpath(out))
-        elif out_format == "junit":
-            test_suite = junit.JUnit("Rally test suite")
-            for result in results:
-                if isinstance(result["sla"], list):
-                    message = ",".join([sla["detail"] for sla in
-                                        result["sla"] if not sla["success"]])
-                if message:
-                    outcome = junit.JUnit.FAILURE
-                else:
-                    outcome = junit.JUnit.SUCCESS
-                test_suite.add_test(result["key"]["name"],
-                                    result["full_duration"], outcome, message)
-            with open(output_file, "w+") as f:
-                f.write(test_suite.to_xml())
-        else:
-            print(_("Invalid output format: %s") % out_format,
-                  file=sys.stderr)
+        try:
+            if out_format == "html":
+                report = plot.plot(_load_results())
+            elif out_format == "junit":
+                test_suite = junit.JUnit("Rally test suite")
+                for result in _load_results():
+                    message = ""
+                    if isinstance(result["sla"], list):
+                        message = ",".join([sla["detail"] for sla in
+                                            result["sla"]
+                                            if not sla["success"]])
+                    if message:
+                        outcome = junit.JUnit.FAILURE
+                    else:
+                        outcome = junit.JUnit.SUCCESS
+                    test_suite.add_test(result["key"]["name"],
+                                        result["full_duration"], outcome,
+                                        message)
+                report = test_suite.to_xml()
+            else:
+                print(_("Invalid output format: %s") % out_format,
+                      file=sys.stderr)
+                return 1
+        except jsonschema.ValidationError:
             return 1
 
+        with open(output_file, "w+") as f:
+            f.write(report)
+        if out_format == "html" and open_it:
+            webbrowser.open_new_tab("file://" + os.path.realpath(out))
+
     @cliutils.args("--force", action="store_true", help="force delete")
     @cliutils.args("--uuid", type=str, dest="task_id", nargs="*",
                    metavar="TASK_ID",
@@ -643,7 +729,7 @@ class TaskCommands(object):
         :param task_id: Task uuid.
         :returns: Number of failed criteria.
         """
-        results = objects.Task.get(task_id).get_results()
+        results = objects.Task.get(task_id).iter_results(with_raw=False)
         failed_criteria = 0
         data = []
         STATUS_PASS = "PASS"
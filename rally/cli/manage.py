@@ -22,7 +22,11 @@ import sys
 from rally import api
 from rally.cli import cliutils
 from rally.cli import envutils
+from rally.common.i18n import _
 from rally import db
+from rally import plugins
+from rally.task import agent
+from rally.task import engine
 
 
 class DBCommands(object):
@@ -33,6 +37,19 @@ class DBCommands(object):
         db.db_create()
         envutils.clear_env()
 
+    def create(self):
+        """Create missing database tables, keeping the existing ones.
+
+        Use it to add tables introduced by a newer version of Rally to an
+        existing database.
+        """
+        db.db_create()
+
+    def compact(self):
+        """Store raw task results of older versions of Rally compactly."""
+        count = db.task_results_compact(engine.RESULTS_CHUNK_SIZE)
+        print(_("%d task results compacted.") % count)
+
 
 class TempestCommands(object):
     """Commands for Tempest management."""
@@ -68,8 +85,34 @@ class TempestCommands(object):
         api.Verification.reinstall_tempest(deployment, tempest_config, source)
 
 
+class AgentCommands(object):
+    """Commands for load generation agents."""
+
+    @cliutils.args("--host", type=str, dest="host", required=False,
+                   default="127.0.0.1",
+                   help="Host to listen on. Anyone who is able to connect to "
+                        "the agent and knows the authkey can run arbitrary "
+                        "code on it, so listen on other addresses than "
+                        "localhost only in trusted networks")
+    @cliutils.args("--port", type=int, dest="port", required=False,
+                   default=0, help="Port to listen on, any free port is "
+                                   "used by default")
+    @cliutils.args("--address", type=str, dest="address", required=False,
+                   help="host:port address which the distributed runner "
+                        "uses to connect to the agent. Fully qualified "
+                        "domain name and the port are used by default")
+    @plugins.ensure_plugins_are_loaded
+    def start(self, host="127.0.0.1", port=0, address=None):
+        """Start load generation agent for the distributed runner."""
+        try:
+            agent.Agent(host, port, address).serve()
+        except KeyboardInterrupt:
+            pass
+
+
 def main():
-    categories = {"db": DBCommands,
+    categories = {"agent": AgentCommands,
+                  "db": DBCommands,
                   "tempest": TempestCommands}
     cliutils.run(sys.argv, categories)
 
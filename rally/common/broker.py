@@ -17,54 +17,176 @@ import collections
 import threading
 import time
 
+from six.moves import queue as Queue
+
 from rally.common.i18n import _
 from rally.common import log as logging
+from rally.common import streaming_algorithms
 
 
 LOG = logging.getLogger(__name__)
 
+# Number of jobs per consumer that is enough to keep consumers busy. Callers
+# use it to bound the queue, so publishers that list resources don't keep
+# all of them in memory when consumers are slower.
+QUEUE_SIZE_PER_CONSUMER = 10
+
+
+class _Queue(object):
+    """Blocking queue of jobs, with the deque interface used by publishers.
+
+    append() blocks while a queue with max_size is full, popleft() blocks
+    while it is empty and not closed yet. When the queue is closed and empty,
+    popleft() raises IndexError just like deque does.
+    """
+
+    def __init__(self, max_size=None):
+        """Init queue.
+
+        :param max_size: max number of jobs in the queue, None for unlimited
+        """
+        self.max_size = max_size
+        self._jobs = collections.deque()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def append(self, job):
+        with self._not_full:
+            while self.max_size and len(self._jobs) >= self.max_size:
+                self._not_full.wait()
+            self._jobs.append(job)
+            self._not_empty.notify()
+
+    def extend(self, jobs):
+        for job in jobs:
+            self.append(job)
+
+    def popleft(self):
+        with self._not_empty:
+            while not self._jobs:
+                if self._closed:
+                    raise IndexError("pop from a closed empty queue")
+                self._not_empty.wait()
+            job = self._jobs.popleft()
+            self._not_full.notify()
+            return job
+
+    def close(self):
+        """Wake up all consumers waiting for jobs that won't come."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+
+
+class _ThreadPool(object):
+    """Pool of threads that are reused by subsequent broker runs.
+
+    A new thread is started only if there is no idle one, so nested runs
+    (publishers or consumers that run the broker themselves) never wait
+    for each other. Threads that stay idle for idle_timeout seconds exit.
+    """
+
+    def __init__(self, idle_timeout=60):
+        self.idle_timeout = idle_timeout
+        self._tasks = Queue.Queue()
+        self._idle = 0
+        self._lock = threading.Lock()
+
+    def _worker(self, task):
+        while True:
+            func, args, done = task
+            try:
+                func(*args)
+            except Exception as e:
+                LOG.exception(e)
+            finally:
+                with self._lock:
+                    self._idle += 1
+                done.set()
+
+            task = self._next_task()
+            if task is None:
+                break
+
+    def _next_task(self):
+        while True:
+            try:
+                return self._tasks.get(timeout=self.idle_timeout)
+            except Queue.Empty:
+                with self._lock:
+                    if self._tasks.empty():
+                        self._idle -= 1
+                        return None
+
+    def submit(self, func, *args):
+        """Run func(*args) in a thread of the pool.
+
+        :returns: threading.Event that is set when func is finished
+        """
+        done = threading.Event()
+        with self._lock:
+            if self._idle:
+                self._idle -= 1
+                self._tasks.put((func, args, done))
+                return done
+        thread = threading.Thread(target=self._worker,
+                                  args=((func, args, done),))
+        thread.daemon = True
+        thread.start()
+        return done
+
 
-def _consumer(consume, queue, is_published):
-    """Infinity worker that consumes tasks from queue.
+_POOL = _ThreadPool()
 
-    This finishes it's work only in case if is_published.isSet().
+
+def _consumer(consume, queue, stats, rate=None):
+    """Worker that consumes tasks from queue until it is closed.
 
     :param consume: method that consumes an object removed from the queue
-    :param queue: deque object to popleft() objects from
-    :param is_published: threading.Event that is used to stop the consumer
-                         when the queue is empty
+    :param queue: _Queue object to popleft() objects from
+    :param stats: dict to count failed jobs ("failed") and to put
+                  durations of jobs into ("durations" QuantileSketch)
+    :param rate: max number of jobs consumed per second, None for unlimited
     """
     cache = {}
+    next_start = None
     while True:
-        if not queue:
-            if is_published.isSet():
-                break
-            time.sleep(0.1)
-            continue
-        else:
-            try:
-                args = queue.popleft()
-            except IndexError:
-                # consumed by other thread
-                continue
+        try:
+            args = queue.popleft()
+        except IndexError:
+            break
+
+        if rate:
+            now = time.time()
+            if next_start and next_start > now:
+                time.sleep(next_start - now)
+            next_start = max(now, next_start or now) + 1.0 / rate
+
+        started = time.time()
         try:
             consume(cache, args)
         except Exception as e:
+            stats["failed"] += 1
             LOG.warning(_("Failed to consume a task from the queue: %s") % e)
             if logging.is_debug():
                 LOG.exception(e)
+        finally:
+            stats["durations"].add(time.time() - started)
 
 
-def _publisher(publish, queue, is_published):
+def _publisher(publish, queue):
     """Calls a publish method that fills queue with jobs.
 
-    After running publish method it sets is_published variable, that is used to
+    After running publish method it closes the queue, that is used to
     stop workers (consumers).
 
     :param publish: method that fills the queue
-    :param queue: deque object to be filled by the publish() method
-    :param is_published: threading.Event that is used to stop consumers and
-                         finish task
+    :param queue: _Queue object to be filled by the publish() method
     """
     try:
         publish(queue)
@@ -73,31 +195,59 @@ def _publisher(publish, queue, is_published):
         if logging.is_debug():
             LOG.exception(e)
     finally:
-        is_published.set()
+        queue.close()
 
 
-def run(publish, consume, consumers_count=1):
+def run(publish, consume, consumers_count=1, max_size=None,
+        consumers_rate=None):
     """Run broker.
 
     publish() put to queue, consume() process one element from queue.
 
     When publish() is finished and elements from queue are processed process
-    is finished all consumers threads are cleaned.
+    is finished. Consumers are run in threads of a pool shared by all runs.
 
     :param publish: Function that puts values to the queue
     :param consume: Function that processes a single value from the queue
     :param consumers_count: Number of consumers
+    :param max_size: Max number of values waiting in the queue, publish()
+                     is blocked while the queue is full. None for unlimited.
+                     Don't use it if consume() puts values to the queue, it
+                     would block forever on a full queue
+    :param consumers_rate: Max number of values processed by each consumer
+                           per second, None for unlimited
+    :returns: dict with number of processed ("jobs") and failed ("failed")
+              values, total duration ("duration") and min, median,
+              95 percentile and max of durations of processing single
+              values ("job_duration")
     """
-    queue = collections.deque()
-    is_published = threading.Event()
+    queue = _Queue(max_size)
 
+    started = time.time()
     consumers = []
     for i in range(consumers_count):
-        consumer = threading.Thread(target=_consumer,
-                                    args=(consume, queue, is_published))
-        consumer.start()
-        consumers.append(consumer)
-
-    _publisher(publish, queue, is_published)
-    for consumer in consumers:
-        consumer.join()
+        stats = {"failed": 0,
+                 "durations": streaming_algorithms.QuantileSketch()}
+        done = _POOL.submit(_consumer, consume, queue, stats, consumers_rate)
+        consumers.append((done, stats))
+
+    _publisher(publish, queue)
+
+    durations = streaming_algorithms.QuantileSketch()
+    failed = 0
+    for done, stats in consumers:
+        done.wait()
+        durations.merge(stats["durations"])
+        failed += stats["failed"]
+
+    result = {"jobs": durations.count, "failed": failed,
+              "duration": time.time() - started,
+              "job_duration": None}
+    if durations.count:
+        result["job_duration"] = {"min": durations.min,
+                                  "median": durations.percentile(50),
+                                  "95%ile": durations.percentile(95),
+                                  "max": durations.max}
+    LOG.debug("Broker processed %(jobs)d jobs (%(failed)d failed) in "
+              "%(duration).2fs" % result)
+    return result
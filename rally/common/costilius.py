@@ -34,6 +34,12 @@ except ImportError:
     # present in `collections` library.
     from ordereddict import OrderedDict  # noqa
 
+try:
+    from collections import abc as collections_abc  # noqa
+except ImportError:
+    # NOTE: Python 2 keeps abstract base classes in `collections` itself.
+    import collections as collections_abc  # noqa
+
 
 def is_py26():
     return sys.version_info[:2] == (2, 6)
@@ -0,0 +1,204 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Streaming JSON serialization.
+
+Iterators (e.g. generators) found in the serialized object are written
+as JSON arrays item by item while they are consumed, so data that is
+read lazily (like raw results of iterations) is never kept in memory as
+a whole. Dicts are streamed if some of their values are iterators, all
+other values are serialized by the json module at once.
+
+Loading works the other way round: items of a JSON array (or objects of
+newline-delimited JSON) are decoded and returned one by one while the
+file is read in chunks. Only the top level is streamed, each item is
+decoded as a whole.
+"""
+
+import json
+import re
+
+import six
+
+from rally.common import costilius
+
+
+def _is_iterator(obj):
+    return isinstance(obj, costilius.collections_abc.Iterator)
+
+
+def _iterencode(obj, indent, sort_keys, level):
+    if _is_iterator(obj):
+        items = enumerate(obj)
+        opening, closing = "[", "]"
+    elif (isinstance(obj, dict) and
+            any(_is_iterator(value) for value in six.itervalues(obj))):
+        items = sorted(obj.items()) if sort_keys else obj.items()
+        opening, closing = "{", "}"
+    else:
+        separators = (",", ": ") if indent is not None else None
+        encoded = json.dumps(obj, indent=indent, sort_keys=sort_keys,
+                             separators=separators)
+        if indent:
+            encoded = encoded.replace("\n", "\n" + " " * indent * level)
+        yield encoded
+        return
+
+    if indent is not None:
+        newline = "\n" + " " * indent * (level + 1)
+        separator = "," + newline
+    else:
+        newline = ""
+        separator = ", "
+
+    empty = True
+    for key, value in items:
+        if empty:
+            yield opening + newline
+            empty = False
+        else:
+            yield separator
+        if closing == "}":
+            yield json.dumps(key) + ": "
+        for chunk in _iterencode(value, indent, sort_keys, level + 1):
+            yield chunk
+    if empty:
+        yield opening + closing
+    elif indent is not None:
+        yield "\n" + " " * indent * level + closing
+    else:
+        yield closing
+
+
+def dump(obj, fp, indent=None, sort_keys=False):
+    """Serialize obj as JSON to fp, consuming iterators while writing.
+
+    :param obj: object to serialize
+    :param fp: file-like object to write to
+    :param indent: indentation level, as of json.dump()
+    :param sort_keys: whether to sort keys of dicts
+    """
+    for chunk in _iterencode(obj, indent, sort_keys, 0):
+        fp.write(chunk)
+
+
+def dump_lines(objects, fp, sort_keys=False):
+    """Serialize objects as newline-delimited JSON to fp.
+
+    Each object is written to a separate line as soon as it is taken
+    from the iterable.
+
+    :param objects: iterable of objects to serialize
+    :param fp: file-like object to write to
+    :param sort_keys: whether to sort keys of dicts
+    """
+    for obj in objects:
+        dump(obj, fp, sort_keys=sort_keys)
+        fp.write("\n")
+
+
+_CHUNK_SIZE = 65536
+_WHITESPACE = re.compile(r"\s*")
+
+
+class _Reader(object):
+    """Decodes JSON values one by one from a file read in chunks."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.buffer = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _read(self):
+        # NOTE: The size of chunks grows with the size of the value being
+        #       decoded, so big values are not decoded again and again.
+        chunk = self.fp.read(max(_CHUNK_SIZE, len(self.buffer) - self.pos))
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, "" at the end."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expecting '%s' at position %d of the chunk"
+                             % (char, self.pos))
+        self.pos += 1
+
+    def decode(self):
+        """Decode the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self._read():
+                    raise
+                continue
+            # NOTE: A number at the end of the buffer may be continued in
+            #       the next chunk.
+            if end == len(self.buffer) and self._read():
+                continue
+            self.pos = end
+            return obj
+
+
+def load(fp):
+    """Load objects from a JSON array or newline-delimited JSON.
+
+    Objects are decoded one by one while the file is read, so the whole
+    document is never kept in memory. A single JSON object is loaded as
+    the only object.
+
+    Each object is decoded as a whole though, including arrays nested in
+    it, so memory usage is bound by the size of the biggest object. For
+    task results that is a single scenario with all its iterations
+    ("result"); they are not streamed since callers validate and process
+    the scenario as a whole, and keys written after "result" (like "sla")
+    are needed before its iterations can be processed.
+
+    :param fp: file-like object to read from
+    :returns: iterator over objects; ValueError is raised while iterating
+              if the document is not valid
+    """
+    reader = _Reader(fp)
+    if reader.peek() != "[":
+        while reader.peek():
+            yield reader.decode()
+        return
+
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+    else:
+        while True:
+            yield reader.decode()
+            if reader.peek() == "]":
+                reader.pos += 1
+                break
+            reader.expect(",")
+    if reader.peek():
+        raise ValueError("Extra data after the JSON array")
@@ -25,6 +25,8 @@ from rally.plugins.openstack.scenarios.heat import utils as heat_utils
 from rally.plugins.openstack.scenarios.manila import utils as manila_utils
 from rally.plugins.openstack.scenarios.nova import utils as nova_utils
 from rally.plugins.openstack.scenarios.sahara import utils as sahara_utils
+from rally.task import agent
+from rally.task import engine
 from rally.verification.tempest import config as tempest_conf
 
 
@@ -41,8 +43,10 @@ def list_opts():
                          manila_utils.MANILA_BENCHMARK_OPTS,
                          nova_utils.NOVA_BENCHMARK_OPTS,
                          sahara_utils.SAHARA_TIMEOUT_OPTS,
-                         ec2_utils.EC2_BENCHMARK_OPTS)),
+                         ec2_utils.EC2_BENCHMARK_OPTS,
+                         engine.ENGINE_OPTS)),
         ("image",
          itertools.chain(tempest_conf.IMAGE_OPTS)),
-        ("users_context", itertools.chain(users.USER_CONTEXT_OPTS))
+        ("users_context", itertools.chain(users.USER_CONTEXT_OPTS)),
+        ("agent", itertools.chain(agent.AGENT_OPTS))
     ]
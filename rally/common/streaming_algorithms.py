@@ -14,6 +14,7 @@
 #    under the License.
 
 import abc
+import bisect
 import heapq
 import math
 
@@ -168,6 +169,236 @@ class PercentileComputation(StreamingAlgorithm):
         return self._current_percentile
 
 
+class QuantileSketch(StreamingAlgorithm):
+    """Compute percentiles of a stream of numbers in bounded memory.
+
+    Values are kept as is until there are more than max_bins of them, so
+    percentiles of small streams are exact. Then values are counted in
+    bins of logarithmically growing width, which estimates any percentile
+    with the given relative accuracy (the DDSketch algorithm). If there
+    are still more than max_bins bins, the lowest ones are collapsed.
+
+    Sketches with the same accuracy and max_bins can be merged, e.g. to
+    combine values processed by several workers or hosts.
+    """
+
+    def __init__(self, percent=50, accuracy=0.01, max_bins=2048):
+        """Init streaming computation.
+
+        :param percent: numeric percent (from 0.1 to 99.9) of result()
+        :param accuracy: max relative error of estimated percentiles
+        :param max_bins: max number of kept values or bins
+        """
+        if not 0 < percent < 100:
+            raise ValueError("Unexpected percent: %s" % percent)
+        if not 0 < accuracy < 1:
+            raise ValueError("Unexpected accuracy: %s" % accuracy)
+        if max_bins < 1:
+            raise ValueError("Unexpected max_bins: %s" % max_bins)
+        self._percent = percent
+        self.accuracy = accuracy
+        self.max_bins = int(max_bins)
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._gamma_log = math.log(self._gamma)
+
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        # Sorted values, until the sketch switches to bins
+        self._values = []
+        # Bins are identified by keys (sign, index), which are ordered
+        # in the same way as values in bins
+        self._bins = None
+        self._keys = None
+
+    def _key(self, value):
+        if value == 0:
+            return (0, 0)
+        index = int(math.ceil(math.log(abs(value)) / self._gamma_log))
+        return (1, index) if value > 0 else (-1, -index)
+
+    def _bin_value(self, key):
+        sign, index = key
+        if sign == 0:
+            value = 0.0
+        else:
+            value = sign * 2 * self._gamma ** (sign * index) / (
+                self._gamma + 1)
+        return min(max(value, self.min), self.max)
+
+    def _add_to_bins(self, key, count):
+        if key not in self._bins:
+            self._bins[key] = 0
+            bisect.insort(self._keys, key)
+        self._bins[key] += count
+
+    def _use_bins(self):
+        if self._bins is not None:
+            return
+        self._bins = {}
+        self._keys = []
+        for value in self._values:
+            self._add_to_bins(self._key(value), 1)
+        self._values = None
+
+    def _collapse(self):
+        excess = len(self._keys) - self.max_bins
+        if excess > 0:
+            collapsed = sum(self._bins.pop(key)
+                            for key in self._keys[:excess])
+            self._keys = self._keys[excess:]
+            self._bins[self._keys[0]] += collapsed
+
+    def add(self, value):
+        value = self._cast_to_float(value)
+
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if self._bins is None:
+            bisect.insort(self._values, value)
+            if len(self._values) > self.max_bins:
+                self._use_bins()
+                self._collapse()
+        else:
+            self._add_to_bins(self._key(value), 1)
+            self._collapse()
+
+    def merge(self, other):
+        """Add all values processed by other sketch to this one."""
+        if (self.accuracy, self.max_bins) != (other.accuracy,
+                                              other.max_bins):
+            raise ValueError("Unable to merge sketches with different "
+                             "accuracy or max_bins")
+        if not other.count:
+            return
+
+        self.count += other.count
+        self.total += other.total
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+
+        if self._bins is None and other._bins is None:
+            self._values = sorted(self._values + other._values)
+            if len(self._values) > self.max_bins:
+                self._use_bins()
+                self._collapse()
+            return
+
+        self._use_bins()
+        if other._bins is None:
+            for value in other._values:
+                self._add_to_bins(self._key(value), 1)
+        else:
+            for key, count in six.iteritems(other._bins):
+                self._add_to_bins(key, count)
+        self._collapse()
+
+    def percentile(self, percent):
+        """Return the percentile of values processed so far.
+
+        :param percent: numeric percent (from 0 to 100)
+        """
+        if not 0 <= percent <= 100:
+            raise ValueError("Unexpected percent: %s" % percent)
+        if not self.count:
+            raise ValueError("No values have been processed")
+
+        k = (self.count - 1) * percent / 100.0
+        if self._bins is None:
+            f = int(math.floor(k))
+            c = int(math.ceil(k))
+            if f == c:
+                return self._values[f]
+            return self._values[f] * (c - k) + self._values[c] * (k - f)
+
+        # NOTE: Bins are walked from the nearest end, so high percentiles
+        #       are found in a few steps.
+        rank = int(math.floor(k))
+        if percent <= 50:
+            keys = self._keys
+        else:
+            keys = reversed(self._keys)
+            rank = self.count - 1 - rank
+        counted = 0
+        for key in keys:
+            counted += self._bins[key]
+            if counted > rank:
+                return self._bin_value(key)
+
+    def rank(self, value):
+        """Return the number of processed values not greater than value.
+
+        The number is exact until the sketch switches to bins, then all
+        values of the bin of the given value are counted.
+        """
+        return self.ranks([value])[0]
+
+    def ranks(self, values):
+        """Return rank() of each of the sorted values.
+
+        Bins are walked once for all values, so it takes
+        O(len(values) + resolution).
+        """
+        if self._bins is None:
+            return [bisect.bisect_right(self._values, value)
+                    for value in values]
+        ranks = []
+        counted = 0
+        index = 0
+        for value in values:
+            if value >= self.max:
+                ranks.append(self.count)
+                continue
+            key = self._key(value)
+            while index < len(self._keys) and self._keys[index] <= key:
+                counted += self._bins[self._keys[index]]
+                index += 1
+            ranks.append(counted)
+        return ranks
+
+    def result(self):
+        if not self.count:
+            raise ValueError("No values have been processed")
+        return self.percentile(self._percent)
+
+    def to_dict(self):
+        """Return the state of the sketch as a JSON-serializable dict."""
+        data = {"percent": self._percent, "accuracy": self.accuracy,
+                "max_bins": self.max_bins, "count": self.count,
+                "total": self.total, "min": self.min, "max": self.max}
+        if self._bins is None:
+            data["values"] = list(self._values)
+        else:
+            data["bins"] = [[sign, index, self._bins[(sign, index)]]
+                            for sign, index in self._keys]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Restore the sketch from the result of to_dict()."""
+        sketch = cls(data["percent"], data["accuracy"], data["max_bins"])
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        if "bins" in data:
+            sketch._bins = dict(((sign, index), count)
+                                for sign, index, count in data["bins"])
+            sketch._keys = sorted(sketch._bins)
+            sketch._values = None
+        else:
+            sketch._values = sorted(data["values"])
+        return sketch
+
+
 class ProgressComputation(StreamingAlgorithm):
     """Compute progress in percent."""
 
@@ -94,13 +94,15 @@ def task_get_detailed_last():
     return get_impl().task_get_detailed_last()
 
 
-def task_get_detailed(uuid):
+def task_get_detailed(uuid, with_raw=True):
     """Returns task with results by uuid.
 
     :param uuid: UUID of the task.
+    :param with_raw: if False, raw data of the results which have a summary
+                     is not loaded.
     :returns: task dict with data on the task and its results.
     """
-    return get_impl().task_get_detailed(uuid)
+    return get_impl().task_get_detailed(uuid, with_raw=with_raw)
 
 
 def task_create(values):
@@ -151,13 +153,56 @@ def task_delete(uuid, status=None):
     return get_impl().task_delete(uuid, status=status)
 
 
-def task_result_get_all_by_uuid(task_uuid):
+def task_result_get_all_by_uuid(task_uuid, with_raw=True):
     """Get list of task results.
 
+    Raw data of the results stored in chunks is gathered from the chunks.
+
     :param task_uuid: string with UUID of Task instance.
+    :param with_raw: if False, raw data of the results which have a summary
+                     is not loaded.
     :returns: list instances of TaskResult.
     """
-    return get_impl().task_result_get_all_by_uuid(task_uuid)
+    return get_impl().task_result_get_all_by_uuid(task_uuid,
+                                                  with_raw=with_raw)
+
+
+def task_result_iter_by_uuid(task_uuid, with_raw=True):
+    """Iterate over task results.
+
+    Unlike task_result_get_all_by_uuid(), results are fetched from the
+    database in batches while iterating, so they don't have to be kept
+    in memory all at once.
+
+    :param task_uuid: string with UUID of Task instance.
+    :param with_raw: if False, raw data of the results which have a summary
+                     is not loaded.
+    :returns: iterator over instances of TaskResult.
+    """
+    return get_impl().task_result_iter_by_uuid(task_uuid, with_raw=with_raw)
+
+
+def task_result_meta_get_all_by_uuid(task_uuid):
+    """Get list of task results without their data.
+
+    :param task_uuid: string with UUID of Task instance.
+    :returns: list of dicts with id, key, task_uuid, created_at and
+              updated_at of the task results.
+    """
+    return get_impl().task_result_meta_get_all_by_uuid(task_uuid)
+
+
+def task_result_iter_raw(result_id):
+    """Iterate over raw data of the task result.
+
+    Chunks of raw data are fetched from the database one by one while
+    iterating.
+
+    :param result_id: id of TaskResult instance.
+    :raises TaskResultNotFound: if the task result does not exist.
+    :returns: iterator over results of scenario iterations.
+    """
+    return get_impl().task_result_iter_raw(result_id)
 
 
 def task_result_create(task_uuid, key, data):
@@ -171,6 +216,45 @@ def task_result_create(task_uuid, key, data):
     return get_impl().task_result_create(task_uuid, key, data)
 
 
+def task_result_update(result_id, data):
+    """Update data of the task result.
+
+    :param result_id: id of TaskResult instance.
+    :param data: new data of the task result.
+    :raises: :class:`rally.exceptions.TaskResultNotFound` if the task
+             result does not exist.
+    :returns: TaskResult instance updated.
+    """
+    return get_impl().task_result_update(result_id, data)
+
+
+def task_results_compact(chunk_size):
+    """Move raw data of task results stored as a whole to chunks.
+
+    Results stored by older versions of Rally keep all iteration results
+    in the task result record. They are moved to chunks, which are stored
+    in compact form.
+
+    :param chunk_size: maximum number of iteration results in a chunk.
+    :returns: number of task results compacted.
+    """
+    return get_impl().task_results_compact(chunk_size)
+
+
+def task_result_chunk_create(result_id, position, raw):
+    """Store a chunk of raw iteration results of the task result.
+
+    Chunks are appended to the raw data of the task result in the order
+    of their positions when the result is read.
+
+    :param result_id: id of TaskResult instance.
+    :param position: position of the chunk within the task result.
+    :param raw: list of iteration results.
+    :returns: TaskResultChunk instance created.
+    """
+    return get_impl().task_result_chunk_create(result_id, position, raw)
+
+
 def deployment_create(values):
     """Create a deployment from the values dictionary.
 
@@ -261,6 +345,63 @@ def resource_delete(id):
     return get_impl().resource_delete(id)
 
 
+def user_pool_tenant_create(values):
+    """Add a tenant with users to the user pool of a deployment.
+
+    :param values: a dict with data on the tenant.
+    :returns: a dict with updated data on the tenant.
+    """
+    return get_impl().user_pool_tenant_create(values)
+
+
+def user_pool_tenant_lease(deployment_uuid, task_uuid, count, users_count,
+                           project_domain, user_domain):
+    """Lease free tenants of the user pool of a deployment to a task.
+
+    Tenants that are leased concurrently by another task are skipped.
+
+    :param deployment_uuid: UUID of the deployment
+    :param task_uuid: UUID of the task the tenants are leased to
+    :param count: max number of tenants to lease
+    :param users_count: min number of users of each tenant
+    :param project_domain: domain of the tenants
+    :param user_domain: domain of the users
+    :returns: a list of dicts with data on the leased tenants
+    """
+    return get_impl().user_pool_tenant_lease(
+        deployment_uuid, task_uuid, count, users_count, project_domain,
+        user_domain)
+
+
+def user_pool_tenant_release(ids):
+    """Return leased tenants to the user pool.
+
+    :param ids: IDs of the tenants in the pool
+    """
+    return get_impl().user_pool_tenant_release(ids)
+
+
+def user_pool_tenant_get_all(deployment_uuid, task_uuid=None):
+    """Return tenants of the user pool of a deployment.
+
+    :param deployment_uuid: UUID of the deployment
+    :param task_uuid: if specified, return only tenants leased to the task
+    :returns: a list of dicts with data on the tenants
+    """
+    return get_impl().user_pool_tenant_get_all(deployment_uuid,
+                                               task_uuid=task_uuid)
+
+
+def user_pool_tenant_delete(id):
+    """Remove a tenant from the user pool.
+
+    :param id: ID of the tenant in the pool
+    :raises: :class:`rally.exceptions.UserPoolTenantNotFound` if the tenant
+             does not exist.
+    """
+    return get_impl().user_pool_tenant_delete(id)
+
+
 def verification_create(deployment_uuid):
     """Create Verification record in DB.
 
@@ -355,6 +496,17 @@ def get_worker(hostname):
     return get_impl().get_worker(hostname)
 
 
+def get_workers(updated_since=None):
+    """Get a list of registered worker services.
+
+    :param updated_since: datetime, if specified, only workers that have
+                          been active (see update_worker()) since this time
+                          are returned
+    :returns: A list of workers.
+    """
+    return get_impl().get_workers(updated_since)
+
+
 def unregister_worker(hostname):
     """Unregister this worker with the service registry.
 
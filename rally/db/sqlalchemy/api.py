@@ -59,6 +59,9 @@ def get_backend():
 
 class Connection(object):
 
+    # Number of task results fetched from the database at once
+    RESULTS_BATCH_SIZE = 10
+
     def db_cleanup(self):
         global _FACADE
 
@@ -103,15 +106,27 @@ class Connection(object):
     def task_get(self, uuid):
         return self._task_get(uuid)
 
-    def task_get_detailed(self, uuid):
-        return (self.model_query(models.Task).
-                options(sa.orm.joinedload("results")).
-                filter_by(uuid=uuid).first())
+    def _task_with_results(self, task, with_raw=True):
+        if task is None:
+            return None
+        task_dict = dict(task)
+        task_dict["results"] = [self._task_result_assemble(result, with_raw)
+                                for result in task.results]
+        return task_dict
+
+    def task_get_detailed(self, uuid, with_raw=True):
+        session = get_session()
+        return self._task_with_results(
+            self.model_query(models.Task, session=session).
+            options(sa.orm.joinedload("results").undefer("data")).
+            filter_by(uuid=uuid).first(), with_raw)
 
     def task_get_detailed_last(self):
-        return (self.model_query(models.Task).
-                options(sa.orm.joinedload("results")).
-                order_by(models.Task.id.desc()).first())
+        session = get_session()
+        return self._task_with_results(
+            self.model_query(models.Task, session=session).
+            options(sa.orm.joinedload("results").undefer("data")).
+            order_by(models.Task.id.desc()).first())
 
     def task_create(self, values):
         task = models.Task()
@@ -149,6 +164,12 @@ class Connection(object):
             if status is not None:
                 query = base_query.filter_by(status=status)
 
+            result_ids = (session.query(models.TaskResult.id).
+                          filter_by(task_uuid=uuid))
+            (self.model_query(models.TaskResultChunk, session=session).
+             filter(models.TaskResultChunk.task_result_id.in_(
+                 result_ids.subquery())).
+             delete(synchronize_session=False))
             (self.model_query(models.TaskResult).filter_by(task_uuid=uuid).
              delete(synchronize_session=False))
 
@@ -168,9 +189,116 @@ class Connection(object):
         result.save()
         return result
 
-    def task_result_get_all_by_uuid(self, uuid):
-        return (self.model_query(models.TaskResult).
-                filter_by(task_uuid=uuid).all())
+    def task_result_update(self, result_id, data):
+        session = get_session()
+        with session.begin():
+            result = (self.model_query(models.TaskResult, session=session).
+                      filter_by(id=result_id).first())
+            if not result:
+                raise exceptions.TaskResultNotFound(id=result_id)
+            result.update({"data": data})
+        return result
+
+    def task_result_chunk_create(self, result_id, position, raw):
+        chunk = models.TaskResultChunk()
+        chunk.update({"task_result_id": result_id, "position": position,
+                      "data": {"raw": raw}})
+        chunk.save()
+        return chunk
+
+    def task_results_compact(self, chunk_size):
+        result_ids = [
+            result_id for result_id, in
+            self.model_query(models.TaskResult).
+            filter(~models.TaskResult.chunks.any()).
+            with_entities(models.TaskResult.id)]
+        compacted = 0
+        for result_id in result_ids:
+            session = get_session()
+            with session.begin():
+                result = (self.model_query(models.TaskResult,
+                                           session=session).
+                          filter_by(id=result_id).first())
+                raw = result.data.get("raw")
+                if not raw:
+                    continue
+                for position, start in enumerate(
+                        range(0, len(raw), chunk_size)):
+                    chunk = models.TaskResultChunk()
+                    chunk.update({"task_result_id": result_id,
+                                  "position": position,
+                                  "data": {"raw": raw[start:start +
+                                                      chunk_size]}})
+                    session.add(chunk)
+                result.update({"data": dict(result.data, raw=[])})
+            compacted += 1
+        return compacted
+
+    def _task_result_assemble(self, result, with_raw=True):
+        """Return the task result with raw data gathered from its chunks.
+
+        Chunks are loaded only when the result is assembled. Results that
+        were stored as a whole (without chunks) are returned as is, as
+        well as results with a summary if raw data is not required.
+        """
+        if not with_raw and "summary" in result.data:
+            return result
+        if not result.chunks:
+            return result
+        raw = list(result.data.get("raw", []))
+        for chunk in result.chunks:
+            raw.extend(chunk.data["raw"])
+        result_dict = dict(result)
+        result_dict["data"] = dict(result.data, raw=raw)
+        return result_dict
+
+    def task_result_get_all_by_uuid(self, uuid, with_raw=True):
+        return list(self.task_result_iter_by_uuid(uuid, with_raw=with_raw))
+
+    def task_result_iter_by_uuid(self, uuid, with_raw=True):
+        # NOTE: Results are fetched in batches and assembled one by one, so
+        #       only the results kept by the caller stay in memory. The
+        #       session is kept until all of them are fetched, since their
+        #       chunks are loaded on demand.
+        #       The query is executed right away, so errors are raised by
+        #       the call rather than by the first iteration.
+        session = get_session()
+        results = iter(self.model_query(models.TaskResult, session=session).
+                       options(sa.orm.undefer("data")).
+                       filter_by(task_uuid=uuid).
+                       order_by(models.TaskResult.id).
+                       yield_per(self.RESULTS_BATCH_SIZE))
+        return (self._task_result_assemble(result, with_raw)
+                for result in results)
+
+    def task_result_meta_get_all_by_uuid(self, uuid):
+        columns = ("id", "key", "task_uuid", "created_at", "updated_at")
+        query = (self.model_query(models.TaskResult).
+                 with_entities(*[getattr(models.TaskResult, column)
+                                 for column in columns]).
+                 filter_by(task_uuid=uuid).
+                 order_by(models.TaskResult.id))
+        return [dict(zip(columns, row)) for row in query]
+
+    def task_result_iter_raw(self, result_id):
+        session = get_session()
+        result = (self.model_query(models.TaskResult, session=session).
+                  options(sa.orm.undefer("data")).
+                  filter_by(id=result_id).first())
+        if not result:
+            raise exceptions.TaskResultNotFound(id=result_id)
+        return self._task_result_iter_raw(result, session)
+
+    def _task_result_iter_raw(self, result, session):
+        for iteration in result.data.get("raw", []):
+            yield iteration
+        chunks = (self.model_query(models.TaskResultChunk, session=session).
+                  filter_by(task_result_id=result.id).
+                  order_by(models.TaskResultChunk.position).
+                  yield_per(1))
+        for chunk in chunks:
+            for iteration in chunk.data["raw"]:
+                yield iteration
 
     def _deployment_get(self, deployment, session=None):
         stored_deployment = self.model_query(
@@ -199,6 +327,9 @@ class Connection(object):
         with session.begin():
             count = (self.model_query(models.Resource, session=session).
                      filter_by(deployment_uuid=uuid).count())
+            count += (self.model_query(models.UserPoolTenant,
+                                       session=session).
+                      filter_by(deployment_uuid=uuid).count())
             if count:
                 raise exceptions.DeploymentIsBusy(uuid=uuid)
 
@@ -249,6 +380,59 @@ class Connection(object):
         if not count:
             raise exceptions.ResourceNotFound(id=id)
 
+    def user_pool_tenant_create(self, values):
+        tenant = models.UserPoolTenant()
+        tenant.update(values)
+        tenant.save()
+        return tenant
+
+    def user_pool_tenant_lease(self, deployment_uuid, task_uuid, count,
+                               users_count, project_domain, user_domain):
+        free = (self.model_query(models.UserPoolTenant).
+                filter_by(deployment_uuid=deployment_uuid, task_uuid=None,
+                          project_domain=project_domain,
+                          user_domain=user_domain).
+                filter(models.UserPoolTenant.users_count >= users_count).
+                order_by(models.UserPoolTenant.id).
+                with_entities(models.UserPoolTenant.id))
+        leased = []
+        while len(leased) < count:
+            ids = [id_ for id_, in free.limit(count - len(leased))]
+            if not ids:
+                break
+            for id_ in ids:
+                # NOTE: The tenant is leased only if it is still free, so
+                #       tenants are never leased to concurrent tasks twice.
+                if (self.model_query(models.UserPoolTenant).
+                        filter_by(id=id_, task_uuid=None).
+                        update({"task_uuid": task_uuid},
+                               synchronize_session=False)):
+                    leased.append(id_)
+        if not leased:
+            return []
+        return (self.model_query(models.UserPoolTenant).
+                filter(models.UserPoolTenant.id.in_(leased)).
+                order_by(models.UserPoolTenant.id).all())
+
+    def user_pool_tenant_release(self, ids):
+        if ids:
+            (self.model_query(models.UserPoolTenant).
+             filter(models.UserPoolTenant.id.in_(ids)).
+             update({"task_uuid": None}, synchronize_session=False))
+
+    def user_pool_tenant_get_all(self, deployment_uuid, task_uuid=None):
+        query = (self.model_query(models.UserPoolTenant).
+                 filter_by(deployment_uuid=deployment_uuid))
+        if task_uuid is not None:
+            query = query.filter_by(task_uuid=task_uuid)
+        return query.order_by(models.UserPoolTenant.id).all()
+
+    def user_pool_tenant_delete(self, id):
+        count = (self.model_query(models.UserPoolTenant).
+                 filter_by(id=id).delete(synchronize_session=False))
+        if not count:
+            raise exceptions.UserPoolTenantNotFound(id=id)
+
     def verification_create(self, deployment_uuid):
         verification = models.Verification()
         verification.update({"deployment_uuid": deployment_uuid})
@@ -320,6 +504,12 @@ class Connection(object):
         except NoResultFound:
             raise exceptions.WorkerNotFound(worker=hostname)
 
+    def get_workers(self, updated_since=None):
+        query = self.model_query(models.Worker)
+        if updated_since is not None:
+            query = query.filter(models.Worker.updated_at >= updated_since)
+        return query.order_by(models.Worker.hostname).all()
+
     def unregister_worker(self, hostname):
         count = (self.model_query(models.Worker).
                  filter_by(hostname=hostname).delete())
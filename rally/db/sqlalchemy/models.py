@@ -174,7 +174,9 @@ class TaskResult(BASE, RallyBase):
     id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
 
     key = sa.Column(sa_types.MutableJSONEncodedDict, nullable=False)
-    data = sa.Column(sa_types.BigMutableJSONEncodedDict, nullable=False)
+    # NOTE: Data of results may be large, so it is loaded only on demand.
+    data = sa.orm.deferred(
+        sa.Column(sa_types.BigMutableJSONEncodedDict, nullable=False))
 
     task_uuid = sa.Column(sa.String(36), sa.ForeignKey("tasks.uuid"))
     task = sa.orm.relationship(Task,
@@ -183,6 +185,31 @@ class TaskResult(BASE, RallyBase):
                                primaryjoin="TaskResult.task_uuid == Task.uuid")
 
 
+class TaskResultChunk(BASE, RallyBase):
+    """Represents a chunk of raw iteration results of the task result.
+
+    Results of iterations are stored in chunks while the scenario is still
+    running, so they don't have to be kept in memory until it is finished.
+    """
+    __tablename__ = "task_result_chunks"
+    __table_args__ = (
+        sa.Index("task_result_chunk_result_id", "task_result_id",
+                 "position"),
+    )
+
+    id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
+
+    position = sa.Column(sa.Integer, nullable=False)
+    data = sa.Column(sa_types.BigCompactJSONEncodedDict, nullable=False)
+
+    task_result_id = sa.Column(sa.Integer, sa.ForeignKey("task_results.id"))
+    task_result = sa.orm.relationship(
+        TaskResult,
+        backref=sa.orm.backref("chunks", order_by=position),
+        foreign_keys=task_result_id,
+        primaryjoin="TaskResultChunk.task_result_id == TaskResult.id")
+
+
 class Verification(BASE, RallyBase):
     """Represents a verifier result."""
 
@@ -224,6 +251,40 @@ class VerificationResult(BASE, RallyBase):
     data = sa.Column(sa_types.BigMutableJSONEncodedDict, nullable=False)
 
 
+class UserPoolTenant(BASE, RallyBase):
+    """Represents a tenant with users kept for reuse by benchmark tasks.
+
+    A tenant is leased by a task while its task_uuid is set.
+    """
+    __tablename__ = "user_pool_tenants"
+    __table_args__ = (
+        sa.Index("user_pool_tenant_deployment_uuid", "deployment_uuid",
+                 "task_uuid"),
+        sa.Index("user_pool_tenant_task_uuid", "task_uuid"),
+    )
+
+    id = sa.Column(sa.Integer, primary_key=True, autoincrement=True)
+
+    deployment_uuid = sa.Column(
+        sa.String(36),
+        sa.ForeignKey(Deployment.uuid),
+        nullable=False,
+    )
+    task_uuid = sa.Column(sa.String(36), nullable=True, default=None)
+
+    project_domain = sa.Column(sa.String(255), nullable=False)
+    user_domain = sa.Column(sa.String(255), nullable=False)
+    users_count = sa.Column(sa.Integer, nullable=False)
+
+    # NOTE: The tenant ({"id": ..., "name": ...}) and the list of its users
+    #       ({"id": ..., "endpoint": <dict of rally.objects.Endpoint>}).
+    #       Endpoints include passwords of the users in plain text, like
+    #       the credentials of deployments, since tenants of the pool are
+    #       reused by tasks without any calls to keystone.
+    tenant = sa.Column(sa_types.JSONEncodedDict, nullable=False)
+    users = sa.Column(sa_types.JSONEncodedDict, nullable=False)
+
+
 class Worker(BASE, RallyBase):
     __tablename__ = "workers"
     __table_args__ = (
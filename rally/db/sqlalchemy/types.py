@@ -13,8 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import base64
 import json
+import zlib
 
+import six
 from sqlalchemy.dialects import mysql as mysql_types
 from sqlalchemy.ext import mutable
 from sqlalchemy import types as sa_types
@@ -55,6 +58,149 @@ class BigJSONEncodedDict(JSONEncodedDict):
             return dialect.type_descriptor(sa_types.Text)
 
 
+def _encode_column(values):
+    """Encode the list of values of a single result key.
+
+    Lists of numbers are stored as they are. Dicts of numbers which have
+    the same order of keys (like atomic actions) are stored as a matrix
+    with a row per iteration. Other values are stored sparsely if most of
+    them are equal to the value of the first iteration (like errors and
+    scenario output).
+    """
+    if all(isinstance(v, (six.integer_types, float)) and
+           not isinstance(v, bool) for v in values):
+        return {"values": values}
+
+    if all(isinstance(v, dict) for v in values):
+        names = []
+        for value in values:
+            for name in value:
+                if name not in names:
+                    names.append(name)
+        numbers = six.integer_types + (float,)
+        matrix = []
+        for value in values:
+            if (list(value) != [n for n in names if n in value] or
+                    not all(isinstance(v, numbers) and
+                            not isinstance(v, bool)
+                            for v in six.itervalues(value))):
+                break
+            matrix.append([value.get(n) for n in names])
+        else:
+            return {"names": names, "matrix": matrix}
+
+    default = values[0]
+    index = [i for i, v in enumerate(values) if v != default]
+    if len(index) * 2 <= len(values):
+        return {"default": default, "index": index,
+                "values": [values[i] for i in index]}
+    return {"values": values}
+
+
+def _copy_json(value):
+    """Copy json-compatible value, much faster than copy.deepcopy()."""
+    if isinstance(value, dict):
+        return dict((k, _copy_json(v)) for k, v in six.iteritems(value))
+    if isinstance(value, list):
+        return [_copy_json(v) for v in value]
+    return value
+
+
+def _decode_column(column, count):
+    if "names" in column:
+        names = column["names"]
+        return [costilius.OrderedDict((n, v) for n, v in zip(names, row)
+                                      if v is not None)
+                for row in column["matrix"]]
+    if "default" in column:
+        default = column["default"]
+        if isinstance(default, (dict, list)):
+            # NOTE: Results may be changed by their consumers, so each of
+            #       them gets its own copy of the default value.
+            values = [_copy_json(default) for i in range(count)]
+        else:
+            values = [default] * count
+        for i, value in zip(column["index"], column["values"]):
+            values[i] = value
+        return values
+    return column["values"]
+
+
+def raw_to_columns(raw):
+    """Convert the list of iteration results to the columnar form.
+
+    :param raw: list of dicts, one per iteration
+    :returns: dict with the number of iterations ("count"), the keys of
+              the results in their order ("keys"), the encoded values of
+              each key ("columns") and indices of the iterations without
+              the key ("absent")
+    """
+    keys = []
+    for result in raw:
+        for key in result:
+            if key not in keys:
+                keys.append(key)
+
+    columns = {}
+    absent = {}
+    for key in keys:
+        missing = [i for i, r in enumerate(raw) if key not in r]
+        if missing:
+            absent[key] = missing
+            values = [r[key] for r in raw if key in r]
+        else:
+            values = [r[key] for r in raw]
+        columns[key] = _encode_column(values)
+    return {"count": len(raw), "keys": keys, "columns": columns,
+            "absent": absent}
+
+
+def columns_to_raw(columns):
+    """Convert iteration results from the columnar form back to the list."""
+    count = columns["count"]
+    raw = [{} for i in range(count)]
+    for key in columns["keys"]:
+        missing = set(columns["absent"].get(key, []))
+        present = [r for i, r in enumerate(raw) if i not in missing]
+        values = _decode_column(columns["columns"][key], len(present))
+        for result, value in zip(present, values):
+            result[key] = value
+    return raw
+
+
+class BigCompactJSONEncodedDict(BigJSONEncodedDict):
+    """Represents an immutable structure with task results in compact form.
+
+       The list of iteration results stored under the "raw" key is
+       converted to the columnar form (see raw_to_columns()), and the
+       whole structure is stored as zlib-compressed json, so keys of the
+       results are not repeated for every iteration. Values stored as plain
+       json by JSONEncodedDict are read as they are.
+    """
+
+    PREFIX = "zlib:"
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        if isinstance(value.get("raw"), list):
+            value = dict(value)
+            value["raw_columns"] = raw_to_columns(value.pop("raw"))
+        data = zlib.compress(json.dumps(value).encode("utf-8"))
+        return self.PREFIX + base64.b64encode(data).decode("ascii")
+
+    def process_result_value(self, value, dialect):
+        if value is None or not value.startswith(self.PREFIX):
+            return super(BigCompactJSONEncodedDict,
+                         self).process_result_value(value, dialect)
+        data = zlib.decompress(base64.b64decode(value[len(self.PREFIX):]))
+        value = costilius.json_loads(data.decode("utf-8"),
+                                     object_pairs_hook=costilius.OrderedDict)
+        if "raw_columns" in value:
+            value["raw"] = columns_to_raw(value.pop("raw_columns"))
+        return value
+
+
 class MutableDict(mutable.Mutable, dict):
     @classmethod
     def coerce(cls, key, value):
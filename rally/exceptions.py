@@ -142,6 +142,10 @@ class TaskNotFound(NotFoundException):
     msg_fmt = _("Task with uuid=%(uuid)s not found.")
 
 
+class TaskResultNotFound(NotFoundException):
+    msg_fmt = _("Task result with id=%(id)s not found.")
+
+
 class DeploymentNotFound(NotFoundException):
     msg_fmt = _("Deployment %(deployment)s not found.")
 
@@ -163,12 +167,21 @@ class ResourceNotFound(NotFoundException):
     msg_fmt = _("Resource with id=%(id)s not found.")
 
 
+class UserPoolTenantNotFound(NotFoundException):
+    msg_fmt = _("Tenant with id=%(id)s not found in the user pool.")
+
+
 class TimeoutException(RallyException):
     msg_fmt = _("Rally tired waiting for %(resource_type)s %(resource_name)s:"
                 "%(resource_id)s to become %(desired_status)s current "
                 "status %(resource_status)s")
 
 
+class IterationTimeout(TimeoutException):
+    msg_fmt = _("Scenario iteration %(iteration)s has not finished in "
+                "%(timeout)s seconds")
+
+
 class GetResourceFailure(RallyException):
     msg_fmt = _("Failed to get the resource %(resource)s: %(err)s")
 
@@ -252,6 +265,19 @@ class WorkerAlreadyRegistered(RallyException):
     msg_fmt = _("Worker %(worker)s already registered")
 
 
+class NoAgentsFound(RallyException):
+    msg_fmt = _("No live load generation agents found.")
+
+
+class AgentAuthKeyNotSet(RallyException):
+    msg_fmt = _("Key to authenticate load generation agents is not set, "
+                "set authkey in the [agent] section of rally.conf.")
+
+
+class AgentFailure(RallyException):
+    msg_fmt = _("Agent %(agent)s failed: %(error)s")
+
+
 class SaharaClusterFailure(RallyException):
     msg_fmt = _("Sahara cluster %(name)s has failed to %(action)s. "
                 "Reason: '%(reason)s'")
@@ -17,4 +17,5 @@
 from rally.objects.deploy import Deployment  # noqa
 from rally.objects.endpoint import Endpoint  # noqa
 from rally.objects.task import Task  # noqa
+from rally.objects.user_pool import UserPool  # noqa
 from rally.objects.verification import Verification  # noqa
@@ -73,6 +73,9 @@ TASK_RESULT_SCHEMA = {
                     "idle_duration": {
                         "type": "number"
                     },
+                    "scheduled_timestamp": {
+                        "type": "number"
+                    },
                     "scenario_output": {
                         "type": "object",
                         "properties": {
@@ -85,6 +88,9 @@ TASK_RESULT_SCHEMA = {
                         },
                         "required": ["data", "errors"]
                     },
+                    "stage": {
+                        "type": "integer"
+                    },
                 },
                 "required": ["atomic_actions", "duration", "error",
                              "idle_duration", "scenario_output"]
@@ -158,11 +164,62 @@ class Task(object):
         self._update({"status": consts.TaskStatus.FAILED,
                       "verification_log": json.dumps(log)})
 
-    def get_results(self):
-        return db.task_result_get_all_by_uuid(self.task["uuid"])
+    def is_result_finished(self, result):
+        """Check whether the scenario of the result is finished.
+
+        Results are stored when their scenarios start and get the summary
+        when they finish. Results stored by older versions of Rally have no
+        summary and are finished if the task is.
+        """
+        return ("summary" in result["data"] or
+                self.task["status"] in (consts.TaskStatus.FINISHED,
+                                        consts.TaskStatus.FAILED))
+
+    def get_results(self, with_raw=True, partial=False):
+        """Get results of finished scenarios of the task.
+
+        :param with_raw: whether to load raw data of results with summary
+        :param partial: also get results of scenarios which are running or
+                        were interrupted, e.g. by a crash of Rally which left
+                        the task running; they contain the iterations stored
+                        so far and no summary
+        """
+        return [result for result in db.task_result_get_all_by_uuid(
+                self.task["uuid"], with_raw=with_raw)
+                if partial or self.is_result_finished(result)]
+
+    def iter_results(self, with_raw=True, partial=False):
+        """Iterate over results of finished scenarios of the task.
+
+        See get_results() for parameters.
+        """
+        return (result for result in db.task_result_iter_by_uuid(
+                self.task["uuid"], with_raw=with_raw)
+                if partial or self.is_result_finished(result))
+
+    def get_results_meta(self):
+        """Get results of the task without their data.
+
+        Results of running scenarios are included, use is_result_finished()
+        on results with data to skip them.
+        """
+        return db.task_result_meta_get_all_by_uuid(self.task["uuid"])
+
+    def iter_results_raw(self, result_id):
+        return db.task_result_iter_raw(result_id)
 
     def append_results(self, key, value):
-        db.task_result_create(self.task["uuid"], key, value)
+        """Store the result of the scenario.
+
+        :returns: id of the stored result
+        """
+        return db.task_result_create(self.task["uuid"], key, value)["id"]
+
+    def update_results(self, result_id, value):
+        db.task_result_update(result_id, value)
+
+    def append_results_chunk(self, result_id, position, raw):
+        db.task_result_chunk_create(result_id, position, raw)
 
     def delete(self, status=None):
         db.task_delete(self.task["uuid"], status=status)
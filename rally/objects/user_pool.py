@@ -0,0 +1,73 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from rally import db
+
+
+class UserPool(object):
+    """Represents the pool of benchmark tenants and users of a deployment.
+
+    Tenants are leased to tasks with all their users and returned to the
+    pool afterwards, so they don't have to be created by each task.
+    """
+
+    def __init__(self, deployment_uuid):
+        self.deployment_uuid = deployment_uuid
+
+    def add(self, task_uuid, tenant, users, project_domain, user_domain):
+        """Add a tenant leased to the task to the pool.
+
+        :param task_uuid: UUID of the task the tenant is leased to
+        :param tenant: dict with id and name of the tenant
+        :param users: list of dicts with id and endpoint
+                      (rally.objects.Endpoint) of each user of the tenant
+        :param project_domain: domain of the tenant
+        :param user_domain: domain of the users
+        :returns: dict with data on the tenant in the pool
+        """
+        return db.user_pool_tenant_create({
+            "deployment_uuid": self.deployment_uuid,
+            "task_uuid": task_uuid,
+            "project_domain": project_domain,
+            "user_domain": user_domain,
+            "users_count": len(users),
+            "tenant": {"id": tenant["id"], "name": tenant["name"]},
+            "users": [{"id": user["id"],
+                       "endpoint": user["endpoint"].to_dict(
+                           include_permission=True)}
+                      for user in users]})
+
+    def lease(self, task_uuid, tenants, users_per_tenant, project_domain,
+              user_domain):
+        """Lease up to the number of free tenants of the pool to the task.
+
+        :returns: list of dicts with data on the leased tenants
+        """
+        return db.user_pool_tenant_lease(self.deployment_uuid, task_uuid,
+                                         tenants, users_per_tenant,
+                                         project_domain, user_domain)
+
+    @staticmethod
+    def release(ids):
+        """Return leased tenants with the given pool IDs to the pool."""
+        db.user_pool_tenant_release(ids)
+
+    def list(self, task_uuid=None):
+        return db.user_pool_tenant_get_all(self.deployment_uuid,
+                                           task_uuid=task_uuid)
+
+    @staticmethod
+    def delete(id):
+        db.user_pool_tenant_delete(id)
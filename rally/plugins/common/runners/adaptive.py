@@ -0,0 +1,246 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from rally.common import log as logging
+from rally import consts
+from rally.plugins.common.runners import stages
+from rally.task import runner
+from rally.task import sla
+
+LOG = logging.getLogger(__name__)
+
+
+@runner.configure(name="adaptive")
+class AdaptiveScenarioRunner(stages.StagesScenarioRunner):
+    """Scenario runner that searches for the maximum sustainable load.
+
+    The load is generated in rounds of "times" iterations each, by the
+    constant runner (if "load" is "concurrency") or by the rps runner (if
+    "load" is "rps"). Results of every round are checked against the SLA
+    "criteria" (same format as the "sla" section of the task), and the load
+    of the next round is chosen by the search "strategy":
+
+    * "binary" - the load is doubled until the criteria fail, then the
+      highest passing load is found by bisection with the given
+      "precision";
+    * "aimd" - the load is increased by "step" after a passed round and
+      multiplied by "decrease_factor" after a failed one, until
+      "max_rounds" rounds are done.
+
+    The search is bounded by "min" and "max" loads. Each iteration result
+    is tagged with the number of its round (as the stages runner does) and
+    the load of the round is added to its scenario output, so the whole
+    trajectory of the search is kept in the task results. The maximum
+    load that met the criteria is written to the log.
+    """
+
+    # Runner that generates the load of the given kind
+    LOAD_RUNNERS = {"concurrency": "constant", "rps": "rps"}
+
+    CONFIG_SCHEMA = {
+        "type": "object",
+        "$schema": consts.JSON_SCHEMA,
+        "properties": {
+            "type": {
+                "type": "string"
+            },
+            "load": {
+                "enum": ["concurrency", "rps"]
+            },
+            "times": {
+                "type": "integer",
+                "minimum": 1
+            },
+            "start": {
+                "type": "number",
+                "exclusiveMinimum": True,
+                "minimum": 0
+            },
+            "min": {
+                "type": "number",
+                "exclusiveMinimum": True,
+                "minimum": 0
+            },
+            "max": {
+                "type": "number",
+                "exclusiveMinimum": True,
+                "minimum": 0
+            },
+            "strategy": {
+                "enum": ["binary", "aimd"]
+            },
+            "precision": {
+                "type": "number",
+                "exclusiveMinimum": True,
+                "minimum": 0
+            },
+            "step": {
+                "type": "number",
+                "exclusiveMinimum": True,
+                "minimum": 0
+            },
+            "decrease_factor": {
+                "type": "number",
+                "exclusiveMinimum": True,
+                "minimum": 0,
+                "exclusiveMaximum": True,
+                "maximum": 1
+            },
+            "max_rounds": {
+                "type": "integer",
+                "minimum": 1
+            },
+            "criteria": {
+                "type": "object",
+                "minProperties": 1
+            },
+            "timeout": {
+                "type": "number",
+                "minimum": 1
+            },
+            "max_cpu_count": {
+                "type": "integer",
+                "minimum": 1
+            }
+        },
+        "required": ["type", "load", "times", "start", "criteria"],
+        "additionalProperties": False
+    }
+
+    @classmethod
+    def _validate_config(cls, config):
+        super(AdaptiveScenarioRunner, cls)._validate_config(config)
+        sla.SLA.validate(config["criteria"])
+
+    def __init__(self, task, config):
+        super(AdaptiveScenarioRunner, self).__init__(task, config)
+        self.min_load = self.config.get("min", min(self.config["start"], 1))
+        self.max_load = self.config.get("max", float("inf"))
+        self.trajectory = []
+        self._load = None
+        self._round_checker = None
+        self._round_iterations = 0
+
+    def _normalize_load(self, load):
+        load = min(max(load, self.min_load), self.max_load)
+        if self.config["load"] == "concurrency":
+            load = max(int(round(load)), 1)
+        return load
+
+    def _get_round_config(self, load):
+        config = {"type": self.LOAD_RUNNERS[self.config["load"]],
+                  "times": self.config["times"],
+                  self.config["load"]: load}
+        for key in ("timeout", "max_cpu_count"):
+            if key in self.config:
+                config[key] = self.config[key]
+        return config
+
+    def _next_load_binary(self, load, passed):
+        passed_loads = [r["load"] for r in self.trajectory if r["success"]]
+        failed_loads = [r["load"] for r in self.trajectory
+                        if not r["success"]]
+        lowest_failed = min(failed_loads) if failed_loads else None
+        highest_passed = max(passed_loads) if passed_loads else None
+
+        if lowest_failed is None:
+            next_load = load * 2
+        elif highest_passed is None:
+            next_load = load / 2.0
+        elif (lowest_failed - highest_passed <=
+                self.config.get("precision", 1)):
+            return None
+        else:
+            next_load = (highest_passed + lowest_failed) / 2.0
+        return self._normalize_load(next_load)
+
+    def _next_load_aimd(self, load, passed):
+        if passed:
+            next_load = load + self.config.get("step", self.config["start"])
+        else:
+            next_load = load * self.config.get("decrease_factor", 0.5)
+        return self._normalize_load(next_load)
+
+    def _get_next_load(self, load, passed):
+        """Return the load for the next round or None to stop the search."""
+        strategy = self.config.get("strategy", "binary")
+        if strategy == "binary":
+            next_load = self._next_load_binary(load, passed)
+            tried_loads = [r["load"] for r in self.trajectory]
+            if next_load in tried_loads:
+                return None
+        else:
+            next_load = self._next_load_aimd(load, passed)
+            if next_load == load:
+                return None
+        return next_load
+
+    def _send_stage_result(self, stage, result):
+        result["scenario_output"].setdefault("data", {})["load"] = self._load
+        self._round_checker.add_iteration(result)
+        self._round_iterations += 1
+        super(AdaptiveScenarioRunner, self)._send_stage_result(stage, result)
+
+    def _run_scenario(self, cls, method_name, context, args):
+        """Runs the specified benchmark scenario with given arguments.
+
+        :param cls: The Scenario class where the scenario is implemented
+        :param method_name: Name of the method that implements the scenario
+        :param context: Benchmark context that contains users, admin & other
+                        information, that was created before benchmark started.
+        :param args: Arguments to call the scenario method with
+
+        :returns: List of results fore each single scenario iteration,
+                  where each result is a dictionary
+        """
+        max_rounds = self.config.get("max_rounds", 10)
+        load = self._normalize_load(self.config["start"])
+
+        self._log_debug_info(load=self.config["load"], start=load,
+                             min_load=self.min_load, max_load=self.max_load,
+                             strategy=self.config.get("strategy", "binary"),
+                             max_rounds=max_rounds,
+                             criteria=self.config["criteria"])
+
+        self.trajectory = []
+        for stage in range(max_rounds):
+            self._load = load
+            self._round_checker = sla.SLAChecker(
+                {"sla": self.config["criteria"]})
+            self._round_iterations = 0
+            self._run_stage(stage, self._get_round_config(load), cls,
+                            method_name, context, args)
+            # NOTE: results of the interrupted round are not conclusive
+            if self.aborted.is_set() or not self._round_iterations:
+                break
+
+            passed = all(r["success"]
+                         for r in self._round_checker.results())
+            self.trajectory.append({"load": load, "success": passed})
+            LOG.info("Round %(stage)d with %(kind)s %(load)s: %(status)s" %
+                     {"stage": stage, "kind": self.config["load"],
+                      "load": load,
+                      "status": "Passed" if passed else "Failed"})
+
+            load = self._get_next_load(load, passed)
+            if load is None:
+                break
+
+        passed_loads = [r["load"] for r in self.trajectory if r["success"]]
+        LOG.info("Maximum sustainable %(kind)s: %(load)s (trajectory: "
+                 "%(trajectory)s)" %
+                 {"kind": self.config["load"],
+                  "load": max(passed_loads) if passed_loads else None,
+                  "trajectory": self.trajectory})
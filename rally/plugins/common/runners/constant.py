@@ -15,7 +15,6 @@
 
 import collections
 import multiprocessing
-import threading
 import time
 
 from rally.common import log as logging
@@ -26,6 +25,26 @@ from rally.task import utils as butils
 
 LOG = logging.getLogger(__name__)
 
+# How often the threads of _pool_worker_process() are checked for timeout
+POOL_WATCH_INTERVAL = 0.1
+
+# Scenario class, method, benchmark context and args of the iterations run
+# by the process of ConstantForDurationScenarioRunner's pool
+_pool_process_scenario = {}
+
+
+def _init_pool_process(cls, method_name, context, args):
+    _pool_process_scenario.update(cls=cls, method_name=method_name,
+                                  context=context, args=args)
+
+
+def _run_pool_iteration(iteration):
+    scenario = _pool_process_scenario
+    scenario_context = runner._get_scenario_context(scenario["context"])
+    return runner._run_scenario_once((iteration, scenario["cls"],
+                                      scenario["method_name"],
+                                      scenario_context, scenario["args"]))
+
 
 def _worker_process(queue, iteration_gen, timeout, concurrency, times, context,
                     cls, method_name, args, aborted, info):
@@ -52,8 +71,8 @@ def _worker_process(queue, iteration_gen, timeout, concurrency, times, context,
     """
 
     pool = collections.deque()
-    alive_threads_in_pool = 0
-    finished_threads_in_pool = 0
+    hung_threads = []
+    batcher = runner.ResultBatcher(queue)
 
     runner._log_worker_info(times=times, concurrency=concurrency,
                             timeout=timeout, cls=cls, method_name=method_name,
@@ -63,40 +82,121 @@ def _worker_process(queue, iteration_gen, timeout, concurrency, times, context,
     while iteration < times and not aborted.is_set():
         scenario_context = runner._get_scenario_context(context)
         scenario_args = (iteration, cls, method_name, scenario_context, args)
-        worker_args = (queue, scenario_args)
 
-        thread = threading.Thread(target=runner._worker_thread,
-                                  args=worker_args)
+        thread = runner.ScenarioThread(batcher, [scenario_args], timeout)
         thread.start()
-        pool.append((thread, time.time()))
-        alive_threads_in_pool += 1
-
-        while alive_threads_in_pool == concurrency:
-            prev_finished_threads_in_pool = finished_threads_in_pool
-            finished_threads_in_pool = 0
-            for t in pool:
-                if not t[0].isAlive():
-                    finished_threads_in_pool += 1
-
-            alive_threads_in_pool -= finished_threads_in_pool
-            alive_threads_in_pool += prev_finished_threads_in_pool
-
-            if alive_threads_in_pool < concurrency:
-                # NOTE(boris-42): cleanup pool array. This is required because
-                # in other case array length will be equal to times which
-                # is unlimited big
-                while pool and not pool[0][0].isAlive():
-                    pool.popleft()[0].join()
-                    finished_threads_in_pool -= 1
-                break
+        pool.append(thread)
 
-            # we should wait to not create big noise with these checks
-            time.sleep(0.001)
+        while len(pool) >= concurrency:
+            _reap_threads(pool, hung_threads)
+            if len(pool) >= concurrency:
+                # we should wait to not create big noise with these checks
+                time.sleep(0.001)
         iteration = next(iteration_gen)
 
     # Wait until all threads are done
+    runner._join_threads(pool, hung_threads)
+
+    batcher.close()
+    runner._worker_done(queue)
+
+
+def _reap_threads(pool, hung_threads):
+    """Remove finished and timed out threads from the pool.
+
+    :param pool: deque of running runner.ScenarioThread objects
+    :param hung_threads: list to append threads that have timed out
+    :returns: number of threads that have timed out
+    """
+    timed_out = 0
+    for i in range(len(pool)):
+        thread = pool.popleft()
+        if not thread.isAlive():
+            thread.join()
+        elif thread.check_timeout():
+            hung_threads.append(thread)
+            timed_out += 1
+        else:
+            pool.append(thread)
+    return timed_out
+
+
+def _pool_iterations(iteration_gen, times, context, cls, method_name, args,
+                     aborted):
+    """Generate arguments for scenario iterations until there is nothing to do.
+
+    :param iteration_gen: next iteration number generator, shared between
+                          all threads and processes of the runner
+    :param times: total number of scenario iterations to be run
+    :param context: scenario context object
+    :param cls: scenario class
+    :param method_name: scenario method name
+    :param args: scenario args
+    :param aborted: multiprocessing.Event that aborts load generation if
+                    the flag is set
+    """
+    while not aborted.is_set():
+        iteration = next(iteration_gen)
+        if iteration >= times:
+            break
+        scenario_context = runner._get_scenario_context(context)
+        yield (iteration, cls, method_name, scenario_context, args)
+
+
+def _pool_worker_process(queue, iteration_gen, timeout, concurrency, times,
+                         context, cls, method_name, args, aborted, info):
+    """Start the scenario within a fixed pool of threads.
+
+    Unlike _worker_process(), which starts a new thread for every single
+    iteration and polls them to keep the pool full, this function starts
+    exactly `concurrency` long-lived threads. Each of them takes the next
+    iteration number from the shared counter as soon as the previous
+    iteration is finished, so there is neither thread creation nor polling
+    overhead between iterations. A thread whose iteration has timed out is
+    abandoned and replaced with a new one.
+
+    :param queue: queue object to append results
+    :param iteration_gen: next iteration number generator
+    :param timeout: operation's timeout
+    :param concurrency: number of concurrently running scenario iterations
+    :param times: total number of scenario iterations to be run
+    :param context: scenario context object
+    :param cls: scenario class
+    :param method_name: scenario method name
+    :param args: scenario args
+    :param aborted: multiprocessing.Event that aborts load generation if
+                    the flag is set
+    :param info: info about all processes count and counter of launched process
+    """
+    runner._log_worker_info(times=times, concurrency=concurrency,
+                            timeout=timeout, cls=cls, method_name=method_name,
+                            args=args)
+
+    batcher = runner.ResultBatcher(queue)
+    pool = collections.deque()
+    hung_threads = []
+
+    def start_thread():
+        thread = runner.ScenarioThread(
+            batcher, _pool_iterations(iteration_gen, times, context, cls,
+                                      method_name, args, aborted),
+            timeout)
+        thread.start()
+        pool.append(thread)
+
+    for i in range(concurrency):
+        start_thread()
+
     while pool:
-        pool.popleft()[0].join()
+        pool[0].join(POOL_WATCH_INTERVAL if timeout else None)
+        # NOTE: the thread that has timed out is replaced with a new one,
+        #       so the concurrency doesn't decay
+        for i in range(_reap_threads(pool, hung_threads)):
+            start_thread()
+    runner._join_threads(pool, hung_threads)
+
+    batcher.close()
+    runner._worker_done(queue)
 
 
 @runner.configure(name="constant")
@@ -111,6 +211,11 @@ class ConstantScenarioRunner(runner.ScenarioRunner):
     number of concurrent scenarios which execute during a single
     iteration in order to simulate the activities of multiple users
     placing load on the cloud under test.
+
+    If the reuse_threads parameter is set, every worker process keeps
+    a fixed pool of threads, each of them running iterations one after
+    another, instead of starting a new thread per iteration. This reduces
+    the runner overhead for fast scenarios and high concurrency.
     """
 
     CONFIG_SCHEMA = {
@@ -135,6 +240,9 @@ class ConstantScenarioRunner(runner.ScenarioRunner):
             "max_cpu_count": {
                 "type": "integer",
                 "minimum": 1
+            },
+            "reuse_threads": {
+                "type": "boolean"
             }
         },
         "required": ["type"],
@@ -187,8 +295,13 @@ class ConstantScenarioRunner(runner.ScenarioRunner):
                 if concurrency_overhead:
                     concurrency_overhead -= 1
 
+        if self.config.get("reuse_threads", False):
+            worker_process = _pool_worker_process
+        else:
+            worker_process = _worker_process
+
         process_pool = self._create_process_pool(
-            processes_to_start, _worker_process,
+            processes_to_start, worker_process,
             worker_args_gen(concurrency_overhead))
         self._join_processes(process_pool, result_queue)
 
@@ -232,11 +345,11 @@ class ConstantForDurationScenarioRunner(runner.ScenarioRunner):
     }
 
     @staticmethod
-    def _iter_scenario_args(cls, method, ctx, args, aborted):
+    def _iter_scenario_args(aborted):
         def _scenario_args(i):
             if aborted.is_set():
                 raise StopIteration()
-            return (i, cls, method, runner._get_scenario_context(ctx), args)
+            return i
         return _scenario_args
 
     def _run_scenario(self, cls, method, context, args):
@@ -255,12 +368,15 @@ class ConstantForDurationScenarioRunner(runner.ScenarioRunner):
         concurrency = self.config.get("concurrency", 1)
         duration = self.config.get("duration")
 
-        pool = multiprocessing.Pool(concurrency)
+        # NOTE: The context is passed to the pool processes once, when they
+        #       are started, so only iteration numbers are sent to them
+        #       for every iteration instead of the pickled context.
+        pool = multiprocessing.Pool(
+            concurrency, _init_pool_process, (cls, method, context, args))
 
         run_args = butils.infinite_run_args_generator(
-            self._iter_scenario_args(cls, method, context, args,
-                                     self.aborted))
-        iter_result = pool.imap(runner._run_scenario_once, run_args)
+            self._iter_scenario_args(self.aborted))
+        iter_result = pool.imap(_run_pool_iteration, run_args)
 
         start = time.time()
         while True:
@@ -268,6 +384,7 @@ class ConstantForDurationScenarioRunner(runner.ScenarioRunner):
                 result = iter_result.next(timeout)
             except multiprocessing.TimeoutError as e:
                 result = runner.format_result_on_timeout(e, timeout)
+                result["timestamp"] = time.time() - timeout
             except StopIteration:
                 break
 
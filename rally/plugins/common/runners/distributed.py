@@ -0,0 +1,202 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+from rally.common import log as logging
+from rally import consts
+from rally import exceptions
+from rally.plugins.common.runners import constant
+from rally.plugins.common.runners import rps
+from rally.plugins.common.runners import stages
+from rally.task import agent
+from rally.task import runner
+
+LOG = logging.getLogger(__name__)
+
+
+def _split(value, parts):
+    """Split integer value into the given number of nearly equal parts."""
+    part, rest = divmod(value, parts)
+    return [part + 1 if i < rest else part for i in range(parts)]
+
+
+@runner.configure(name="distributed")
+class DistributedScenarioRunner(runner.ScenarioRunner):
+    """Scenario runner that generates load from several Rally hosts.
+
+    Iterations are split among live load generation agents (see
+    "rally-manage agent start"), and each agent runs its share by the
+    constant or rps runner configured in the "runner" parameter. The
+    concurrency (for the constant runner) or rps and max_concurrency (for
+    the rps runner) are split among the agents as well, so together they
+    generate the requested load. Results are streamed back from the agents
+    and merged into the results of the task.
+
+    The number of agents to be used can be limited by the "agents"
+    parameter, by default all live agents are used.
+    """
+
+    # How often (in seconds) to check whether the task is aborted
+    ABORT_CHECK_INTERVAL = 0.1
+
+    CONFIG_SCHEMA = {
+        "type": "object",
+        "$schema": consts.JSON_SCHEMA,
+        "properties": {
+            "type": {
+                "type": "string"
+            },
+            "runner": {
+                "oneOf": [
+                    stages.get_stage_schema(constant.ConstantScenarioRunner,
+                                            "constant", ["type"]),
+                    stages.get_stage_schema(rps.RPSScenarioRunner,
+                                            "rps", ["type", "times", "rps"])
+                ]
+            },
+            "agents": {
+                "type": "integer",
+                "minimum": 1
+            }
+        },
+        "required": ["type", "runner"],
+        "additionalProperties": False
+    }
+
+    def _split_config(self, agents_count):
+        """Split the load among the agents.
+
+        :param agents_count: number of available agents
+        :returns: list of runner configs, one per agent to be used
+        """
+        config = self.config["runner"]
+        times = config.get("times", 1)
+        agents_count = min(agents_count, self.config.get("agents", times),
+                           times)
+        if config["type"] == "constant":
+            agents_count = min(agents_count, config.get("concurrency", 1))
+        elif "max_concurrency" in config:
+            agents_count = min(agents_count, config["max_concurrency"])
+
+        configs = [dict(config, times=t) for t in _split(times, agents_count)]
+        if config["type"] == "constant":
+            for c, concurrency in zip(
+                    configs, _split(config.get("concurrency", 1),
+                                    agents_count)):
+                c["concurrency"] = concurrency
+        else:
+            for c in configs:
+                c["rps"] = float(config["rps"]) / agents_count
+            if "max_concurrency" in config:
+                for c, max_concurrency in zip(
+                        configs, _split(config["max_concurrency"],
+                                        agents_count)):
+                    c["max_concurrency"] = max_concurrency
+        return configs
+
+    def _receive_results(self, address, conn, errors):
+        """Pass results received from the agent to the consumer.
+
+        :param address: address of the agent
+        :param conn: connection to the agent
+        :param errors: list to append (address, error) pairs
+        """
+        try:
+            while True:
+                kind, data = conn.recv()
+                if kind == "results":
+                    for packed in data:
+                        self._send_result(runner._unpack_result(packed))
+                elif kind == "done":
+                    return
+                else:
+                    errors.append((address, data))
+                    return
+        except (EOFError, IOError) as e:
+            errors.append((address, ["ConnectionError", str(e)]))
+
+    def _run_scenario(self, cls, method_name, context, args):
+        """Runs the specified benchmark scenario with given arguments.
+
+        :param cls: The Scenario class where the scenario is implemented
+        :param method_name: Name of the method that implements the scenario
+        :param context: Benchmark context that contains users, admin & other
+                        information, that was created before benchmark started.
+        :param args: Arguments to call the scenario method with
+
+        :returns: List of results fore each single scenario iteration,
+                  where each result is a dictionary
+        """
+        agents = agent.get_live_agents()
+        if not agents:
+            raise exceptions.NoAgentsFound()
+        configs = self._split_config(len(agents))
+        agents = agents[:len(configs)]
+
+        self._log_debug_info(agents=agents, configs=configs)
+
+        # NOTE: The task object can't be sent to the agents, while the
+        #       scenario needs only its uuid.
+        task = {"uuid": context["task"]["uuid"]}
+        context = dict(context, task=task)
+
+        connections = []
+        errors = []
+        try:
+            iteration_offset = 0
+            for address, config in zip(agents, configs):
+                conn = agent.connect(address)
+                connections.append(conn)
+                # NOTE: Each agent numbers the iterations of its share from
+                #       0, so the offset keeps iteration numbers unique.
+                agent_context = dict(context,
+                                     iteration_offset=iteration_offset)
+                conn.send(("run", {"task": task, "runner": config,
+                                   "scenario": "%s.%s" % (cls.get_name(),
+                                                          method_name),
+                                   "context": agent_context,
+                                   "args": args}))
+                iteration_offset += config.get("times", 1)
+
+            receivers = []
+            for address, conn in zip(agents, connections):
+                thread = threading.Thread(target=self._receive_results,
+                                          args=(address, conn, errors))
+                thread.start()
+                receivers.append(thread)
+
+            abort_sent = False
+            for thread in receivers:
+                while thread.isAlive():
+                    thread.join(self.ABORT_CHECK_INTERVAL)
+                    if self.aborted.is_set() and not abort_sent:
+                        for conn in connections:
+                            try:
+                                conn.send(("abort", None))
+                            except IOError:
+                                pass
+                        abort_sent = True
+        finally:
+            for conn in connections:
+                conn.close()
+
+        for address, error in errors:
+            LOG.error("Agent %(agent)s failed: %(error)s" %
+                      {"agent": "%s:%s" % address, "error": " ".join(error)})
+        if errors:
+            address, error = errors[0]
+            raise exceptions.AgentFailure(agent="%s:%s" % address,
+                                          error=" ".join(error[:2]))
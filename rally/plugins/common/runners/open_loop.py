@@ -0,0 +1,219 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import multiprocessing
+import random
+import threading
+import time
+
+from rally.common import log as logging
+from rally import consts
+from rally.task import runner
+
+LOG = logging.getLogger(__name__)
+
+
+def _get_schedule(times, rps, distribution, seed=None):
+    """Compute start times of all iterations.
+
+    :param times: total number of scenario iterations to be run
+    :param rps: average number of scenario iterations started per second
+    :param distribution: distribution of intervals between iterations:
+                         "poisson" (exponentially distributed intervals,
+                         i.e. Poisson arrivals), "uniform" (intervals are
+                         uniformly distributed from 0 to 2 / rps) or
+                         "constant" (all intervals are equal to 1 / rps)
+    :param seed: seed of random numbers generator
+    :returns: list of start times (in seconds from the beginning of load)
+    """
+    generator = random.Random(seed)
+    intervals = {
+        "poisson": lambda: generator.expovariate(rps),
+        "uniform": lambda: generator.uniform(0, 2.0 / rps),
+        "constant": lambda: 1.0 / rps
+    }[distribution]
+
+    schedule = []
+    offset = 0.0
+    for i in range(times):
+        schedule.append(offset)
+        offset += intervals()
+    return schedule
+
+
+def _worker_thread(queue, args, scheduled):
+    """Run the scenario once and record how late it was started.
+
+    The scheduled start time is added to the result as
+    scheduled_timestamp, and two values are added to scenario output
+    data: start_delay (how much later than scheduled the iteration was
+    actually started) and corrected_duration (duration counted from the
+    scheduled start, i.e. latency corrected for coordinated omission).
+
+    :param queue: queue object to append results
+    :param args: arguments for runner._run_scenario_once()
+    :param scheduled: scheduled start time (timestamp) of the iteration
+    """
+    result = runner._run_scenario_once(args)
+    result["scheduled_timestamp"] = scheduled
+    start_delay = max(result["timestamp"] - scheduled, 0.0)
+    data = result["scenario_output"].setdefault("data", {})
+    data["start_delay"] = start_delay
+    data["corrected_duration"] = result["duration"] + start_delay
+    queue.put(result)
+
+
+def _worker_process(queue, schedule, start, context, cls, method_name, args,
+                    aborted, info):
+    """Start scenario iterations within threads according to the schedule.
+
+    Every iteration is started in a new thread at its scheduled time,
+    regardless of how many iterations are still running, so the load
+    doesn't depend on response times of the cloud.
+
+    :param queue: queue object to append results
+    :param schedule: list of (iteration, start time) pairs, where start time
+                     is in seconds from the beginning of load
+    :param start: time (timestamp) of the beginning of load, the same for
+                  all worker processes
+    :param context: scenario context object
+    :param cls: scenario class
+    :param method_name: scenario method name
+    :param args: scenario args
+    :param aborted: multiprocessing.Event that aborts load generation if
+                    the flag is set
+    :param info: info about all processes count and counter of launched process
+    """
+    pool = collections.deque()
+    batcher = runner.ResultBatcher(queue)
+
+    runner._log_worker_info(times=len(schedule), cls=cls,
+                            method_name=method_name, args=args)
+
+    for iteration, offset in schedule:
+        scheduled = start + offset
+        delay = scheduled - time.time()
+        if delay > 0:
+            aborted.wait(delay)
+        if aborted.is_set():
+            break
+
+        scenario_context = runner._get_scenario_context(context)
+        scenario_args = (iteration, cls, method_name, scenario_context, args)
+        thread = threading.Thread(target=_worker_thread,
+                                  args=(batcher, scenario_args, scheduled))
+        thread.start()
+        pool.append(thread)
+
+        while pool and not pool[0].isAlive():
+            pool.popleft().join()
+
+    while pool:
+        pool.popleft().join()
+
+    batcher.close()
+    runner._worker_done(queue)
+
+
+@runner.configure(name="open_loop")
+class OpenLoopScenarioRunner(runner.ScenarioRunner):
+    """Scenario runner that starts iterations by an open-loop schedule.
+
+    Start times of all iterations are computed before the load begins,
+    with intervals taken from the given distribution ("poisson" by default)
+    for the specified average rps. Unlike the rps runner, iterations are
+    started on schedule even if previous ones are not finished yet, so
+    overload of the cloud results in growing latency rather than in
+    throttled load.
+
+    For every iteration the scheduled start time is recorded in the result
+    as scheduled_timestamp, and the start_delay (actual minus scheduled
+    start time) and corrected_duration (duration plus start_delay, i.e.
+    latency corrected for coordinated omission) values are recorded in
+    scenario output.
+    """
+
+    CONFIG_SCHEMA = {
+        "type": "object",
+        "$schema": consts.JSON_SCHEMA,
+        "properties": {
+            "type": {
+                "type": "string"
+            },
+            "times": {
+                "type": "integer",
+                "minimum": 1
+            },
+            "rps": {
+                "type": "number",
+                "exclusiveMinimum": True,
+                "minimum": 0
+            },
+            "distribution": {
+                "enum": ["poisson", "uniform", "constant"]
+            },
+            "seed": {
+                "type": "integer"
+            },
+            "max_cpu_count": {
+                "type": "integer",
+                "minimum": 1
+            }
+        },
+        "required": ["type", "times", "rps"],
+        "additionalProperties": False
+    }
+
+    def _run_scenario(self, cls, method_name, context, args):
+        """Runs the specified benchmark scenario with given arguments.
+
+        :param cls: The Scenario class where the scenario is implemented
+        :param method_name: Name of the method that implements the scenario
+        :param context: Benchmark context that contains users, admin & other
+                        information, that was created before benchmark started.
+        :param args: Arguments to call the scenario method with
+
+        :returns: List of results fore each single scenario iteration,
+                  where each result is a dictionary
+        """
+        times = self.config["times"]
+        rps = self.config["rps"]
+        distribution = self.config.get("distribution", "poisson")
+
+        cpu_count = multiprocessing.cpu_count()
+        max_cpu_used = min(cpu_count,
+                           self.config.get("max_cpu_count", cpu_count))
+        processes_to_start = min(max_cpu_used, times)
+
+        self._log_debug_info(times=times, rps=rps, distribution=distribution,
+                             max_cpu_used=max_cpu_used,
+                             processes_to_start=processes_to_start)
+
+        schedule = list(enumerate(_get_schedule(
+            times, rps, distribution, self.config.get("seed"))))
+        result_queue = multiprocessing.Queue()
+        # NOTE: The schedule is split between processes, so all of them
+        #       count it from the same start time.
+        start = time.time()
+
+        def worker_args_gen():
+            for i in range(processes_to_start):
+                yield (result_queue, schedule[i::processes_to_start], start,
+                       context, cls, method_name, args, self.aborted)
+
+        process_pool = self._create_process_pool(
+            processes_to_start, _worker_process, worker_args_gen())
+        self._join_processes(process_pool, result_queue)
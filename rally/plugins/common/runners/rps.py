@@ -15,7 +15,6 @@
 
 import collections
 import multiprocessing
-import threading
 import time
 
 from rally.common import log as logging
@@ -51,6 +50,8 @@ def _worker_process(queue, iteration_gen, timeout, rps, times,
     """
 
     pool = collections.deque()
+    hung_threads = []
+    batcher = runner.ResultBatcher(queue)
     start = time.time()
     sleep = 1.0 / rps
 
@@ -62,12 +63,11 @@ def _worker_process(queue, iteration_gen, timeout, rps, times,
 
     i = 0
     while i < times and not aborted.is_set():
+        iteration = next(iteration_gen)
         scenario_context = runner._get_scenario_context(context)
-        scenario_args = (next(iteration_gen), cls, method_name,
-                         scenario_context, args)
-        worker_args = (queue, scenario_args)
-        thread = threading.Thread(target=runner._worker_thread,
-                                  args=worker_args)
+        scenario_args = (iteration, cls, method_name, scenario_context,
+                         args)
+        thread = runner.ScenarioThread(batcher, [scenario_args], timeout)
         i += 1
         thread.start()
         pool.append(thread)
@@ -85,12 +85,15 @@ def _worker_process(queue, iteration_gen, timeout, rps, times,
                 pool[0].join(0.001)
                 if not pool[0].isAlive():
                     pool.popleft()
+                elif pool[0].check_timeout():
+                    hung_threads.append(pool.popleft())
             else:
                 time.sleep(0.001)
 
-    while pool:
-        thr = pool.popleft()
-        thr.join()
+    runner._join_threads(pool, hung_threads)
+
+    batcher.close()
+    runner._worker_done(queue)
 
 
 @runner.configure(name="rps")
@@ -0,0 +1,182 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import functools
+
+from rally import consts
+from rally.plugins.common.runners import constant
+from rally.plugins.common.runners import rps
+from rally.task import runner
+
+
+def get_stage_schema(runner_cls, name, required):
+    schema = copy.deepcopy(runner_cls.CONFIG_SCHEMA)
+    schema.pop("$schema")
+    schema["properties"]["type"] = {"enum": [name]}
+    schema["required"] = required
+    return schema
+
+
+@runner.configure(name="stages")
+class StagesScenarioRunner(runner.ScenarioRunner):
+    """Scenario runner that changes the load through a list of stages.
+
+    Every stage is executed by the constant or rps runner one after another
+    within the same context, so the load can be ramped up, stepped or
+    shaped by a custom profile without recreating users and other
+    resources. Each iteration result is tagged with the number of its
+    stage (starting from 0), so statistics and SLA are also reported
+    per stage.
+
+    The stages are either listed explicitly in the "stages" parameter, each
+    being a config of the constant or rps runner, or generated from the
+    "ramp" parameter: "steps" stages of "times" iterations each, with
+    concurrency (for the constant runner) or rps (for the rps runner)
+    changing linearly from "start" to "end".
+    """
+
+    # Parameter of the stage runner that is changed by the ramp
+    RAMP_LOAD = {"constant": "concurrency", "rps": "rps"}
+
+    CONFIG_SCHEMA = {
+        "type": "object",
+        "$schema": consts.JSON_SCHEMA,
+        "properties": {
+            "type": {
+                "type": "string"
+            },
+            "stages": {
+                "type": "array",
+                "items": {
+                    "oneOf": [
+                        get_stage_schema(constant.ConstantScenarioRunner,
+                                         "constant", ["type"]),
+                        get_stage_schema(rps.RPSScenarioRunner,
+                                         "rps", ["type", "times", "rps"])
+                    ]
+                },
+                "minItems": 1
+            },
+            "ramp": {
+                "type": "object",
+                "properties": {
+                    "type": {
+                        "enum": ["constant", "rps"]
+                    },
+                    "times": {
+                        "type": "integer",
+                        "minimum": 1
+                    },
+                    "start": {
+                        "type": "number",
+                        "exclusiveMinimum": True,
+                        "minimum": 0
+                    },
+                    "end": {
+                        "type": "number",
+                        "exclusiveMinimum": True,
+                        "minimum": 0
+                    },
+                    "steps": {
+                        "type": "integer",
+                        "minimum": 1
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "minimum": 1
+                    },
+                    "max_cpu_count": {
+                        "type": "integer",
+                        "minimum": 1
+                    }
+                },
+                "required": ["type", "times", "start", "end", "steps"],
+                "additionalProperties": False
+            }
+        },
+        "oneOf": [
+            {"required": ["type", "stages"]},
+            {"required": ["type", "ramp"]}
+        ],
+        "additionalProperties": False
+    }
+
+    def _get_stages(self):
+        """Return the list of stage runner configs."""
+        if "stages" in self.config:
+            return self.config["stages"]
+
+        ramp = dict(self.config["ramp"])
+        start = ramp.pop("start")
+        end = ramp.pop("end")
+        steps = ramp.pop("steps")
+        load_key = self.RAMP_LOAD[ramp["type"]]
+
+        stages = []
+        for i in range(steps):
+            load = start + float(end - start) * i / max(steps - 1, 1)
+            if load_key == "concurrency":
+                load = max(int(round(load)), 1)
+            stage = dict(ramp)
+            stage[load_key] = load
+            stages.append(stage)
+        return stages
+
+    def _send_stage_result(self, stage, result):
+        result["stage"] = stage
+        self._send_result(result)
+
+    def _run_stage(self, stage, config, cls, method_name, context, args):
+        """Run a single stage of load with the corresponding runner.
+
+        :param stage: number of the stage
+        :param config: config of the stage runner
+        :param cls: The Scenario class where the scenario is implemented
+        :param method_name: Name of the method that implements the scenario
+        :param context: Benchmark context
+        :param args: Arguments to call the scenario method with
+        """
+        stage_runner = runner.ScenarioRunner.get(config["type"])(
+            self.task, config)
+        # NOTE: The stage runner shares the abort flag with this runner
+        #       and passes its results here instead of keeping them in
+        #       its own result_queue, so the consumer gets them as soon
+        #       as they arrive.
+        stage_runner.aborted = self.aborted
+        stage_runner._send_result = functools.partial(
+            self._send_stage_result, stage)
+        stage_runner._run_scenario(cls, method_name, context, args)
+
+    def _run_scenario(self, cls, method_name, context, args):
+        """Runs the specified benchmark scenario with given arguments.
+
+        :param cls: The Scenario class where the scenario is implemented
+        :param method_name: Name of the method that implements the scenario
+        :param context: Benchmark context that contains users, admin & other
+                        information, that was created before benchmark started.
+        :param args: Arguments to call the scenario method with
+
+        :returns: List of results fore each single scenario iteration,
+                  where each result is a dictionary
+        """
+        stages = self._get_stages()
+
+        self._log_debug_info(stages=stages)
+
+        for stage, config in enumerate(stages):
+            if self.aborted.is_set():
+                break
+            self._run_stage(stage, config, cls, method_name, context, args)
@@ -0,0 +1,77 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+"""
+SLA (Service-level agreement) is set of details for determining compliance
+with contracted values such as maximum error rate or minimum response time.
+"""
+
+from rally.common.i18n import _
+from rally.common import streaming_algorithms
+from rally import consts
+from rally.task import sla
+
+
+@sla.configure(name="max_percentile_duration")
+class MaxPercentileDuration(sla.SLA):
+    """Maximum percentile of iteration duration in seconds."""
+    CONFIG_SCHEMA = {
+        "type": "object",
+        "$schema": consts.JSON_SCHEMA,
+        "properties": {
+            "percentile": {"type": "number", "minimum": 0.0,
+                           "maximum": 100.0, "exclusiveMinimum": True,
+                           "exclusiveMaximum": True},
+            "max": {"type": "number", "minimum": 0.0,
+                    "exclusiveMinimum": True}
+        },
+        "required": ["max"],
+        "additionalProperties": False
+    }
+
+    def __init__(self, criterion_value):
+        super(MaxPercentileDuration, self).__init__(criterion_value)
+        self.percent = self.criterion_value.get("percentile", 95)
+        self.max_duration = self.criterion_value["max"]
+        self.value = 0.0
+        self.durations = streaming_algorithms.QuantileSketch(self.percent)
+        self._value_outdated = False
+
+    def add_iteration(self, iteration):
+        if not iteration.get("error"):
+            duration = iteration["duration"]
+            self.durations.add(duration)
+            # NOTE: A new duration moves the percentile towards itself but
+            #       not past itself, so the percentile can cross the max
+            #       only if the duration is on the other side of the max.
+            #       Otherwise the status stays the same and the percentile
+            #       is taken from the sketch only when it is shown.
+            if (duration > self.max_duration) == self.success:
+                self.value = self.durations.result()
+                self._value_outdated = False
+            else:
+                self._value_outdated = True
+        self.success = self.value <= self.max_duration
+        return self.success
+
+    def details(self):
+        if self._value_outdated:
+            self.value = self.durations.result()
+            self._value_outdated = False
+        return (_("%(percent)s%%ile duration of one iteration "
+                  "%(value).2fs <= %(max).2fs - %(status)s") %
+                {"percent": self.percent, "value": self.value,
+                 "max": self.max_duration, "status": self.status()})
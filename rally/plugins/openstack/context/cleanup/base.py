@@ -13,12 +13,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import six
+
 from rally.task import utils
 
 
 def resource(service, resource, order=0, admin_required=False,
              perform_for_admin_only=False, tenant_resource=False,
-             max_attempts=3, timeout=600, interval=1, threads=20):
+             max_attempts=3, timeout=600, interval=1, threads=20,
+             independent=False, list_limit=1000):
     """Decorator that overrides resource specification.
 
     Just put it on top of your resource class and specify arguments that you
@@ -38,6 +41,12 @@ def resource(service, resource, order=0, admin_required=False,
     :param interval: Resource status pooling interval
     :param threads: Amount of threads (workers) that are deleting resources
                     simultaneously
+    :param independent: Resources don't depend on resources of other
+                        services and vice versa, so they can be cleaned up
+                        in parallel with them
+    :param list_limit: Max number of resources returned by one list() call,
+                       e.g. nova returns up to osapi_max_limit (1000 by
+                       default) servers if list() doesn't page through them
     """
 
     def inner(cls):
@@ -52,6 +61,8 @@ def resource(service, resource, order=0, admin_required=False,
         cls._interval = interval
         cls._threads = threads
         cls._tenant_resource = tenant_resource
+        cls._independent = independent
+        cls._list_limit = list_limit
 
         return cls
 
@@ -97,6 +108,43 @@ class ResourceManager(object):
 
         return utils.get_status(resource) in ("DELETED", "DELETE_COMPLETE")
 
+    def check_deleted(self, resources):
+        """Checks which of the resources are deleted.
+
+        Resources are checked in a batch, by a single list() call: those
+        that are not listed anymore or have DELETED or DELETE_COMPLETE
+        status are deleted. If list() returned _list_limit resources, the
+        list may be truncated, so resources missing from it are checked by
+        is_deleted() one by one. If is_deleted() is overridden, it is
+        called for each resource instead.
+
+        :param resources: instances of this class, initiated with resources
+                          of the same user as this one
+        :returns: list of the resources that are deleted
+        """
+        if (six.get_unbound_function(type(self).is_deleted) is not
+                six.get_unbound_function(ResourceManager.is_deleted)):
+            return [resource for resource in resources
+                    if resource.is_deleted()]
+
+        listed = {}
+        listed_count = 0
+        for raw_resource in self.list():
+            listed[type(self)(resource=raw_resource).id()] = raw_resource
+            listed_count += 1
+        truncated = listed_count >= self._list_limit
+
+        deleted = []
+        for resource in resources:
+            raw_resource = listed.get(resource.id())
+            if raw_resource is None:
+                if not truncated or resource.is_deleted():
+                    deleted.append(resource)
+            elif utils.get_status(raw_resource) in ("DELETED",
+                                                    "DELETE_COMPLETE"):
+                deleted.append(resource)
+        return deleted
+
     def delete(self):
         """Delete resource that corresponds to instance of this class."""
         self._manager().delete(self.id())
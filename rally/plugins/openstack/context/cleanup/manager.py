@@ -13,9 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
 import time
 
 from rally.common import broker
+from rally.common import costilius
 from rally.common.i18n import _
 from rally.common import log as logging
 from rally.common.plugin import discover
@@ -42,6 +44,15 @@ class SeekAndDestroy(object):
         self.manager_cls = manager_cls
         self.admin = admin
         self.users = users or []
+        self.listed_count = 0
+        self.listing_duration = 0.0
+        # Resources which deletion was requested, by user ids, with
+        # deadlines of their deletion
+        self._pending = {}
+        # Notified when a resource is added to _pending or when all
+        # deletion requests are sent
+        self._pending_cond = threading.Condition()
+        self._requests_sent = False
 
     @staticmethod
     def _get_cached_client(user, cache=None):
@@ -59,16 +70,19 @@ class SeekAndDestroy(object):
 
         return cache[key]
 
-    def _delete_single_resource(self, resource):
-        """Safe resource deletion with retries and timeouts.
+    def _delete_single_resource(self, resource, user=None):
+        """Safe resource deletion with retries.
 
         Send request to delete resource, in case of failures repeat it few
-        times. After that pull status of resource until it's deleted.
+        times. After that the resource is left to _poll_deleted(), which
+        checks status of deleted resources in batches, so the caller is
+        free to delete other resources.
 
         Writes in LOG warning with UUID of resource that wasn't deleted
 
         :param resource: instance of resource manager initiated with resource
                          that should be deleted.
+        :param user: user whose resource is deleted, or None for admin
         """
 
         msg_kw = {
@@ -91,31 +105,73 @@ class SeekAndDestroy(object):
             if logging.is_debug():
                 LOG.exception(e)
         else:
-            started = time.time()
-            failures_count = 0
-            while time.time() - started < resource._timeout:
-                try:
-                    if resource.is_deleted():
-                        return
-                except Exception as e:
+            key = user and user["id"]
+            with self._pending_cond:
+                pending = self._pending.setdefault(
+                    key, {"resources": [], "failures": 0})
+                pending["resources"].append(
+                    (resource, time.time() + resource._timeout))
+                self._pending_cond.notify()
+
+    def _check_pending(self, key, pending):
+        """Check status of pending deleted resources of a single user."""
+        with self._pending_cond:
+            resources = [resource
+                         for resource, deadline in pending["resources"]]
+        try:
+            deleted = resources[0].check_deleted(resources)
+        except Exception as e:
+            LOG.warning(
+                _("Seems like %s.%s.check_deleted(self, resources) method is "
+                  "broken It shouldn't raise any exceptions.")
+                % (resources[0].__module__, type(resources[0]).__name__))
+            LOG.exception(e)
+            deleted = []
+
+            # NOTE(boris-42): Avoid LOG spaming in case of bad
+            #                 check_deleted() method
+            pending["failures"] += 1
+
+        deleted = set(id(resource) for resource in deleted)
+        now = time.time()
+        with self._pending_cond:
+            left = []
+            for resource, deadline in pending["resources"]:
+                if id(resource) in deleted:
+                    continue
+                if (now > deadline or
+                        pending["failures"] > resource._max_attempts):
                     LOG.warning(
-                        _("Seems like %s.%s.is_deleted(self) method is broken "
-                          "It shouldn't raise any exceptions.")
-                        % (resource.__module__, type(resource).__name__))
-                    LOG.exception(e)
-
-                    # NOTE(boris-42): Avoid LOG spaming in case of bad
-                    #                 is_deleted() method
-                    failures_count += 1
-                    if failures_count > resource._max_attempts:
-                        break
-
-                finally:
-                    time.sleep(resource._interval)
-
-            LOG.warning(_("Resource deletion failed, timeout occurred for "
+                        _("Resource deletion failed, timeout occurred for "
                           "%(service)s.%(resource)s: %(uuid)s.")
-                        % msg_kw)
+                        % {"uuid": resource.id(),
+                           "service": resource._service,
+                           "resource": resource._resource})
+                    continue
+                left.append((resource, deadline))
+            pending["resources"] = left
+            if not left:
+                del self._pending[key]
+
+    def _poll_deleted(self):
+        """Wait until all pending deleted resources disappear.
+
+        Resources of each user are checked in a batch (by one list() call
+        for most of resources) every manager_cls._interval seconds. Stops
+        when nothing is pending and _finish_requests() is called.
+        """
+        while True:
+            with self._pending_cond:
+                while not (self._pending or self._requests_sent):
+                    self._pending_cond.wait()
+                pending = list(self._pending.items())
+            if not pending:
+                break
+
+            for key, user_pending in pending:
+                self._check_pending(key, user_pending)
+            if self._pending:
+                time.sleep(self.manager_cls._interval)
 
     def _gen_publisher(self):
         """Returns publisher for deletion jobs.
@@ -127,15 +183,18 @@ class SeekAndDestroy(object):
         uuid that should be deleted.
 
         In case of tenant based resource, uuids are fetched only from one user
-        per tenant.
+        per tenant. Resources of different users are listed concurrently
+        (by up to manager_cls._threads threads).
         """
 
         def publisher(queue):
+            listed = []
 
             def _publish(admin, user, manager):
                 try:
                     for raw_resource in rutils.retry(3, manager.list):
                         queue.append((admin, user, raw_resource))
+                        listed.append(1)
                 except Exception as e:
                     LOG.warning(
                         _("Seems like %s.%s.list(self) method is broken. "
@@ -143,6 +202,7 @@ class SeekAndDestroy(object):
                         % (manager.__module__, type(manager).__name__))
                     LOG.exception(e)
 
+            started = time.time()
             if self.admin and (not self.users
                                or self.manager_cls._perform_for_admin_only):
                 manager = self.manager_cls(
@@ -152,12 +212,16 @@ class SeekAndDestroy(object):
             else:
                 visited_tenants = set()
                 admin_client = self._get_cached_client(self.admin)
+                users = []
                 for user in self.users:
                     if (self.manager_cls._tenant_resource
                        and user["tenant_id"] in visited_tenants):
                         continue
 
                     visited_tenants.add(user["tenant_id"])
+                    users.append(user)
+
+                def _publish_for_user(cache, user):
                     manager = self.manager_cls(
                         admin=admin_client,
                         user=self._get_cached_client(user),
@@ -165,6 +229,16 @@ class SeekAndDestroy(object):
 
                     _publish(self.admin, user, manager)
 
+                if users:
+                    broker.run(
+                        lambda users_queue: users_queue.extend(users),
+                        _publish_for_user,
+                        consumers_count=min(self.manager_cls._threads,
+                                            len(users)))
+
+            self.listed_count = len(listed)
+            self.listing_duration = time.time() - started
+
         return publisher
 
     def _gen_consumer(self):
@@ -180,15 +254,41 @@ class SeekAndDestroy(object):
                 user=self._get_cached_client(user, cache=cache),
                 tenant_uuid=user and user["tenant_id"])
 
-            self._delete_single_resource(manager)
+            self._delete_single_resource(manager, user)
 
         return consumer
 
+    def _finish_requests(self):
+        """Tell _poll_deleted() that all deletion requests are sent."""
+        with self._pending_cond:
+            self._requests_sent = True
+            self._pending_cond.notify()
+
     def exterminate(self):
         """Delete all resources for passed users, admin and resource_mgr."""
 
-        broker.run(self._gen_publisher(), self._gen_consumer(),
-                   consumers_count=self.manager_cls._threads)
+        self._requests_sent = False
+        poller = threading.Thread(target=self._poll_deleted)
+
+        with rutils.Timer() as timer:
+            poller.start()
+            try:
+                threads = self.manager_cls._threads
+                broker.run(self._gen_publisher(), self._gen_consumer(),
+                           consumers_count=threads,
+                           max_size=threads * broker.QUEUE_SIZE_PER_CONSUMER)
+            finally:
+                self._finish_requests()
+                poller.join()
+
+        LOG.info(_("Cleanup of %(service)s %(resource)s objects: "
+                   "%(count)d listed in %(listing).2fs, "
+                   "finished in %(total).2fs")
+                 % {"service": self.manager_cls._service,
+                    "resource": self.manager_cls._resource,
+                    "count": self.listed_count,
+                    "listing": self.listing_duration,
+                    "total": timer.duration()})
 
 
 def list_resource_names(admin_required=None):
@@ -248,6 +348,61 @@ def find_resource_managers(names=None, admin_required=None):
     return resource_managers
 
 
+# NOTE: Resources with orders starting from this one (keystone users,
+#       projects, etc.) are cleaned up only after all branches are finished,
+#       since other resources are deleted with credentials of the users.
+_LAST_ORDER = 9000
+
+
+def _get_cleanup_branches(resource_managers):
+    """Split resource managers into branches that run in parallel.
+
+    Resource managers are grouped by hundreds of _order, i.e. by the
+    ranges of orders of services. Groups of independent managers form
+    their own branches, while all other managers stay in a single branch
+    in order, as they may depend on each other. Managers with _order
+    starting from _LAST_ORDER are not part of any branch.
+
+    :param resource_managers: resource managers sorted by _order
+    :returns: tuple of the list of branches (lists of resource managers)
+              and the list of resource managers to run after all branches
+    """
+    groups = costilius.OrderedDict()
+    last = []
+    for manager in resource_managers:
+        if manager._order >= _LAST_ORDER:
+            last.append(manager)
+        else:
+            groups.setdefault(manager._order // 100, []).append(manager)
+
+    dependent = []
+    branches = []
+    for group in groups.values():
+        if all(manager._independent for manager in group):
+            branches.append(group)
+        else:
+            dependent.extend(group)
+    if dependent:
+        branches.insert(0, dependent)
+    return branches, last
+
+
+def _cleanup_branch(resource_managers, admin, users):
+    for manager in resource_managers:
+        LOG.debug("Cleaning up %(service)s %(resource)s objects" %
+                  {"service": manager._service,
+                   "resource": manager._resource})
+        try:
+            SeekAndDestroy(manager, admin, users).exterminate()
+        except Exception as e:
+            LOG.warning(_("Cleanup of %(service)s %(resource)s objects "
+                          "failed: %(error)s")
+                        % {"service": manager._service,
+                           "resource": manager._resource, "error": e})
+            if logging.is_debug():
+                LOG.exception(e)
+
+
 def cleanup(names=None, admin_required=None, admin=None, users=None):
     """Generic cleaner.
 
@@ -255,7 +410,9 @@ def cleanup(names=None, admin_required=None, admin=None, users=None):
     with _service from services or _resource from resources.
 
     Then goes through all passed users and using cleaners cleans all related
-    resources.
+    resources. Independent services are cleaned up in parallel with others,
+    keystone resources are cleaned up after all others
+    (see _get_cleanup_branches()).
 
     :param names: Use only resource manages that has name from this list.
                   There are in as _service or
@@ -274,8 +431,23 @@ def cleanup(names=None, admin_required=None, admin=None, users=None):
 
                   }
     """
-    for manager in find_resource_managers(names, admin_required):
-        LOG.debug("Cleaning up %(service)s %(resource)s objects" %
-                  {"service": manager._service,
-                   "resource": manager._resource})
-        SeekAndDestroy(manager, admin, users).exterminate()
+    branches, last = _get_cleanup_branches(
+        find_resource_managers(names, admin_required))
+
+    with rutils.Timer() as timer:
+        threads = []
+        for branch in branches[1:]:
+            thread = threading.Thread(target=_cleanup_branch,
+                                      args=(branch, admin, users))
+            thread.start()
+            threads.append(thread)
+        if branches:
+            _cleanup_branch(branches[0], admin, users)
+        for thread in threads:
+            thread.join()
+        _cleanup_branch(last, admin, users)
+
+    LOG.info(_("Cleanup of %(count)d resource types finished in "
+               "%(duration).2fs")
+             % {"count": sum(len(branch) for branch in branches) + len(last),
+                "duration": timer.duration()})
@@ -34,6 +34,9 @@ class SynchronizedDeletion(object):
     def is_deleted(self):
         return True
 
+    def check_deleted(self, resources):
+        return list(resources)
+
 
 class QuotaMixin(SynchronizedDeletion):
 
@@ -275,7 +278,8 @@ class ManilaSecurityService(base.ResourceManager):
 
 # GLANCE
 
-@base.resource("glance", "images", order=500, tenant_resource=True)
+@base.resource("glance", "images", order=500, tenant_resource=True,
+               independent=True)
 class GlanceImage(base.ResourceManager):
 
     def list(self):
@@ -348,7 +352,8 @@ class SaharaNodeGroup(SynchronizedDeletion, base.ResourceManager):
 
 # CEILOMETER
 
-@base.resource("ceilometer", "alarms", order=700, tenant_resource=True)
+@base.resource("ceilometer", "alarms", order=700, tenant_resource=True,
+               independent=True)
 class CeilometerAlarms(SynchronizedDeletion, base.ResourceManager):
 
     def id(self):
@@ -365,7 +370,7 @@ class CeilometerAlarms(SynchronizedDeletion, base.ResourceManager):
 
 # ZAQAR
 
-@base.resource("zaqar", "queues", order=800)
+@base.resource("zaqar", "queues", order=800, independent=True)
 class ZaqarQueues(SynchronizedDeletion, base.ResourceManager):
 
     def list(self):
@@ -411,7 +416,7 @@ class SwiftMixin(SynchronizedDeletion, base.ResourceManager):
 
 
 @base.resource("swift", "object", order=next(_swift_order),
-               tenant_resource=True)
+               tenant_resource=True, independent=True)
 class SwiftObject(SwiftMixin):
 
     def list(self):
@@ -427,7 +432,7 @@ class SwiftObject(SwiftMixin):
 
 
 @base.resource("swift", "container", order=next(_swift_order),
-               tenant_resource=True)
+               tenant_resource=True, independent=True)
 class SwiftContainer(SwiftMixin):
 
     def list(self):
@@ -437,7 +442,8 @@ class SwiftContainer(SwiftMixin):
 
 # MISTRAL
 
-@base.resource("mistral", "workbooks", order=1100, tenant_resource=True)
+@base.resource("mistral", "workbooks", order=1100, tenant_resource=True,
+               independent=True)
 class MistralWorkbooks(SynchronizedDeletion, base.ResourceManager):
     def delete(self):
         self._manager().delete(self.raw_resource.name)
@@ -27,7 +27,8 @@ LOG = logging.getLogger(__name__)
 # NOTE(boris-42): This context should be hidden for now and used only by
 #                 benchmark engine.  In future during various refactoring of
 #                 validation system and rally CI testing we will make it public
-@context.context(name="existing_users", order=99, hidden=True)
+@context.context(name="existing_users", order=99, hidden=True,
+                 shared_services=[])
 class ExistingUsers(context.Context):
     """This context supports using existing users in Rally.
 
@@ -25,7 +25,7 @@ from rally.task import context
 LOG = logging.getLogger(__name__)
 
 
-@context.context(name="roles", order=330)
+@context.context(name="roles", order=330, shared_services=[])
 class RoleGenerator(context.Context):
     """Context class for adding temporary roles for benchmarks."""
 
@@ -17,6 +17,7 @@ import collections
 import uuid
 
 from oslo_config import cfg
+import six
 
 from rally.common import broker
 from rally.common.i18n import _
@@ -44,6 +45,13 @@ USER_CONTEXT_OPTS = [
     cfg.StrOpt("user_domain",
                default="default",
                help="ID of domain in which users will be created."),
+    cfg.BoolOpt("use_pool",
+                default=False,
+                help="Lease tenants and users from the pool of the "
+                     "deployment, instead of creating them for each "
+                     "benchmark and deleting afterwards. Passwords of the "
+                     "users of the pool are stored in the Rally database "
+                     "in plain text, like credentials of deployments."),
 ]
 
 CONF = cfg.CONF
@@ -52,7 +60,7 @@ CONF.register_opts(USER_CONTEXT_OPTS,
                                       title="benchmark context options"))
 
 
-@context.context(name="users", order=100)
+@context.context(name="users", order=100, shared_services=[])
 class UserGenerator(context.Context):
     """Context class for generating temporary users/tenants for benchmarks."""
 
@@ -78,6 +86,9 @@ class UserGenerator(context.Context):
             "user_domain": {
                 "type": "string",
             },
+            "use_pool": {
+                "type": "boolean",
+            },
         },
         "additionalProperties": False
     }
@@ -90,7 +101,8 @@ class UserGenerator(context.Context):
         "resource_management_workers":
             cfg.CONF.users_context.resource_management_workers,
         "project_domain": cfg.CONF.users_context.project_domain,
-        "user_domain": cfg.CONF.users_context.user_domain
+        "user_domain": cfg.CONF.users_context.user_domain,
+        "use_pool": cfg.CONF.users_context.use_pool
     }
 
     def __init__(self, context):
@@ -98,6 +110,8 @@ class UserGenerator(context.Context):
         self.context["users"] = []
         self.context["tenants"] = {}
         self.endpoint = self.context["admin"]["endpoint"]
+        # IDs in the user pool of the leased tenants, by tenant IDs
+        self._pool_ids = {}
         # NOTE(boris-42): I think this is the best place for adding logic when
         #                 we are using pre created users or temporary. So we
         #                 should rename this class s/UserGenerator/UserContext/
@@ -149,14 +163,16 @@ class UserGenerator(context.Context):
                                 "Exception: %(ex)s" %
                                 {"tenant_id": network_tenant_id, "ex": ex})
 
-    def _create_tenants(self):
+    def _create_tenants(self, count=None, task_id=None):
         threads = self.config["resource_management_workers"]
+        count = self.config["tenants"] if count is None else count
+        task_id = task_id or self.task["uuid"]
 
         tenants = collections.deque()
 
         def publish(queue):
-            for i in range(self.config["tenants"]):
-                args = (self.config["project_domain"], self.task["uuid"], i)
+            for i in range(count):
+                args = (self.config["project_domain"], task_id, i)
                 queue.append(args)
 
         def consume(cache, args):
@@ -170,22 +186,24 @@ class UserGenerator(context.Context):
             tenants.append(tenant_dict)
 
         # NOTE(msdubov): consume() will fill the tenants list in the closure.
-        broker.run(publish, consume, threads)
+        broker.run(publish, consume, threads,
+                   max_size=threads * broker.QUEUE_SIZE_PER_CONSUMER)
         tenants_dict = {}
         for t in tenants:
             tenants_dict[t["id"]] = t
 
         return tenants_dict
 
-    def _create_users(self):
+    def _create_users(self, tenants=None):
         # NOTE(msdubov): This should be called after _create_tenants().
         threads = self.config["resource_management_workers"]
         users_per_tenant = self.config["users_per_tenant"]
+        tenants = self.context["tenants"] if tenants is None else tenants
 
         users = collections.deque()
 
         def publish(queue):
-            for tenant_id in self.context["tenants"]:
+            for tenant_id in tenants:
                 for user_id in range(users_per_tenant):
                     username = self.PATTERN_USER % {"tenant_id": tenant_id,
                                                     "uid": user_id}
@@ -214,7 +232,8 @@ class UserGenerator(context.Context):
                           "tenant_id": tenant_id})
 
         # NOTE(msdubov): consume() will fill the users list in the closure.
-        broker.run(publish, consume, threads)
+        broker.run(publish, consume, threads,
+                   max_size=threads * broker.QUEUE_SIZE_PER_CONSUMER)
         return list(users)
 
     def _delete_tenants(self):
@@ -232,7 +251,8 @@ class UserGenerator(context.Context):
                 cache["client"] = keystone.wrap(clients.keystone())
             cache["client"].delete_project(tenant_id)
 
-        broker.run(publish, consume, threads)
+        broker.run(publish, consume, threads,
+                   max_size=threads * broker.QUEUE_SIZE_PER_CONSUMER)
         self.context["tenants"] = {}
 
     def _delete_users(self):
@@ -248,17 +268,164 @@ class UserGenerator(context.Context):
                 cache["client"] = keystone.wrap(clients.keystone())
             cache["client"].delete_user(user_id)
 
-        broker.run(publish, consume, threads)
+        broker.run(publish, consume, threads,
+                   max_size=threads * broker.QUEUE_SIZE_PER_CONSUMER)
         self.context["users"] = []
 
+    def _lease_from_pool(self):
+        """Lease tenants and users from the pool, create missing ones."""
+        pool = objects.UserPool(self.task["deployment_uuid"])
+        users_per_tenant = self.config["users_per_tenant"]
+        domains = (self.config["project_domain"], self.config["user_domain"])
+
+        for pooled in pool.lease(self.task["uuid"], self.config["tenants"],
+                                 users_per_tenant, *domains):
+            tenant = pooled["tenant"]
+            self._pool_ids[tenant["id"]] = pooled["id"]
+            self.context["tenants"][tenant["id"]] = {"id": tenant["id"],
+                                                     "name": tenant["name"]}
+            for user in pooled["users"][:users_per_tenant]:
+                self.context["users"].append({
+                    "id": user["id"],
+                    "endpoint": objects.Endpoint(**user["endpoint"]),
+                    "tenant_id": tenant["id"]})
+
+        missing = self.config["tenants"] - len(self._pool_ids)
+        LOG.debug("Leased %(leased)d tenants from the pool, creating "
+                  "%(missing)d tenants" % {"leased": len(self._pool_ids),
+                                           "missing": missing})
+        if not missing:
+            return
+
+        # NOTE: Names of tenants include the task ID, but tenants of the
+        #       pool outlive tasks, so they are made unique another way.
+        tenants = self._create_tenants(missing, task_id=str(uuid.uuid4()))
+        self.context["tenants"].update(tenants)
+        users = self._create_users(tenants)
+        self.context["users"].extend(users)
+
+        for tenant_id, tenant in six.iteritems(tenants):
+            pooled = pool.add(
+                self.task["uuid"], tenant,
+                [user for user in users if user["tenant_id"] == tenant_id],
+                *domains)
+            self._pool_ids[tenant_id] = pooled["id"]
+
+    def _return_to_pool(self):
+        """Return leased tenants to the pool.
+
+        Tenants are verified first: those which were deleted or which users
+        were deleted meanwhile are removed from the pool (deleting what is
+        left of them), so they are never leased again. If tenants can't be
+        verified, they are returned to the pool as they are, so they stay
+        known to the pool and are verified when they are returned next time.
+        """
+        pool = objects.UserPool(self.task["deployment_uuid"])
+        try:
+            client = keystone.wrap(
+                osclients.Clients(self.endpoint).keystone())
+            project_ids = set(project.id
+                              for project in client.list_projects())
+            user_ids = set(user.id for user in client.list_users())
+        except Exception as e:
+            LOG.warning(_("Failed to verify tenants leased from the pool, "
+                          "they are returned to it unverified: %s") % e)
+            pool.release(list(self._pool_ids.values()))
+            self._pool_ids = {}
+            return
+
+        pooled = dict((entry["tenant"]["id"], entry)
+                      for entry in pool.list(task_uuid=self.task["uuid"]))
+
+        verified = []
+        for tenant_id, pool_id in six.iteritems(self._pool_ids):
+            users = [user["id"]
+                     for user in pooled.get(tenant_id, {}).get("users", [])]
+            if (tenant_id in project_ids and users and
+                    user_ids.issuperset(users)):
+                verified.append(pool_id)
+                continue
+
+            LOG.warning(_("Tenant %s or its users are missing, it is removed "
+                          "from the pool") % tenant_id)
+            with logging.ExceptionLogger(
+                    LOG, _("Unable to delete tenant %s") % tenant_id):
+                for user_id in user_ids.intersection(users):
+                    client.delete_user(user_id)
+                if tenant_id in project_ids:
+                    client.delete_project(tenant_id)
+            try:
+                pool.delete(pool_id)
+            except exceptions.UserPoolTenantNotFound:
+                pass
+
+        pool.release(verified)
+        self._pool_ids = {}
+
+    @classmethod
+    def purge_pool(cls, deployment):
+        """Delete all tenants and users of the pool of the deployment.
+
+        The pool is always emptied: failures to delete tenants and users
+        in the cloud are only logged, so the pool never prevents the
+        deployment from being destroyed.
+
+        :param deployment: deployment (dict-like) with uuid and admin
+        """
+        pool = objects.UserPool(deployment["uuid"])
+        pooled = pool.list()
+        if not pooled:
+            return
+
+        endpoint = None
+        with logging.ExceptionLogger(
+                LOG, _("Unable to get the admin endpoint of the deployment, "
+                       "tenants of the pool are left in the cloud")):
+            endpoint = objects.Endpoint(**deployment["admin"])
+
+        def publish(queue):
+            queue.extend(pooled)
+
+        def consume(cache, tenant):
+            if "client" not in cache and endpoint is not None:
+                # NOTE: The failure is cached, so the client is not created
+                #       again for every tenant if keystone is unreachable.
+                cache["client"] = None
+                with logging.ExceptionLogger(
+                        LOG, _("Unable to connect to keystone, tenants of "
+                               "the pool are left in the cloud")):
+                    clients = osclients.Clients(endpoint)
+                    cache["client"] = keystone.wrap(clients.keystone())
+            client = cache.get("client")
+            if client is not None:
+                with logging.ExceptionLogger(
+                        LOG, _("Unable to delete tenant %s of the pool")
+                        % tenant["tenant"]["id"]):
+                    for user in tenant["users"]:
+                        client.delete_user(user["id"])
+                    client.delete_project(tenant["tenant"]["id"])
+            try:
+                pool.delete(tenant["id"])
+            except exceptions.UserPoolTenantNotFound:
+                pass
+
+        LOG.debug("Deleting %d tenants of the pool" % len(pooled))
+        threads = CONF.users_context.resource_management_workers
+        broker.run(publish, consume, threads,
+                   max_size=threads * broker.QUEUE_SIZE_PER_CONSUMER)
+
     @rutils.log_task_wrapper(LOG.info, _("Enter context: `users`"))
     def setup(self):
         """Create tenants and users, using the broker pattern."""
         threads = self.config["resource_management_workers"]
 
-        LOG.debug("Creating %(tenants)d tenants using %(threads)s threads" %
-                  {"tenants": self.config["tenants"], "threads": threads})
-        self.context["tenants"] = self._create_tenants()
+        if self.config["use_pool"]:
+            self._lease_from_pool()
+        else:
+            LOG.debug("Creating %(tenants)d tenants using %(threads)s "
+                      "threads" % {"tenants": self.config["tenants"],
+                                   "threads": threads})
+            self.context["tenants"] = self._create_tenants()
 
         if len(self.context["tenants"]) < self.config["tenants"]:
             raise exceptions.ContextSetupFailure(
@@ -266,9 +433,10 @@ class UserGenerator(context.Context):
                 msg=_("Failed to create the requested number of tenants."))
 
         users_num = self.config["users_per_tenant"] * self.config["tenants"]
-        LOG.debug("Creating %(users)d users using %(threads)s threads" %
-                  {"users": users_num, "threads": threads})
-        self.context["users"] = self._create_users()
+        if not self.config["use_pool"]:
+            LOG.debug("Creating %(users)d users using %(threads)s threads" %
+                      {"users": users_num, "threads": threads})
+            self.context["users"] = self._create_users()
 
         if len(self.context["users"]) < users_num:
             raise exceptions.ContextSetupFailure(
@@ -278,6 +446,10 @@ class UserGenerator(context.Context):
     @rutils.log_task_wrapper(LOG.info, _("Exit context: `users`"))
     def cleanup(self):
         """Delete tenants and users, using the broker pattern."""
+        if self.config["use_pool"]:
+            self._return_to_pool()
+            return
+
         self._remove_default_security_group()
         self._delete_users()
         self._delete_tenants()
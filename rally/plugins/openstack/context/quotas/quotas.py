@@ -29,7 +29,8 @@ from rally.task import context
 LOG = logging.getLogger(__name__)
 
 
-@context.context(name="quotas", order=300)
+@context.context(name="quotas", order=300,
+                 shared_services=["nova", "cinder", "neutron"])
 class Quotas(context.Context):
     """Context class for updating benchmarks' tenants quotas."""
 
@@ -140,7 +140,9 @@ class BaseCustomImageGenerator(context.Context):
                 tenant = self.context["tenants"][tenant_id]
                 tenant["custom_image"] = self.create_one_image(user)
 
-            broker.run(publish, consume, self.config["workers"])
+            workers = self.config["workers"]
+            broker.run(publish, consume, workers,
+                       max_size=workers * broker.QUEUE_SIZE_PER_CONSUMER)
 
     def create_one_image(self, user, **kwargs):
         """Create one image for the user."""
@@ -208,7 +210,9 @@ class BaseCustomImageGenerator(context.Context):
                     self.delete_one_image(user, tenant["custom_image"])
                     tenant.pop("custom_image")
 
-            broker.run(publish, consume, self.config["workers"])
+            workers = self.config["workers"]
+            broker.run(publish, consume, workers,
+                       max_size=workers * broker.QUEUE_SIZE_PER_CONSUMER)
 
     def delete_one_image(self, user, custom_image):
         """Delete the image created for the user and tenant."""
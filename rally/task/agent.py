@@ -0,0 +1,260 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Agent that generates load on behalf of the distributed runner.
+
+Agents register themselves as workers in the database and send heartbeats
+by updating their records. The distributed runner connects to live agents,
+sends each of them a job (its share of iterations and the config of the
+runner that generates the load) and receives the results as they arrive.
+
+Messages are (kind, data) tuples sent over multiprocessing connections:
+
+* runner to agent: ("run", job) and ("abort", None);
+* agent to runner: ("results", [packed results]), ("done", None) and
+  ("error", formatted exception).
+
+Messages are pickled, so anyone who is able to connect to an agent and
+knows the authkey can run arbitrary code on it, and the benchmark context
+(including cloud credentials) is sent unencrypted. Agents listen on
+localhost by default; listen on other addresses only in trusted networks
+and keep the authkey secret.
+"""
+
+import datetime
+from multiprocessing import connection
+import socket
+import threading
+
+from oslo_config import cfg
+from oslo_utils import encodeutils
+from oslo_utils import timeutils
+
+from rally.common import log as logging
+from rally import db
+from rally import exceptions
+from rally.task import runner
+from rally.task.scenarios import base as scenario_base
+from rally.task import utils
+
+LOG = logging.getLogger(__name__)
+
+
+AGENT_OPTS = [
+    cfg.StrOpt("authkey",
+               secret=True,
+               help="Key used to authenticate connections between "
+                    "the distributed runner and the agents. It is required "
+                    "to run agents and must be kept secret"),
+    cfg.IntOpt("heartbeat_interval",
+               default=5,
+               help="How often (in seconds) agents report that they are "
+                    "alive. Agents that were silent for 3 intervals are "
+                    "not used")
+]
+
+CONF = cfg.CONF
+CONF.register_opts(AGENT_OPTS,
+                   group=cfg.OptGroup(name="agent",
+                                      title="Load generation agent options"))
+
+
+def get_live_agents():
+    """Return addresses of the agents that have sent a heartbeat recently.
+
+    :returns: list of (host, port) tuples
+    """
+    updated_since = timeutils.utcnow() - datetime.timedelta(
+        seconds=3 * CONF.agent.heartbeat_interval)
+    agents = []
+    for worker in db.get_workers(updated_since=updated_since):
+        host, port = worker["hostname"].rsplit(":", 1)
+        agents.append((host, int(port)))
+    return agents
+
+
+def _get_authkey():
+    if not CONF.agent.authkey:
+        raise exceptions.AgentAuthKeyNotSet()
+    return encodeutils.safe_encode(CONF.agent.authkey)
+
+
+def connect(address):
+    """Connect to the agent.
+
+    :param address: (host, port) tuple
+    :returns: multiprocessing.connection.Connection
+    """
+    return connection.Client(address, authkey=_get_authkey())
+
+
+class _ConnectionQueue(object):
+    """Queue-like wrapper which sends batches of results to the runner."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.Lock()
+
+    def put(self, batch):
+        self.send("results", batch)
+
+    def send(self, kind, data):
+        with self._lock:
+            self.conn.send((kind, data))
+
+
+class Agent(object):
+    """Load generation agent."""
+
+    def __init__(self, host="127.0.0.1", port=0, address=None):
+        """Init agent.
+
+        :param host: host to listen on. Anyone who is able to connect to
+                     the agent and knows the authkey can run arbitrary code
+                     on it, so listen on other addresses than localhost
+                     only in trusted networks
+        :param port: port to listen on, 0 means any free port
+        :param address: "host:port" string under which the agent is
+                        registered, by default it is made of the fully
+                        qualified domain name and the port
+        """
+        # NOTE: The authkey is kept, so the agent can be stopped even if
+        #       the config has changed since it was started.
+        self._authkey = _get_authkey()
+        self.listener = connection.Listener((host, port),
+                                            authkey=self._authkey)
+        self.address = address or "%s:%d" % (
+            socket.getfqdn(), self.listener.address[1])
+        self._stopped = threading.Event()
+
+    def _heartbeat(self):
+        while not self._stopped.wait(CONF.agent.heartbeat_interval):
+            try:
+                db.update_worker(self.address)
+            except Exception as e:
+                LOG.warning("Agent %s failed to send a heartbeat: %s"
+                            % (self.address, e))
+
+    def serve(self):
+        """Register the agent and run jobs until it is stopped."""
+        try:
+            db.register_worker({"hostname": self.address})
+        except exceptions.WorkerAlreadyRegistered:
+            # NOTE: The record was left behind by the agent that had
+            #       crashed, so it is reused
+            LOG.warning("Agent %s is already registered, its record is "
+                        "updated" % self.address)
+            db.update_worker(self.address)
+        heartbeat = threading.Thread(target=self._heartbeat)
+        heartbeat.daemon = True
+        heartbeat.start()
+        LOG.info("Agent %s is ready" % self.address)
+
+        try:
+            while True:
+                try:
+                    conn = self.listener.accept()
+                except Exception as e:
+                    LOG.warning("Failed to accept connection: %s" % e)
+                    continue
+                if self._stopped.is_set():
+                    conn.close()
+                    break
+                thread = threading.Thread(target=self._handle, args=(conn,))
+                thread.daemon = True
+                thread.start()
+        finally:
+            self._stopped.set()
+            self.listener.close()
+            db.unregister_worker(self.address)
+
+    def stop(self):
+        """Stop serving. Jobs that are already running are not affected."""
+        if self._stopped.is_set():
+            return
+        host, port = self.listener.address
+        address = ("127.0.0.1" if host == "0.0.0.0" else host, port)
+        self._stopped.set()
+        # NOTE: accept() is not interrupted by closing the listener, so the
+        #       agent is woken up by connecting to it
+        try:
+            connection.Client(address, authkey=self._authkey).close()
+        except Exception:
+            # NOTE: The agent is still waiting for a connection, so let
+            #       stop() be called again
+            self._stopped.clear()
+            raise
+
+    def _handle(self, conn):
+        queue = _ConnectionQueue(conn)
+        try:
+            job = conn.recv()[1]
+            self._run_job(conn, queue, job)
+        except Exception as e:
+            LOG.exception(e)
+            try:
+                queue.send("error", utils.format_exc(e))
+            except Exception:
+                pass
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _watch_abort(conn, runner_obj):
+        try:
+            while conn.recv()[0] != "abort":
+                pass
+        except (EOFError, IOError):
+            pass
+        runner_obj.abort()
+
+    def _run_job(self, conn, queue, job):
+        """Generate load and send the results back.
+
+        :param conn: connection to the distributed runner
+        :param queue: _ConnectionQueue object for the connection
+        :param job: dict with the task ("task"), the runner config
+                    ("runner"), the scenario name ("scenario"), the
+                    benchmark context ("context", its "iteration_offset"
+                    is the number of the first iteration of the share) and
+                    scenario args ("args")
+        """
+        LOG.info("Task %(task)s | Agent %(agent)s starts %(scenario)s with "
+                 "%(runner)s" % {"task": job["task"]["uuid"],
+                                 "agent": self.address,
+                                 "scenario": job["scenario"],
+                                 "runner": job["runner"]})
+        cls_name, method_name = job["scenario"].split(".", 1)
+        cls = scenario_base.Scenario.get_by_name(cls_name)
+
+        runner_obj = runner.ScenarioRunner.get(job["runner"]["type"])(
+            job["task"], job["runner"])
+        batcher = runner.ResultBatcher(queue)
+        # NOTE: Results are sent to the distributed runner as they arrive,
+        #       it validates them anyway.
+        runner_obj._send_result = batcher.put
+
+        watcher = threading.Thread(target=self._watch_abort,
+                                   args=(conn, runner_obj))
+        watcher.daemon = True
+        watcher.start()
+
+        try:
+            runner_obj._run_scenario(cls, method_name, job["context"],
+                                     job["args"])
+        finally:
+            batcher.close()
+        queue.send("done", None)
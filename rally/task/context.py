@@ -14,6 +14,7 @@
 #    under the License.
 
 import abc
+import copy
 
 import jsonschema
 import six
@@ -26,7 +27,7 @@ from rally.task import functional
 LOG = logging.getLogger(__name__)
 
 
-def context(name, order, hidden=False):
+def context(name, order, hidden=False, shared_services=None):
     """Context class wrapper.
 
     Each context class has to be wrapped by context() wrapper. It
@@ -39,11 +40,17 @@ def context(name, order, hidden=False):
                   Contexts with smaller order are run first
     :param hidden: If it is true you won't be able to specify context via
                    task config
+    :param shared_services: If it is not None, the context may be shared by
+                            consecutive scenarios of a task (see
+                            SharedContexts). It lists services in which the
+                            context creates resources, so it is not shared
+                            with scenarios which clean up these services
     """
     def wrapper(cls):
         cls = plugin.configure(name=name)(cls)
         cls._meta_set("order", order)
         cls._meta_set("hidden", hidden)
+        cls._meta_set("shared_services", shared_services)
         return cls
 
     return wrapper
@@ -107,12 +114,130 @@ class Context(plugin.Plugin, functional.FunctionalMixin):
         self.cleanup()
 
 
+class SharedContexts(object):
+    """Contexts which are kept set up for consecutive scenarios of a task.
+
+    For each scenario, the longest prefix of its sorted contexts that may
+    be shared (see context()) is shared. Contexts set up for the previous
+    scenarios are reused as long as they have the same names and config
+    in the same order, other shared contexts are cleaned up and set up
+    again. Contexts are counted while scenarios use them and are never
+    cleaned up in use.
+
+    Each scenario gets deep copies of the data (e.g. "users" and "tenants")
+    of the shared contexts, so contexts that are set up for the scenario
+    only may change its users and tenants, at any nesting level, without
+    affecting the shared ones.
+    """
+
+    # Keys of context objects which are not data of contexts
+    BASE_KEYS = ("task", "admin", "scenario_name", "config")
+
+    def __init__(self):
+        self.context_obj = None
+        self._contexts = []
+
+    @staticmethod
+    def _get_shareable(context_obj):
+        """Return (context class, config) pairs that may be shared."""
+        config = context_obj["config"]
+        cleanup = set(service.split(".")[0]
+                      for name in ("cleanup", "admin_cleanup")
+                      for service in config.get(name, []))
+        shareable = []
+        for ctx_cls in sorted(map(Context.get, config),
+                              key=lambda ctx_cls: ctx_cls.get_order()):
+            services = ctx_cls._meta_get("shared_services")
+            if services is None or cleanup.intersection(services):
+                break
+            shareable.append((ctx_cls, config[ctx_cls.get_name()]))
+        return shareable
+
+    def acquire(self, context_obj):
+        """Set up shared contexts of the scenario and put their data to it.
+
+        :param context_obj: context object of the scenario
+        :returns: names of the shared contexts
+        """
+        shareable = self._get_shareable(context_obj)
+        reused = 0
+        for (ctx_cls, config), shared in zip(shareable, self._contexts):
+            if (ctx_cls.get_name(), config) != (shared["name"],
+                                                shared["config"]):
+                break
+            reused += 1
+        self.cleanup(keep=reused)
+
+        if self.context_obj is None:
+            self.context_obj = {"task": context_obj["task"],
+                                "admin": context_obj["admin"],
+                                "scenario_name": context_obj["scenario_name"],
+                                "config": {}}
+        for ctx_cls, config in shareable[reused:]:
+            name = ctx_cls.get_name()
+            # NOTE: The scenario config is not passed to the context, since
+            #       contexts update their config with default values.
+            self.context_obj["config"][name] = dict(config)
+            self._contexts.append({"name": name, "config": config,
+                                   "ctx": ctx_cls(self.context_obj),
+                                   "refs": 0})
+            try:
+                self._contexts[-1]["ctx"].setup()
+            except Exception:
+                self.cleanup(keep=len(self._contexts) - 1)
+                raise
+            LOG.debug("Context %s is shared by the following scenarios"
+                      % name)
+
+        for shared in self._contexts:
+            shared["refs"] += 1
+        for key, value in six.iteritems(self.context_obj):
+            if key not in self.BASE_KEYS:
+                context_obj[key] = copy.deepcopy(value)
+        return [shared["name"] for shared in self._contexts]
+
+    def release(self):
+        """Mark shared contexts as not used by the finished scenario."""
+        for shared in self._contexts:
+            shared["refs"] -= 1
+
+    def cleanup(self, keep=0):
+        """Clean up shared contexts, but the first `keep` of them.
+
+        :raises RallyException: if the contexts are still in use
+        """
+        stale = self._contexts[keep:]
+        if any(shared["refs"] for shared in stale):
+            raise exceptions.RallyException(
+                "Shared contexts %s are in use"
+                % [shared["name"] for shared in stale])
+
+        for shared in stale[::-1]:
+            self._contexts.pop()
+            self.context_obj["config"].pop(shared["name"])
+            try:
+                shared["ctx"].cleanup()
+            except Exception as e:
+                LOG.error("Context %s failed during cleanup." % shared["name"])
+                LOG.exception(e)
+        if not self._contexts:
+            self.context_obj = None
+
+
 class ContextManager(object):
     """Create context environment and run method inside it."""
 
-    def __init__(self, context_obj):
+    def __init__(self, context_obj, shared=None):
+        """Init context manager.
+
+        :param context_obj: context object of the scenario
+        :param shared: SharedContexts to take shared contexts from, None to
+                       set up all contexts for the scenario
+        """
         self._visited = []
+        self._shared_names = None
         self.context_obj = context_obj
+        self.shared = shared
 
     @staticmethod
     def validate(ctx, non_hidden=False):
@@ -120,13 +245,17 @@ class ContextManager(object):
             Context.get(name).validate(config, non_hidden=non_hidden)
 
     def _get_sorted_context_lst(self):
-        ctxlst = map(Context.get, self.context_obj["config"])
+        ctxlst = map(Context.get,
+                     [name for name in self.context_obj["config"]
+                      if name not in (self._shared_names or [])])
         return sorted(map(lambda ctx: ctx(self.context_obj), ctxlst))
 
     def setup(self):
         """Creates benchmark environment from config."""
 
         self._visited = []
+        if self.shared is not None:
+            self._shared_names = self.shared.acquire(self.context_obj)
         for ctx in self._get_sorted_context_lst():
             self._visited.append(ctx)
             ctx.setup()
@@ -144,6 +273,10 @@ class ContextManager(object):
                 LOG.error("Context %s failed during cleanup." % ctx.get_name())
                 LOG.exception(e)
 
+        if self._shared_names is not None:
+            self.shared.release()
+            self._shared_names = None
+
     def __enter__(self):
         try:
             self.setup()
@@ -19,6 +19,7 @@ import time
 import traceback
 
 import jsonschema
+from oslo_config import cfg
 import six
 
 from rally.common.i18n import _
@@ -31,6 +32,7 @@ from rally import osclients
 from rally.plugins.openstack.context.keystone import existing_users
 from rally.plugins.openstack.context.keystone import users as users_ctx
 from rally.task import context
+from rally.task.processing import summary as result_summary
 from rally.task import runner
 from rally.task.scenarios import base as base_scenario
 from rally.task import sla
@@ -38,6 +40,24 @@ from rally.task import sla
 
 LOG = logging.getLogger(__name__)
 
+# Iteration results are stored to the database in chunks as soon as there
+# are RESULTS_CHUNK_SIZE of them or the oldest one has been waiting for
+# RESULTS_CHUNK_INTERVAL seconds
+RESULTS_CHUNK_SIZE = 1000
+RESULTS_CHUNK_INTERVAL = 60
+
+ENGINE_OPTS = [
+    cfg.FloatOpt("timeseries_window",
+                 default=1.0,
+                 help="Duration (in seconds) of windows in which iteration "
+                      "results are aggregated to the time series shown by "
+                      "the task report")
+]
+
+CONF = cfg.CONF
+benchmark_group = cfg.OptGroup(name="benchmark", title="benchmark options")
+CONF.register_opts(ENGINE_OPTS, group=benchmark_group)
+
 
 CONFIG_SCHEMA = {
     "type": "object",
@@ -95,7 +115,7 @@ class BenchmarkEngine(object):
     """
 
     def __init__(self, config, task, admin=None, users=None,
-                 abort_on_sla_failure=False):
+                 abort_on_sla_failure=False, share_contexts=False):
         """BenchmarkEngine constructor.
 
         :param config: The configuration with specified benchmark scenarios
@@ -104,12 +124,17 @@ class BenchmarkEngine(object):
         :param users: List of dicts with user credentials
         :param abort_on_sla_failure: True if the execution should be stopped
                                      when some SLA check fails
+        :param share_contexts: True if identical contexts should be shared
+                               by consecutive scenarios instead of being set
+                               up for each of them
         """
         self.config = config
         self.task = task
         self.admin = admin and objects.Endpoint(**admin) or None
         self.existing_users = users or []
         self.abort_on_sla_failure = abort_on_sla_failure
+        self.shared_contexts = (share_contexts and context.SharedContexts()
+                                or None)
 
     @rutils.log_task_wrapper(LOG.info, _("Task validation check cloud."))
     def _check_cloud(self):
@@ -232,37 +257,59 @@ class BenchmarkEngine(object):
                   corresponding benchmark test launches
         """
         self.task.update_status(consts.TaskStatus.RUNNING)
-        for name in self.config:
-            for n, kw in enumerate(self.config[name]):
-                key = {"name": name, "pos": n, "kw": kw}
-                LOG.info("Running benchmark with key: \n%s"
-                         % json.dumps(key, indent=2))
-                runner_obj = self._get_runner(kw)
-                is_done = threading.Event()
-                unexpected_failure = {}
-                consumer = threading.Thread(
-                    target=self.consume_results,
-                    args=(key, self.task, is_done, unexpected_failure,
-                          runner_obj))
-                consumer.start()
-                context_obj = self._prepare_context(kw.get("context", {}),
-                                                    name, self.admin)
-                self.duration = 0
-                self.full_duration = 0
-                try:
-                    with rutils.Timer() as timer:
-                        with context.ContextManager(context_obj):
-                            self.duration = runner_obj.run(
-                                name, context_obj, kw.get("args", {}))
-                except Exception as e:
-                    LOG.exception(e)
-                    unexpected_failure["exc"] = e
-                finally:
-                    self.full_duration = timer.duration()
-                    is_done.set()
-                    consumer.join()
+        try:
+            for name in self.config:
+                for n, kw in enumerate(self.config[name]):
+                    key = {"name": name, "pos": n, "kw": kw}
+                    LOG.info("Running benchmark with key: \n%s"
+                             % json.dumps(key, indent=2))
+                    runner_obj = self._get_runner(kw)
+                    is_done = threading.Event()
+                    unexpected_failure = {}
+                    consumer = threading.Thread(
+                        target=self.consume_results,
+                        args=(key, self.task, is_done, unexpected_failure,
+                              runner_obj))
+                    consumer.start()
+                    context_obj = self._prepare_context(kw.get("context", {}),
+                                                        name, self.admin)
+                    self.duration = 0
+                    self.full_duration = 0
+                    try:
+                        with rutils.Timer() as timer:
+                            with context.ContextManager(
+                                    context_obj, shared=self.shared_contexts):
+                                self.duration = runner_obj.run(
+                                    name, context_obj, kw.get("args", {}))
+                    except Exception as e:
+                        LOG.exception(e)
+                        unexpected_failure["exc"] = e
+                    finally:
+                        self.full_duration = timer.duration()
+                        is_done.set()
+                        with runner_obj.result_cond:
+                            runner_obj.result_cond.notify_all()
+                        consumer.join()
+        finally:
+            if self.shared_contexts is not None:
+                self.shared_contexts.cleanup()
         self.task.update_status(consts.TaskStatus.FINISHED)
 
+    def _store_results_chunk(self, task, result_id, position, chunk):
+        # NOTE: If the consumer stopped on a failure to store results, the
+        #       runner would keep filling the queue until memory runs out,
+        #       so the chunk is lost instead. Its results are still counted
+        #       in the summary and checked by SLA.
+        try:
+            task.append_results_chunk(result_id, position, chunk)
+        except Exception as e:
+            LOG.error(_("Failed to store %(count)d iteration results of "
+                        "the task %(uuid)s: %(error)s")
+                      % {"count": len(chunk), "uuid": task["uuid"],
+                         "error": e})
+            if logging.is_debug():
+                LOG.exception(e)
+
     def consume_results(self, key, task, is_done, unexpected_failure,
                         runner_obj):
         """Consume scenario runner results from queue and send them to db.
@@ -278,25 +325,71 @@ class BenchmarkEngine(object):
                                    unexpected exception.
         :param runner_obj: ScenarioRunner object that was used to run a task
         """
-        results = []
+        # NOTE: The result is stored before the scenario starts, and
+        #       iteration results are appended to it in chunks as they
+        #       arrive, so memory usage doesn't grow with the number of
+        #       iterations and results survive a crash of Rally.
+        result_id = task.append_results(key, {"raw": [],
+                                              "load_duration": 0,
+                                              "full_duration": 0,
+                                              "sla": []})
+        chunk = []
+        chunk_position = 0
+        chunk_started_at = None
         sla_checker = sla.SLAChecker(key["kw"])
+        summary = result_summary.ResultsSummary(
+            timeseries_window=CONF.benchmark.timeseries_window)
         while True:
-            if runner_obj.result_queue:
-                result = runner_obj.result_queue.popleft()
-                results.append(result)
-                success = sla_checker.add_iteration(result)
-                if self.abort_on_sla_failure and not success:
-                    sla_checker.set_aborted()
-                    runner_obj.abort()
-            elif is_done.isSet():
-                break
-            else:
-                time.sleep(0.1)
-
-            if unexpected_failure.get("exc"):
-                sla_checker.set_unexpected_failure(unexpected_failure["exc"])
-
-        task.append_results(key, {"raw": results,
-                                  "load_duration": self.duration,
-                                  "full_duration": self.full_duration,
-                                  "sla": sla_checker.results()})
+            timed_out = False
+            with runner_obj.result_cond:
+                while not runner_obj.result_queue and not is_done.isSet():
+                    # NOTE: Results of slow scenarios may arrive rarely, so
+                    #       the chunk is stored when its interval expires
+                    #       even if no more results arrive.
+                    timeout = None
+                    if chunk:
+                        timeout = (chunk_started_at + RESULTS_CHUNK_INTERVAL -
+                                   time.time())
+                        if timeout <= 0:
+                            timed_out = True
+                            break
+                    runner_obj.result_cond.wait(timeout)
+                if timed_out:
+                    result = None
+                elif runner_obj.result_queue:
+                    result = runner_obj.result_queue.popleft()
+                else:
+                    break
+
+            if result is not None:
+                if not chunk:
+                    chunk_started_at = time.time()
+                chunk.append(result)
+            if chunk and (timed_out or len(chunk) >= RESULTS_CHUNK_SIZE or
+                          time.time() - chunk_started_at >=
+                          RESULTS_CHUNK_INTERVAL):
+                self._store_results_chunk(task, result_id, chunk_position,
+                                          chunk)
+                chunk = []
+                chunk_position += 1
+            if result is None:
+                continue
+
+            summary.add_iteration(result)
+            success = sla_checker.add_iteration(result)
+            if self.abort_on_sla_failure and not success:
+                sla_checker.set_aborted()
+                runner_obj.abort()
+
+        if chunk:
+            self._store_results_chunk(task, result_id, chunk_position, chunk)
+
+        if unexpected_failure.get("exc"):
+            sla_checker.set_unexpected_failure(unexpected_failure["exc"])
+
+        task.update_results(result_id, {
+            "raw": [],
+            "load_duration": self.duration,
+            "full_duration": self.full_duration,
+            "sla": sla_checker.results(),
+            "summary": summary.to_dict()})
@@ -15,49 +15,37 @@
 
 import math
 
+import six
 
-class Histogram:
-    """Represents a Histogram chart."""
-
-    def __init__(self, data, number_of_bins, method=None, key=None):
-        """Initialize a Histogram object
-
-        :param data: a list of numbers
-        :param number_of_bins: an integer
-        :param description: a string
-        :param key: a string
-        """
-        self.data = data
-        self.number_of_bins = number_of_bins
-        self.method = method
-        self.key = key
-
-        self.size = len(data)
-        self.min_data = min(data)
-        self.max_data = max(data)
-        self.bin_width = self._calculate_bin_width()
-
-        self.x_axis = self._calculate_x_axis()
-        self.y_axis = self._calculate_y_axis()
-
-    def _calculate_bin_width(self):
-        """Calculate the bin width using a given number of bins."""
-        return (self.max_data - self.min_data) / self.number_of_bins
-
-    def _calculate_x_axis(self):
-        """Return a list with the values of the x axis."""
-        return [self.min_data + (self.bin_width * i)
-                for i in range(1, self.number_of_bins + 1)]
-
-    def _calculate_y_axis(self):
-        """Return a list with the values of the y axis."""
-        y_axis = [0] * len(self.x_axis)
-        for data_point in self.data:
-            for i, bin in enumerate(self.x_axis):
-                if data_point <= bin:
-                    y_axis[i] += 1
-                    break
-        return y_axis
+
+def get_sketch_histograms_axes(sketch):
+    """Calculate axes of histograms of values processed by a sketch.
+
+    Bins are counted by ranks of their upper bounds in the sketch, so the
+    values are not kept in memory. Histograms are exact while the sketch
+    keeps all values, then they are as accurate as the sketch is. The
+    number of bins is limited by max_bins of the sketch, so the size of
+    histograms doesn't grow with the number of values.
+
+    :param sketch: non-empty streaming_algorithms.QuantileSketch instance
+    :returns: list of tuples of method name, x axis and y axis lists
+    """
+    bin_width_total = sketch.max - sketch.min
+    histograms = []
+    for variety in hvariety(six.moves.range(sketch.count)):
+        # NOTE: The sketch doesn't tell apart more than max_bins points,
+        #       more bins would only show its artifacts.
+        number_of_bins = min(variety["number_of_bins"], sketch.max_bins)
+        bin_width = bin_width_total / number_of_bins
+        x_axis = [sketch.min + (bin_width * i)
+                  for i in range(1, number_of_bins + 1)]
+        y_axis = []
+        counted = 0
+        for count in sketch.ranks(x_axis):
+            y_axis.append(count - counted)
+            counted = count
+        histograms.append((variety["method"], x_axis, y_axis))
+    return histograms
 
 
 def calculate_number_of_bins_sqrt(data):
@@ -13,53 +13,65 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import copy
 import json
 
 import six
 
-from rally.task.processing.charts import histogram as histo
+from rally.common import costilius
+from rally.task.processing import summary as result_summary
 from rally.task.processing import utils
 from rally.ui import utils as ui_utils
 
 
 def _prepare_data(data):
-    durations = []
-    idle_durations = []
-    atomic_durations = {}
-    output = {}
+    """Aggregate data of all charts of the scenario in a single pass.
+
+    Iterations are read once and are not kept: the series of durations
+    are compressed on the fly, and histograms and statistics are taken
+    from the summary of the results (it is computed during the same
+    pass if the results don't have it).
+
+    :param data: result of the scenario, its "result" may be an iterator
+                 if the result has a summary
+    """
+    summary = data.get("summary")
+    if summary:
+        iterations_num = summary["iterations"]
+        summary_acc = None
+    else:
+        iterations_num = len(data["result"])
+        summary_acc = result_summary.ResultsSummary()
+
     output_errors = []
-    output_stacked = []
     errors = []
-
-    # NOTE(maretskiy): We need this extra iteration
-    # to determine something that we should know about the data
-    # before starting its processing.
-    atomic_names = set()
-    output_names = set()
-    for r in data["result"]:
-        atomic_names.update(r["atomic_actions"].keys())
-        output_names.update(r["scenario_output"]["data"].keys())
+    durations = utils.Compressor(iterations_num)
+    idle_durations = utils.Compressor(iterations_num)
+    atomic_durations = costilius.OrderedDict()
+    atomic_sums = costilius.OrderedDict()
+    output = costilius.OrderedDict()
+    success = 0
+
+    def add_values(series, values, idx):
+        for name, value in six.iteritems(values):
+            if name not in series:
+                series[name] = utils.Compressor(iterations_num)
+                # NOTE(maretskiy): Sometimes we miss iteration data.
+                # So we care about data integrity by setting zero values
+                for i in range(idx):
+                    series[name].add(0)
+            series[name].add(value)
+        for name, compressor in six.iteritems(series):
+            if compressor.count == idx:
+                compressor.add(0)
 
     for idx, r in enumerate(data["result"]):
-        # NOTE(maretskiy): Sometimes we miss iteration data.
-        # So we care about data integrity by setting zero values
-        if len(r["atomic_actions"]) < len(atomic_names):
-            for atomic_name in atomic_names:
-                r["atomic_actions"].setdefault(atomic_name, 0)
-
-        if len(r["scenario_output"]["data"]) < len(output_names):
-            for output_name in output_names:
-                r["scenario_output"]["data"].setdefault(output_name, 0)
+        if summary_acc:
+            summary_acc.add_iteration(r)
 
         if r["scenario_output"]["errors"]:
             output_errors.append((idx, r["scenario_output"]["errors"]))
-
-        for param, value in r["scenario_output"]["data"].items():
-            try:
-                output[param].append(value)
-            except KeyError:
-                output[param] = [value]
+        add_values(output, r["scenario_output"]["data"], idx)
+        add_values(atomic_durations, r["atomic_actions"], idx)
 
         if r["error"]:
             type_, message, traceback = r["error"]
@@ -69,32 +81,39 @@ def _prepare_data(data):
                            "traceback": traceback})
 
             # NOTE(maretskiy): Reset failed durations (no sense to display)
-            r["duration"] = 0
-            r["idle_duration"] = 0
-
-        durations.append(r["duration"])
-        idle_durations.append(r["idle_duration"])
-
-        for met, duration in r["atomic_actions"].items():
-            try:
-                atomic_durations[met].append(duration)
-            except KeyError:
-                atomic_durations[met] = [duration]
-
-    for k, v in six.iteritems(output):
-        output_stacked.append({"key": k, "values": utils.compress(v)})
+            durations.add(0)
+            idle_durations.add(0)
+        else:
+            success += 1
+            durations.add(r["duration"])
+            idle_durations.add(r["idle_duration"])
+            for name, duration in six.iteritems(r["atomic_actions"]):
+                # in case any single atomic action failed, put 0
+                atomic_sums[name] = (atomic_sums.get(name, 0.0) +
+                                     (duration or 0.0))
 
-    for k, v in six.iteritems(atomic_durations):
-        atomic_durations[k] = utils.compress(v)
+    # NOTE: Atomic actions missing in successful iterations are treated as
+    #       zero durations there.
+    atomic_pie = []
+    if success:
+        for name in atomic_durations:
+            atomic_pie.append({"key": name,
+                               "value": atomic_sums.get(name, 0.0) / success})
 
     return {
         "total_durations": {
-            "duration": utils.compress(durations),
-            "idle_duration": utils.compress(idle_durations)},
-        "atomic_durations": atomic_durations,
-        "output": output_stacked,
+            "duration": durations.result(),
+            "idle_duration": idle_durations.result()},
+        "atomic_durations": costilius.OrderedDict(
+            (k, v.result()) for k, v in six.iteritems(atomic_durations)),
+        "atomic_pie": atomic_pie,
+        "output": [{"key": k, "values": v.result()}
+                   for k, v in six.iteritems(output)],
         "output_errors": output_errors,
         "errors": errors,
+        "success": success,
+        "iterations_num": iterations_num,
+        "summary": summary or summary_acc.to_dict(),
         "sla": data["sla"],
         "load_duration": data["load_duration"],
         "full_duration": data["full_duration"],
@@ -102,16 +121,6 @@ def _prepare_data(data):
 
 
 def _process_main_duration(result, data):
-    histogram_data = [r["duration"] for r in result["result"]
-                      if not r["error"]]
-    histograms = []
-    if histogram_data:
-        hvariety = histo.hvariety(histogram_data)
-        for i in range(len(hvariety)):
-            histograms.append(histo.Histogram(histogram_data,
-                                              hvariety[i]["number_of_bins"],
-                                              hvariety[i]["method"]))
-
     stacked_area = []
     for key in "duration", "idle_duration":
         stacked_area.append({
@@ -122,85 +131,16 @@ def _process_main_duration(result, data):
 
     return {
         "pie": [
-            {"key": "success", "value": len(histogram_data)},
+            {"key": "success", "value": data["success"]},
             {"key": "errors", "value": len(data["errors"])},
         ],
         "iter": stacked_area,
-        "histogram": [
-            {
-                "key": "task",
-                "method": histogram.method,
-                "values": [{"x": round(x, 2), "y": float(y)}
-                           for x, y in zip(histogram.x_axis, histogram.y_axis)]
-            } for histogram in histograms
-        ],
+        "histogram": [dict(histogram, key="task")
+                      for histogram in data["summary"]["histograms"]["total"]],
     }
 
 
 def _process_atomic(result, data):
-
-    def avg(lst, key=None):
-        lst = lst if not key else map(lambda x: x[key], lst)
-        return utils.mean(lst)
-
-    # NOTE(boris-42): In our result["result"] we have next structure:
-    #                 {"error": NoneOrDict,
-    #                  "atomic_actions": {
-    #                       "action1": <duration>,
-    #                       "action2": <duration>
-    #                   }
-    #                 }
-    #                 Our goal is to get next structure:
-    #                 [{"key": $atomic_actions.action,
-    #                   "values": [[order, $atomic_actions.duration
-    #                              if not $error else 0], ...}]
-    #
-    #                 Order of actions in "atomic_action" is similar for
-    #                 all iteration. So we should take first non "error"
-    #                 iteration. And get in atomitc_iter list:
-    #                 [{"key": "action", "values":[]}]
-    stacked_area = []
-    for row in result["result"]:
-        if not row["error"] and "atomic_actions" in row:
-            stacked_area = [{"key": a, "values": []}
-                            for a in row["atomic_actions"]]
-            break
-
-    # NOTE(boris-42): pie is similar to stacked_area, only difference is in
-    #                 structure of values. In case of $error we shouldn't put
-    #                 anything in pie. In case of non error we should put just
-    #                 $atomic_actions.duration (without order)
-    pie = []
-    histogram_data = []
-    if stacked_area:
-        pie = copy.deepcopy(stacked_area)
-        histogram_data = copy.deepcopy(stacked_area)
-        for i, res in enumerate(result["result"]):
-            # in case of error put (order, 0.0) to all actions of stacked area
-            if res["error"]:
-                for k in range(len(stacked_area)):
-                    stacked_area[k]["values"].append([i + 1, 0.0])
-                continue
-
-            # in case of non error put real durations to pie and stacked area
-            for j, action in enumerate(res["atomic_actions"].keys()):
-                # in case any single atomic action failed, put 0
-                action_duration = res["atomic_actions"][action] or 0.0
-                pie[j]["values"].append(action_duration)
-                histogram_data[j]["values"].append(action_duration)
-
-    # filter out empty action lists in pie / histogram to avoid errors
-    pie = filter(lambda x: x["values"], pie)
-    histogram_data = [x for x in histogram_data if x["values"]]
-
-    histograms = [[] for atomic_action in range(len(histogram_data))]
-    for i, atomic_action in enumerate(histogram_data):
-        hvariety = histo.hvariety(atomic_action["values"])
-        for v in range(len(hvariety)):
-            histograms[i].append(histo.Histogram(atomic_action["values"],
-                                                 hvariety[v]["number_of_bins"],
-                                                 hvariety[v]["method"],
-                                                 atomic_action["key"]))
     stacked_area = []
     for name, durations in six.iteritems(data["atomic_durations"]):
         stacked_area.append({
@@ -210,49 +150,83 @@ def _process_atomic(result, data):
 
     return {
         "histogram": [[
-            {
-                "key": action.key,
-                "disabled": i,
-                "method": action.method,
-                "values": [{"x": round(x, 2), "y": y}
-                           for x, y in zip(action.x_axis, action.y_axis)]
-            } for action in atomic_action_list]
-            for i, atomic_action_list in enumerate(histograms)
+            dict(histogram, key=atomic_action["key"], disabled=i)
+            for histogram in atomic_action["histograms"]]
+            for i, atomic_action in enumerate(
+                data["summary"]["histograms"]["atomic"])
         ],
         "iter": stacked_area,
-        "pie": [{"key": x["key"], "value": avg(x["values"])} for x in pie]
+        "pie": data["atomic_pie"]
     }
 
 
-def _get_atomic_action_durations(result):
-    raw = result.get("result", [])
-    actions_data = utils.get_atomic_actions_data(raw)
+def _process_timeseries(data):
+    timeseries = data["summary"].get("timeseries")
+    if not timeseries or not timeseries["rows"]:
+        return {"throughput": [], "latency": []}
+
+    rows = timeseries["rows"]
+    window = timeseries["window"]
+    throughput = costilius.OrderedDict(
+        (key, []) for key in ("started", "completed", "failed"))
+    last_time = None
+    for row in rows:
+        # NOTE: Empty windows are not listed, so throughput drops to zero
+        #       at both ends of the gaps between listed windows.
+        gap = []
+        if last_time is not None:
+            empty = int(round((row["time"] - last_time) / window)) - 1
+            if empty > 0:
+                gap.append(last_time + window)
+            if empty > 1:
+                gap.append(row["time"] - window)
+        for key, values in six.iteritems(throughput):
+            values.extend((time, 0.0) for time in gap)
+            values.append((row["time"], round(row[key] / window, 2)))
+        last_time = row["time"]
+    throughput = [{"key": key, "values": values}
+                  for key, values in six.iteritems(throughput)]
+
+    latency = costilius.OrderedDict()
+
+    def add_stats(name, time, stats):
+        for percentile in "median", "95%ile":
+            key = "%s %s" % (name, percentile)
+            latency.setdefault(key, []).append(
+                (time, round(stats[percentile], 3)))
+
+    for row in rows:
+        if row["duration"]:
+            add_stats("total", row["time"], row["duration"])
+        for atomic in row["atomic"]:
+            if atomic["stats"]:
+                add_stats(atomic["name"], row["time"], atomic["stats"])
+
+    return {"throughput": throughput,
+            "latency": [{"key": k, "values": v}
+                        for k, v in six.iteritems(latency)]}
+
+
+def _get_atomic_action_durations(summary):
+    iterations = summary["iterations"]
     table = []
-    total = []
-    for action in actions_data:
-        durations = actions_data[action]
-        if durations:
-            data = [action,
-                    round(min(durations), 3),
-                    round(utils.median(durations), 3),
-                    round(utils.percentile(durations, 0.90), 3),
-                    round(utils.percentile(durations, 0.95), 3),
-                    round(max(durations), 3),
-                    round(utils.mean(durations), 3),
-                    "%.1f%%" % (len(durations) * 100.0 / len(raw)),
-                    len(raw)]
+    for action in summary["atomic"]:
+        stats = action["stats"]
+        if stats:
+            data = [action["name"],
+                    round(stats["min"], 3),
+                    round(stats["median"], 3),
+                    round(stats["90%ile"], 3),
+                    round(stats["95%ile"], 3),
+                    round(stats["max"], 3),
+                    round(stats["avg"], 3),
+                    "%.1f%%" % (action["count"] * 100.0 / iterations),
+                    iterations]
         else:
-            data = [action, None, None, None, None, None, None, 0, len(raw)]
-
-        # Save 'total' - it must be appended last
-        if action == "total":
-            total = data
-            continue
+            data = [action["name"], None, None, None, None, None, None, 0,
+                    iterations]
         table.append(data)
 
-    if total:
-        table.append(total)
-
     return table
 
 
@@ -269,10 +243,10 @@ def _process_results(results):
                       "Avg (sec)",
                       "Success",
                       "Count"]
-        table_rows = _get_atomic_action_durations(result)
+        data = _prepare_data(result)
+        table_rows = _get_atomic_action_durations(data["summary"])
         scenario_name, kw, pos = (result["key"]["name"],
                                   result["key"]["kw"], result["key"]["pos"])
-        data = _prepare_data(result)
         cls = scenario_name.split(".")[0]
         met = scenario_name.split(".")[1]
         name = "%s%s" % (met, (pos and " [%d]" % (int(pos) + 1) or ""))
@@ -290,6 +264,7 @@ def _process_results(results):
             "config": json.dumps({scenario_name: [kw]}, indent=2),
             "iterations": _process_main_duration(result, data),
             "atomic": _process_atomic(result, data),
+            "timeline": _process_timeseries(data),
             "table_cols": table_cols,
             "table_rows": table_rows,
             "output": data["output"],
@@ -299,7 +274,7 @@ def _process_results(results):
             "full_duration": data["full_duration"],
             "sla": data["sla"],
             "sla_success": all([sla["success"] for sla in data["sla"]]),
-            "iterations_num": len(result["result"]),
+            "iterations_num": data["iterations_num"],
         })
     source = json.dumps(source_dict, indent=2, sort_keys=True)
     scenarios = sorted(output, key=lambda r: "%s%s" % (r["cls"], r["name"]))
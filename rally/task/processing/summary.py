@@ -0,0 +1,193 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Summary of scenario results.
+
+The summary is computed by the engine while the scenario runs and is
+stored with the results, so statistics can be shown without loading and
+processing the raw data of all iterations.
+"""
+
+import six
+
+from rally.common import costilius
+from rally.common import streaming_algorithms
+from rally.task.processing.charts import histogram as histo
+from rally.task.processing import timeseries
+
+
+def get_sketch_stats(sketch):
+    """Calculate statistics of values processed by the quantile sketch.
+
+    :param sketch: streaming_algorithms.QuantileSketch instance
+    :returns: dict with min, median, 90%ile, 95%ile, max and avg values,
+              or None if the sketch is empty
+    """
+    if not sketch.count:
+        return None
+    return {"min": sketch.min,
+            "median": sketch.percentile(50),
+            "90%ile": sketch.percentile(90),
+            "95%ile": sketch.percentile(95),
+            "max": sketch.max,
+            "avg": sketch.total / sketch.count}
+
+
+def get_sketch_histograms(sketch):
+    """Calculate histograms of values processed by the quantile sketch.
+
+    :param sketch: non-empty streaming_algorithms.QuantileSketch instance
+    :returns: list of dicts with the method (see hvariety()) and the
+              values of histogram
+    """
+    return [{"method": method,
+             "values": [{"x": round(x, 2), "y": float(y)}
+                        for x, y in zip(x_axis, y_axis)]}
+            for method, x_axis, y_axis
+            in histo.get_sketch_histograms_axes(sketch)]
+
+
+class ResultsSummary(object):
+    """Accumulates the summary of scenario iteration results.
+
+    Durations of atomic actions, of iterations and of stages and scenario
+    output values are processed by quantile sketches instead of keeping
+    the whole iteration results, so the summary takes bounded memory in
+    large runs. Statistics and histograms are exact while the sketches
+    keep all values (up to QuantileSketch max_bins of them).
+    """
+
+    def __init__(self, timeseries_window=1.0):
+        """Init summary.
+
+        :param timeseries_window: float, duration (in seconds) of windows
+                                  of the time series of results
+        """
+        self.iterations = 0
+        self.errors = 0
+        self.atomic_names = None
+        # Durations of atomic actions of all iterations which have them
+        self.atomic = costilius.OrderedDict()
+        # Durations of atomic actions of successful iterations, 0 for
+        # failed actions (as shown by the report)
+        self.atomic_success = costilius.OrderedDict()
+        self.total = streaming_algorithms.QuantileSketch()
+        self.stages = {}
+        self.output = costilius.OrderedDict()
+        self.output_errors = []
+        self.timeseries = timeseries.ResultsTimeSeries(timeseries_window)
+
+    def add_iteration(self, result):
+        """Add the result of a single iteration to the summary."""
+        self.iterations += 1
+        if result["error"]:
+            self.errors += 1
+        elif self.atomic_names is None and "atomic_actions" in result:
+            self.atomic_names = list(result["atomic_actions"])
+
+        for name, duration in six.iteritems(result["atomic_actions"]):
+            if duration is not None:
+                self.atomic.setdefault(
+                    name, streaming_algorithms.QuantileSketch()).add(duration)
+        if not result["error"]:
+            self.total.add(result["duration"])
+            # NOTE: Failed and missing atomic actions of successful
+            #       iterations are shown as zero durations.
+            for name in self.atomic_names or []:
+                self.atomic_success.setdefault(
+                    name, streaming_algorithms.QuantileSketch()).add(
+                        result["atomic_actions"].get(name) or 0.0)
+
+        if "stage" in result:
+            stage = self.stages.setdefault(
+                result["stage"],
+                {"count": 0,
+                 "durations": streaming_algorithms.QuantileSketch()})
+            stage["count"] += 1
+            if not result["error"]:
+                stage["durations"].add(result["duration"])
+
+        output = result["scenario_output"]
+        for key, value in six.iteritems(output.get("data") or {}):
+            values = self.output.setdefault(
+                key, streaming_algorithms.QuantileSketch())
+            try:
+                values.add(value)
+            except TypeError:
+                pass
+        if output.get("errors"):
+            self.output_errors.append(output["errors"])
+
+        # NOTE: Results stored by older versions may have no timestamp,
+        #       they are not shown in the time series.
+        if "timestamp" in result:
+            self.timeseries.add_iteration(result)
+
+    def to_dict(self):
+        """Return the summary.
+
+        :returns: dict with the numbers of iterations ("iterations") and
+                  errors ("errors"), statistics of atomic actions and of
+                  the total duration ("atomic", in the order of actions of
+                  the first successful iteration, "total" is the last
+                  one), of stages ("stages") and of scenario output values
+                  ("output"), errors of scenario output ("output_errors"),
+                  histograms of durations ("histograms") and the time
+                  series of results ("timeseries")
+        """
+        atomic = []
+        for name in (self.atomic_names or []) + ["total"]:
+            durations = (self.total if name == "total"
+                         else self.atomic.get(name))
+            if durations is None:
+                atomic.append({"name": name, "count": 0, "stats": None})
+            else:
+                atomic.append({"name": name, "count": durations.count,
+                               "stats": get_sketch_stats(durations)})
+
+        stages = []
+        for stage, data in sorted(self.stages.items()):
+            stages.append({"stage": stage, "count": data["count"],
+                           "success": data["durations"].count,
+                           "stats": get_sketch_stats(data["durations"])})
+
+        histograms = {"total": [], "atomic": []}
+        if self.total.count:
+            histograms["total"] = get_sketch_histograms(self.total)
+        for name in self.atomic_names or []:
+            durations = self.atomic_success.get(name)
+            if durations is not None and durations.count:
+                histograms["atomic"].append(
+                    {"key": name,
+                     "histograms": get_sketch_histograms(durations)})
+
+        return {"iterations": self.iterations,
+                "errors": self.errors,
+                "atomic": atomic,
+                "stages": stages,
+                "output": [{"key": key, "stats": get_sketch_stats(output)}
+                           for key, output in six.iteritems(self.output)],
+                "output_errors": self.output_errors,
+                "histograms": histograms,
+                "timeseries": self.timeseries.to_dict()}
+
+
+def summarize(raw):
+    """Return the summary of the list of iteration results."""
+    summary = ResultsSummary()
+    for result in raw:
+        summary.add_iteration(result)
+    return summary.to_dict()
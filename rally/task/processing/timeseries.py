@@ -0,0 +1,141 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Time series of scenario results.
+
+Iterations are counted in windows of time (one second by default) as
+they start and finish, and latency percentiles are calculated for each
+window, so throughput dips and latency spikes can be seen over the run.
+"""
+
+import math
+
+import six
+
+from rally.common import costilius
+from rally.common import streaming_algorithms
+
+
+class ResultsTimeSeries(object):
+    """Accumulates scenario iteration results over windows of time.
+
+    Iterations are counted as started in the window of their timestamp
+    and as completed or failed in the window in which they finished.
+    Durations are kept in quantile sketches only while windows are open;
+    a window is closed (and only its percentiles are kept) once results
+    finished `lag` seconds later arrive. Durations of iterations arriving
+    after that are not taken into account.
+    """
+
+    PERCENTILES = (("median", 50), ("95%ile", 95))
+
+    def __init__(self, window=1.0, lag=10.0, max_bins=128):
+        """Init time series.
+
+        :param window: float, duration of a window in seconds
+        :param lag: float, for how long (in seconds) windows are open
+        :param max_bins: max_bins of quantile sketches of each window
+        """
+        if window <= 0:
+            raise ValueError("Unexpected window: %s" % window)
+        self.window = float(window)
+        self.lag = max(int(math.ceil(lag / self.window)), 1)
+        self.max_bins = max_bins
+        self.windows = {}
+        self.open_windows = set()
+        self.last = None
+
+    def _get_window(self, timestamp):
+        index = int(math.floor(timestamp / self.window))
+        if index not in self.windows:
+            self.windows[index] = {"started": 0, "completed": 0, "failed": 0,
+                                   "duration": None, "atomic": []}
+            if self.last is None or index > self.last - self.lag:
+                self.windows[index]["sketches"] = (
+                    streaming_algorithms.QuantileSketch(
+                        max_bins=self.max_bins),
+                    costilius.OrderedDict())
+                self.open_windows.add(index)
+        return index, self.windows[index]
+
+    def _get_stats(self, sketch):
+        if not sketch.count:
+            return None
+        return dict((name, sketch.percentile(percent))
+                    for name, percent in self.PERCENTILES)
+
+    def _close(self, index):
+        window = self.windows[index]
+        total, atomic = window.pop("sketches")
+        window["duration"] = self._get_stats(total)
+        window["atomic"] = [{"name": name, "stats": self._get_stats(sketch)}
+                            for name, sketch in six.iteritems(atomic)]
+        self.open_windows.discard(index)
+
+    def add_iteration(self, result):
+        """Add the result of a single iteration to the time series."""
+        self._get_window(result["timestamp"])[1]["started"] += 1
+
+        finished_at = (result["timestamp"] + result["duration"] +
+                       result.get("idle_duration", 0))
+        index, window = self._get_window(finished_at)
+        if result["error"]:
+            window["failed"] += 1
+        else:
+            window["completed"] += 1
+            if "sketches" in window:
+                total, atomic = window["sketches"]
+                total.add(result["duration"])
+                for name, duration in six.iteritems(
+                        result["atomic_actions"]):
+                    if duration is not None:
+                        atomic.setdefault(
+                            name, streaming_algorithms.QuantileSketch(
+                                max_bins=self.max_bins)).add(duration)
+
+        if self.last is None or index > self.last:
+            self.last = index
+            for old in [i for i in self.open_windows
+                        if i < index - self.lag]:
+                self._close(old)
+
+    def to_dict(self):
+        """Return the time series.
+
+        :returns: dict with the duration of windows in seconds ("window"),
+                  the start time of the first window ("start") and the list
+                  of windows ("rows"). Windows in which no iteration was
+                  started or finished are not listed, so the size of the
+                  result doesn't depend on the length of pauses in the
+                  load. Each window has its time since the start ("time"),
+                  numbers of started, completed and failed iterations and
+                  median and 95 percentile of durations of completed
+                  iterations ("duration") and of their atomic actions
+                  ("atomic")
+        """
+        for index in list(self.open_windows):
+            self._close(index)
+        if not self.windows:
+            return {"window": self.window, "start": None, "rows": []}
+
+        first = min(self.windows)
+        rows = []
+        for index in sorted(self.windows):
+            row = {"time": (index - first) * self.window}
+            row.update(self.windows[index])
+            rows.append(row)
+        return {"window": self.window, "start": first * self.window,
+                "rows": rows}
@@ -63,7 +63,20 @@ def percentile(values, percent):
     """
     if not values:
         return None
-    values.sort()
+    return sorted_percentile(sorted(values), percent)
+
+
+def sorted_percentile(values, percent):
+    """Find the percentile of a sorted list of values.
+
+    Unlike percentile(), doesn't sort values, so a list sorted once can
+    be used for calculating several percentiles.
+
+    :parameter values: non-empty sorted list of numbers
+    :parameter percent: float value from 0.0 to 1.0
+
+    :returns: the percentile of values
+    """
     k = (len(values) - 1) * percent
     f = math.floor(k)
     c = math.ceil(k)
@@ -98,52 +111,81 @@ def get_atomic_actions_data(raw_data):
     return actions_data
 
 
-def compress(data, limit=1000, merge=None, normalize=None):
-    """Enumerate and reduce list of values.
+class Compressor(object):
+    """Enumerate and reduce a stream of values.
 
-    :param data: data list
-    :param limit: int, max length of result list
-    :param merge: function that merges two values
-    :param normalize: function that guarantees sanity of value
-    :returns: items list [(idx1, value1), (idx2, value2) ...]
+    Gives the same result as compress() for the same values, but takes
+    them one by one, so they don't have to be kept in memory.
     """
 
-    if not normalize:
-        normalize = lambda i: i and round(float(i), 2) or 0.0
+    def __init__(self, length, limit=1000, merge=None, normalize=None):
+        """Init compressor.
 
-    if not merge:
-        merge = lambda a, b: normalize((a + normalize(b)) / 2)
-
-    if len(data) <= limit:
-        return [(idx, normalize(v)) for idx, v in enumerate(data, start=1)]
-
-    # For determining which rows should be merged we are using `factor'
-    # e.g. if we have 100 rows and should reduce it to 75 then we have
-    # factor of 0.25 and delete (merge with previous) each 4th row.
-    factor = float(limit) / len(data)
-    store = 0.0
-
-    result = []
-    first = True
+        :param length: int, number of values to be added
+        :param limit: int, max length of result list
+        :param merge: function that merges two values
+        :param normalize: function that guarantees sanity of value
+        """
+        if not normalize:
+            normalize = lambda i: i and round(float(i), 2) or 0.0
+
+        if not merge:
+            merge = lambda a, b: normalize((a + normalize(b)) / 2)
+
+        self.length = length
+        self.normalize = normalize
+        self.merge = merge
+        self.count = 0
+        self.compressed = length > limit
+
+        # For determining which rows should be merged we are using `factor'
+        # e.g. if we have 100 rows and should reduce it to 75 then we have
+        # factor of 0.25 and delete (merge with previous) each 4th row.
+        self.factor = float(limit) / length if self.compressed else 1.0
+        self.store = 0.0
+        self.first = True
+        self.cur_value = None
+        self.points = []
+
+    def add(self, value):
+        self.count += 1
+        if not self.compressed:
+            self.points.append((self.count, self.normalize(value)))
+            return
+
+        self.store += self.factor
+
+        if self.first:
+            self.cur_value = self.normalize(value)
+            self.first = False
+        else:
+            self.cur_value = self.merge(self.cur_value, value)
 
-    for idx, value in enumerate(data, start=1):
-        store += factor
+        if self.store > 1:
+            self.store -= 1
+            self.first = True
+            self.points.append((self.count, self.cur_value))
 
-        if first:
-            cur_value = normalize(value)
-            first = False
-        else:
-            cur_value = merge(cur_value, value)
+    def result(self):
+        """Return items list [(idx1, value1), (idx2, value2) ...]."""
+        if self.compressed and not self.first:
+            return self.points + [(self.length, self.cur_value)]
+        return list(self.points)
 
-        if store > 1:
-            store -= 1
-            first = True
-            result.append((idx, cur_value))
 
-    if not first:
-        result.append((len(data), cur_value))
+def compress(data, limit=1000, merge=None, normalize=None):
+    """Enumerate and reduce list of values.
 
-    return result
+    :param data: data list
+    :param limit: int, max length of result list
+    :param merge: function that merges two values
+    :param normalize: function that guarantees sanity of value
+    :returns: items list [(idx1, value1), (idx2, value2) ...]
+    """
+    compressor = Compressor(len(data), limit, merge, normalize)
+    for value in data:
+        compressor.add(value)
+    return compressor.result()
 
 
 class GraphZipper(object):
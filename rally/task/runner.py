@@ -17,15 +17,19 @@ import abc
 import collections
 import multiprocessing
 import random
+import threading
 import time
 
 import jsonschema
 import six
+from six.moves import queue as Queue
 
+from rally.common import costilius
 from rally.common import log as logging
 from rally.common.plugin import plugin
 from rally.common import utils as rutils
 from rally import consts
+from rally import exceptions
 from rally.task.scenarios import base as scenario_base
 from rally.task import types
 from rally.task import utils
@@ -44,27 +48,66 @@ def format_result_on_timeout(exc, timeout):
     }
 
 
+class _ScenarioContext(costilius.collections_abc.Mapping):
+    """Read-only view of the benchmark context for a single iteration.
+
+    The benchmark context is shared rather than copied: its "users" and
+    "tenants" are hidden and the per-iteration items (e.g. the "user",
+    "tenant" and "iteration" of the iteration) are shown on top of it.
+    """
+
+    HIDDEN_KEYS = ("users", "tenants")
+
+    def __init__(self, context, **items):
+        self._context = context
+        self._items = items
+
+    def __getitem__(self, key):
+        if key in self._items:
+            return self._items[key]
+        if key in self.HIDDEN_KEYS:
+            raise KeyError(key)
+        return self._context[key]
+
+    def __iter__(self):
+        for key in self._context:
+            if key not in self.HIDDEN_KEYS and key not in self._items:
+                yield key
+        for key in self._items:
+            yield key
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+
 def _get_scenario_context(context):
-    scenario_ctx = {}
-    for key, value in six.iteritems(context):
-        if key not in ["users", "tenants"]:
-            scenario_ctx[key] = value
+    """Return the context of a single scenario iteration.
 
-    if "users" in context:
-        user = random.choice(context["users"])
-        tenant = context["tenants"][user["tenant_id"]]
-        scenario_ctx["user"], scenario_ctx["tenant"] = user, tenant
+    A random user (with its tenant) is chosen for the iteration, the rest
+    of the benchmark context is shared with the iteration, so the cost of
+    this call doesn't depend on the size of the benchmark context.
+
+    :param context: benchmark context
+    :returns: _ScenarioContext with the scenario context
+    """
+    if "users" not in context:
+        return _ScenarioContext(context)
 
-    return scenario_ctx
+    user = random.choice(context["users"])
+    return _ScenarioContext(context, user=user,
+                            tenant=context["tenants"][user["tenant_id"]])
 
 
 def _run_scenario_once(args):
     iteration, cls, method_name, context, kwargs = args
+    # NOTE: Agents of the distributed runner run a share of the iterations,
+    #       which starts from the "iteration_offset" of the context.
+    iteration += context.get("iteration_offset", 0)
 
     LOG.info("Task %(task)s | ITER: %(iteration)s START" %
              {"task": context["task"]["uuid"], "iteration": iteration})
 
-    context["iteration"] = iteration
+    context = _ScenarioContext(context, iteration=iteration)
     scenario = cls(context=context)
 
     error = []
@@ -95,6 +138,199 @@ def _worker_thread(queue, args):
     queue.put(_run_scenario_once(args))
 
 
+class ScenarioThread(threading.Thread):
+    """Thread that runs scenario iterations with a timeout for each one.
+
+    Python threads can't be killed, so an iteration that exceeds the
+    timeout is abandoned instead: check_timeout() puts the timeout result
+    to the queue, and the result that the iteration may return later is
+    dropped. The thread itself stops as soon as the abandoned iteration
+    is finished.
+    """
+
+    def __init__(self, queue, args_gen, timeout=0):
+        """Init thread.
+
+        :param queue: queue object to append results
+        :param args_gen: iterable of arguments for _run_scenario_once(),
+                         one item per iteration
+        :param timeout: timeout for each iteration in seconds, 0 means
+                        no timeout
+        """
+        super(ScenarioThread, self).__init__()
+        # NOTE: abandoned threads should not prevent the process from exit
+        self.daemon = True
+        self.queue = queue
+        self.args_gen = args_gen
+        self.timeout = timeout
+        self.abandoned = False
+        self._iteration = None
+        self._started_at = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        for args in self.args_gen:
+            with self._lock:
+                self._iteration = args[0]
+                self._started_at = time.time()
+            result = _run_scenario_once(args)
+            with self._lock:
+                self._started_at = None
+                if self.abandoned:
+                    LOG.warning("Iteration %s has finished after timeout, "
+                                "its result is dropped." % args[0])
+                    return
+            self.queue.put(result)
+
+    def get_time_left(self):
+        """Return time left before the current iteration times out.
+
+        :returns: time in seconds or None if there is no timeout
+        """
+        if not self.timeout:
+            return None
+        started_at = self._started_at
+        if started_at is None:
+            return self.timeout
+        return max(started_at + self.timeout - time.time(), 0)
+
+    def check_timeout(self):
+        """Abandon the current iteration if it has exceeded the timeout.
+
+        :returns: True if the iteration was abandoned, False otherwise
+        """
+        if not self.timeout:
+            return False
+        with self._lock:
+            if (self.abandoned or self._started_at is None or
+                    time.time() - self._started_at < self.timeout):
+                return False
+            self.abandoned = True
+            started_at = self._started_at
+
+        LOG.warning("Iteration %s has not finished in %s seconds, its thread "
+                    "is left hanging." % (self._iteration, self.timeout))
+        exc = exceptions.IterationTimeout(iteration=self._iteration,
+                                          timeout=self.timeout)
+        result = format_result_on_timeout(exc, self.timeout)
+        result["timestamp"] = started_at
+        self.queue.put(result)
+        return True
+
+
+def _join_threads(pool, hung_threads):
+    """Wait for all threads in the pool, abandoning those that time out.
+
+    :param pool: deque of running ScenarioThread objects
+    :param hung_threads: list to append threads that have timed out
+    """
+    while pool:
+        thread = pool.popleft()
+        thread.join(thread.get_time_left())
+        if thread.isAlive():
+            if thread.check_timeout():
+                hung_threads.append(thread)
+            else:
+                pool.append(thread)
+
+    if hung_threads:
+        alive = len([t for t in hung_threads if t.isAlive()])
+        LOG.warning("%d iteration(s) timed out, %d of their threads are "
+                    "still hanging." % (len(hung_threads), alive))
+
+
+def _worker_done(queue):
+    """Notify the parent process that the worker has no more results.
+
+    :param queue: multiprocessing.Queue that receives the results
+    """
+    queue.put(None)
+
+
+def _pack_result(result):
+    """Pack iteration result to be sent to the parent process.
+
+    Results without errors and scenario output make up the vast majority,
+    so they are sent as plain tuples which are much cheaper to pickle.
+
+    :param result: dict returned by _run_scenario_once()
+    :returns: tuple for successful iterations without scenario output,
+              the result dict as is otherwise
+    """
+    if result["error"] or result["scenario_output"] != {"errors": "",
+                                                        "data": {}}:
+        return result
+    return (result["duration"], result["timestamp"],
+            result["idle_duration"], result["atomic_actions"])
+
+
+def _unpack_result(packed):
+    """Restore iteration result packed by _pack_result()."""
+    if not isinstance(packed, tuple):
+        return packed
+    duration, timestamp, idle_duration, atomic_actions = packed
+    return {"duration": duration,
+            "timestamp": timestamp,
+            "idle_duration": idle_duration,
+            "error": [],
+            "scenario_output": {"errors": "", "data": {}},
+            "atomic_actions": atomic_actions}
+
+
+class ResultBatcher(object):
+    """Send results of worker threads to the parent process in batches.
+
+    Putting every single result to multiprocessing.Queue means pickling it
+    and waking up the parent process, which becomes a bottleneck for fast
+    scenarios. ResultBatcher collects packed results and puts them to the
+    queue as a list once batch_size results are collected or flush_interval
+    seconds passed since the previous flush, whichever comes first.
+
+    It provides put() method, so it can be passed to _worker_thread()
+    instead of the queue itself. close() must be called when the worker
+    is done, to send the rest of results.
+    """
+
+    def __init__(self, queue, batch_size=100, flush_interval=0.05):
+        """Init batcher.
+
+        :param queue: multiprocessing.Queue that receives the results
+        :param batch_size: max number of results in one batch
+        :param flush_interval: max time (in seconds) to keep results
+        """
+        self.queue = queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._batch = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically)
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _flush(self):
+        if self._batch:
+            self.queue.put(self._batch)
+            self._batch = []
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                self._flush()
+
+    def put(self, result):
+        with self._lock:
+            self._batch.append(_pack_result(result))
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+    def close(self):
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            self._flush()
+
+
 def _log_worker_info(**info):
     """Log worker parameters for debugging.
 
@@ -118,6 +354,9 @@ class ScenarioRunnerResult(dict):
             "timestamp": {
                 "type": "number"
             },
+            "scheduled_timestamp": {
+                "type": "number"
+            },
             "idle_duration": {
                 "type": "number"
             },
@@ -147,6 +386,10 @@ class ScenarioRunnerResult(dict):
                 "items": {
                     "type": "string"
                 }
+            },
+            "stage": {
+                "type": "integer",
+                "minimum": 0
             }
         },
         "additionalProperties": False
@@ -154,7 +397,63 @@ class ScenarioRunnerResult(dict):
 
     def __init__(self, result_list):
         super(ScenarioRunnerResult, self).__init__(result_list)
-        jsonschema.validate(result_list, self.RESULT_SCHEMA)
+        # NOTE: jsonschema.validate() is too expensive to be called for each
+        #       iteration, so the result is checked by hand-written
+        #       equivalent of RESULT_SCHEMA. Full validation is done in debug
+        #       mode, or to get the proper error if the quick check fails.
+        if logging.is_debug() or not self._is_valid(result_list):
+            jsonschema.validate(result_list, self.RESULT_SCHEMA)
+
+    @staticmethod
+    def _is_number(value):
+        return (isinstance(value, six.integer_types + (float,))
+                and not isinstance(value, bool))
+
+    @classmethod
+    def _is_valid(cls, result):
+        """Check result structure in a fast way.
+
+        :param result: result to be checked
+        :returns: True if result matches RESULT_SCHEMA, False otherwise
+        """
+        if not isinstance(result, dict):
+            return False
+
+        for key, value in six.iteritems(result):
+            if key in ("duration", "timestamp", "scheduled_timestamp",
+                       "idle_duration"):
+                if not cls._is_number(value):
+                    return False
+            elif key == "scenario_output":
+                if not isinstance(value, dict):
+                    return False
+                for out_key, out_value in six.iteritems(value):
+                    if out_key == "data":
+                        if not (isinstance(out_value, dict) and
+                                all(cls._is_number(v)
+                                    for v in six.itervalues(out_value))):
+                            return False
+                    elif out_key == "errors":
+                        if not isinstance(out_value, six.string_types):
+                            return False
+                    else:
+                        return False
+            elif key == "atomic_actions":
+                if not (isinstance(value, dict) and
+                        all(v is None or cls._is_number(v)
+                            for v in six.itervalues(value))):
+                    return False
+            elif key == "error":
+                if not (isinstance(value, list) and
+                        all(isinstance(v, six.string_types) for v in value)):
+                    return False
+            elif key == "stage":
+                if not (isinstance(value, six.integer_types) and
+                        not isinstance(value, bool) and value >= 0):
+                    return False
+            else:
+                return False
+        return True
 
 
 def configure(name, namespace="default"):
@@ -174,11 +473,17 @@ class ScenarioRunner(plugin.Plugin):
 
     CONFIG_SCHEMA = {}
 
+    # How long to block on the results queue of worker processes before
+    # checking that they are still alive. Normally workers report their end
+    # with _worker_done(), so this timeout matters only for crashed ones.
+    WORKER_RESULT_TIMEOUT = 1.0
+
     def __init__(self, task, config):
         """Runner constructor.
 
         It sets task and config to local variables. Also initialize
-        result_queue, where results will be put by _send_result method.
+        result_queue, where results will be put by _send_result method,
+        and result_cond, which is notified each time a result is put.
 
         :param task: Instance of objects.Task
         :param config: Dict with runner section from benchmark configuration
@@ -186,13 +491,23 @@ class ScenarioRunner(plugin.Plugin):
         self.task = task
         self.config = config
         self.result_queue = collections.deque()
+        self.result_cond = threading.Condition()
         self.aborted = multiprocessing.Event()
 
     @staticmethod
     def validate(config):
         """Validates runner's part of task config."""
         runner = ScenarioRunner.get(config.get("type", "serial"))
-        jsonschema.validate(config, runner.CONFIG_SCHEMA)
+        runner._validate_config(config)
+
+    @classmethod
+    def _validate_config(cls, config):
+        """Validate config of the runner.
+
+        Override this method to check the things that can't be expressed
+        by CONFIG_SCHEMA.
+        """
+        jsonschema.validate(config, cls.CONFIG_SCHEMA)
 
     @abc.abstractmethod
     def _run_scenario(self, cls, method_name, context, args):
@@ -251,19 +566,35 @@ class ScenarioRunner(plugin.Plugin):
     def _join_processes(self, process_pool, result_queue):
         """Join the processes in the pool and send their results to the queue.
 
+        Results are read with blocking calls, so they are passed to the
+        consumer as soon as they arrive. They can be put to the queue
+        either one by one or in batches (see ResultBatcher). Each process
+        puts None to the queue (see _worker_done()) after its last result.
+
         :param process_pool: pool of processes to join
         :result_queue: multiprocessing.Queue that receives the results
         """
-        while process_pool:
-            while process_pool and not process_pool[0].is_alive():
-                process_pool.popleft().join()
-
-            if result_queue.empty():
-                # sleep a bit to avoid 100% usage of CPU by this method
-                time.sleep(0.001)
+        processes_left = len(process_pool)
+        while processes_left:
+            try:
+                result = result_queue.get(timeout=self.WORKER_RESULT_TIMEOUT)
+            except Queue.Empty:
+                if not any(p.is_alive() for p in process_pool):
+                    LOG.warning("%d worker process(es) exited without "
+                                "reporting the end of work." % processes_left)
+                    break
+                continue
+
+            if result is None:
+                processes_left -= 1
+            elif isinstance(result, list):
+                for packed in result:
+                    self._send_result(_unpack_result(packed))
+            else:
+                self._send_result(result)
 
-            while not result_queue.empty():
-                self._send_result(result_queue.get())
+        while process_pool:
+            process_pool.popleft().join()
         result_queue.close()
 
     def _send_result(self, result):
@@ -273,7 +604,10 @@ class ScenarioRunner(plugin.Plugin):
                        ScenarioRunnerResult schema, otherwise
                        ValidationError is raised.
         """
-        self.result_queue.append(ScenarioRunnerResult(result))
+        result = ScenarioRunnerResult(result)
+        with self.result_cond:
+            self.result_queue.append(result)
+            self.result_cond.notify()
 
     def _log_debug_info(self, **info):
         """Log runner parameters for debugging.
@@ -36,15 +36,23 @@ def _format_result(criterion_name, success, detail):
 
 
 class SLAChecker(object):
-    """Base SLA checker class."""
+    """Base SLA checker class.
+
+    If iterations are tagged with the number of the load stage (see the
+    stages runner), the criteria are also checked for each stage separately.
+    """
 
     def __init__(self, config):
         self.config = config
         self.unexpected_failure = None
         self.aborted = False
-        self.sla_criteria = [SLA.get(name)(criterion_value)
-                             for name, criterion_value
-                             in config.get("sla", {}).items()]
+        self.sla_criteria = self._get_criteria()
+        self.stage_criteria = {}
+
+    def _get_criteria(self):
+        return [SLA.get(name)(criterion_value)
+                for name, criterion_value
+                in self.config.get("sla", {}).items()]
 
     def add_iteration(self, iteration):
         """Process the result of a single iteration.
@@ -54,10 +62,23 @@ class SLAChecker(object):
 
         :param iteration: iteration result object
         """
-        return all([sla.add_iteration(iteration) for sla in self.sla_criteria])
+        criteria = self.sla_criteria
+        if "stage" in iteration:
+            stage = iteration["stage"]
+            if stage not in self.stage_criteria:
+                self.stage_criteria[stage] = self._get_criteria()
+            criteria = criteria + self.stage_criteria[stage]
+        return all([sla.add_iteration(iteration) for sla in criteria])
 
     def results(self):
         results = [sla.result() for sla in self.sla_criteria]
+        for stage in sorted(self.stage_criteria):
+            for sla in self.stage_criteria[stage]:
+                result = sla.result()
+                result["stage"] = stage
+                result["detail"] = _("Stage %(stage)d: %(detail)s") % {
+                    "stage": stage, "detail": result["detail"]}
+                results.append(result)
         if self.aborted:
             results.append(_format_result(
                 "aborted_on_sla", False,
@@ -109,6 +109,10 @@
           id: "details",
           name: "Details",
           visible: function(){ return !! $scope.scenario.atomic.pie.length }
+        },{
+          id: "timeline",
+          name: "Timeline",
+          visible: function(){ return !! $scope.scenario.timeline.throughput.length }
         },{
           id: "output",
           name: "Output",
@@ -194,6 +198,20 @@
             .tickFormat(d3.format(",.2f"));
           this._render(selector, datum, chart)
         },
+        line: function(selector, datum, y_label){
+          var chart = nv.models.lineChart()
+            .x(function(d) { return d[0] })
+            .y(function(d) { return d[1] })
+            .useInteractiveGuideline(true)
+            .clipEdge(true);
+          chart.xAxis
+            .axisLabel("Time (seconds since the start)")
+            .tickFormat(d3.format(",.1f"));
+          chart.yAxis
+            .axisLabel(y_label)
+            .tickFormat(d3.format(",.2f"));
+          this._render(selector, datum, chart)
+        },
         histogram: function(selector, datum){
           var chart = nv.models.multiBarChart()
             .reduceXTicks(true)
@@ -242,6 +260,17 @@
         }
       }
 
+      $scope.renderTimeline = function() {
+        if ($scope.scenario) {
+          Charts.line("#timeline-throughput",
+                      $scope.scenario.timeline.throughput,
+                      "Iterations per second");
+          Charts.line("#timeline-latency",
+                      $scope.scenario.timeline.latency,
+                      "Duration (seconds)")
+        }
+      }
+
       $scope.renderOutput = function() {
         if ($scope.scenario) {
           Charts.stack("#output-stack", $scope.scenario.output)
@@ -596,6 +625,20 @@
           </div>
         </script>
 
+        <script type="text/ng-template" id="timeline">
+          {{renderTimeline()}}
+
+          <h2>Throughput</h2>
+          <div class="chart">
+            <svg id="timeline-throughput"></svg>
+          </div>
+
+          <h2>Latency</h2>
+          <div class="chart">
+            <svg id="timeline-latency"></svg>
+          </div>
+        </script>
+
         <script type="text/ng-template" id="output">
           {{renderOutput()}}
 
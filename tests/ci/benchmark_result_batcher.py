@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Compare throughput of iteration results sent by worker processes.
+
+Worker processes of scenario runners send results to the parent process
+through multiprocessing.Queue. This script sends results of a fast
+scenario one by one (as runners did before) and with ResultBatcher, and
+prints how many results per second the parent process receives:
+
+    $ python tests/ci/benchmark_result_batcher.py --iterations 100000
+"""
+
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import time
+
+from rally.task import runner
+
+
+def _result(iteration):
+    return {"duration": 0.001,
+            "timestamp": time.time(),
+            "idle_duration": 0,
+            "error": [],
+            "scenario_output": {"errors": "", "data": {}},
+            "atomic_actions": {"action_%d" % (iteration % 3): 0.001}}
+
+
+def _send_per_item(queue, iterations):
+    for i in range(iterations):
+        queue.put(_result(i))
+    runner._worker_done(queue)
+
+
+def _send_batched(queue, iterations):
+    batcher = runner.ResultBatcher(queue)
+    for i in range(iterations):
+        batcher.put(_result(i))
+    batcher.close()
+    runner._worker_done(queue)
+
+
+def _receive(queue, processes):
+    """Receive results the way ScenarioRunner._join_processes() does."""
+    received = 0
+    while processes:
+        result = queue.get()
+        if result is None:
+            processes -= 1
+        elif isinstance(result, list):
+            for packed in result:
+                runner._unpack_result(packed)
+                received += 1
+        else:
+            received += 1
+    return received
+
+
+def measure(send, iterations, processes):
+    """Return the number of results received per second."""
+    queue = multiprocessing.Queue()
+    pool = [multiprocessing.Process(target=send, args=(queue, iterations))
+            for i in range(processes)]
+    started = time.time()
+    for process in pool:
+        process.start()
+    received = _receive(queue, processes)
+    duration = time.time() - started
+    for process in pool:
+        process.join()
+    assert received == iterations * processes
+    return received / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000,
+                        help="number of results sent by each process")
+    parser.add_argument("--processes", type=int, default=2,
+                        help="number of worker processes")
+    args = parser.parse_args()
+
+    per_item = measure(_send_per_item, args.iterations, args.processes)
+    batched = measure(_send_batched, args.iterations, args.processes)
+    print("%-10s %15s" % ("transport", "results/sec"))
+    print("%-10s %15.0f" % ("per item", per_item))
+    print("%-10s %15.0f" % ("batched", batched))
+    print("speedup: %.1fx" % (batched / per_item))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@
 import copy
 import datetime as date
 import os.path
+import sys
 
 import mock
 
@@ -114,7 +115,8 @@ class TaskCommandsTestCase(test.TestCase):
         self.task.start(task_path, deployment_id)
         mock_task_start.assert_called_once_with(
             deployment_id, {"some": "json"},
-            task=mock_task_create.return_value, abort_on_sla_failure=False)
+            task=mock_task_create.return_value, abort_on_sla_failure=False,
+            share_contexts=False)
         mock__load_task.assert_called_once_with(task_path, None, None)
 
     @mock.patch("rally.cli.commands.task.TaskCommands._load_task",
@@ -145,7 +147,8 @@ class TaskCommandsTestCase(test.TestCase):
         mock_api.Task.create.assert_called_once_with("deployment", "tag")
         mock_api.Task.start.assert_called_once_with(
             "deployment", mock__load_task.return_value,
-            task=mock_api.Task.create.return_value, abort_on_sla_failure=False)
+            task=mock_api.Task.create.return_value, abort_on_sla_failure=False,
+            share_contexts=False)
 
     @mock.patch("rally.cli.commands.task.api")
     def test_abort(self, mock_api):
@@ -180,7 +183,7 @@ class TaskCommandsTestCase(test.TestCase):
         value = {
             "id": "task",
             "uuid": test_uuid,
-            "status": "status",
+            "status": consts.TaskStatus.FINISHED,
             "results": [
                 {
                     "key": {
@@ -244,9 +247,99 @@ class TaskCommandsTestCase(test.TestCase):
         }
         mock_db.task_get_detailed = mock.MagicMock(return_value=value)
         self.task.detailed(test_uuid)
-        mock_db.task_get_detailed.assert_called_once_with(test_uuid)
+        mock_db.task_get_detailed.assert_called_once_with(test_uuid,
+                                                          with_raw=False)
 
         self.task.detailed(test_uuid, iterations_data=True)
+        mock_db.task_get_detailed.assert_called_with(test_uuid,
+                                                     with_raw=True)
+
+    @mock.patch("rally.cli.commands.task.cliutils.print_list")
+    @mock.patch("rally.cli.commands.task.db")
+    def test_detailed_with_summary(self, mock_db, mock_print_list):
+        summary = {
+            "iterations": 4, "errors": 1,
+            "atomic": [{"name": "a", "count": 2,
+                        "stats": {"min": 0.1, "median": 0.2, "90%ile": 0.3,
+                                  "95%ile": 0.4, "max": 0.5, "avg": 0.25}},
+                       {"name": "total", "count": 0, "stats": None}],
+            "stages": [],
+            "output": [{"key": "x", "stats": None}],
+            "output_errors": ["some"],
+            "histograms": {"total": [], "atomic": []}}
+        mock_db.task_get_detailed.return_value = {
+            "uuid": "uuid", "status": "finished",
+            "results": [{"key": {"name": "fake_name", "pos": 0, "kw": {}},
+                         "data": {"load_duration": 1.0, "full_duration": 2.0,
+                                  "raw": [], "summary": summary}}]}
+
+        self.task.detailed("uuid")
+
+        rows = mock_print_list.call_args_list[0][0][0]
+        self.assertEqual(["a", "total"], [r.action for r in rows])
+        self.assertEqual(["50.0%", "0.0%"], [r.success for r in rows])
+        self.assertEqual([4, 4], [r.count for r in rows])
+        self.assertEqual([0.25, None], [r.avg for r in rows])
+        rows = mock_print_list.call_args_list[1][0][0]
+        self.assertEqual(["n/a"], [r.avg for r in rows])
+
+    @mock.patch("rally.cli.commands.task.cliutils.print_list")
+    @mock.patch("rally.cli.commands.task.db")
+    def test_detailed_running_scenario(self, mock_db, mock_print_list):
+        mock_db.task_get_detailed.return_value = {
+            "uuid": "uuid", "status": consts.TaskStatus.RUNNING,
+            "results": [{"key": {"name": "fake", "pos": 0, "kw": {}},
+                         "data": {"raw": [], "sla": [], "load_duration": 0,
+                                  "full_duration": 0}}]}
+
+        self.task.detailed("uuid")
+
+        self.assertFalse(mock_print_list.called)
+
+    @mock.patch("rally.cli.commands.task.cliutils.print_list")
+    @mock.patch("rally.cli.commands.task.db")
+    def test_detailed_running_scenario_partial(self, mock_db,
+                                               mock_print_list):
+        mock_db.task_get_detailed.return_value = {
+            "uuid": "uuid", "status": consts.TaskStatus.RUNNING,
+            "results": [{"key": {"name": "fake", "pos": 0, "kw": {}},
+                         "data": {"raw": [{"duration": 1.0, "idle_duration": 0,
+                                           "error": [], "scenario_output":
+                                           {"data": {}, "errors": ""},
+                                           "atomic_actions": {}}],
+                                  "sla": [], "load_duration": 0,
+                                  "full_duration": 0}}]}
+
+        self.task.detailed("uuid", partial=True)
+
+        rows = mock_print_list.call_args_list[0][0][0]
+        self.assertEqual(["total"], [r.action for r in rows])
+        self.assertEqual([1], [r.count for r in rows])
+
+    @mock.patch("rally.cli.commands.task.cliutils.print_list")
+    @mock.patch("rally.cli.commands.task.db")
+    def test_detailed_with_stages(self, mock_db, mock_print_list):
+        raw = [{"duration": duration, "idle_duration": 0,
+                "scenario_output": {"data": {}, "errors": ""},
+                "atomic_actions": {}, "error": error, "stage": stage}
+               for duration, error, stage in [(1.0, [], 1), (2.0, [], 0),
+                                              (3.0, ["e"], 1), (4.0, [], 0)]]
+        mock_db.task_get_detailed.return_value = {
+            "uuid": "uuid", "status": "finished",
+            "results": [{"key": {"name": "fake_name", "pos": 0, "kw": {}},
+                         "data": {"load_duration": 1.0, "full_duration": 2.0,
+                                  "raw": raw}}]}
+
+        self.task.detailed("uuid")
+
+        stages_calls = [c for c in mock_print_list.call_args_list
+                        if c[1].get("table_label") == "Stages (sec)"]
+        self.assertEqual(1, len(stages_calls))
+        rows = stages_calls[0][0][0]
+        self.assertEqual([0, 1], [r.stage for r in rows])
+        self.assertEqual([2, 2], [r.count for r in rows])
+        self.assertEqual(["100.0%", "50.0%"], [r.success for r in rows])
+        self.assertEqual([3.0, 1.0], [r.avg for r in rows])
 
     @mock.patch("rally.cli.commands.task.db")
     @mock.patch("rally.cli.commands.task.logging")
@@ -277,45 +370,85 @@ class TaskCommandsTestCase(test.TestCase):
         test_uuid = "eb290c30-38d8-4c8f-bbcc-fc8f74b004ae"
         mock_db.task_get_detailed = mock.MagicMock(return_value=None)
         self.task.detailed(test_uuid)
-        mock_db.task_get_detailed.assert_called_once_with(test_uuid)
+        mock_db.task_get_detailed.assert_called_once_with(test_uuid,
+                                                          with_raw=False)
 
-    @mock.patch("json.dumps")
+    @mock.patch("rally.cli.commands.task.json_stream")
     @mock.patch("rally.cli.commands.task.objects.Task.get")
-    def test_results(self, mock_task_get, mock_json_dumps):
+    def test_results(self, mock_task_get, mock_json_stream):
         task_id = "foo_task_id"
         data = [
-            {"key": "foo_key", "data": {"raw": "foo_raw", "sla": [],
-                                        "load_duration": "lo_duration",
-                                        "full_duration": "fu_duration"}}
+            {"id": 1, "key": "foo_key",
+             "data": {"raw": "foo_raw", "sla": [],
+                      "load_duration": "lo_duration",
+                      "full_duration": "fu_duration"}},
+            {"id": 2, "key": "bar_key",
+             "data": {"raw": [], "sla": [], "summary": {},
+                      "load_duration": "lo_duration",
+                      "full_duration": "fu_duration"}}
         ]
-        result = map(lambda x: {"key": x["key"],
-                                "result": x["data"]["raw"],
-                                "load_duration": x["data"]["load_duration"],
-                                "full_duration": x["data"]["full_duration"],
-                                "sla": x["data"]["sla"]}, data)
-        mock_results = mock.Mock(return_value=data)
-        mock_task_get.return_value = mock.Mock(get_results=mock_results)
+        task = mock_task_get.return_value
+        task.iter_results.return_value = iter(data)
+        task.iter_results_raw.return_value = "bar_raw"
 
         self.task.results(task_id)
-        self.assertEqual(1, mock_json_dumps.call_count)
-        self.assertEqual(1, len(mock_json_dumps.call_args[0]))
-        self.assertSequenceEqual(result, mock_json_dumps.call_args[0][0])
-        self.assertEqual({"sort_keys": True, "indent": 4},
-                         mock_json_dumps.call_args[1])
+
         mock_task_get.assert_called_once_with(task_id)
+        mock_json_stream.dump.assert_called_once_with(
+            mock.ANY, sys.stdout, sort_keys=True, indent=4)
+        results = list(mock_json_stream.dump.call_args[0][0])
+        task.iter_results.assert_called_once_with(with_raw=False,
+                                                  partial=False)
+        self.assertEqual(["foo_raw", "bar_raw"],
+                         [r["result"] for r in results])
+        self.assertEqual({"key": "foo_key", "result": "foo_raw", "sla": [],
+                          "load_duration": "lo_duration",
+                          "full_duration": "fu_duration"}, results[0])
+        task.iter_results_raw.assert_called_once_with(2)
+
+    @mock.patch("rally.cli.commands.task.json_stream")
+    @mock.patch("rally.cli.commands.task.objects.Task.get")
+    def test_results_ndjson(self, mock_task_get, mock_json_stream):
+        task = mock_task_get.return_value
+        task.iter_results.return_value = iter([
+            {"id": 1, "key": "foo_key",
+             "data": {"raw": [], "sla": [], "load_duration": 1,
+                      "full_duration": 2}}])
+
+        self.task.results("foo_task_id", ndjson=True)
+
+        mock_json_stream.dump_lines.assert_called_once_with(
+            mock.ANY, sys.stdout, sort_keys=True)
+        self.assertFalse(mock_json_stream.dump.called)
+
+    @mock.patch("rally.cli.commands.task.json_stream")
+    @mock.patch("rally.cli.commands.task.objects.Task.get")
+    def test_results_partial(self, mock_task_get, mock_json_stream):
+        task = mock_task_get.return_value
+        task.iter_results.return_value = iter([
+            {"id": 1, "key": "foo_key",
+             "data": {"raw": ["foo_raw"], "sla": [], "load_duration": 0,
+                      "full_duration": 0}}])
+
+        self.task.results("foo_task_id", partial=True)
+
+        task.iter_results.assert_called_once_with(with_raw=False,
+                                                  partial=True)
+        results = list(mock_json_stream.dump.call_args[0][0])
+        self.assertEqual([["foo_raw"]], [r["result"] for r in results])
 
     @mock.patch("rally.cli.commands.task.sys.stdout")
     @mock.patch("rally.cli.commands.task.objects.Task.get")
     def test_results_no_data(self, mock_task_get, mock_stdout):
         task_id = "foo_task_id"
-        mock_results = mock.Mock(return_value=[])
-        mock_task_get.return_value = mock.Mock(get_results=mock_results)
+        mock_task_get.return_value.iter_results.return_value = iter([])
 
         result = self.task.results(task_id)
         mock_task_get.assert_called_once_with(task_id)
         self.assertEqual(1, result)
         expected_out = ("The task %s is still running, results will become"
-                        " available when it is finished." % task_id)
+                        " available when it is finished. Use --partial to"
+                        " get results stored so far." % task_id)
         mock_stdout.write.assert_has_calls([mock.call(expected_out)])
 
     @mock.patch("rally.cli.commands.task.jsonschema.validate",
@@ -356,11 +489,20 @@ class TaskCommandsTestCase(test.TestCase):
                 m.reset_mock()
         self.task.report(tasks=task_id, out="/tmp/%s.html" % task_id)
         mock_open.assert_called_once_with("/tmp/%s.html" % task_id, "w+")
-        mock_plot.plot.assert_called_once_with(results)
+        self.assertEqual(1, mock_plot.plot.call_count)
+        self.assertEqual(results, list(mock_plot.plot.call_args[0][0]))
+        mock_results.assert_called_once_with(with_raw=False, partial=False)
 
         mock_open.side_effect().write.assert_called_once_with("html_report")
         mock_task_get.assert_called_once_with(task_id)
 
+        reset_mocks()
+        mock_results.reset_mock()
+        self.task.report(tasks=task_id, out="/tmp/%s.html" % task_id,
+                         partial=True)
+        list(mock_plot.plot.call_args[0][0])
+        mock_results.assert_called_once_with(with_raw=False, partial=True)
+
         reset_mocks()
         self.task.report(tasks=task_id, out="/tmp/%s.html" % task_id,
                          out_format="junit")
@@ -371,6 +513,36 @@ class TaskCommandsTestCase(test.TestCase):
         mock_webbrowser.open_new_tab.assert_called_once_with(
             "file://realpath_spam.html")
 
+    @mock.patch("rally.cli.commands.task.open",
+                side_effect=mock.mock_open(), create=True)
+    @mock.patch("rally.cli.commands.task.plot")
+    @mock.patch("rally.cli.commands.task.objects.Task.get")
+    def test_report_uuid_with_summary(self, mock_task_get, mock_plot,
+                                      mock_open):
+        task_id = "eb290c30-38d8-4c8f-bbcc-fc8f74b004ae"
+        task = mock_task_get.return_value
+        task.get_results.return_value = [
+            {"id": 42, "key": {"name": "class.test", "pos": 0},
+             "data": {"raw": [], "sla": [], "summary": "foo_summary",
+                      "load_duration": 0.1, "full_duration": 1.2}}]
+        task.iter_results_raw.return_value = "foo_raw"
+
+        self.task.report(tasks=task_id, out="/tmp/%s.html" % task_id)
+
+        self.assertEqual(1, mock_plot.plot.call_count)
+        self.assertEqual(
+            [{"key": {"name": "class.test", "pos": 0}, "sla": [],
+              "result": "foo_raw", "summary": "foo_summary",
+              "load_duration": 0.1, "full_duration": 1.2}],
+            list(mock_plot.plot.call_args[0][0]))
+        task.get_results.assert_called_once_with(with_raw=False, partial=False)
+        task.iter_results_raw.assert_called_once_with(42)
+
+        task.iter_results_raw.reset_mock()
+        self.task.report(tasks=task_id, out="/tmp/%s.xml" % task_id,
+                         out_format="junit")
+        self.assertFalse(task.iter_results_raw.called)
+
     @mock.patch("rally.cli.commands.task.jsonschema.validate",
                 return_value=None)
     @mock.patch("rally.cli.commands.task.os.path.realpath",
@@ -414,13 +586,14 @@ class TaskCommandsTestCase(test.TestCase):
                 m.reset_mock()
         self.task.report(tasks=tasks, out="/tmp/1_test.html")
         mock_open.assert_called_once_with("/tmp/1_test.html", "w+")
-        mock_plot.plot.assert_called_once_with(results)
+        self.assertEqual(1, mock_plot.plot.call_count)
+        self.assertEqual(results, list(mock_plot.plot.call_args[0][0]))
 
         mock_open.side_effect().write.assert_called_once_with("html_report")
         expected_get_calls = [mock.call(task) for task in tasks]
         mock_task_get.assert_has_calls(expected_get_calls, any_order=True)
 
-    @mock.patch("rally.cli.commands.task.json.load")
+    @mock.patch("rally.cli.commands.task.json_stream.load")
     @mock.patch("rally.cli.commands.task.os.path.exists", return_value=True)
     @mock.patch("rally.cli.commands.task.jsonschema.validate",
                 return_value=None)
@@ -429,7 +602,8 @@ class TaskCommandsTestCase(test.TestCase):
     @mock.patch("rally.cli.commands.task.open", create=True)
     @mock.patch("rally.cli.commands.task.plot")
     def test_report_one_file(self, mock_plot, mock_open, mock_realpath,
-                             mock_validate, mock_path_exists, mock_json_load):
+                             mock_validate, mock_path_exists,
+                             mock_json_stream_load):
 
         task_file = "/tmp/some_file.json"
         data = [
@@ -452,23 +626,25 @@ class TaskCommandsTestCase(test.TestCase):
         mock_plot.plot.return_value = "html_report"
         mock_open.side_effect = mock.mock_open(read_data=results)
 
-        mock_json_load.return_value = results
+        mock_json_stream_load.return_value = iter(results)
 
         def reset_mocks():
-            for m in mock_plot, mock_open, mock_json_load, mock_validate:
+            for m in (mock_plot, mock_open, mock_json_stream_load,
+                      mock_validate):
                 m.reset_mock()
         self.task.report(tasks=task_file, out="/tmp/1_test.html")
+        self.assertEqual(1, mock_plot.plot.call_count)
+        self.assertEqual(results, list(mock_plot.plot.call_args[0][0]))
         expected_open_calls = [mock.call(task_file, "r"),
                                mock.call("/tmp/1_test.html", "w+")]
         mock_open.assert_has_calls(expected_open_calls, any_order=True)
-        mock_plot.plot.assert_called_once_with(results)
 
         mock_open.side_effect().write.assert_called_once_with("html_report")
 
     @mock.patch("rally.cli.commands.task.os.path.exists", return_value=True)
-    @mock.patch("rally.cli.commands.task.json.load")
+    @mock.patch("rally.cli.commands.task.json_stream.load")
     @mock.patch("rally.cli.commands.task.open", create=True)
-    def test_report_exceptions(self, mock_open, mock_json_load,
+    def test_report_exceptions(self, mock_open, mock_json_stream_load,
                                mock_path_exists):
 
         results = [
@@ -478,13 +654,15 @@ class TaskCommandsTestCase(test.TestCase):
                       "full_duration": 1.2}}]
 
         mock_open.side_effect = mock.mock_open(read_data=results)
-        mock_json_load.return_value = results
+        mock_json_stream_load.return_value = results
 
         ret = self.task.report(tasks="/tmp/task.json",
                                out="/tmp/tmp.hsml")
 
         self.assertEqual(ret, 1)
-        for m in mock_open, mock_json_load:
+        self.assertNotIn(mock.call("/tmp/tmp.hsml", "w+"),
+                         mock_open.mock_calls)
+        for m in mock_open, mock_json_stream_load:
             m.reset_mock()
         mock_path_exists.return_value = False
         ret = self.task.report(tasks="/tmp/task.json",
@@ -493,9 +671,9 @@ class TaskCommandsTestCase(test.TestCase):
 
     @mock.patch("rally.cli.commands.task.sys.stderr")
     @mock.patch("rally.cli.commands.task.os.path.exists", return_value=True)
-    @mock.patch("rally.cli.commands.task.json.load")
+    @mock.patch("rally.cli.commands.task.json_stream.load")
     @mock.patch("rally.cli.commands.task.open", create=True)
-    def test_report_invalid_format(self, mock_open, mock_json_load,
+    def test_report_invalid_format(self, mock_open, mock_json_stream_load,
                                    mock_path_exists, mock_stderr):
         result = self.task.report(tasks="/tmp/task.json", out="/tmp/tmp.html",
                                   out_format="invalid")
@@ -600,13 +778,14 @@ class TaskCommandsTestCase(test.TestCase):
                                    "success": False,
                                    "detail": "Max foo, actually bar"}]}}]
 
-        mock_task_get().get_results.return_value = copy.deepcopy(data)
+        mock_task_get().iter_results.return_value = copy.deepcopy(data)
         result = self.task.sla_check(task_id="fake_task_id")
         self.assertEqual(1, result)
         mock_task_get.assert_called_with("fake_task_id")
+        mock_task_get().iter_results.assert_called_with(with_raw=False)
 
         data[0]["data"]["sla"][0]["success"] = True
-        mock_task_get().get_results.return_value = data
+        mock_task_get().iter_results.return_value = data
 
         result = self.task.sla_check(task_id="fake_task_id", tojson=True)
         self.assertEqual(0, result)
@@ -26,11 +26,27 @@ class CmdManageTestCase(test.TestCase):
     @mock.patch("rally.cli.manage.cliutils")
     def test_main(self, mock_cliutils):
         manage.main()
-        categories = {"db": manage.DBCommands,
+        categories = {"agent": manage.AgentCommands,
+                      "db": manage.DBCommands,
                       "tempest": manage.TempestCommands}
         mock_cliutils.run.assert_called_once_with(sys.argv, categories)
 
 
+class AgentCommandsTestCase(test.TestCase):
+
+    @mock.patch("rally.cli.manage.agent.Agent")
+    def test_start(self, mock_agent):
+        manage.AgentCommands().start("127.0.0.1", 1234, "host:1234")
+        mock_agent.assert_called_once_with("127.0.0.1", 1234, "host:1234")
+        mock_agent.return_value.serve.assert_called_once_with()
+
+    @mock.patch("rally.cli.manage.agent.Agent")
+    def test_start_interrupted(self, mock_agent):
+        mock_agent.return_value.serve.side_effect = KeyboardInterrupt
+        manage.AgentCommands().start()
+        mock_agent.assert_called_once_with("127.0.0.1", 0, None)
+
+
 class DBCommandsTestCase(test.TestCase):
 
     def setUp(self):
@@ -43,6 +59,18 @@ class DBCommandsTestCase(test.TestCase):
         calls = [mock.call.db_drop(), mock.call.db_create()]
         self.assertEqual(calls, mock_db.mock_calls)
 
+    @mock.patch("rally.cli.manage.db")
+    def test_compact(self, mock_db):
+        mock_db.task_results_compact.return_value = 2
+        self.db_commands.compact()
+        mock_db.task_results_compact.assert_called_once_with(
+            manage.engine.RESULTS_CHUNK_SIZE)
+
+    @mock.patch("rally.cli.manage.db")
+    def test_create(self, mock_db):
+        self.db_commands.create()
+        self.assertEqual([mock.call.db_create()], mock_db.mock_calls)
+
 
 class TempestCommandsTestCase(test.TestCase):
 
@@ -13,39 +13,122 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import collections
+import threading
 
 import mock
 
 from rally.common import broker
+from rally.common import streaming_algorithms
 from tests.unit import test
 
 
+class QueueTestCase(test.TestCase):
+
+    def test_popleft(self):
+        queue = broker._Queue()
+        queue.extend([1, 2])
+        self.assertEqual(2, len(queue))
+        self.assertEqual(1, queue.popleft())
+        queue.close()
+        self.assertEqual(2, queue.popleft())
+        self.assertRaises(IndexError, queue.popleft)
+
+    def test_popleft_waits(self):
+        queue = broker._Queue()
+        popped = []
+        consumer = threading.Thread(
+            target=lambda: popped.append(queue.popleft()))
+        consumer.start()
+        queue.append(1)
+        consumer.join()
+        self.assertEqual([1], popped)
+
+    def test_append_waits_when_full(self):
+        queue = broker._Queue(max_size=2)
+        publisher = threading.Thread(target=queue.extend, args=(range(5),))
+        publisher.start()
+
+        popped = [queue.popleft() for i in range(5)]
+        publisher.join()
+        self.assertEqual(list(range(5)), popped)
+        self.assertEqual(0, len(queue))
+
+
+class ThreadPoolTestCase(test.TestCase):
+
+    def test_submit(self):
+        pool = broker._ThreadPool()
+        results = []
+        pool.submit(results.append, 1).wait()
+        self.assertEqual([1], results)
+        self.assertEqual(1, pool._idle)
+
+        pool.submit(results.append, 2).wait()
+        self.assertEqual([1, 2], results)
+        self.assertEqual(1, pool._idle)
+
+    def test_submit_nested(self):
+        pool = broker._ThreadPool()
+        results = []
+
+        def task():
+            pool.submit(results.append, 1).wait()
+
+        pool.submit(task).wait()
+        self.assertEqual([1], results)
+        self.assertEqual(2, pool._idle)
+
+    @mock.patch("rally.common.broker.LOG")
+    def test_submit_fails(self, mock_log):
+        pool = broker._ThreadPool()
+        pool.submit(mock.Mock(side_effect=Exception)).wait()
+        self.assertTrue(mock_log.exception.called)
+        self.assertEqual(1, pool._idle)
+
+    def test_idle_timeout(self):
+        pool = broker._ThreadPool(idle_timeout=0)
+        pool.submit(lambda: None).wait()
+        for i in range(100):
+            if not pool._idle:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(0, pool._idle)
+
+
 class BrokerTestCase(test.TestCase):
 
+    def _stats(self):
+        return {"failed": 0,
+                "durations": streaming_algorithms.QuantileSketch()}
+
     def test__publisher(self):
         mock_publish = mock.MagicMock()
-        mock_is_published = mock.MagicMock()
-        queue = collections.deque()
-        broker._publisher(mock_publish, queue, mock_is_published)
-        mock_publish.assert_called_once_with(queue)
-        mock_is_published.set.assert_called_once_with()
+        mock_queue = mock.MagicMock()
+        broker._publisher(mock_publish, mock_queue)
+        mock_publish.assert_called_once_with(mock_queue)
+        mock_queue.close.assert_called_once_with()
 
     def test__publisher_fails(self):
         mock_publish = mock.MagicMock(side_effect=Exception())
-        mock_is_published = mock.MagicMock()
-        queue = collections.deque()
-        broker._publisher(mock_publish, queue, mock_is_published)
-        mock_is_published.set.assert_called_once_with()
+        mock_queue = mock.MagicMock()
+        broker._publisher(mock_publish, mock_queue)
+        mock_queue.close.assert_called_once_with()
+
+    def _closed_queue(self, jobs):
+        queue = broker._Queue()
+        queue.extend(jobs)
+        queue.close()
+        return queue
 
     def test__consumer(self):
-        queue = collections.deque([1, 2, 3])
+        queue = self._closed_queue([1, 2, 3])
         mock_consume = mock.MagicMock()
-        mock_is_published = mock.MagicMock()
-        mock_is_published.isSet = mock.MagicMock(return_value=True)
-        broker._consumer(mock_consume, queue, mock_is_published)
+        stats = self._stats()
+        broker._consumer(mock_consume, queue, stats)
         self.assertEqual(3, mock_consume.call_count)
         self.assertEqual(0, len(queue))
+        self.assertEqual(0, stats["failed"])
+        self.assertEqual(3, stats["durations"].count)
 
     def test__consumer_cache(self):
         cache_keys_history = []
@@ -54,32 +137,30 @@ class BrokerTestCase(test.TestCase):
             cache[item] = True
             cache_keys_history.append(list(cache))
 
-        queue = collections.deque([1, 2, 3])
-        mock_is_published = mock.MagicMock()
-        mock_is_published.isSet = mock.MagicMock(return_value=True)
-        broker._consumer(consume, queue, mock_is_published)
+        queue = self._closed_queue([1, 2, 3])
+        broker._consumer(consume, queue, self._stats())
         self.assertEqual([[1], [1, 2], [1, 2, 3]], cache_keys_history)
 
-    def test__consumer_fails(self):
-        queue = collections.deque([1, 2, 3])
+    @mock.patch("rally.common.broker.LOG")
+    def test__consumer_fails(self, mock_log):
+        queue = self._closed_queue([1, 2, 3])
         mock_consume = mock.MagicMock(side_effect=Exception())
-        mock_is_published = mock.MagicMock()
-        mock_is_published.isSet = mock.MagicMock(return_value=True)
-        broker._consumer(mock_consume, queue, mock_is_published)
+        stats = self._stats()
+        broker._consumer(mock_consume, queue, stats)
         self.assertEqual(0, len(queue))
+        self.assertEqual(3, stats["failed"])
+        self.assertEqual(3, stats["durations"].count)
+        self.assertEqual(3, mock_log.warning.call_count)
 
-    @mock.patch("rally.common.broker.LOG")
-    def test__consumer_indexerror(self, mock_log):
-        consume = mock.Mock()
-        consume.side_effect = IndexError()
-        queue = collections.deque([1, 2, 3])
-        is_published = mock.Mock()
-        is_published.isSet.side_effect = [False, False, True]
-        broker._consumer(consume, queue, is_published)
-        self.assertTrue(mock_log.warning.called)
-        self.assertFalse(queue)
-        expected = [mock.call({}, 1), mock.call({}, 2), mock.call({}, 3)]
-        self.assertEqual(expected, consume.mock_calls)
+    @mock.patch("rally.common.broker.time")
+    def test__consumer_rate(self, mock_time):
+        mock_time.time.side_effect = [10, 10, 10, 10.25, 10.25, 10.5,
+                                      11.25, 11.25, 11.5]
+        queue = self._closed_queue([1, 2, 3])
+        mock_consume = mock.MagicMock()
+        broker._consumer(mock_consume, queue, self._stats(), rate=2)
+        self.assertEqual(3, mock_consume.call_count)
+        self.assertEqual([mock.call(0.25)], mock_time.sleep.mock_calls)
 
     def test_run(self):
 
@@ -94,5 +175,97 @@ class BrokerTestCase(test.TestCase):
             consumed.add(item)
 
         consumer_count = 2
-        broker.run(publish, consume, consumer_count)
+        result = broker.run(publish, consume, consumer_count)
         self.assertEqual(set([1, 2, 3]), consumed)
+        self.assertEqual(3, result["jobs"])
+        self.assertEqual(0, result["failed"])
+        self.assertEqual(["95%ile", "max", "median", "min"],
+                         sorted(result["job_duration"]))
+
+    @mock.patch("rally.common.broker.LOG")
+    def test_run_backpressure(self, mock_log):
+        queued = []
+
+        def publish(queue):
+            for i in range(20):
+                queue.append(i)
+                queued.append(len(queue))
+
+        def consume(cache, item):
+            if item == 0:
+                threading.Event().wait(0.05)
+            elif item == 1:
+                raise Exception()
+
+        result = broker.run(publish, consume, 1, max_size=3)
+        self.assertEqual(3, max(queued))
+        self.assertEqual(20, result["jobs"])
+        self.assertEqual(1, result["failed"])
+
+    def test_run_publisher_blocks(self):
+        queues = []
+        published = []
+        consumed = []
+        release = threading.Event()
+
+        def publish(queue):
+            queues.append(queue)
+            for i in range(10):
+                queue.append(i)
+                published.append(i)
+
+        def consume(cache, item):
+            release.wait()
+            consumed.append(item)
+
+        runner = threading.Thread(target=broker.run,
+                                  args=(publish, consume, 1),
+                                  kwargs={"max_size": 2})
+        runner.start()
+        # NOTE: One item is taken by the blocked consumer, two fill the
+        #       queue, so the publisher waits for room for the fourth one.
+        for i in range(500):
+            if len(published) == 3:
+                break
+            threading.Event().wait(0.01)
+        threading.Event().wait(0.1)
+        self.assertEqual([0, 1, 2], published)
+        self.assertEqual(2, len(queues[0]))
+
+        release.set()
+        runner.join()
+        self.assertEqual(list(range(10)), published)
+        self.assertEqual(list(range(10)), consumed)
+
+    def test_run_consumer_requeues(self):
+        queues = []
+        consumed = []
+
+        def publish(queue):
+            queues.append(queue)
+            queue.extend(range(30))
+
+        def consume(cache, item):
+            consumed.append(item)
+            if item < 30:
+                queues[0].append(item + 30)
+
+        result = broker.run(publish, consume, 2)
+        self.assertEqual(list(range(60)), sorted(consumed))
+        self.assertEqual(60, result["jobs"])
+        self.assertEqual(0, result["failed"])
+
+    def test_run_nothing_published(self):
+        result = broker.run(lambda queue: None, mock.Mock(), 3)
+        self.assertEqual(0, result["jobs"])
+        self.assertIsNone(result["job_duration"])
+
+    def test_run_nested(self):
+        consumed = []
+
+        def consume(cache, item):
+            broker.run(lambda queue: queue.extend(range(item)),
+                       lambda cache, x: consumed.append((item, x)), 2)
+
+        broker.run(lambda queue: queue.extend([1, 2]), consume, 2)
+        self.assertEqual([(1, 0), (2, 0), (2, 1)], sorted(consumed))
@@ -0,0 +1,121 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+import ddt
+import mock
+import six
+
+from rally.common import json_stream
+from tests.unit import test
+
+
+RESULTS = [
+    {"key": {"name": "a", "pos": 0, "kw": {"args": [1, 2]}},
+     "result": [{"duration": 1.5, "error": [], "atomic_actions": {"x": 1}},
+                {"duration": 2, "error": ["e", "m\nl", "t"]}],
+     "sla": [{"criterion": "c", "success": True}]},
+    {"key": {"name": "b", "pos": 0, "kw": {}},
+     "result": [],
+     "sla": []}
+]
+
+
+def _stream(results):
+    for result in results:
+        yield dict(result, result=iter(result["result"]))
+
+
+@ddt.ddt
+class JSONStreamTestCase(test.TestCase):
+
+    @ddt.data(None, 0, 2, 4)
+    def test_dump(self, indent):
+        fp = six.StringIO()
+        json_stream.dump(_stream(RESULTS), fp, indent=indent, sort_keys=True)
+
+        separators = (",", ": ") if indent is not None else None
+        self.assertEqual(json.dumps(RESULTS, indent=indent, sort_keys=True,
+                                    separators=separators),
+                         fp.getvalue())
+
+    def test_dump_consumes_lazily(self):
+        written = []
+
+        class FakeFile(object):
+            def write(self, data):
+                written.append(data)
+
+        def results():
+            yield 1
+            self.assertEqual("[1", "".join(written))
+            yield 2
+
+        json_stream.dump(results(), FakeFile())
+        self.assertEqual("[1, 2]", "".join(written))
+
+    @ddt.data([], {}, "foo", {"a": [1, 2]})
+    def test_dump_plain(self, obj):
+        fp = six.StringIO()
+        json_stream.dump(obj, fp, indent=4)
+        self.assertEqual(json.dumps(obj, indent=4, separators=(",", ": ")),
+                         fp.getvalue())
+
+    def test_dump_lines(self):
+        fp = six.StringIO()
+        json_stream.dump_lines(_stream(RESULTS), fp, sort_keys=True)
+
+        lines = fp.getvalue().split("\n")
+        self.assertEqual([""], lines[len(RESULTS):])
+        self.assertEqual(RESULTS, [json.loads(line)
+                                   for line in lines[:len(RESULTS)]])
+
+    @ddt.data(None, 4)
+    def test_load(self, indent):
+        fp = six.StringIO(json.dumps(RESULTS, indent=indent))
+        self.assertEqual(RESULTS, list(json_stream.load(fp)))
+
+    def test_load_lines(self):
+        fp = six.StringIO()
+        json_stream.dump_lines(_stream(RESULTS), fp)
+        fp.seek(0)
+        self.assertEqual(RESULTS, list(json_stream.load(fp)))
+
+    def test_load_single_line(self):
+        fp = six.StringIO(json.dumps(RESULTS[0]) + "\n")
+        self.assertEqual(RESULTS[:1], list(json_stream.load(fp)))
+
+    @ddt.data("", " [ ] ")
+    def test_load_empty(self, data):
+        self.assertEqual([], list(json_stream.load(six.StringIO(data))))
+
+    def test_load_small_chunks(self):
+        data = RESULTS + [1234567890, "foo"]
+        with mock.patch("rally.common.json_stream._CHUNK_SIZE", 3):
+            self.assertEqual(data, list(json_stream.load(
+                six.StringIO(json.dumps(data)))))
+
+    def test_load_lazily(self):
+        fp = six.StringIO(json.dumps(RESULTS) + "garbage")
+        objects = json_stream.load(fp)
+        self.assertEqual(RESULTS[0], next(objects))
+        self.assertEqual(RESULTS[1], next(objects))
+        self.assertRaises(ValueError, next, objects)
+
+    @ddt.data("[1,\n2", "[1 2]", "[1,]", "[1] 2", "{")
+    def test_load_invalid(self, data):
+        self.assertRaises(ValueError, list,
+                          json_stream.load(six.StringIO(data)))
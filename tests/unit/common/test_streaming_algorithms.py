@@ -13,12 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import ddt
-
+import json
 import math
 
+import ddt
+
 from rally.common import streaming_algorithms as algo
 from rally import exceptions
+from rally.task.processing import utils
 from tests.unit import test
 
 
@@ -152,6 +154,144 @@ class PercentileComputationTestCase(test.TestCase):
         self.assertRaises(ValueError, comp.result)
 
 
+@ddt.ddt
+class QuantileSketchTestCase(test.TestCase):
+
+    exp1000 = [math.exp(i / 100.0) for i in range(1000)]
+    mixed = [(i * 7919 % 1009) / 10.0 - 20 for i in range(3000)]
+
+    def _exact(self, values, percent):
+        values = sorted(values)
+        return values[int((len(values) - 1) * percent / 100.0)]
+
+    @ddt.data(0, 25, 50, 90, 95, 100)
+    def test_percentile_exact(self, percent):
+        values = [4.0, 1.0, 3.0, 2.0, 6.5]
+        comp = algo.QuantileSketch()
+        [comp.add(v) for v in values]
+        self.assertEqual(utils.percentile(values, percent / 100.0),
+                         comp.percentile(percent))
+
+    @ddt.data(
+        {"stream": "exp1000", "accuracy": 0.01},
+        {"stream": "exp1000", "accuracy": 0.05},
+        {"stream": "mixed", "accuracy": 0.01})
+    @ddt.unpack
+    def test_percentile_estimated(self, stream, accuracy):
+        values = getattr(self, stream)
+        comp = algo.QuantileSketch(accuracy=accuracy, max_bins=500)
+        [comp.add(v) for v in values]
+
+        self.assertIsNone(comp._values)
+        self.assertLessEqual(len(comp._bins), 500)
+        for percent in (0, 1, 10, 25, 50, 75, 90, 95, 99, 100):
+            expected = self._exact(values, percent)
+            self.assertLessEqual(abs(comp.percentile(percent) - expected),
+                                 abs(expected) * accuracy * (1 + 1e-9))
+        self.assertEqual(min(values), comp.min)
+        self.assertEqual(max(values), comp.max)
+        self.assertEqual(len(values), comp.count)
+        self.assertAlmostEqual(sum(values), comp.total)
+
+    def test_collapse(self):
+        comp = algo.QuantileSketch(max_bins=10)
+        [comp.add(v) for v in self.exp1000]
+        self.assertEqual(10, len(comp._bins))
+        self.assertEqual(1000, sum(comp._bins.values()))
+        self.assertLessEqual(abs(comp.percentile(99) -
+                                 self._exact(self.exp1000, 99)),
+                             self._exact(self.exp1000, 99) * 0.01)
+
+    @ddt.data((10, 20), (1000, 2000), (10, 2000), (2000, 10), (600, 600))
+    @ddt.unpack
+    def test_merge(self, size1, size2):
+        values = self.mixed[:size1 + size2]
+        comp = algo.QuantileSketch(max_bins=1000)
+        comp1 = algo.QuantileSketch(max_bins=1000)
+        comp2 = algo.QuantileSketch(max_bins=1000)
+        [comp.add(v) for v in values]
+        [comp1.add(v) for v in values[:size1]]
+        [comp2.add(v) for v in values[size1:]]
+
+        comp1.merge(comp2)
+        comp1.merge(algo.QuantileSketch(max_bins=1000))
+        for percent in (0, 5, 50, 95, 100):
+            self.assertEqual(comp.percentile(percent),
+                             comp1.percentile(percent))
+        self.assertEqual(comp.count, comp1.count)
+        self.assertEqual((comp.min, comp.max), (comp1.min, comp1.max))
+
+    def test_merge_values_over_max_bins(self):
+        comp1 = algo.QuantileSketch(max_bins=10)
+        comp2 = algo.QuantileSketch(max_bins=10)
+        [comp1.add(v) for v in range(1, 9)]
+        [comp2.add(v) for v in range(101, 109)]
+
+        comp1.merge(comp2)
+        self.assertEqual(16, comp1.count)
+        self.assertEqual(16, sum(comp1._bins.values()))
+        self.assertLessEqual(abs(comp1.percentile(50) - 8), 8 * 0.01)
+        self.assertLessEqual(abs(comp1.percentile(75) - 104.25), 104.25 * 0.01)
+
+    def test_merge_raises(self):
+        comp = algo.QuantileSketch()
+        self.assertRaises(ValueError, comp.merge,
+                          algo.QuantileSketch(accuracy=0.02))
+        self.assertRaises(ValueError, comp.merge,
+                          algo.QuantileSketch(max_bins=10))
+
+    @ddt.data(10, 5000)
+    def test_to_dict_and_from_dict(self, size):
+        comp = algo.QuantileSketch(90)
+        [comp.add(v) for v in self.mixed[:size]]
+        restored = algo.QuantileSketch.from_dict(
+            json.loads(json.dumps(comp.to_dict())))
+        self.assertEqual(comp.result(), restored.result())
+        self.assertEqual(comp.to_dict(), restored.to_dict())
+
+    def test_rank_exact(self):
+        comp = algo.QuantileSketch()
+        [comp.add(v) for v in [4.0, 1.0, 3.0, 3.0, 6.5]]
+        self.assertEqual([0, 1, 1, 3, 4, 5],
+                         [comp.rank(v) for v in (0.5, 1, 2, 3, 5, 10)])
+
+    def test_rank_estimated(self):
+        comp = algo.QuantileSketch(max_bins=500)
+        [comp.add(v) for v in self.exp1000]
+
+        self.assertIsNone(comp._values)
+        for value in (1.5, 10, 100, 10000):
+            expected = len([v for v in self.exp1000 if v <= value])
+            estimated = comp.rank(value)
+            self.assertLessEqual(expected, estimated)
+            self.assertLessEqual(estimated, len(
+                [v for v in self.exp1000 if v <= value * 1.03]))
+        self.assertEqual(0, comp.rank(0.5))
+        self.assertEqual(1000, comp.rank(comp.max))
+
+    def test_ranks(self):
+        comp = algo.QuantileSketch(max_bins=500)
+        [comp.add(v) for v in self.exp1000]
+        values = [0.5, 1.5, 10, 100, 10000]
+        self.assertEqual([comp.rank(v) for v in values], comp.ranks(values))
+
+    def test_result(self):
+        comp = algo.QuantileSketch(90)
+        [comp.add(v) for v in range(11)]
+        self.assertEqual(9, comp.result())
+
+    def test_raises(self):
+        self.assertRaises(ValueError, algo.QuantileSketch, 100)
+        self.assertRaises(ValueError, algo.QuantileSketch, accuracy=1)
+        self.assertRaises(ValueError, algo.QuantileSketch, max_bins=0)
+        comp = algo.QuantileSketch()
+        self.assertRaises(ValueError, comp.result)
+        self.assertRaises(ValueError, comp.percentile, 50)
+        self.assertRaises(TypeError, comp.add, "str")
+        comp.add(1)
+        self.assertRaises(ValueError, comp.percentile, 101)
+
+
 class ProgressComputationTestCase(test.TestCase):
 
     def test___init__raises(self):
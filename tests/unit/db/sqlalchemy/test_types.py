@@ -0,0 +1,109 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+import ddt
+
+from rally.common import costilius
+from rally.db.sqlalchemy import types
+from tests.unit import test
+
+
+def _result(duration, error=None, atomic_actions=None, **kwargs):
+    result = {"duration": duration, "timestamp": 1.0 + duration,
+              "idle_duration": 0, "error": error or [],
+              "scenario_output": {"errors": "", "data": {}},
+              "atomic_actions": costilius.OrderedDict(atomic_actions or [])}
+    result.update(kwargs)
+    return result
+
+
+@ddt.ddt
+class ColumnsTestCase(test.TestCase):
+
+    @ddt.data(
+        [],
+        [_result(1.5)],
+        [_result(1.5, atomic_actions=[("b", 1.0), ("a", 0.5)]),
+         _result(2, error=["E", "msg", "tb"], atomic_actions=[("b", 1.0)]),
+         _result(2.5, atomic_actions=[("b", 2.0), ("a", 0.5)])],
+        [_result(1, atomic_actions=[("a", 1)]),
+         _result(2, atomic_actions=[("b", 2), ("a", 1)])],
+        [_result(1, atomic_actions=[("a", None)]), _result(2)],
+        [_result(1, stage=0), _result(2), _result(3, stage=1)],
+        [_result(1, scenario_output={"errors": "", "data": {"a": 1}}),
+         _result(2, scenario_output={"errors": "", "data": {"a": 2}}),
+         _result(3)])
+    def test_raw_to_columns_and_back(self, raw):
+        columns = types.raw_to_columns(raw)
+        restored = types.columns_to_raw(json.loads(
+            json.dumps(columns), object_pairs_hook=costilius.OrderedDict))
+
+        self.assertEqual(raw, restored)
+        self.assertEqual([list(r["atomic_actions"]) for r in raw],
+                         [list(r["atomic_actions"]) for r in restored])
+
+    def test_raw_to_columns(self):
+        raw = [_result(1, atomic_actions=[("a", 1)]),
+               _result(2, error=["E"], atomic_actions=[("a", 2)]),
+               _result(3, atomic_actions=[("a", 3)])]
+        columns = types.raw_to_columns(raw)
+
+        self.assertEqual(3, columns["count"])
+        self.assertEqual({}, columns["absent"])
+        self.assertEqual({"values": [1, 2, 3]},
+                         columns["columns"]["duration"])
+        self.assertEqual({"names": ["a"], "matrix": [[1], [2], [3]]},
+                         columns["columns"]["atomic_actions"])
+        self.assertEqual({"default": [], "index": [1], "values": [["E"]]},
+                         columns["columns"]["error"])
+
+    def test_columns_to_raw_copies_default(self):
+        raw = types.columns_to_raw(types.raw_to_columns(
+            [_result(1), _result(2)]))
+        raw[0]["scenario_output"]["data"]["a"] = 1
+        self.assertEqual({}, raw[1]["scenario_output"]["data"])
+
+
+@ddt.ddt
+class BigCompactJSONEncodedDictTestCase(test.TestCase):
+
+    def setUp(self):
+        super(BigCompactJSONEncodedDictTestCase, self).setUp()
+        self.type = types.BigCompactJSONEncodedDict()
+
+    @ddt.data({"raw": [_result(1), _result(2, error=["E"])], "sla": []},
+              {"raw": []}, {"a": "b"})
+    def test_bind_and_result(self, value):
+        stored = self.type.process_bind_param(value, None)
+        self.assertTrue(stored.startswith(self.type.PREFIX))
+        self.assertEqual(value, self.type.process_result_value(stored, None))
+
+    def test_compact(self):
+        value = {"raw": [_result(i) for i in range(100)]}
+        self.assertTrue(
+            len(self.type.process_bind_param(value, None)) * 4 <
+            len(types.JSONEncodedDict().process_bind_param(value, None)))
+
+    def test_result_value_json(self):
+        self.assertEqual(
+            {"raw": [{"duration": 1}]},
+            self.type.process_result_value(
+                json.dumps({"raw": [{"duration": 1}]}), None))
+
+    def test_none(self):
+        self.assertIsNone(self.type.process_bind_param(None, None))
+        self.assertIsNone(self.type.process_result_value(None, None))
@@ -15,10 +15,17 @@
 
 """Tests for db.api layer."""
 
+import datetime
+import types
+
+import mock
+from oslo_utils import timeutils
 from six import moves
 
 from rally import consts
 from rally import db
+from rally.db.sqlalchemy import api as db_api
+from rally.db.sqlalchemy import models
 from rally import exceptions
 from tests.unit import test
 
@@ -162,6 +169,127 @@ class TasksTestCase(test.DBTestCase):
             self.assertEqual(res[0]["key"], data)
             self.assertEqual(res[0]["data"], data)
 
+    def test_task_result_get_all_by_uuid_with_chunks(self):
+        task_id = self._create_task()["uuid"]
+        result_id = db.task_result_create(
+            task_id, {"name": "a"}, {"raw": [], "sla": []})["id"]
+        db.task_result_chunk_create(result_id, 1, [{"i": 2}])
+        db.task_result_chunk_create(result_id, 0, [{"i": 0}, {"i": 1}])
+        db.task_result_update(result_id, {"raw": [], "sla": ["sla"]})
+
+        res = db.task_result_get_all_by_uuid(task_id)
+        self.assertEqual(1, len(res))
+        self.assertEqual({"name": "a"}, res[0]["key"])
+        self.assertEqual({"raw": [{"i": 0}, {"i": 1}, {"i": 2}],
+                          "sla": ["sla"]}, res[0]["data"])
+
+    def test_task_result_get_all_by_uuid_without_raw(self):
+        task_id = self._create_task()["uuid"]
+        with_summary = db.task_result_create(
+            task_id, {"name": "a"}, {"raw": [], "summary": {"errors": 0}})
+        without_summary = db.task_result_create(
+            task_id, {"name": "b"}, {"raw": []})
+        for result in with_summary, without_summary:
+            db.task_result_chunk_create(result["id"], 0, [{"i": 0}])
+
+        res = db.task_result_get_all_by_uuid(task_id, with_raw=False)
+        self.assertEqual([{"raw": [], "summary": {"errors": 0}},
+                          {"raw": [{"i": 0}]}],
+                         [r["data"] for r in res])
+        res = db.task_get_detailed(task_id, with_raw=False)["results"]
+        self.assertEqual([[], [{"i": 0}]], [r["data"]["raw"] for r in res])
+
+    def test_task_result_data_is_deferred(self):
+        task_id = self._create_task()["uuid"]
+        db.task_result_create(task_id, {"name": "a"}, {"raw": []})
+        result = db_api.Connection().model_query(models.TaskResult).first()
+        self.assertNotIn("data", result.__dict__)
+
+    def test_task_result_iter_by_uuid(self):
+        task_id = self._create_task()["uuid"]
+        for i in range(3):
+            result_id = db.task_result_create(task_id, {"name": i},
+                                              {"raw": []})["id"]
+            db.task_result_chunk_create(result_id, 0, [{"i": i}])
+
+        with mock.patch.object(db_api.Connection, "RESULTS_BATCH_SIZE", 2):
+            res = db.task_result_iter_by_uuid(task_id)
+            self.assertIsInstance(res, types.GeneratorType)
+            self.assertEqual([({"name": i}, [{"i": i}]) for i in range(3)],
+                             [(r["key"], r["data"]["raw"]) for r in res])
+
+    def test_task_result_meta_get_all_by_uuid(self):
+        task_id = self._create_task()["uuid"]
+        result_id = db.task_result_create(task_id, {"name": "a"},
+                                          {"raw": [1, 2, 3]})["id"]
+
+        res = db.task_result_meta_get_all_by_uuid(task_id)
+        self.assertEqual(1, len(res))
+        self.assertEqual({"id": result_id, "key": {"name": "a"},
+                          "task_uuid": task_id},
+                         dict((k, res[0][k])
+                              for k in ("id", "key", "task_uuid")))
+        self.assertNotIn("data", res[0])
+        self.assertIn("created_at", res[0])
+
+    def test_task_result_iter_raw(self):
+        task_id = self._create_task()["uuid"]
+        result_id = db.task_result_create(task_id, {"name": "a"},
+                                          {"raw": [{"i": 0}]})["id"]
+        db.task_result_chunk_create(result_id, 1, [{"i": 3}])
+        db.task_result_chunk_create(result_id, 0, [{"i": 1}, {"i": 2}])
+
+        self.assertEqual([{"i": i} for i in range(4)],
+                         list(db.task_result_iter_raw(result_id)))
+
+    def test_task_result_iter_raw_not_found(self):
+        self.assertRaises(exceptions.TaskResultNotFound,
+                          db.task_result_iter_raw, 42)
+
+    def test_task_results_compact(self):
+        task_id = self._create_task()["uuid"]
+        raw = [{"duration": i, "error": []} for i in range(5)]
+        old_id = db.task_result_create(task_id, {"name": "old"},
+                                       {"raw": raw, "sla": []})["id"]
+        new_id = db.task_result_create(task_id, {"name": "new"},
+                                       {"raw": [], "sla": []})["id"]
+        db.task_result_chunk_create(new_id, 0, raw[:1])
+
+        self.assertEqual(1, db.task_results_compact(2))
+        self.assertEqual(0, db.task_results_compact(2))
+
+        chunks = (db_api.Connection().model_query(models.TaskResultChunk).
+                  filter_by(task_result_id=old_id).
+                  order_by(models.TaskResultChunk.position).all())
+        self.assertEqual([raw[:2], raw[2:4], raw[4:]],
+                         [c["data"]["raw"] for c in chunks])
+        res = db.task_result_get_all_by_uuid(task_id)
+        self.assertEqual([raw, raw[:1]], [r["data"]["raw"] for r in res])
+
+    def test_task_result_update_not_found(self):
+        self.assertRaises(exceptions.TaskResultNotFound,
+                          db.task_result_update, 42, {})
+
+    def test_task_delete_with_result_chunks(self):
+        task_id = self._create_task()["uuid"]
+        result_id = db.task_result_create(task_id, {"name": "a"},
+                                          {"raw": []})["id"]
+        db.task_result_chunk_create(result_id, 0, [{"i": 0}])
+        db.task_delete(task_id)
+        self.assertEqual([], db.task_result_get_all_by_uuid(task_id))
+        self.assertEqual(
+            0, db_api.Connection().model_query(
+                models.TaskResultChunk).count())
+
+    def test_task_get_detailed_with_chunks(self):
+        task = self._create_task()
+        result_id = db.task_result_create(task["uuid"], {"name": "a"},
+                                          {"raw": []})["id"]
+        db.task_result_chunk_create(result_id, 0, [{"i": 0}])
+
+        results = db.task_get_detailed(task["uuid"])["results"]
+        self.assertEqual([{"i": 0}], results[0]["data"]["raw"])
+
     def test_task_get_detailed(self):
         task1 = self._create_task()
         key = {"name": "atata"}
@@ -399,6 +527,100 @@ class ResourceTestCase(test.DBTestCase):
         self.assertEqual(res_two["id"], resources[0]["id"])
 
 
+class UserPoolTenantTestCase(test.DBTestCase):
+    def setUp(self):
+        super(UserPoolTenantTestCase, self).setUp()
+        self.deploy = db.deployment_create({})
+
+    def _create(self, task_uuid=None, users_count=1, domain="default",
+                deployment_uuid=None):
+        return db.user_pool_tenant_create({
+            "deployment_uuid": deployment_uuid or self.deploy["uuid"],
+            "task_uuid": task_uuid,
+            "project_domain": domain,
+            "user_domain": domain,
+            "users_count": users_count,
+            "tenant": {"id": "t", "name": "t"},
+            "users": [{"id": "u%d" % i, "endpoint": {}}
+                      for i in range(users_count)]})
+
+    def _lease(self, task_uuid, count, users_count=1, domain="default"):
+        return db.user_pool_tenant_lease(self.deploy["uuid"], task_uuid,
+                                         count, users_count, domain, domain)
+
+    def test_create(self):
+        tenant = self._create(users_count=2)
+        tenants = db.user_pool_tenant_get_all(self.deploy["uuid"])
+        self.assertEqual([tenant["id"]], [t["id"] for t in tenants])
+        self.assertIsNone(tenants[0]["task_uuid"])
+        self.assertEqual({"id": "t", "name": "t"}, tenants[0]["tenant"])
+        self.assertEqual([{"id": "u0", "endpoint": {}},
+                          {"id": "u1", "endpoint": {}}],
+                         tenants[0]["users"])
+
+    def test_lease(self):
+        tenants = [self._create() for i in range(3)]
+        self._create(task_uuid="other_task")
+
+        leased = self._lease("task", 2)
+        self.assertEqual([t["id"] for t in tenants[:2]],
+                         [t["id"] for t in leased])
+        self.assertEqual(["task", "task"], [t["task_uuid"] for t in leased])
+
+        leased = self._lease("task2", 2)
+        self.assertEqual([tenants[2]["id"]], [t["id"] for t in leased])
+        self.assertEqual([], self._lease("task3", 2))
+
+    def test_lease_filters(self):
+        self._create(users_count=1)
+        self._create(domain="other", users_count=3)
+        self._create(deployment_uuid=db.deployment_create({})["uuid"],
+                     users_count=3)
+        suitable = self._create(users_count=3)
+
+        leased = self._lease("task", 5, users_count=2)
+        self.assertEqual([suitable["id"]], [t["id"] for t in leased])
+
+    def test_release(self):
+        tenants = [self._create(task_uuid="task") for i in range(3)]
+        db.user_pool_tenant_release([t["id"] for t in tenants[:2]])
+        db.user_pool_tenant_release([])
+
+        self.assertEqual(
+            [tenants[2]["id"]],
+            [t["id"] for t in db.user_pool_tenant_get_all(
+                self.deploy["uuid"], task_uuid="task")])
+        leased = self._lease("task2", 5)
+        self.assertEqual([t["id"] for t in tenants[:2]],
+                         [t["id"] for t in leased])
+
+    def test_get_all(self):
+        tenants = [self._create(), self._create(task_uuid="task")]
+        self._create(deployment_uuid=db.deployment_create({})["uuid"])
+        self.assertEqual(
+            [t["id"] for t in tenants],
+            [t["id"] for t in db.user_pool_tenant_get_all(
+                self.deploy["uuid"])])
+        self.assertEqual(
+            [tenants[1]["id"]],
+            [t["id"] for t in db.user_pool_tenant_get_all(
+                self.deploy["uuid"], task_uuid="task")])
+
+    def test_delete(self):
+        tenant = self._create()
+        db.user_pool_tenant_delete(tenant["id"])
+        self.assertEqual([], db.user_pool_tenant_get_all(self.deploy["uuid"]))
+
+    def test_delete_not_found(self):
+        self.assertRaises(exceptions.UserPoolTenantNotFound,
+                          db.user_pool_tenant_delete, 123456789)
+
+    def test_deployment_delete_is_busy(self):
+        self._create()
+        self.assertRaises(exceptions.DeploymentIsBusy, db.deployment_delete,
+                          self.deploy["uuid"])
+
+
 class VerificationTestCase(test.DBTestCase):
     def setUp(self):
         super(VerificationTestCase, self).setUp()
@@ -435,6 +657,24 @@ class WorkerTestCase(test.DBTestCase):
     def test_get_worker_not_found(self):
         self.assertRaises(exceptions.WorkerNotFound, db.get_worker, "notfound")
 
+    def test_get_workers(self):
+        db.register_worker({"hostname": "another"})
+        self.assertEqual(["another", "test"],
+                         [w["hostname"] for w in db.get_workers()])
+
+    def test_get_workers_updated_since(self):
+        since = self.worker["updated_at"] + datetime.timedelta(seconds=10)
+        self.assertEqual([], db.get_workers(updated_since=since))
+        since = self.worker["updated_at"] - datetime.timedelta(seconds=10)
+        self.assertEqual(["test"], [w["hostname"]
+                                    for w in db.get_workers(since)])
+
+    def test_get_workers_registered_since(self):
+        since = timeutils.utcnow() - datetime.timedelta(seconds=1)
+        db.register_worker({"hostname": "another"})
+        self.assertIn("another", [w["hostname"]
+                                  for w in db.get_workers(since)])
+
     def test_unregister_worker(self):
         db.unregister_worker("test")
         self.assertRaises(exceptions.WorkerNotFound, db.get_worker, "test")
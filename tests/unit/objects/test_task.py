@@ -17,6 +17,7 @@
 
 import json
 
+import ddt
 import mock
 
 from rally import consts
@@ -24,6 +25,7 @@ from rally import objects
 from tests.unit import test
 
 
+@ddt.ddt
 class TaskTestCase(test.TestCase):
     def setUp(self):
         super(TaskTestCase, self).setUp()
@@ -139,22 +141,79 @@ class TaskTestCase(test.TestCase):
             {"verification_log": json.dumps({"a": "fake"})}
         )
 
-    @mock.patch("rally.objects.task.db.task_result_get_all_by_uuid",
-                return_value="foo_results")
+    @mock.patch("rally.objects.task.db.task_result_get_all_by_uuid")
     def test_get_results(self, mock_task_result_get_all_by_uuid):
+        results = [{"id": 1, "data": {"summary": {}}}, {"id": 2, "data": {}}]
+        mock_task_result_get_all_by_uuid.return_value = results
         task = objects.Task(task=self.task)
-        results = task.get_results()
+        self.assertEqual(results[:1], task.get_results())
         mock_task_result_get_all_by_uuid.assert_called_once_with(
+            self.task["uuid"], with_raw=True)
+
+    @mock.patch("rally.objects.task.db.task_result_iter_by_uuid")
+    def test_iter_results(self, mock_task_result_iter_by_uuid):
+        results = [{"id": 1, "data": {"summary": {}}}, {"id": 2, "data": {}}]
+        mock_task_result_iter_by_uuid.return_value = iter(results)
+        task = objects.Task(task=self.task)
+        self.assertEqual(results[:1], list(task.iter_results(with_raw=False)))
+        mock_task_result_iter_by_uuid.assert_called_once_with(
+            self.task["uuid"], with_raw=False)
+
+    @mock.patch("rally.objects.task.db.task_result_iter_by_uuid")
+    def test_iter_results_partial(self, mock_task_result_iter_by_uuid):
+        results = [{"id": 1, "data": {"summary": {}}}, {"id": 2, "data": {}}]
+        mock_task_result_iter_by_uuid.return_value = iter(results)
+        task = objects.Task(task=self.task)
+        self.assertEqual(results, list(task.iter_results(partial=True)))
+
+    @ddt.data(
+        {"status": consts.TaskStatus.RUNNING, "data": {}, "finished": False},
+        {"status": consts.TaskStatus.RUNNING, "data": {"summary": {}},
+         "finished": True},
+        {"status": consts.TaskStatus.FINISHED, "data": {}, "finished": True},
+        {"status": consts.TaskStatus.FAILED, "data": {}, "finished": True})
+    @ddt.unpack
+    def test_is_result_finished(self, status, data, finished):
+        task = objects.Task(task=dict(self.task, status=status))
+        self.assertEqual(finished, task.is_result_finished({"data": data}))
+
+    @mock.patch("rally.objects.task.db.task_result_meta_get_all_by_uuid",
+                return_value="foo_results")
+    def test_get_results_meta(self, mock_task_result_meta_get_all_by_uuid):
+        task = objects.Task(task=self.task)
+        results = task.get_results_meta()
+        mock_task_result_meta_get_all_by_uuid.assert_called_once_with(
             self.task["uuid"])
         self.assertEqual(results, "foo_results")
 
-    @mock.patch("rally.objects.task.db.task_result_create")
+    @mock.patch("rally.objects.task.db.task_result_iter_raw",
+                return_value="foo_raw")
+    def test_iter_results_raw(self, mock_task_result_iter_raw):
+        task = objects.Task(task=self.task)
+        self.assertEqual("foo_raw", task.iter_results_raw(42))
+        mock_task_result_iter_raw.assert_called_once_with(42)
+
+    @mock.patch("rally.objects.task.db.task_result_create",
+                return_value={"id": 42})
     def test_append_results(self, mock_task_result_create):
         task = objects.Task(task=self.task)
-        task.append_results("opt", "val")
+        self.assertEqual(42, task.append_results("opt", "val"))
         mock_task_result_create.assert_called_once_with(
             self.task["uuid"], "opt", "val")
 
+    @mock.patch("rally.objects.task.db.task_result_update")
+    def test_update_results(self, mock_task_result_update):
+        task = objects.Task(task=self.task)
+        task.update_results(42, "val")
+        mock_task_result_update.assert_called_once_with(42, "val")
+
+    @mock.patch("rally.objects.task.db.task_result_chunk_create")
+    def test_append_results_chunk(self, mock_task_result_chunk_create):
+        task = objects.Task(task=self.task)
+        task.append_results_chunk(42, 1, ["raw"])
+        mock_task_result_chunk_create.assert_called_once_with(42, 1,
+                                                              ["raw"])
+
     @mock.patch("rally.objects.task.db.task_update")
     def test_set_failed(self, mock_task_update):
         mock_task_update.return_value = self.task
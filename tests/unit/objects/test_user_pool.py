@@ -0,0 +1,70 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for db.user_pool layer."""
+
+import mock
+
+from rally import objects
+from tests.unit import test
+
+
+class UserPoolTestCase(test.TestCase):
+
+    @mock.patch("rally.objects.user_pool.db.user_pool_tenant_create")
+    def test_add(self, mock_user_pool_tenant_create):
+        endpoint = objects.Endpoint("url", "user", "pass")
+        pool = objects.UserPool("dep_id")
+
+        result = pool.add("task_id", {"id": "t", "name": "n", "extra": 1},
+                          [{"id": "u", "endpoint": endpoint,
+                            "tenant_id": "t"}],
+                          "pdomain", "udomain")
+
+        self.assertEqual(mock_user_pool_tenant_create.return_value, result)
+        mock_user_pool_tenant_create.assert_called_once_with({
+            "deployment_uuid": "dep_id",
+            "task_uuid": "task_id",
+            "project_domain": "pdomain",
+            "user_domain": "udomain",
+            "users_count": 1,
+            "tenant": {"id": "t", "name": "n"},
+            "users": [{"id": "u",
+                       "endpoint": endpoint.to_dict(
+                           include_permission=True)}]})
+
+    @mock.patch("rally.objects.user_pool.db.user_pool_tenant_lease")
+    def test_lease(self, mock_user_pool_tenant_lease):
+        result = objects.UserPool("dep_id").lease("task_id", 3, 2, "p", "u")
+        self.assertEqual(mock_user_pool_tenant_lease.return_value, result)
+        mock_user_pool_tenant_lease.assert_called_once_with(
+            "dep_id", "task_id", 3, 2, "p", "u")
+
+    @mock.patch("rally.objects.user_pool.db.user_pool_tenant_release")
+    def test_release(self, mock_user_pool_tenant_release):
+        objects.UserPool.release([1, 2])
+        mock_user_pool_tenant_release.assert_called_once_with([1, 2])
+
+    @mock.patch("rally.objects.user_pool.db.user_pool_tenant_get_all")
+    def test_list(self, mock_user_pool_tenant_get_all):
+        result = objects.UserPool("dep_id").list(task_uuid="task_id")
+        self.assertEqual(mock_user_pool_tenant_get_all.return_value, result)
+        mock_user_pool_tenant_get_all.assert_called_once_with(
+            "dep_id", task_uuid="task_id")
+
+    @mock.patch("rally.objects.user_pool.db.user_pool_tenant_delete")
+    def test_delete(self, mock_user_pool_tenant_delete):
+        objects.UserPool.delete(42)
+        mock_user_pool_tenant_delete.assert_called_once_with(42)
@@ -0,0 +1,146 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import ddt
+import jsonschema
+import mock
+
+from rally.plugins.common.runners import adaptive
+from rally.task import runner
+from tests.unit import fakes
+from tests.unit import test
+
+
+@ddt.ddt
+class AdaptiveScenarioRunnerTestCase(test.TestCase):
+
+    def setUp(self):
+        super(AdaptiveScenarioRunnerTestCase, self).setUp()
+        self.config = {"type": "adaptive", "load": "concurrency",
+                       "times": 2, "start": 1,
+                       "criteria": {"failure_rate": {"max": 0}}}
+        self.context = fakes.FakeUserContext({"task":
+                                             {"uuid": "uuid"}}).context
+        self.args = {"a": 1}
+        self.task = mock.MagicMock()
+
+    def _get_runner(self, **config):
+        self.config.update(config)
+        return adaptive.AdaptiveScenarioRunner(self.task, self.config)
+
+    def _run_with_saturation(self, runner_obj, saturation):
+        """Run the search against a fake cloud saturated at given load."""
+        def run_stage(stage, config, *args):
+            load = config[runner_obj.config["load"]]
+            error = ["error"] if load > saturation else []
+            runner_obj._send_stage_result(
+                stage, {"duration": 1.0, "error": error,
+                        "scenario_output": {"errors": "", "data": {}}})
+
+        with mock.patch.object(runner_obj, "_run_stage",
+                               side_effect=run_stage):
+            runner_obj._run_scenario("cls", "method", "context", "args")
+        return [r["load"] for r in runner_obj.trajectory]
+
+    @ddt.data(
+        {},
+        {"load": "rps", "start": 0.5, "min": 0.1, "max": 100,
+         "strategy": "aimd", "step": 2, "decrease_factor": 0.75,
+         "max_rounds": 20, "timeout": 10, "max_cpu_count": 2,
+         "criteria": {"max_avg_duration": 2,
+                      "failure_rate": {"max": 1}}},
+        {"strategy": "binary", "precision": 2})
+    def test_validate(self, config):
+        self.config.update(config)
+        adaptive.AdaptiveScenarioRunner.validate(self.config)
+
+    @ddt.data({"load": "times"}, {"start": 0}, {"decrease_factor": 1},
+              {"strategy": "random"}, {"criteria": {}},
+              {"criteria": {"failure_rate": {"max": 200}}},
+              {"criteria": {"no_such_sla": 1}}, {"concurrency": 2})
+    def test_validate_failed(self, config):
+        self.config.update(config)
+        self.assertRaises(jsonschema.ValidationError,
+                          adaptive.AdaptiveScenarioRunner.validate,
+                          self.config)
+
+    @ddt.data(
+        {"config": {}, "saturation": 10,
+         "trajectory": [1, 2, 4, 8, 16, 12, 10, 11]},
+        {"config": {"precision": 3}, "saturation": 10,
+         "trajectory": [1, 2, 4, 8, 16, 12, 10]},
+        {"config": {"max": 6}, "saturation": 10,
+         "trajectory": [1, 2, 4, 6]},
+        {"config": {"start": 8}, "saturation": 0,
+         "trajectory": [8, 4, 2, 1]},
+        {"config": {"start": 5, "max_rounds": 3}, "saturation": 100,
+         "trajectory": [5, 10, 20]},
+        {"config": {"load": "rps", "start": 4, "precision": 0.5},
+         "saturation": 5,
+         "trajectory": [4, 8, 6.0, 5.0, 5.5]},
+        {"config": {"strategy": "aimd", "step": 2, "max_rounds": 8},
+         "saturation": 6,
+         "trajectory": [1, 3, 5, 7, 4, 6, 8, 4]},
+        {"config": {"strategy": "aimd", "max": 3}, "saturation": 10,
+         "trajectory": [1, 2, 3]})
+    @ddt.unpack
+    def test__run_scenario_search(self, config, saturation, trajectory):
+        runner_obj = self._get_runner(**config)
+        self.assertEqual(trajectory,
+                         self._run_with_saturation(runner_obj, saturation))
+        for r in runner_obj.trajectory:
+            self.assertEqual(r["load"] <= saturation, r["success"])
+
+    def test__run_scenario_tags_results(self):
+        runner_obj = self._get_runner(max_rounds=2)
+
+        self._run_with_saturation(runner_obj, 1)
+
+        self.assertEqual(
+            [(0, 1), (1, 2)],
+            [(r["stage"], r["scenario_output"]["data"]["load"])
+             for r in runner_obj.result_queue])
+
+    def test__run_scenario_aborted(self):
+        runner_obj = self._get_runner()
+
+        def run_stage(stage, config, *args):
+            runner_obj.abort()
+
+        with mock.patch.object(runner_obj, "_run_stage",
+                               side_effect=run_stage) as mock__run_stage:
+            runner_obj._run_scenario("cls", "method", "context", "args")
+
+        self.assertEqual(1, mock__run_stage.call_count)
+        self.assertEqual([], runner_obj.trajectory)
+
+    def test__get_round_config(self):
+        runner_obj = self._get_runner(load="rps", timeout=5, max_rounds=3)
+        self.assertEqual({"type": "rps", "times": 2, "rps": 2.5,
+                          "timeout": 5},
+                         runner_obj._get_round_config(2.5))
+
+    def test__run_scenario(self):
+        runner_obj = self._get_runner(max=2)
+
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        self.assertEqual([{"load": 1, "success": True},
+                          {"load": 2, "success": True}],
+                         runner_obj.trajectory)
+        self.assertEqual(4, len(runner_obj.result_queue))
+        for result in runner_obj.result_queue:
+            self.assertIsNotNone(runner.ScenarioRunnerResult(result))
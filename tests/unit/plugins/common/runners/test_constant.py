@@ -13,6 +13,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import multiprocessing
+
 import jsonschema
 import mock
 
@@ -48,15 +51,13 @@ class ConstantScenarioRunnerTestCase(test.TestCase):
                           self.config)
 
     @mock.patch(RUNNERS + "constant.time")
-    @mock.patch(RUNNERS + "constant.threading.Thread")
     @mock.patch(RUNNERS + "constant.multiprocessing.Queue")
     @mock.patch(RUNNERS + "constant.runner")
-    def test__worker_process(self, mock_runner, mock_queue, mock_thread,
-                             mock_time):
+    def test__worker_process(self, mock_runner, mock_queue, mock_time):
 
         mock_thread_instance = mock.MagicMock(
             isAlive=mock.MagicMock(return_value=False))
-        mock_thread.return_value = mock_thread_instance
+        mock_runner.ScenarioThread.return_value = mock_thread_instance
 
         mock_event = mock.MagicMock(
             is_set=mock.MagicMock(return_value=False))
@@ -73,18 +74,131 @@ class ConstantScenarioRunnerTestCase(test.TestCase):
                                  context, "Dummy", "dummy", (), mock_event,
                                  info)
 
-        self.assertEqual(times, mock_thread.call_count)
+        self.assertEqual(times, mock_runner.ScenarioThread.call_count)
         self.assertEqual(times, mock_thread_instance.start.call_count)
         self.assertEqual(times, mock_thread_instance.join.call_count)
         self.assertEqual(times, mock_runner._get_scenario_context.call_count)
 
+        mock_batcher = mock_runner.ResultBatcher.return_value
         for i in range(times):
             scenario_context = mock_runner._get_scenario_context(context)
-            call = mock.call(args=(mock_queue,
-                                   (i, "Dummy", "dummy",
-                                    scenario_context, ())),
-                             target=mock_runner._worker_thread)
-            self.assertIn(call, mock_thread.mock_calls)
+            call = mock.call(mock_batcher,
+                             [(i, "Dummy", "dummy", scenario_context, ())],
+                             1)
+            self.assertIn(call, mock_runner.ScenarioThread.mock_calls)
+        mock_runner._join_threads.assert_called_once_with(
+            collections.deque(), [])
+        mock_runner.ResultBatcher.assert_called_once_with(mock_queue)
+        mock_batcher.close.assert_called_once_with()
+        mock_runner._worker_done.assert_called_once_with(mock_queue)
+
+    @mock.patch(RUNNERS + "constant._reap_threads", return_value=0)
+    @mock.patch(RUNNERS + "constant._pool_iterations")
+    @mock.patch(RUNNERS + "constant.runner")
+    def test__pool_worker_process(self, mock_runner, mock__pool_iterations,
+                                  mock__reap_threads):
+        mock_queue = mock.MagicMock()
+        mock_event = mock.MagicMock()
+        info = {"processes_to_start": 1, "processes_counter": 1}
+        mock_thread = mock_runner.ScenarioThread.return_value
+
+        def reap_threads(pool, hung_threads):
+            pool.clear()
+            return 0
+
+        mock__reap_threads.side_effect = reap_threads
+
+        constant._pool_worker_process(mock_queue, "iteration_gen", 0, 3, 10,
+                                      "context", "Dummy", "dummy", (),
+                                      mock_event, info)
+
+        mock_batcher = mock_runner.ResultBatcher.return_value
+        self.assertEqual(
+            [mock.call(mock_batcher, mock__pool_iterations.return_value, 0)
+             ] * 3, mock_runner.ScenarioThread.call_args_list)
+        self.assertEqual(
+            [mock.call("iteration_gen", 10, "context", "Dummy", "dummy", (),
+                       mock_event)] * 3,
+            mock__pool_iterations.call_args_list)
+        self.assertEqual(3, mock_thread.start.call_count)
+        mock_thread.join.assert_called_once_with(None)
+        mock_runner.ResultBatcher.assert_called_once_with(mock_queue)
+        mock_batcher.close.assert_called_once_with()
+        mock_runner._worker_done.assert_called_once_with(mock_queue)
+
+    @mock.patch(RUNNERS + "constant._reap_threads")
+    @mock.patch(RUNNERS + "constant._pool_iterations")
+    @mock.patch(RUNNERS + "constant.runner")
+    def test__pool_worker_process_timeout(self, mock_runner,
+                                          mock__pool_iterations,
+                                          mock__reap_threads):
+        threads = [mock.MagicMock() for i in range(3)]
+        mock_runner.ScenarioThread.side_effect = threads
+        info = {"processes_to_start": 1, "processes_counter": 1}
+
+        def reap_threads(pool, hung_threads):
+            thread = pool.popleft()
+            if thread is threads[0]:
+                hung_threads.append(thread)
+                return 1
+            return 0
+
+        mock__reap_threads.side_effect = reap_threads
+
+        constant._pool_worker_process(mock.MagicMock(), "iteration_gen", 5, 2,
+                                      10, "context", "Dummy", "dummy", (),
+                                      mock.MagicMock(), info)
+
+        # NOTE: the first thread has timed out and was replaced
+        self.assertEqual(3, mock_runner.ScenarioThread.call_count)
+        for thread in threads:
+            thread.start.assert_called_once_with()
+        threads[0].join.assert_called_once_with(
+            constant.POOL_WATCH_INTERVAL)
+        mock_runner._join_threads.assert_called_once_with(
+            collections.deque(), [threads[0]])
+
+    @mock.patch(RUNNERS + "constant.runner")
+    def test__pool_iterations(self, mock_runner):
+        mock_event = mock.MagicMock(
+            is_set=mock.MagicMock(return_value=False))
+
+        iterations = constant._pool_iterations(iter(range(10)), 4, "context",
+                                               "Dummy", "dummy", (),
+                                               mock_event)
+
+        scenario_context = mock_runner._get_scenario_context.return_value
+        self.assertEqual(
+            [(i, "Dummy", "dummy", scenario_context, ()) for i in range(4)],
+            list(iterations))
+
+    @mock.patch(RUNNERS + "constant.runner")
+    def test__pool_iterations_aborted(self, mock_runner):
+        mock_event = mock.MagicMock(
+            is_set=mock.MagicMock(side_effect=[False, False, True]))
+
+        iterations = constant._pool_iterations(iter(range(10)), 4, "context",
+                                               "Dummy", "dummy", (),
+                                               mock_event)
+
+        self.assertEqual(2, len(list(iterations)))
+
+    def test__reap_threads(self):
+        finished = mock.MagicMock(isAlive=mock.MagicMock(return_value=False))
+        running = mock.MagicMock(
+            isAlive=mock.MagicMock(return_value=True),
+            check_timeout=mock.MagicMock(return_value=False))
+        timed_out = mock.MagicMock(
+            isAlive=mock.MagicMock(return_value=True),
+            check_timeout=mock.MagicMock(return_value=True))
+        pool = collections.deque([finished, running, timed_out, running])
+        hung_threads = []
+
+        self.assertEqual(1, constant._reap_threads(pool, hung_threads))
+
+        self.assertEqual(collections.deque([running, running]), pool)
+        self.assertEqual([timed_out], hung_threads)
+        finished.join.assert_called_once_with()
 
     @mock.patch(RUNNERS_BASE + "_run_scenario_once")
     def test__worker_thread(self, mock__run_scenario_once):
@@ -108,6 +222,16 @@ class ConstantScenarioRunnerTestCase(test.TestCase):
         for result in runner_obj.result_queue:
             self.assertIsNotNone(runner.ScenarioRunnerResult(result))
 
+    def test__run_scenario_reuse_threads(self):
+        self.config["reuse_threads"] = True
+        runner_obj = constant.ConstantScenarioRunner(self.task, self.config)
+
+        runner_obj._run_scenario(
+            fakes.FakeScenario, "do_it", self.context, self.args)
+        self.assertEqual(len(runner_obj.result_queue), self.config["times"])
+        for result in runner_obj.result_queue:
+            self.assertIsNotNone(runner.ScenarioRunnerResult(result))
+
     def test__run_scenario_exception(self):
         runner_obj = constant.ConstantScenarioRunner(self.task, self.config)
 
@@ -260,6 +384,20 @@ class ConstantForDurationScenarioRunnerTestCase(test.TestCase):
         for result in runner_obj.result_queue:
             self.assertIsNotNone(runner.ScenarioRunnerResult(result))
 
+    @mock.patch(RUNNERS + "constant.runner")
+    def test__run_pool_iteration(self, mock_runner):
+        with mock.patch.dict(constant._pool_process_scenario):
+            constant._init_pool_process("Dummy", "dummy", self.context,
+                                        self.args)
+            result = constant._run_pool_iteration(3)
+
+        mock_runner._get_scenario_context.assert_called_once_with(
+            self.context)
+        mock_runner._run_scenario_once.assert_called_once_with(
+            (3, "Dummy", "dummy",
+             mock_runner._get_scenario_context.return_value, self.args))
+        self.assertEqual(mock_runner._run_scenario_once.return_value, result)
+
     def test_run_scenario_constantly_for_duration_exception(self):
         runner_obj = constant.ConstantForDurationScenarioRunner(
             None, self.config)
@@ -286,6 +424,23 @@ class ConstantForDurationScenarioRunnerTestCase(test.TestCase):
             self.assertIsNotNone(runner.ScenarioRunnerResult(result))
         self.assertIn("error", runner_obj.result_queue[0])
 
+    @mock.patch(RUNNERS + "constant.multiprocessing.Pool")
+    def test_run_scenario_constantly_for_duration_pool_timeout(
+            self, mock_pool):
+        mock_pool.return_value.imap.return_value.next.side_effect = [
+            multiprocessing.TimeoutError(), StopIteration()]
+        runner_obj = constant.ConstantForDurationScenarioRunner(
+            None, self.config)
+
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it",
+                                 self.context, self.args)
+
+        self.assertEqual(1, len(runner_obj.result_queue))
+        result = runner_obj.result_queue[0]
+        self.assertIsNotNone(runner.ScenarioRunnerResult(result))
+        self.assertIn("timestamp", result)
+        self.assertTrue(result["error"])
+
     def test__run_scenario_constantly_aborted(self):
         runner_obj = constant.ConstantForDurationScenarioRunner(None,
                                                                 self.config)
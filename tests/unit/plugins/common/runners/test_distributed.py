@@ -0,0 +1,179 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+import ddt
+import jsonschema
+import mock
+from oslo_config import fixture
+
+from rally import exceptions
+from rally.plugins.common.runners import distributed
+from rally.task import agent
+from rally.task import runner
+from tests.unit import fakes
+from tests.unit import test
+
+
+@ddt.ddt
+class DistributedScenarioRunnerTestCase(test.TestCase):
+
+    def setUp(self):
+        super(DistributedScenarioRunnerTestCase, self).setUp()
+        self.context = fakes.FakeUserContext({"task":
+                                             {"uuid": "uuid"}}).context
+        self.args = {"a": 1}
+        self.task = mock.MagicMock()
+
+    def _start_agents(self, count):
+        self.useFixture(fixture.Config()).config(authkey="secret",
+                                                 group="agent")
+        mock.patch("rally.task.agent.db").start()
+        self.addCleanup(mock.patch.stopall)
+        addresses = []
+        for i in range(count):
+            agent_obj = agent.Agent(host="127.0.0.1",
+                                    address="agent%d:1234" % i)
+            server = threading.Thread(target=agent_obj.serve)
+            server.start()
+            self.addCleanup(server.join)
+            self.addCleanup(agent_obj.stop)
+            addresses.append(agent_obj.listener.address)
+        mock.patch("rally.task.agent.get_live_agents",
+                   return_value=addresses).start()
+        return addresses
+
+    @ddt.data(
+        {"type": "distributed", "runner": {"type": "constant"}},
+        {"type": "distributed", "agents": 2,
+         "runner": {"type": "constant", "times": 10, "concurrency": 2,
+                    "timeout": 5}},
+        {"type": "distributed",
+         "runner": {"type": "rps", "times": 10, "rps": 2,
+                    "max_concurrency": 4}})
+    def test_validate(self, config):
+        distributed.DistributedScenarioRunner.validate(config)
+
+    @ddt.data(
+        {"type": "distributed"},
+        {"type": "distributed", "runner": {"type": "serial"}},
+        {"type": "distributed", "runner": {"type": "rps", "times": 1}},
+        {"type": "distributed", "runner": {"type": "constant"},
+         "agents": 0},
+        {"type": "distributed", "runner": {"type": "constant"},
+         "times": 10})
+    def test_validate_failed(self, config):
+        self.assertRaises(jsonschema.ValidationError,
+                          distributed.DistributedScenarioRunner.validate,
+                          config)
+
+    @ddt.data(
+        {"config": {"runner": {"type": "constant", "times": 10,
+                               "concurrency": 3}},
+         "agents_count": 2,
+         "expected": [{"type": "constant", "times": 5, "concurrency": 2},
+                      {"type": "constant", "times": 5, "concurrency": 1}]},
+        {"config": {"runner": {"type": "constant", "times": 10,
+                               "concurrency": 5},
+                    "agents": 2},
+         "agents_count": 3,
+         "expected": [{"type": "constant", "times": 5, "concurrency": 3},
+                      {"type": "constant", "times": 5, "concurrency": 2}]},
+        {"config": {"runner": {"type": "constant", "times": 10}},
+         "agents_count": 3,
+         "expected": [{"type": "constant", "times": 10, "concurrency": 1}]},
+        {"config": {"runner": {"type": "rps", "times": 3, "rps": 6,
+                               "max_concurrency": 4}},
+         "agents_count": 5,
+         "expected": [{"type": "rps", "times": 1, "rps": 2.0,
+                       "max_concurrency": 2},
+                      {"type": "rps", "times": 1, "rps": 2.0,
+                       "max_concurrency": 1},
+                      {"type": "rps", "times": 1, "rps": 2.0,
+                       "max_concurrency": 1}]})
+    @ddt.unpack
+    def test__split_config(self, config, agents_count, expected):
+        config["type"] = "distributed"
+        runner_obj = distributed.DistributedScenarioRunner(self.task, config)
+        self.assertEqual(expected, runner_obj._split_config(agents_count))
+
+    def test__run_scenario(self):
+        self._start_agents(2)
+        runner_obj = distributed.DistributedScenarioRunner(
+            self.task, {"type": "distributed",
+                        "runner": {"type": "constant", "times": 5,
+                                   "concurrency": 2}})
+
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        self.assertEqual(5, len(runner_obj.result_queue))
+        for result in runner_obj.result_queue:
+            self.assertIsNotNone(runner.ScenarioRunnerResult(result))
+
+    @mock.patch("rally.task.agent.connect")
+    @mock.patch("rally.task.agent.get_live_agents",
+                return_value=[("host1", 1), ("host2", 2)])
+    def test__run_scenario_iteration_offsets(self, mock_get_live_agents,
+                                             mock_connect):
+        mock_connect.return_value.recv.return_value = ("done", None)
+        runner_obj = distributed.DistributedScenarioRunner(
+            self.task, {"type": "distributed",
+                        "runner": {"type": "constant", "times": 5,
+                                   "concurrency": 2}})
+
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        jobs = [call[0][0][1]
+                for call in mock_connect.return_value.send.call_args_list]
+        self.assertEqual([0, 3],
+                         [job["context"]["iteration_offset"] for job in jobs])
+        self.assertNotIn("iteration_offset", self.context)
+
+    def test__run_scenario_aborted(self):
+        self._start_agents(2)
+        runner_obj = distributed.DistributedScenarioRunner(
+            self.task, {"type": "distributed",
+                        "runner": {"type": "rps", "times": 1000,
+                                   "rps": 20}})
+        runner_obj.abort()
+
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        self.assertTrue(len(runner_obj.result_queue) < 1000)
+
+    def test__run_scenario_agent_failed(self):
+        self._start_agents(1)
+        runner_obj = distributed.DistributedScenarioRunner(
+            self.task, {"type": "distributed",
+                        "runner": {"type": "constant", "times": 2}})
+        fake_scenario = mock.MagicMock()
+        fake_scenario.get_name.return_value = "NoSuchScenario"
+
+        self.assertRaises(exceptions.AgentFailure, runner_obj._run_scenario,
+                          fake_scenario, "do_it", self.context, self.args)
+
+    @mock.patch("rally.task.agent.get_live_agents", return_value=[])
+    def test__run_scenario_no_agents(self, mock_get_live_agents):
+        runner_obj = distributed.DistributedScenarioRunner(
+            self.task, {"type": "distributed",
+                        "runner": {"type": "constant"}})
+
+        self.assertRaises(exceptions.NoAgentsFound, runner_obj._run_scenario,
+                          fakes.FakeScenario, "do_it", self.context,
+                          self.args)
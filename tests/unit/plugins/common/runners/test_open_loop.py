@@ -0,0 +1,148 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import ddt
+import jsonschema
+import mock
+
+from rally.plugins.common.runners import open_loop
+from rally.task import runner
+from tests.unit import fakes
+from tests.unit import test
+
+
+RUNNERS = "rally.plugins.common.runners."
+
+
+@ddt.ddt
+class OpenLoopScenarioRunnerTestCase(test.TestCase):
+
+    def setUp(self):
+        super(OpenLoopScenarioRunnerTestCase, self).setUp()
+        self.config = {"type": "open_loop", "times": 4, "rps": 100,
+                       "max_cpu_count": 2}
+        self.context = fakes.FakeUserContext({"task":
+                                             {"uuid": "uuid"}}).context
+        self.args = {"a": 1}
+        self.task = mock.MagicMock()
+
+    def test_validate(self):
+        self.config.update({"distribution": "uniform", "seed": 42})
+        open_loop.OpenLoopScenarioRunner.validate(self.config)
+
+    @ddt.data({"rps": 0}, {"distribution": "normal"}, {"timeout": 10},
+              {"seed": "42"})
+    def test_validate_failed(self, config):
+        self.config.update(config)
+        self.assertRaises(jsonschema.ValidationError,
+                          open_loop.OpenLoopScenarioRunner.validate,
+                          self.config)
+
+    @ddt.data("poisson", "uniform", "constant")
+    def test__get_schedule(self, distribution):
+        schedule = open_loop._get_schedule(1000, 10, distribution, seed=42)
+
+        self.assertEqual(1000, len(schedule))
+        self.assertEqual(0.0, schedule[0])
+        self.assertEqual(sorted(schedule), schedule)
+        # NOTE: average rate should be close to the requested one
+        self.assertAlmostEqual(100, schedule[-1], delta=10)
+        self.assertEqual(
+            schedule,
+            open_loop._get_schedule(1000, 10, distribution, seed=42))
+
+    def test__get_schedule_constant(self):
+        self.assertEqual([0.0, 0.5, 1.0],
+                         open_loop._get_schedule(3, 2, "constant"))
+
+    @mock.patch(RUNNERS + "open_loop.runner._run_scenario_once")
+    def test__worker_thread(self, mock__run_scenario_once):
+        mock__run_scenario_once.return_value = {
+            "duration": 1.0, "timestamp": 10.5,
+            "scenario_output": {"errors": "", "data": {"foo": 1}}}
+        mock_queue = mock.MagicMock()
+
+        open_loop._worker_thread(mock_queue, "args", 10.0)
+
+        mock__run_scenario_once.assert_called_once_with("args")
+        mock_queue.put.assert_called_once_with({
+            "duration": 1.0, "timestamp": 10.5, "scheduled_timestamp": 10.0,
+            "scenario_output": {"errors": "",
+                                "data": {"foo": 1, "start_delay": 0.5,
+                                         "corrected_duration": 1.5}}})
+
+    @mock.patch(RUNNERS + "open_loop.time")
+    @mock.patch(RUNNERS + "open_loop.threading.Thread")
+    @mock.patch(RUNNERS + "open_loop.runner")
+    def test__worker_process(self, mock_runner, mock_thread, mock_time):
+        mock_time.time.side_effect = [100.0, 100.5, 103.0]
+        mock_thread.return_value.isAlive.return_value = False
+        mock_event = mock.MagicMock(
+            is_set=mock.MagicMock(return_value=False))
+        mock_queue = mock.MagicMock()
+        schedule = [(0, 0.0), (2, 1.0), (4, 2.0)]
+        info = {"processes_to_start": 1, "processes_counter": 1}
+
+        open_loop._worker_process(mock_queue, schedule, 100.0, "context",
+                                  "Dummy", "dummy", (), mock_event, info)
+
+        self.assertEqual([mock.call(0.5)], mock_event.wait.mock_calls)
+        mock_batcher = mock_runner.ResultBatcher.return_value
+        scenario_context = mock_runner._get_scenario_context.return_value
+        self.assertEqual(
+            [mock.call(target=open_loop._worker_thread,
+                       args=(mock_batcher,
+                             (i, "Dummy", "dummy", scenario_context, ()),
+                             100.0 + offset))
+             for i, offset in schedule],
+            mock_thread.call_args_list)
+        self.assertEqual(3, mock_thread.return_value.join.call_count)
+        mock_batcher.close.assert_called_once_with()
+        mock_runner._worker_done.assert_called_once_with(mock_queue)
+
+    def test__run_scenario(self):
+        runner_obj = open_loop.OpenLoopScenarioRunner(self.task, self.config)
+
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        self.assertEqual(self.config["times"], len(runner_obj.result_queue))
+        for result in runner_obj.result_queue:
+            self.assertIsNotNone(runner.ScenarioRunnerResult(result))
+            data = result["scenario_output"]["data"]
+            self.assertEqual(result["duration"] + data["start_delay"],
+                             data["corrected_duration"])
+
+    def test__run_scenario_same_start_for_processes(self):
+        self.config["distribution"] = "constant"
+        runner_obj = open_loop.OpenLoopScenarioRunner(self.task, self.config)
+
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        scheduled = sorted(result["scheduled_timestamp"]
+                           for result in runner_obj.result_queue)
+        self.assertEqual(self.config["times"], len(scheduled))
+        for prev, next_ in zip(scheduled, scheduled[1:]):
+            self.assertAlmostEqual(0.01, next_ - prev, delta=1e-6)
+
+    def test__run_scenario_aborted(self):
+        runner_obj = open_loop.OpenLoopScenarioRunner(self.task, self.config)
+
+        runner_obj.abort()
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        self.assertEqual(0, len(runner_obj.result_queue))
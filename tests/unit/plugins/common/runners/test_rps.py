@@ -13,6 +13,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 import jsonschema
 import mock
 
@@ -65,11 +67,10 @@ class RPSScenarioRunnerTestCase(test.TestCase):
 
     @mock.patch(RUNNERS + "rps.LOG")
     @mock.patch(RUNNERS + "rps.time")
-    @mock.patch(RUNNERS + "rps.threading.Thread")
     @mock.patch(RUNNERS + "rps.multiprocessing.Queue")
     @mock.patch(RUNNERS + "rps.runner")
-    def test__worker_process(self, mock_runner, mock_queue, mock_thread,
-                             mock_time, mock_log):
+    def test__worker_process(self, mock_runner, mock_queue, mock_time,
+                             mock_log):
 
         def time_side():
             time_side.last += 0.03
@@ -82,7 +83,7 @@ class RPSScenarioRunnerTestCase(test.TestCase):
 
         mock_thread_instance = mock.MagicMock(
             isAlive=mock.MagicMock(return_value=False))
-        mock_thread.return_value = mock_thread_instance
+        mock_runner.ScenarioThread.return_value = mock_thread_instance
 
         mock_event = mock.MagicMock(
             is_set=mock.MagicMock(return_value=False))
@@ -101,7 +102,7 @@ class RPSScenarioRunnerTestCase(test.TestCase):
                             (), mock_event, info)
 
         self.assertEqual(times, mock_log.debug.call_count)
-        self.assertEqual(times, mock_thread.call_count)
+        self.assertEqual(times, mock_runner.ScenarioThread.call_count)
         self.assertEqual(times, mock_thread_instance.start.call_count)
         self.assertEqual(times, mock_thread_instance.join.call_count)
         self.assertEqual(times - 1, mock_time.sleep.call_count)
@@ -109,13 +110,39 @@ class RPSScenarioRunnerTestCase(test.TestCase):
         self.assertEqual(times * 4 - 1, mock_time.time.count)
         self.assertEqual(times, mock_runner._get_scenario_context.call_count)
 
+        mock_batcher = mock_runner.ResultBatcher.return_value
         for i in range(times):
             scenario_context = mock_runner._get_scenario_context(context)
-            call = mock.call(args=(mock_queue,
-                                   (i, "Dummy", "dummy",
-                                    scenario_context, ())),
-                             target=mock_runner._worker_thread)
-            self.assertIn(call, mock_thread.mock_calls)
+            call = mock.call(mock_batcher,
+                             [(i, "Dummy", "dummy", scenario_context, ())], 1)
+            self.assertIn(call, mock_runner.ScenarioThread.mock_calls)
+        mock_runner._join_threads.assert_called_once_with(
+            collections.deque(), [])
+        mock_runner.ResultBatcher.assert_called_once_with(mock_queue)
+        mock_batcher.close.assert_called_once_with()
+        mock_runner._worker_done.assert_called_once_with(mock_queue)
+
+    @mock.patch(RUNNERS + "rps.time")
+    @mock.patch(RUNNERS + "rps.runner")
+    def test__worker_process_timeout(self, mock_runner, mock_time):
+        mock_time.time.side_effect = [0, 0, 0.5, 0.5, 0.5, 1.5, 1.5, 1.5]
+        hung_thread = mock.MagicMock(
+            isAlive=mock.MagicMock(return_value=True),
+            check_timeout=mock.MagicMock(return_value=True))
+        mock_runner.ScenarioThread.side_effect = [
+            hung_thread,
+            mock.MagicMock(isAlive=mock.MagicMock(return_value=False))]
+        info = {"processes_to_start": 1, "processes_counter": 1}
+
+        rps._worker_process(mock.MagicMock(), iter(range(10)), 1, 2, 2, 1,
+                            {}, "Dummy", "dummy", (), mock.MagicMock(
+                                is_set=mock.MagicMock(return_value=False)),
+                            info)
+
+        hung_thread.check_timeout.assert_called_once_with()
+        self.assertEqual(2, mock_runner.ScenarioThread.call_count)
+        self.assertEqual([hung_thread],
+                         mock_runner._join_threads.call_args[0][1])
 
     @mock.patch(RUNNERS + "rps.runner._run_scenario_once")
     def test__worker_thread(self, mock__run_scenario_once):
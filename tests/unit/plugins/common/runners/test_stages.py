@@ -0,0 +1,165 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import functools
+
+import ddt
+import jsonschema
+import mock
+
+from rally.plugins.common.runners import stages
+from rally.task import runner
+from tests.unit import fakes
+from tests.unit import test
+
+
+RUNNERS = "rally.plugins.common.runners."
+
+
+@ddt.ddt
+class StagesScenarioRunnerTestCase(test.TestCase):
+
+    def setUp(self):
+        super(StagesScenarioRunnerTestCase, self).setUp()
+        self.context = fakes.FakeUserContext({"task":
+                                             {"uuid": "uuid"}}).context
+        self.args = {"a": 1}
+        self.task = mock.MagicMock()
+
+    @ddt.data(
+        {"type": "stages",
+         "stages": [{"type": "constant", "times": 2, "concurrency": 1},
+                    {"type": "rps", "times": 4, "rps": 2.5,
+                     "max_concurrency": 2}]},
+        {"type": "stages",
+         "ramp": {"type": "constant", "times": 10, "start": 1, "end": 5,
+                  "steps": 5, "timeout": 10}},
+        {"type": "stages",
+         "ramp": {"type": "rps", "times": 10, "start": 0.5, "end": 5,
+                  "steps": 3, "max_cpu_count": 2}})
+    def test_validate(self, config):
+        stages.StagesScenarioRunner.validate(config)
+
+    @ddt.data(
+        {"type": "stages"},
+        {"type": "stages", "stages": []},
+        {"type": "stages", "ramp": {"type": "rps", "times": 2, "start": 0,
+                                    "end": 2, "steps": 2}},
+        {"type": "stages", "stages": [{"type": "serial", "times": 2}]},
+        {"type": "stages", "stages": [{"type": "rps", "times": 2}]},
+        {"type": "stages",
+         "stages": [{"type": "constant", "times": 2, "rps": 2}]},
+        {"type": "stages", "ramp": {"type": "constant", "times": 2,
+                                    "start": 1, "end": 2}},
+        {"type": "stages", "ramp": {"type": "constant", "times": 2,
+                                    "start": 1, "end": 2, "steps": 2,
+                                    "concurrency": 2}},
+        {"type": "stages", "stages": [{"type": "constant"}],
+         "ramp": {"type": "constant", "times": 2, "start": 1, "end": 2,
+                  "steps": 2}})
+    def test_validate_failed(self, config):
+        self.assertRaises(jsonschema.ValidationError,
+                          stages.StagesScenarioRunner.validate, config)
+
+    def test__get_stages(self):
+        config = {"type": "stages",
+                  "stages": [{"type": "constant", "times": 2}]}
+        runner_obj = stages.StagesScenarioRunner(self.task, config)
+        self.assertEqual(config["stages"], runner_obj._get_stages())
+
+    @ddt.data(
+        {"ramp": {"type": "constant", "times": 3, "start": 1, "end": 10,
+                  "steps": 4},
+         "expected": [{"type": "constant", "times": 3, "concurrency": c}
+                      for c in (1, 4, 7, 10)]},
+        {"ramp": {"type": "constant", "times": 3, "start": 1, "end": 2,
+                  "steps": 3, "timeout": 5},
+         "expected": [{"type": "constant", "times": 3, "concurrency": c,
+                       "timeout": 5} for c in (1, 2, 2)]},
+        {"ramp": {"type": "constant", "times": 3, "start": 0.1, "end": 2,
+                  "steps": 2},
+         "expected": [{"type": "constant", "times": 3, "concurrency": c}
+                      for c in (1, 2)]},
+        {"ramp": {"type": "rps", "times": 3, "start": 10, "end": 5,
+                  "steps": 3},
+         "expected": [{"type": "rps", "times": 3, "rps": r}
+                      for r in (10.0, 7.5, 5.0)]},
+        {"ramp": {"type": "rps", "times": 3, "start": 2, "end": 5,
+                  "steps": 1},
+         "expected": [{"type": "rps", "times": 3, "rps": 2.0}]})
+    @ddt.unpack
+    def test__get_stages_ramp(self, ramp, expected):
+        runner_obj = stages.StagesScenarioRunner(
+            self.task, {"type": "stages", "ramp": ramp})
+        self.assertEqual(expected, runner_obj._get_stages())
+
+    @mock.patch(RUNNERS + "stages.runner.ScenarioRunner.get")
+    def test__run_scenario_stage_runners(self, mock_scenario_runner_get):
+        config = {"type": "stages",
+                  "stages": [{"type": "constant", "times": 2},
+                             {"type": "rps", "times": 2, "rps": 1}]}
+        runner_obj = stages.StagesScenarioRunner(self.task, config)
+        stage_runners = []
+
+        def run_scenario(stage_runner, *args):
+            stage_runner._send_result({"duration": 1.0})
+            stage_runners.append(stage_runner)
+
+        def get_runner(name):
+            stage_runner_cls = mock.MagicMock()
+            stage_runner = stage_runner_cls.return_value
+            stage_runner._run_scenario.side_effect = functools.partial(
+                run_scenario, stage_runner)
+            return stage_runner_cls
+
+        mock_scenario_runner_get.side_effect = get_runner
+
+        runner_obj._run_scenario("cls", "method", "context", "args")
+
+        self.assertEqual([mock.call("constant"), mock.call("rps")],
+                         mock_scenario_runner_get.call_args_list)
+        for stage_runner in stage_runners:
+            self.assertEqual(runner_obj.aborted, stage_runner.aborted)
+            stage_runner._run_scenario.assert_called_once_with(
+                "cls", "method", "context", "args")
+        self.assertEqual([{"duration": 1.0, "stage": 0},
+                          {"duration": 1.0, "stage": 1}],
+                         list(runner_obj.result_queue))
+
+    def test__run_scenario(self):
+        config = {"type": "stages",
+                  "ramp": {"type": "constant", "times": 3, "start": 1,
+                           "end": 2, "steps": 2}}
+        runner_obj = stages.StagesScenarioRunner(self.task, config)
+
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        self.assertEqual(6, len(runner_obj.result_queue))
+        for result in runner_obj.result_queue:
+            self.assertIsNotNone(runner.ScenarioRunnerResult(result))
+        self.assertEqual([0, 0, 0, 1, 1, 1],
+                         [r["stage"] for r in runner_obj.result_queue])
+
+    def test__run_scenario_aborted(self):
+        config = {"type": "stages",
+                  "stages": [{"type": "constant", "times": 3}]}
+        runner_obj = stages.StagesScenarioRunner(self.task, config)
+
+        runner_obj.abort()
+        runner_obj._run_scenario(fakes.FakeScenario, "do_it", self.context,
+                                 self.args)
+
+        self.assertEqual(0, len(runner_obj.result_queue))
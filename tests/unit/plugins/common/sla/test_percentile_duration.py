@@ -0,0 +1,88 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+import ddt
+import jsonschema
+import mock
+
+from rally.plugins.common.sla import percentile_duration
+from tests.unit import test
+
+
+@ddt.ddt
+class MaxPercentileDurationTestCase(test.TestCase):
+
+    def test_config_schema(self):
+        percentile_duration.MaxPercentileDuration.validate(
+            {"max_percentile_duration": {"percentile": 99, "max": 1.5}})
+
+    @ddt.data({}, {"max": 0}, {"percentile": 100, "max": 1},
+              {"percentile": 0, "max": 1}, {"max": 1, "foo": 1})
+    def test_config_schema_invalid(self, config):
+        self.assertRaises(jsonschema.ValidationError,
+                          percentile_duration.MaxPercentileDuration.validate,
+                          {"max_percentile_duration": config})
+
+    def test_result(self):
+        sla1 = percentile_duration.MaxPercentileDuration({"max": 42})
+        sla2 = percentile_duration.MaxPercentileDuration(
+            {"percentile": 50, "max": 2.5})
+        for sla in [sla1, sla2]:
+            for duration in [1.0, 2.0, 3.0, 4.0, 5.0]:
+                sla.add_iteration({"duration": duration})
+        self.assertTrue(sla1.result()["success"])
+        self.assertFalse(sla2.result()["success"])
+        self.assertEqual("Passed", sla1.status())
+        self.assertEqual("Failed", sla2.status())
+
+    def test_result_no_iterations(self):
+        sla = percentile_duration.MaxPercentileDuration({"max": 42})
+        self.assertTrue(sla.result()["success"])
+
+    def test_add_iteration(self):
+        sla = percentile_duration.MaxPercentileDuration(
+            {"percentile": 50, "max": 2.0})
+        self.assertTrue(sla.add_iteration({"duration": 1.0}))
+        self.assertTrue(sla.add_iteration({"duration": 1.5}))
+        self.assertTrue(sla.add_iteration({"duration": 9.0,
+                                           "error": ["error"]}))
+        self.assertTrue(sla.add_iteration({"duration": 5.0}))
+        self.assertFalse(sla.add_iteration({"duration": 4.0}))
+        for i in range(3):
+            sla.add_iteration({"duration": 0.5})
+        self.assertTrue(sla.add_iteration({"duration": 0.5}))
+
+    @mock.patch("rally.plugins.common.sla.percentile_duration."
+                "streaming_algorithms.QuantileSketch.result")
+    def test_add_iteration_percentile_not_crossing_max(
+            self, mock_quantile_sketch_result):
+        mock_quantile_sketch_result.return_value = 1.0
+        sla = percentile_duration.MaxPercentileDuration(
+            {"percentile": 50, "max": 2.0})
+        for i in range(100):
+            self.assertTrue(sla.add_iteration({"duration": 0.5 + i % 2}))
+        self.assertFalse(mock_quantile_sketch_result.called)
+        mock_quantile_sketch_result.return_value = 3.0
+        self.assertFalse(sla.add_iteration({"duration": 2.5}))
+        self.assertEqual(1, mock_quantile_sketch_result.call_count)
+
+    def test_details(self):
+        sla = percentile_duration.MaxPercentileDuration(
+            {"percentile": 50, "max": 2.0})
+        for duration in [1.0, 1.5, 0.5]:
+            sla.add_iteration({"duration": duration})
+        self.assertIn("1.00s <= 2.00s - Passed", sla.details())
+        self.assertEqual(1.0, sla.value)
@@ -32,6 +32,7 @@ class ResourceDecoratorTestCase(test.TestCase):
 
         self.assertEqual(Fake._service, "service")
         self.assertEqual(Fake._resource, "res")
+        self.assertEqual(1000, Fake._list_limit)
 
 
 class ResourceManagerTestCase(test.TestCase):
@@ -99,6 +100,50 @@ class ResourceManagerTestCase(test.TestCase):
         self.assertFalse(manager.is_deleted())
         self.assertTrue(manager.is_deleted())
 
+    @mock.patch("%s.ResourceManager.list" % BASE)
+    def test_check_deleted(self, mock_resource_manager_list):
+        mock_resource_manager_list.return_value = [
+            mock.MagicMock(id="active", status="ACTIVE"),
+            mock.MagicMock(id="deleting", status="DELETED")]
+        res = [base.ResourceManager(resource=mock.MagicMock(id=uuid))
+               for uuid in ("active", "deleting", "gone")]
+
+        self.assertEqual(res[1:], res[0].check_deleted(res))
+        mock_resource_manager_list.assert_called_once_with()
+
+    @mock.patch("%s.ResourceManager.is_deleted" % BASE)
+    @mock.patch("%s.ResourceManager.list" % BASE)
+    def test_check_deleted_list_truncated(self, mock_resource_manager_list,
+                                          mock_resource_manager_is_deleted):
+
+        @base.resource("service", "res", list_limit=2)
+        class Fake(base.ResourceManager):
+            pass
+
+        mock_resource_manager_list.return_value = [
+            mock.MagicMock(id="active", status="ACTIVE"),
+            mock.MagicMock(id="deleting", status="DELETED")]
+        mock_resource_manager_is_deleted.side_effect = [False, True]
+        res = [Fake(resource=mock.MagicMock(id=uuid))
+               for uuid in ("active", "deleting", "next_page", "gone")]
+
+        self.assertEqual([res[1], res[3]], res[0].check_deleted(res))
+        self.assertEqual(2, mock_resource_manager_is_deleted.call_count)
+
+    @mock.patch("%s.ResourceManager.list" % BASE)
+    def test_check_deleted_is_deleted_overridden(
+            self, mock_resource_manager_list):
+
+        class Fake(base.ResourceManager):
+            def is_deleted(self):
+                return self.raw_resource.deleted
+
+        res = [Fake(resource=mock.MagicMock(deleted=deleted))
+               for deleted in (True, False, True)]
+
+        self.assertEqual([res[0], res[2]], res[0].check_deleted(res))
+        self.assertFalse(mock_resource_manager_list.called)
+
     @mock.patch("%s.ResourceManager._manager" % BASE)
     def test_delete(self, mock_resource_manager__manager):
         res = mock.MagicMock(id="test_id")
@@ -45,7 +45,8 @@ class AdminCleanupTestCase(test.TestCase):
                           context.AdminCleanup.validate, {})
 
     @mock.patch("%s.manager.find_resource_managers" % BASE,
-                return_value=[mock.MagicMock(), mock.MagicMock()])
+                return_value=[mock.MagicMock(_order=1, _independent=False),
+                              mock.MagicMock(_order=2, _independent=False)])
     @mock.patch("%s.manager.SeekAndDestroy" % BASE)
     def test_cleanup(self, mock_seek_and_destroy, mock_find_resource_managers):
 
@@ -97,7 +98,8 @@ class UserCleanupTestCase(test.TestCase):
                           context.UserCleanup.validate, {})
 
     @mock.patch("%s.manager.find_resource_managers" % BASE,
-                return_value=[mock.MagicMock(), mock.MagicMock()])
+                return_value=[mock.MagicMock(_order=1, _independent=False),
+                              mock.MagicMock(_order=2, _independent=False)])
     @mock.patch("%s.manager.SeekAndDestroy" % BASE)
     def test_cleanup(self, mock_seek_and_destroy, mock_find_resource_managers):
 
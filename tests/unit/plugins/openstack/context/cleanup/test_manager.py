@@ -13,9 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import threading
+
 import mock
 import six
 
+from rally.common import broker
 from rally.plugins.openstack.context.cleanup import base
 from rally.plugins.openstack.context.cleanup import manager
 from tests.unit import test
@@ -46,56 +49,125 @@ class SeekAndDestroyTestCase(test.TestCase):
             manager.SeekAndDestroy._get_cached_client(users[0], cache=cache),
             manager.SeekAndDestroy._get_cached_client(users[1], cache=cache))
 
+    @mock.patch("%s.time.time" % BASE, return_value=100)
     @mock.patch("%s.LOG" % BASE)
-    def test__delete_single_resource(self, mock_log):
+    def test__delete_single_resource(self, mock_log, mock_time):
         mock_resource = mock.MagicMock(_max_attempts=3, _timeout=10,
                                        _interval=0.01)
         mock_resource.delete.side_effect = [Exception, Exception, True]
-        mock_resource.is_deleted.side_effect = [False, False, True]
 
-        manager.SeekAndDestroy(None, None, None)._delete_single_resource(
-            mock_resource)
+        destroyer = manager.SeekAndDestroy(None, None, None)
+        destroyer._delete_single_resource(mock_resource, {"id": "u1"})
 
         mock_resource.delete.assert_has_calls([mock.call()] * 3)
         self.assertEqual(mock_resource.delete.call_count, 3)
-        mock_resource.is_deleted.assert_has_calls([mock.call()] * 3)
-        self.assertEqual(mock_resource.is_deleted.call_count, 3)
+        self.assertFalse(mock_resource.is_deleted.called)
+        self.assertEqual(
+            {"u1": {"resources": [(mock_resource, 110)], "failures": 0}},
+            destroyer._pending)
 
         # NOTE(boris-42): No logs and no exceptions means no bugs!
         self.assertEqual(0, mock_log.call_count)
 
     @mock.patch("%s.LOG" % BASE)
-    def test__delete_single_resource_timeout(self, mock_log):
+    def test__delete_single_resource_failed(self, mock_log):
+        mock_resource = mock.MagicMock(_max_attempts=2, _timeout=10,
+                                       _interval=0.01)
+        mock_resource.delete.side_effect = Exception
 
-        mock_resource = mock.MagicMock(_max_attempts=1, _timeout=0.02,
-                                       _interval=0.025)
+        destroyer = manager.SeekAndDestroy(None, None, None)
+        destroyer._delete_single_resource(mock_resource)
 
-        mock_resource.delete.return_value = True
-        mock_resource.is_deleted.side_effect = [False, False, True]
+        self.assertEqual(2, mock_resource.delete.call_count)
+        self.assertEqual({}, destroyer._pending)
+        self.assertEqual(1, mock_log.warning.call_count)
 
-        manager.SeekAndDestroy(None, None, None)._delete_single_resource(
-            mock_resource)
+    def _pending_resources(self, destroyer, key, count, timeout=10):
+        resources = [mock.MagicMock(_max_attempts=3, _timeout=timeout,
+                                    _interval=0)
+                     for i in range(count)]
+        for resource in resources:
+            resource.check_deleted = resources[0].check_deleted
+            destroyer._delete_single_resource(resource, key and {"id": key})
+        return resources
 
-        mock_resource.delete.assert_called_once_with()
-        mock_resource.is_deleted.assert_called_once_with()
+    @mock.patch("%s.LOG" % BASE)
+    def test__check_pending(self, mock_log):
+        destroyer = manager.SeekAndDestroy(None, None, None)
+        resources = self._pending_resources(destroyer, "u1", 3)
+        check_deleted = resources[0].check_deleted
+        check_deleted.side_effect = [resources[:2], resources[2:]]
+
+        destroyer._check_pending("u1", destroyer._pending["u1"])
+        check_deleted.assert_called_once_with(resources)
+        self.assertEqual([resources[2]],
+                         [r for r, d in destroyer._pending["u1"]["resources"]])
+
+        destroyer._check_pending("u1", destroyer._pending["u1"])
+        check_deleted.assert_called_with(resources[2:])
+        self.assertEqual({}, destroyer._pending)
+        self.assertFalse(mock_log.warning.called)
 
-        self.assertEqual(1, mock_log.warning.call_count)
+    @mock.patch("%s.LOG" % BASE)
+    def test__check_pending_timeout(self, mock_log):
+        destroyer = manager.SeekAndDestroy(None, None, None)
+        resources = self._pending_resources(destroyer, None, 2, timeout=-1)
+        resources[0].check_deleted.return_value = []
+
+        destroyer._check_pending(None, destroyer._pending[None])
+
+        self.assertEqual({}, destroyer._pending)
+        self.assertEqual(2, mock_log.warning.call_count)
 
     @mock.patch("%s.LOG" % BASE)
-    def test__delete_single_resource_excpetion_in_is_deleted(self, mock_log):
-        mock_resource = mock.MagicMock(_max_attempts=3, _timeout=10,
-                                       _interval=0)
-        mock_resource.delete.return_value = True
-        mock_resource.is_deleted.side_effect = [Exception] * 4
-        manager.SeekAndDestroy(None, None, None)._delete_single_resource(
-            mock_resource)
+    def test__check_pending_exception_in_check_deleted(self, mock_log):
+        destroyer = manager.SeekAndDestroy(None, None, None)
+        resources = self._pending_resources(destroyer, "u1", 1)
+        resources[0].check_deleted.side_effect = Exception
 
-        mock_resource.delete.assert_called_once_with()
-        self.assertEqual(4, mock_resource.is_deleted.call_count)
+        for i in range(4):
+            destroyer._check_pending("u1", destroyer._pending["u1"])
 
+        self.assertEqual({}, destroyer._pending)
+        self.assertEqual(4, resources[0].check_deleted.call_count)
         self.assertEqual(5, mock_log.warning.call_count)
         self.assertEqual(4, mock_log.exception.call_count)
 
+    @mock.patch("%s.time.sleep" % BASE)
+    def test__poll_deleted(self, mock_sleep):
+        manager_cls = mock.MagicMock(_interval=2)
+        destroyer = manager.SeekAndDestroy(manager_cls, None, None)
+        users_resources = [self._pending_resources(destroyer, key, 2)
+                           for key in ("u1", "u2")]
+        for resources in users_resources:
+            resources[0].check_deleted.side_effect = [[], resources]
+        destroyer._finish_requests()
+
+        destroyer._poll_deleted()
+
+        for resources in users_resources:
+            resources[0].check_deleted.assert_has_calls(
+                [mock.call(resources)] * 2)
+        mock_sleep.assert_called_once_with(2)
+        self.assertEqual({}, destroyer._pending)
+
+    @mock.patch("%s.time.sleep" % BASE)
+    def test__poll_deleted_waits_for_deletion(self, mock_sleep):
+        destroyer = manager.SeekAndDestroy(mock.MagicMock(), None, None)
+        poller = threading.Thread(target=destroyer._poll_deleted)
+        poller.start()
+
+        resource = mock.MagicMock(_max_attempts=3, _timeout=10)
+        resource.check_deleted.return_value = [resource]
+        destroyer._delete_single_resource(resource, {"id": "u1"})
+        destroyer._finish_requests()
+        poller.join(5)
+
+        self.assertFalse(poller.is_alive())
+        resource.check_deleted.assert_called_once_with([resource])
+        self.assertEqual({}, destroyer._pending)
+        self.assertFalse(mock_sleep.called)
+
     def _manager(self, list_side_effect, **kw):
         mock_mgr = mock.MagicMock()
         mock_mgr().list.side_effect = list_side_effect
@@ -136,17 +208,26 @@ class SeekAndDestroyTestCase(test.TestCase):
             admin=mock__get_cached_client.return_value)
         self.assertEqual(queue, [(admin, None, x) for x in range(1, 4)])
 
+    def _tenant_managers(self, list_side_effects, **kw):
+        managers = dict(
+            (tenant, mock.MagicMock(**{"list.side_effect": side_effect}))
+            for tenant, side_effect in six.iteritems(list_side_effects))
+        mock_mgr = mock.MagicMock(
+            side_effect=lambda **kwargs: managers[kwargs["tenant_uuid"]],
+            _threads=2, **kw)
+        return mock_mgr, managers
+
     @mock.patch("%s.SeekAndDestroy._get_cached_client" % BASE)
     def test__gen_publisher_user_resource(self, mock__get_cached_client):
-        mock_mgr = self._manager([Exception, Exception, [1, 2, 3],
-                                  Exception, Exception, [4, 5]],
-                                 _perform_for_admin_only=False,
-                                 _tenant_resource=True)
+        mock_mgr, managers = self._tenant_managers(
+            {1: [Exception, Exception, [1, 2, 3]],
+             2: [Exception, Exception, [4, 5]]},
+            _perform_for_admin_only=False, _tenant_resource=True)
 
         admin = mock.MagicMock()
         users = [{"tenant_id": 1, "id": 1}, {"tenant_id": 2, "id": 2}]
-        publish = manager.SeekAndDestroy(
-            mock_mgr, admin, users)._gen_publisher()
+        seek_and_destroy = manager.SeekAndDestroy(mock_mgr, admin, users)
+        publish = seek_and_destroy._gen_publisher()
 
         queue = []
         publish(queue)
@@ -155,30 +236,29 @@ class SeekAndDestroyTestCase(test.TestCase):
         mock_mgr.assert_has_calls([
             mock.call(admin=mock_client, user=mock_client,
                       tenant_uuid=users[0]["tenant_id"]),
-            mock.call().list(),
-            mock.call().list(),
-            mock.call().list(),
             mock.call(admin=mock_client, user=mock_client,
-                      tenant_uuid=users[1]["tenant_id"]),
-            mock.call().list(),
-            mock.call().list()
-        ])
+                      tenant_uuid=users[1]["tenant_id"])
+        ], any_order=True)
+        self.assertEqual(3, managers[1].list.call_count)
+        self.assertEqual(3, managers[2].list.call_count)
         mock__get_cached_client.assert_has_calls([
             mock.call(admin),
             mock.call(users[0]),
             mock.call(users[1])
-        ])
+        ], any_order=True)
         expected_queue = [(admin, users[0], x) for x in range(1, 4)]
         expected_queue += [(admin, users[1], x) for x in range(4, 6)]
-        self.assertEqual(queue, expected_queue)
+        self.assertEqual(sorted(expected_queue, key=lambda x: x[2]),
+                         sorted(queue, key=lambda x: x[2]))
+        self.assertEqual(5, seek_and_destroy.listed_count)
 
     @mock.patch("%s.SeekAndDestroy._get_cached_client" % BASE)
     def test__gen_publisher_tenant_resource(self, mock__get_cached_client):
-        mock_mgr = self._manager([Exception, [1, 2, 3],
-                                  Exception, Exception, Exception,
-                                  ["this shouldn't be in results"]],
-                                 _perform_for_admin_only=False,
-                                 _tenant_resource=True)
+        mock_mgr, managers = self._tenant_managers(
+            {1: [Exception, [1, 2, 3]],
+             2: [Exception, Exception, Exception,
+                 ["this shouldn't be in results"]]},
+            _perform_for_admin_only=False, _tenant_resource=True)
         users = [{"tenant_id": 1, "id": 1},
                  {"tenant_id": 1, "id": 2},
                  {"tenant_id": 2, "id": 3}]
@@ -190,22 +270,20 @@ class SeekAndDestroyTestCase(test.TestCase):
         publish(queue)
 
         mock_client = mock__get_cached_client.return_value
+        self.assertEqual(2, mock_mgr.call_count)
         mock_mgr.assert_has_calls([
             mock.call(admin=mock_client, user=mock_client,
                       tenant_uuid=users[0]["tenant_id"]),
-            mock.call().list(),
-            mock.call().list(),
             mock.call(admin=mock_client, user=mock_client,
-                      tenant_uuid=users[2]["tenant_id"]),
-            mock.call().list(),
-            mock.call().list(),
-            mock.call().list()
-        ])
+                      tenant_uuid=users[2]["tenant_id"])
+        ], any_order=True)
+        self.assertEqual(2, managers[1].list.call_count)
+        self.assertEqual(3, managers[2].list.call_count)
         mock__get_cached_client.assert_has_calls([
             mock.call(None),
             mock.call(users[0]),
             mock.call(users[2])
-        ])
+        ], any_order=True)
         self.assertEqual(queue, [(None, users[0], x) for x in range(1, 4)])
 
     @mock.patch("%s.SeekAndDestroy._get_cached_client" % BASE)
@@ -231,7 +309,7 @@ class SeekAndDestroyTestCase(test.TestCase):
             mock.call(user1, cache=cache)
         ])
         mock__delete_single_resource.assert_called_once_with(
-            mock_mgr.return_value)
+            mock_mgr.return_value, user1)
 
         mock_mgr.reset_mock()
         mock__get_cached_client.reset_mock()
@@ -249,7 +327,7 @@ class SeekAndDestroyTestCase(test.TestCase):
             mock.call(None, cache=cache)
         ])
         mock__delete_single_resource.assert_called_once_with(
-            mock_mgr.return_value)
+            mock_mgr.return_value, None)
 
     @mock.patch("%s.SeekAndDestroy._gen_consumer" % BASE)
     @mock.patch("%s.SeekAndDestroy._gen_publisher" % BASE)
@@ -265,7 +343,7 @@ class SeekAndDestroyTestCase(test.TestCase):
         mock_broker_run.assert_called_once_with(
             mock__gen_publisher.return_value,
             mock__gen_consumer.return_value,
-            consumers_count=5)
+            consumers_count=5, max_size=5 * broker.QUEUE_SIZE_PER_CONSUMER)
 
 
 class ResourceManagerTestCase(test.TestCase):
@@ -333,22 +411,95 @@ class ResourceManagerTestCase(test.TestCase):
                          manager.find_resource_managers(names=["fake"],
                                                         admin_required=False))
 
+    def _res_manager(self, order, independent=False):
+        return self._get_res_mock(_service="s%d" % order, _resource="r",
+                                  _order=order, _independent=independent)
+
+    def test__get_cleanup_branches(self):
+        nova = [self._res_manager(200), self._res_manager(201)]
+        glance = [self._res_manager(500, independent=True)]
+        swift = [self._res_manager(1000, independent=True),
+                 self._res_manager(1001, independent=True)]
+        sahara = [self._res_manager(600), self._res_manager(601, True)]
+        keystone = [self._res_manager(9000), self._res_manager(9001, True)]
+
+        self.assertEqual(
+            ([nova + sahara, glance, swift], keystone),
+            manager._get_cleanup_branches(
+                nova + glance + sahara + swift + keystone))
+        self.assertEqual(([glance], []),
+                         manager._get_cleanup_branches(glance))
+        self.assertEqual(([], keystone),
+                         manager._get_cleanup_branches(keystone))
+        self.assertEqual(([], []), manager._get_cleanup_branches([]))
+
     @mock.patch("%s.SeekAndDestroy" % BASE)
-    @mock.patch("%s.find_resource_managers" % BASE,
-                return_value=[mock.MagicMock(), mock.MagicMock()])
+    @mock.patch("%s.find_resource_managers" % BASE)
     def test_cleanup(self, mock_find_resource_managers, mock_seek_and_destroy):
+        managers = [self._res_manager(200), self._res_manager(300),
+                    self._res_manager(500, independent=True),
+                    self._res_manager(9000)]
+        mock_find_resource_managers.return_value = managers
+        cleaned = []
+        mock_seek_and_destroy.side_effect = (
+            lambda mgr, admin, users: mock.Mock(
+                exterminate=lambda: cleaned.append(mgr)))
+
         manager.cleanup(names=["a", "b"], admin_required=True,
                         admin="admin", users=["user"])
 
         mock_find_resource_managers.assert_called_once_with(["a", "b"], True)
-
         mock_seek_and_destroy.assert_has_calls([
-            mock.call(
-                mock_find_resource_managers.return_value[0], "admin", ["user"]
-            ),
-            mock.call().exterminate(),
-            mock.call(
-                mock_find_resource_managers.return_value[1], "admin", ["user"]
-            ),
-            mock.call().exterminate()
-        ])
+            mock.call(managers[0], "admin", ["user"]),
+            mock.call(managers[1], "admin", ["user"]),
+            mock.call(managers[2], "admin", ["user"]),
+            mock.call(managers[3], "admin", ["user"])
+        ], any_order=True)
+        self.assertEqual(4, len(cleaned))
+        self.assertLess(cleaned.index(managers[0]),
+                        cleaned.index(managers[1]))
+        self.assertEqual(managers[3], cleaned[-1])
+
+    @mock.patch("%s.LOG" % BASE)
+    @mock.patch("%s.SeekAndDestroy" % BASE)
+    @mock.patch("%s.find_resource_managers" % BASE)
+    def test_cleanup_failed(self, mock_find_resource_managers,
+                            mock_seek_and_destroy, mock_log):
+        managers = [self._res_manager(200), self._res_manager(300)]
+        mock_find_resource_managers.return_value = managers
+        mock_seek_and_destroy.return_value.exterminate.side_effect = [
+            Exception, None]
+
+        manager.cleanup(names=["a"], admin="admin", users=["user"])
+
+        self.assertEqual(2, mock_seek_and_destroy.call_count)
+        self.assertEqual(1, mock_log.warning.call_count)
+
+    @mock.patch("%s.LOG" % BASE)
+    @mock.patch("%s.SeekAndDestroy" % BASE)
+    @mock.patch("%s.find_resource_managers" % BASE)
+    def test_cleanup_failed_in_branches(self, mock_find_resource_managers,
+                                        mock_seek_and_destroy, mock_log):
+        managers = [self._res_manager(200), self._res_manager(300),
+                    self._res_manager(500, independent=True),
+                    self._res_manager(501, independent=True),
+                    self._res_manager(9000)]
+        mock_find_resource_managers.return_value = managers
+        cleaned = []
+
+        def exterminate(mgr):
+            if mgr in (managers[0], managers[2]):
+                raise Exception("failed")
+            cleaned.append(mgr)
+
+        mock_seek_and_destroy.side_effect = (
+            lambda mgr, admin, users: mock.Mock(
+                exterminate=lambda: exterminate(mgr)))
+
+        manager.cleanup(names=["a"], admin="admin", users=["user"])
+
+        self.assertEqual(5, mock_seek_and_destroy.call_count)
+        self.assertEqual([managers[1], managers[3], managers[4]],
+                         sorted(cleaned, key=lambda mgr: mgr._order))
+        self.assertEqual(managers[4], cleaned[-1])
+        self.assertEqual(2, mock_log.warning.call_count)
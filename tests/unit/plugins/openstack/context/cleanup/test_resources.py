@@ -39,7 +39,9 @@ class AllResourceManagerTestCase(test.TestCase):
                 "_admin_required", "_perform_for_admin_only",
                 "_tenant_resource", "_service", "_resource", "_order",
                 "_max_attempts", "_timeout", "_interval", "_threads",
-                "_manager", "id", "is_deleted", "delete", "list"
+                "_independent", "_list_limit",
+                "_manager", "id", "is_deleted", "check_deleted", "delete",
+                "list"
             ])
 
             extra_opts = set(fields) - available_opts
@@ -56,6 +58,11 @@ class SynchronizedDeletionTestCase(test.TestCase):
     def test_is_deleted(self):
         self.assertTrue(resources.SynchronizedDeletion().is_deleted())
 
+    def test_check_deleted(self):
+        res = [mock.MagicMock(), mock.MagicMock()]
+        self.assertEqual(
+            res, resources.SynchronizedDeletion().check_deleted(iter(res)))
+
 
 class QuotaMixinTestCase(test.TestCase):
 
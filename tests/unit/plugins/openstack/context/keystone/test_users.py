@@ -182,9 +182,8 @@ class UserGeneratorTestCase(test.TestCase):
                                                           "nova-network")
         nova_admin.networks.disassociate.assert_called_once_with(networks[0])
 
-    @mock.patch("%s.broker.time.sleep" % CTX)
     @mock.patch("%s.keystone" % CTX)
-    def test__create_tenants(self, mock_keystone, mock_sleep):
+    def test__create_tenants(self, mock_keystone):
         user_generator = users.UserGenerator(self.context)
         user_generator.config["tenants"] = 1
         tenants = user_generator._create_tenants()
@@ -192,9 +191,8 @@ class UserGeneratorTestCase(test.TestCase):
         id, tenant = tenants.popitem()
         self.assertIn("name", tenant)
 
-    @mock.patch("%s.broker.time.sleep" % CTX)
     @mock.patch("%s.keystone" % CTX)
-    def test__create_users(self, mock_keystone, mock_sleep):
+    def test__create_users(self, mock_keystone):
         user_generator = users.UserGenerator(self.context)
         user_generator.context["tenants"] = {"t1": dict(id="t1", name="t1"),
                                              "t2": dict(id="t2", name="t2")}
@@ -357,3 +355,197 @@ class UserGeneratorTestCase(test.TestCase):
 
         for user in users_:
             self.assertEqual("public", user["endpoint"].endpoint_type)
+
+
+class UserGeneratorPoolTestCase(test.TestCase):
+
+    @property
+    def context(self):
+        return {
+            "config": {
+                "users": {
+                    "tenants": 2,
+                    "users_per_tenant": 1,
+                    "resource_management_workers": 1,
+                    "use_pool": True
+                }
+            },
+            "admin": {"endpoint": objects.Endpoint("url", "foo", "pass")},
+            "task": {"uuid": "task_id", "deployment_uuid": "dep_id"}
+        }
+
+    def setUp(self):
+        super(UserGeneratorPoolTestCase, self).setUp()
+        self.osclients_patcher = mock.patch("%s.osclients" % CTX)
+        self.osclients = self.osclients_patcher.start()
+
+    def tearDown(self):
+        self.osclients_patcher.stop()
+        super(UserGeneratorPoolTestCase, self).tearDown()
+
+    def _pooled(self, pool_id, tenant_id, user_ids):
+        endpoint = objects.Endpoint("url", "user", "pass")
+        return {"id": pool_id,
+                "tenant": {"id": tenant_id, "name": "name_" + tenant_id},
+                "users": [{"id": user_id,
+                           "endpoint": endpoint.to_dict(
+                               include_permission=True)}
+                          for user_id in user_ids]}
+
+    @mock.patch("%s.keystone" % CTX)
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_setup(self, mock_user_pool, mock_keystone):
+        pool = mock_user_pool.return_value
+        pool.lease.return_value = [self._pooled(1, "t1", ["u1", "u2"])]
+        pool.add.return_value = {"id": 2}
+        wrapped_keystone = mock_keystone.wrap.return_value
+        wrapped_keystone.create_project.return_value = mock.Mock(
+            id="t2", name="name_t2")
+        wrapped_keystone.create_user.return_value = mock.Mock(id="u3")
+
+        ctx = users.UserGenerator(self.context)
+        ctx.setup()
+
+        mock_user_pool.assert_called_once_with("dep_id")
+        pool.lease.assert_called_once_with("task_id", 2, 1, "default",
+                                           "default")
+        self.assertEqual(["t1", "t2"], sorted(ctx.context["tenants"]))
+        self.assertEqual([("u1", "t1"), ("u3", "t2")],
+                         [(u["id"], u["tenant_id"])
+                          for u in ctx.context["users"]])
+        self.assertEqual("user", ctx.context["users"][0]["endpoint"].username)
+        self.assertEqual(1, wrapped_keystone.create_project.call_count)
+        pool.add.assert_called_once_with(
+            "task_id", ctx.context["tenants"]["t2"],
+            [ctx.context["users"][1]], "default", "default")
+        self.assertEqual({"t1": 1, "t2": 2}, ctx._pool_ids)
+
+    @mock.patch("%s.keystone" % CTX)
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_setup_all_leased(self, mock_user_pool, mock_keystone):
+        pool = mock_user_pool.return_value
+        pool.lease.return_value = [self._pooled(1, "t1", ["u1"]),
+                                   self._pooled(2, "t2", ["u2"])]
+
+        ctx = users.UserGenerator(self.context)
+        ctx.setup()
+
+        self.assertEqual(2, len(ctx.context["tenants"]))
+        self.assertEqual(2, len(ctx.context["users"]))
+        self.assertFalse(mock_keystone.wrap.called)
+        self.assertFalse(pool.add.called)
+
+    @mock.patch("%s.keystone" % CTX)
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_cleanup(self, mock_user_pool, mock_keystone):
+        pool = mock_user_pool.return_value
+        pool.list.return_value = [self._pooled(1, "t1", ["u1"]),
+                                  self._pooled(2, "t2", ["u2", "u3"]),
+                                  self._pooled(3, "t3", ["u4"])]
+        wrapped_keystone = mock_keystone.wrap.return_value
+        wrapped_keystone.list_projects.return_value = [
+            mock.Mock(id="t1"), mock.Mock(id="t2")]
+        wrapped_keystone.list_users.return_value = [
+            mock.Mock(id="u1"), mock.Mock(id="u3"), mock.Mock(id="u4")]
+
+        ctx = users.UserGenerator(self.context)
+        ctx._pool_ids = {"t1": 1, "t2": 2, "t3": 3}
+        ctx.cleanup()
+
+        pool.list.assert_called_once_with(task_uuid="task_id")
+        pool.release.assert_called_once_with([1])
+        pool.delete.assert_has_calls([mock.call(2), mock.call(3)],
+                                     any_order=True)
+        wrapped_keystone.delete_user.assert_has_calls(
+            [mock.call("u3"), mock.call("u4")], any_order=True)
+        self.assertEqual(2, wrapped_keystone.delete_user.call_count)
+        wrapped_keystone.delete_project.assert_called_once_with("t2")
+        self.assertEqual({}, ctx._pool_ids)
+
+    @mock.patch("%s.keystone" % CTX)
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_cleanup_verification_failed(self, mock_user_pool,
+                                         mock_keystone):
+        pool = mock_user_pool.return_value
+        wrapped_keystone = mock_keystone.wrap.return_value
+        wrapped_keystone.list_projects.side_effect = Exception
+
+        ctx = users.UserGenerator(self.context)
+        ctx._pool_ids = {"t1": 1, "t2": 2}
+        ctx.cleanup()
+
+        self.assertEqual([1, 2], sorted(pool.release.call_args[0][0]))
+        self.assertFalse(pool.delete.called)
+        self.assertFalse(wrapped_keystone.delete_user.called)
+        self.assertFalse(wrapped_keystone.delete_project.called)
+        self.assertEqual({}, ctx._pool_ids)
+
+    @mock.patch("%s.keystone" % CTX)
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_cleanup_client_failed(self, mock_user_pool, mock_keystone):
+        pool = mock_user_pool.return_value
+        mock_keystone.wrap.side_effect = Exception
+
+        ctx = users.UserGenerator(self.context)
+        ctx._pool_ids = {"t1": 1}
+        ctx.cleanup()
+
+        pool.release.assert_called_once_with([1])
+        self.assertFalse(pool.delete.called)
+
+    @mock.patch("%s.keystone" % CTX)
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_purge_pool(self, mock_user_pool, mock_keystone):
+        pool = mock_user_pool.return_value
+        pool.list.return_value = [self._pooled(1, "t1", ["u1", "u2"]),
+                                  self._pooled(2, "t2", ["u3"])]
+        wrapped_keystone = mock_keystone.wrap.return_value
+        wrapped_keystone.delete_project.side_effect = [Exception, None]
+        deployment = {"uuid": "dep_id",
+                      "admin": {"auth_url": "url", "username": "admin",
+                                "password": "pass"}}
+
+        users.UserGenerator.purge_pool(deployment)
+
+        mock_user_pool.assert_called_once_with("dep_id")
+        wrapped_keystone.delete_user.assert_has_calls(
+            [mock.call("u1"), mock.call("u2"), mock.call("u3")],
+            any_order=True)
+        self.assertEqual(2, wrapped_keystone.delete_project.call_count)
+        pool.delete.assert_has_calls([mock.call(1), mock.call(2)],
+                                     any_order=True)
+
+    @mock.patch("%s.keystone" % CTX)
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_purge_pool_keystone_unavailable(self, mock_user_pool,
+                                             mock_keystone):
+        pool = mock_user_pool.return_value
+        pool.list.return_value = [self._pooled(1, "t1", ["u1"]),
+                                  self._pooled(2, "t2", ["u2"])]
+        pool.delete.side_effect = [None, exceptions.UserPoolTenantNotFound(
+            id=2)]
+        mock_keystone.wrap.side_effect = Exception
+        deployment = {"uuid": "dep_id",
+                      "admin": {"auth_url": "url", "username": "admin",
+                                "password": "pass"}}
+
+        users.UserGenerator.purge_pool(deployment)
+
+        pool.delete.assert_has_calls([mock.call(1), mock.call(2)],
+                                     any_order=True)
+
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_purge_pool_without_admin(self, mock_user_pool):
+        pool = mock_user_pool.return_value
+        pool.list.return_value = [self._pooled(1, "t1", ["u1"])]
+
+        users.UserGenerator.purge_pool({"uuid": "dep_id", "admin": None})
+
+        pool.delete.assert_called_once_with(1)
+        self.assertFalse(self.osclients.Clients.called)
+
+    @mock.patch("%s.objects.UserPool" % CTX)
+    def test_purge_pool_empty(self, mock_user_pool):
+        mock_user_pool.return_value.list.return_value = []
+        users.UserGenerator.purge_pool({"uuid": "dep_id", "admin": None})
+        self.assertFalse(self.osclients.Clients.called)
@@ -0,0 +1,69 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import ddt
+
+from rally.common import streaming_algorithms as algo
+from rally.task.processing.charts import histogram as histo
+from tests.unit import test
+
+
+def _linear_y_axis(data, x_axis):
+    y_axis = [0] * len(x_axis)
+    for data_point in data:
+        for i, bin in enumerate(x_axis):
+            if data_point <= bin:
+                y_axis[i] += 1
+                break
+    return y_axis
+
+
+DATA = ([1.0], [1.0, 1.0, 1.0], [3.0, 1.0, 2.0, 2.5, 0.1],
+        [0.5 * i for i in range(100)], [(i * 7919 % 101) / 10.0
+                                        for i in range(300)])
+
+
+@ddt.ddt
+class HistogramTestCase(test.TestCase):
+
+    @ddt.data(*DATA)
+    def test_get_sketch_histograms_axes(self, data):
+        sketch = algo.QuantileSketch()
+        [sketch.add(v) for v in data]
+
+        histograms = histo.get_sketch_histograms_axes(sketch)
+        self.assertEqual([v["method"] for v in histo.hvariety(data)],
+                         [method for method, x_axis, y_axis in histograms])
+        for variety, (method, x_axis, y_axis) in zip(histo.hvariety(data),
+                                                     histograms):
+            bin_width = (max(data) - min(data)) / variety["number_of_bins"]
+            self.assertEqual([min(data) + bin_width * i
+                              for i in range(1, len(x_axis) + 1)], x_axis)
+            self.assertEqual(_linear_y_axis(data, x_axis), y_axis)
+
+    def test_get_sketch_histograms_axes_estimated(self):
+        data = [(i * 7919 % 1009) / 10.0 + 1 for i in range(3000)]
+        sketch = algo.QuantileSketch(max_bins=100)
+        [sketch.add(v) for v in data]
+
+        histograms = histo.get_sketch_histograms_axes(sketch)
+        self.assertEqual([v["method"] for v in histo.hvariety(data)],
+                         [method for method, x_axis, y_axis in histograms])
+        for variety, (method, x_axis, y_axis) in zip(histo.hvariety(data),
+                                                     histograms):
+            self.assertEqual(min(variety["number_of_bins"], 100),
+                             len(x_axis))
+            self.assertAlmostEqual(max(data), x_axis[-1])
+            self.assertEqual(len(data), sum(y_axis))
@@ -20,6 +20,7 @@ import mock
 import testtools
 
 from rally.task.processing import plot
+from rally.task.processing import summary
 from tests.unit import test
 
 PLOT = "rally.task.processing.plot."
@@ -45,6 +46,7 @@ class PlotTestCase(test.TestCase):
         )
         mock_ui_utils.get_template.assert_called_once_with("task/report.mako")
 
+    @mock.patch(PLOT + "_process_timeseries")
     @mock.patch(PLOT + "json.dumps")
     @mock.patch(PLOT + "_prepare_data")
     @mock.patch(PLOT + "_process_atomic")
@@ -53,7 +55,7 @@ class PlotTestCase(test.TestCase):
     def test__process_results(
             self, mock__process_main_duration,
             mock__get_atomic_action_durations, mock__process_atomic,
-            mock__prepare_data, mock_dumps):
+            mock__prepare_data, mock_dumps, mock__process_timeseries):
         sla = [{"success": True}]
         result = ["iter_1", "iter_2"]
         iterations = len(result)
@@ -80,7 +82,9 @@ class PlotTestCase(test.TestCase):
                                                     "output_errors": [],
                                                     "sla": i["sla"],
                                                     "load_duration": 1234.5,
-                                                    "full_duration": 6789.1}
+                                                    "full_duration": 6789.1,
+                                                    "iterations_num": 2,
+                                                    "summary": "summary"}
         mock__process_main_duration.return_value = "main_duration"
         mock__get_atomic_action_durations.return_value = atomic_durations
         mock__process_atomic.return_value = "main_atomic"
@@ -92,6 +96,7 @@ class PlotTestCase(test.TestCase):
         mock_dumps.assert_called_with(source_dict, indent=2,
                                       sort_keys=True)
         self.assertEqual(source, "JSON")
+        mock__get_atomic_action_durations.assert_called_with("summary")
 
         results = sorted(results, key=lambda r: "%s%s" % (r["key"]["name"],
                                                           r["key"]["pos"]))
@@ -109,6 +114,7 @@ class PlotTestCase(test.TestCase):
                 "config": config,
                 "iterations": mock__process_main_duration.return_value,
                 "atomic": mock__process_atomic.return_value,
+                "timeline": mock__process_timeseries.return_value,
                 "table_cols": table_cols,
                 "table_rows": atomic_durations,
                 "errors": "errors_list",
@@ -130,6 +136,7 @@ class PlotTestCase(test.TestCase):
                     "error": [],
                     "duration": 1,
                     "idle_duration": 2,
+                    "timestamp": 1,
                     "atomic_actions": {},
                     "scenario_output": {"errors": [], "data": {}}
                 },
@@ -137,6 +144,7 @@ class PlotTestCase(test.TestCase):
                     "error": ["some", "error", "occurred"],
                     "duration": 1,
                     "idle_duration": 1,
+                    "timestamp": 2,
                     "atomic_actions": {},
                     "scenario_output": {"errors": [], "data": {}}
                 },
@@ -144,6 +152,7 @@ class PlotTestCase(test.TestCase):
                     "error": [],
                     "duration": 2,
                     "idle_duration": 3,
+                    "timestamp": 3,
                     "atomic_actions": {},
                     "scenario_output": {"errors": [], "data": {}}
                 }
@@ -175,18 +184,18 @@ class PlotTestCase(test.TestCase):
                 {
                     "key": "task",
                     "method": "Square Root Choice",
-                    "values": [{"x": 1.0, "y": 1.0}, {"x": 1.0, "y": 0.0}]
+                    "values": [{"x": 1.5, "y": 1.0}, {"x": 2.0, "y": 1.0}]
                 },
                 {
                     "key": "task",
                     "method": "Sturges Formula",
-                    "values": [{"x": 1.0, "y": 1.0}, {"x": 1.0, "y": 0.0}]
+                    "values": [{"x": 1.5, "y": 1.0}, {"x": 2.0, "y": 1.0}]
                 },
                 {
                     "key": "task",
                     "method": "Rice Rule",
-                    "values": [{"x": 1.0, "y": 1.0}, {"x": 1.0, "y": 0.0},
-                               {"x": 1.0, "y": 0.0}]
+                    "values": [{"x": 1.33, "y": 1.0}, {"x": 1.67, "y": 0.0},
+                               {"x": 2.0, "y": 1.0}]
                 },
                 {
                     "key": "task",
@@ -227,12 +236,11 @@ class PlotTestCase(test.TestCase):
             ]
         }
 
-        data = {
-            "atomic_durations": {
-                "action1": [(1, 1.0), (2, 0.0), (3, 3.0)],
-                "action2": [(1, 2.0), (2, 0.0), (3, 4.0)]}}
+        for r in result["result"]:
+            r.update({"duration": 1, "idle_duration": 0, "timestamp": 1})
+        result.update({"sla": [], "load_duration": 1, "full_duration": 2})
 
-        output = plot._process_atomic(result, data)
+        output = plot._process_atomic(result, plot._prepare_data(result))
 
         self.assertEqual({
             "histogram": [
@@ -253,8 +261,8 @@ class PlotTestCase(test.TestCase):
                         "key": "action1",
                         "disabled": 0,
                         "method": "Rice Rule",
-                        "values": [{"x": 1, "y": 1}, {"x": 1, "y": 0},
-                                   {"x": 1, "y": 0}]
+                        "values": [{"x": 1.67, "y": 1}, {"x": 2.33, "y": 0},
+                                   {"x": 3, "y": 1}]
                     },
                     {
                         "key": "action1",
@@ -280,8 +288,8 @@ class PlotTestCase(test.TestCase):
                         "key": "action2",
                         "disabled": 1,
                         "method": "Rice Rule",
-                        "values": [{"x": 2, "y": 1}, {"x": 2, "y": 0},
-                                   {"x": 2, "y": 0}]
+                        "values": [{"x": 2.67, "y": 1}, {"x": 3.33, "y": 0},
+                                   {"x": 4, "y": 1}]
                     },
                     {
                         "key": "action2",
@@ -298,19 +306,16 @@ class PlotTestCase(test.TestCase):
             "iter": [
                 {
                     "key": "action1",
-                    "values": [(1, 1.), (2, 0.), (3, 3.)]
+                    "values": [(1, 1.), (2, 1.), (3, 3.)]
                 },
                 {
                     "key": "action2",
-                    "values": [(1, 2.), (2, 0.), (3, 4.)]
+                    "values": [(1, 2.), (2, 2.), (3, 4.)]
                 }
             ]
         }, output)
 
-    @mock.patch("rally.task.processing.utils.compress")
-    def test__prepare_data(self, mock_compress):
-
-        mock_compress.side_effect = lambda i, **kv: i
+    def test__prepare_data(self):
         rows_num = 100
         load_duration = 1234.5
         full_duration = 6789.1
@@ -324,16 +329,20 @@ class PlotTestCase(test.TestCase):
             row = {
                 "duration": i * 3.1,
                 "idle_duration": i * 0.2,
+                "timestamp": i,
                 "error": [],
                 "atomic_actions": atomic_actions,
                 "scenario_output": {"errors": ["err"],
-                                    "data": {"out_key": "out_value"}}
+                                    "data": {"out_key": i * 0.5}}
             }
             data.append(row)
 
         data[42]["error"] = ["foo", "bar", "spam"]
         data[52]["error"] = ["spam", "bar", "foo"]
 
+        def series(values):
+            return [(i, round(v, 2)) for i, v in enumerate(values, 1)]
+
         values_atomic_a1 = [i + 0.1 for i in range(rows_num)]
         values_atomic_a2 = [i + 0.8 for i in range(rows_num)]
         values_duration = [i * 3.1 for i in range(rows_num)]
@@ -350,21 +359,25 @@ class PlotTestCase(test.TestCase):
                                             "key": "foo_key"})
         self.assertEqual(2, len(prepared_data["errors"]))
 
-        calls = [mock.call(values_atomic_a1),
-                 mock.call(values_atomic_a2),
-                 mock.call(values_duration),
-                 mock.call(values_idle)]
-        mock_compress.assert_has_calls(calls)
-
+        success = [i for i in range(rows_num) if i not in (42, 52)]
         expected_output = [{"key": "out_key",
-                            "values": ["out_value"] * rows_num}]
+                            "values": series([i * 0.5
+                                              for i in range(rows_num)])}]
         expected_output_errors = [(i, [e])
                                   for i, e in enumerate(["err"] * rows_num)]
+        self.assertEqual(
+            summary.summarize(data), prepared_data.pop("summary"))
+        atomic_pie = prepared_data.pop("atomic_pie")
+        self.assertEqual(["a1", "a2"], sorted(p["key"] for p in atomic_pie))
+        for p in atomic_pie:
+            shift = {"a1": 0.1, "a2": 0.8}[p["key"]]
+            self.assertAlmostEqual(
+                sum(i + shift for i in success) / len(success), p["value"])
         self.assertEqual({
-            "total_durations": {"duration": values_duration,
-                                "idle_duration": values_idle},
-            "atomic_durations": {"a1": values_atomic_a1,
-                                 "a2": values_atomic_a2},
+            "total_durations": {"duration": series(values_duration),
+                                "idle_duration": series(values_idle)},
+            "atomic_durations": {"a1": series(values_atomic_a1),
+                                 "a2": series(values_atomic_a2)},
             "errors": [{"iteration": 42,
                         "message": "bar",
                         "traceback": "spam",
@@ -375,7 +388,92 @@ class PlotTestCase(test.TestCase):
                         "type": "spam"}],
             "output": expected_output,
             "output_errors": expected_output_errors,
+            "success": rows_num - 2,
+            "iterations_num": rows_num,
             "load_duration": load_duration,
             "full_duration": full_duration,
             "sla": sla,
         }, prepared_data)
+
+    def test__process_timeseries(self):
+        stats = lambda m, p: {"median": m, "95%ile": p}
+        summary = {"timeseries": {"window": 0.5, "start": 10, "rows": [
+            {"time": 0.0, "started": 2, "completed": 1, "failed": 0,
+             "duration": stats(1.0, 1.5),
+             "atomic": [{"name": "a", "stats": stats(0.5, 0.75)}]},
+            {"time": 0.5, "started": 0, "completed": 0, "failed": 1,
+             "duration": None, "atomic": []}]}}
+
+        self.assertEqual({
+            "throughput": [
+                {"key": "started", "values": [(0.0, 4.0), (0.5, 0.0)]},
+                {"key": "completed", "values": [(0.0, 2.0), (0.5, 0.0)]},
+                {"key": "failed", "values": [(0.0, 0.0), (0.5, 2.0)]}],
+            "latency": [
+                {"key": "total median", "values": [(0.0, 1.0)]},
+                {"key": "total 95%ile", "values": [(0.0, 1.5)]},
+                {"key": "a median", "values": [(0.0, 0.5)]},
+                {"key": "a 95%ile", "values": [(0.0, 0.75)]}]},
+            plot._process_timeseries({"summary": summary}))
+
+    def test__process_timeseries_gaps(self):
+        row = lambda time: {"time": time, "started": 1, "completed": 1,
+                            "failed": 0, "duration": None, "atomic": []}
+        summary = {"timeseries": {"window": 1.0, "start": 10, "rows": [
+            row(0.0), row(2.0), row(10.0), row(11.0)]}}
+
+        throughput = plot._process_timeseries({"summary": summary})[
+            "throughput"]
+
+        self.assertEqual(
+            [(0.0, 1.0), (1.0, 0.0), (2.0, 1.0), (3.0, 0.0), (9.0, 0.0),
+             (10.0, 1.0), (11.0, 1.0)],
+            throughput[0]["values"])
+
+    def test__process_timeseries_missing(self):
+        empty = {"throughput": [], "latency": []}
+        self.assertEqual(empty, plot._process_timeseries({"summary": {}}))
+        self.assertEqual(empty, plot._process_timeseries(
+            {"summary": {"timeseries": {"window": 1.0, "start": None,
+                                        "rows": []}}}))
+
+    def test__prepare_data_missing_values(self):
+        def row(atomic, output):
+            return {"duration": 1, "idle_duration": 0, "timestamp": 1,
+                    "error": [],
+                    "atomic_actions": atomic,
+                    "scenario_output": {"errors": "", "data": output}}
+
+        result = {"result": [row({"a": 1}, {}), row({"a": 2, "b": 3},
+                                                    {"x": 4}),
+                             row({"b": 5}, {})],
+                  "sla": [], "load_duration": 1, "full_duration": 2}
+
+        prepared_data = plot._prepare_data(result)
+
+        self.assertEqual({"a": [(1, 1.0), (2, 2.0), (3, 0.0)],
+                          "b": [(1, 0.0), (2, 3.0), (3, 5.0)]},
+                         prepared_data["atomic_durations"])
+        self.assertEqual([{"key": "x",
+                           "values": [(1, 0.0), (2, 4.0), (3, 0.0)]}],
+                         prepared_data["output"])
+        self.assertEqual([{"key": "a", "value": 1.0},
+                          {"key": "b", "value": 8 / 3.0}],
+                         prepared_data["atomic_pie"])
+
+    @mock.patch(PLOT + "utils.Compressor")
+    def test__prepare_data_with_summary(self, mock_compressor):
+        rows = iter([{"duration": 1, "idle_duration": 0, "timestamp": 1,
+                      "error": [],
+                      "atomic_actions": {},
+                      "scenario_output": {"errors": "", "data": {}}}])
+
+        prepared_data = plot._prepare_data(
+            {"result": rows, "summary": {"iterations": 5},
+             "sla": [], "load_duration": 1, "full_duration": 2})
+
+        self.assertEqual({"iterations": 5}, prepared_data["summary"])
+        self.assertEqual(5, prepared_data["iterations_num"])
+        self.assertEqual(1, prepared_data["success"])
+        mock_compressor.assert_has_calls([mock.call(5), mock.call(5)])
+        self.assertEqual([], list(rows))
@@ -0,0 +1,171 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+
+from rally.common import costilius
+from rally.common import streaming_algorithms
+from rally.task.processing.charts import histogram as histo
+from rally.task.processing import summary
+from tests.unit import test
+
+
+def _result(duration, error=None, stage=None, data=None, errors="",
+            timestamp=0, **atomic):
+    result = {"duration": duration, "idle_duration": 0, "timestamp": timestamp,
+              "error": error or [],
+              "atomic_actions": costilius.OrderedDict(sorted(atomic.items())),
+              "scenario_output": {"data": data or {}, "errors": errors}}
+    if stage is not None:
+        result["stage"] = stage
+    return result
+
+
+def _sketch(values):
+    sketch = streaming_algorithms.QuantileSketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+class SummaryTestCase(test.TestCase):
+
+    def test_get_sketch_stats(self):
+        sketch = streaming_algorithms.QuantileSketch()
+        self.assertIsNone(summary.get_sketch_stats(sketch))
+        for value in [4, 1, 3, 2]:
+            sketch.add(value)
+        stats = summary.get_sketch_stats(sketch)
+        self.assertEqual({"min": 1, "median": 2.5, "max": 4, "avg": 2.5},
+                         dict((k, stats[k])
+                              for k in ("min", "median", "max", "avg")))
+        self.assertAlmostEqual(3.7, stats["90%ile"])
+        self.assertAlmostEqual(3.85, stats["95%ile"])
+
+    def test_get_sketch_histograms(self):
+        sketch = _sketch([3.0, 1.0, 2.0, 2.5, 0.1])
+        expected = []
+        for method, x_axis, y_axis in histo.get_sketch_histograms_axes(
+                sketch):
+            expected.append({
+                "method": method,
+                "values": [{"x": round(x, 2), "y": float(y)}
+                           for x, y in zip(x_axis, y_axis)]})
+        self.assertEqual(expected, summary.get_sketch_histograms(sketch))
+
+    def test_summarize_bounded_memory(self):
+        result = summary.ResultsSummary()
+        max_bins = result.total.max_bins
+        for i in range(max_bins * 3):
+            result.add_iteration(_result(1.0 + i % 100, a=0.5 + i % 10))
+
+        self.assertLessEqual(len(result.total._bins), max_bins)
+        self.assertLessEqual(len(result.atomic["a"]._bins), max_bins)
+        self.assertLessEqual(len(result.atomic_success["a"]._bins),
+                             max_bins)
+        data = result.to_dict()
+        self.assertEqual([("a", max_bins * 3), ("total", max_bins * 3)],
+                         [(a["name"], a["count"]) for a in data["atomic"]])
+        self.assertEqual(100.0, data["atomic"][1]["stats"]["max"])
+        self.assertEqual(
+            [max_bins * 3] * 4,
+            [sum(v["y"] for v in h["values"])
+             for h in data["histograms"]["total"]])
+
+    def test_summarize_bounded_size(self):
+        sizes = []
+        for times in (4, 16):
+            result = summary.ResultsSummary()
+            for i in range(result.total.max_bins * times):
+                duration = 1.0 + (i * 7919 % 1009) / 100.0
+                result.add_iteration(_result(duration, a=duration / 2))
+            sizes.append(len(json.dumps(result.to_dict())))
+            for histogram in result.to_dict()["histograms"]["total"]:
+                self.assertLessEqual(len(histogram["values"]),
+                                     result.total.max_bins)
+
+        self.assertLess(sizes[1], sizes[0] * 1.1)
+
+    def test_summarize(self):
+        raw = [_result(1.0, error=["e"], stage=0, data={"x": 1}, b=0.5),
+               _result(2.0, stage=0, data={"x": "n/a", "y": 2}, errors="err",
+                       a=1.5, b=None),
+               _result(4.0, stage=1, data={"x": 3}, a=3.5, b=0.25)]
+
+        result = summary.summarize(raw)
+
+        self.assertEqual(3, result["iterations"])
+        self.assertEqual(1, result["errors"])
+        self.assertEqual(
+            [("a", 2, 2.5), ("b", 2, 0.375), ("total", 2, 3.0)],
+            [(a["name"], a["count"], a["stats"]["avg"])
+             for a in result["atomic"]])
+        self.assertEqual(
+            [(0, 2, 1, 2.0), (1, 1, 1, 4.0)],
+            [(s["stage"], s["count"], s["success"], s["stats"]["avg"])
+             for s in result["stages"]])
+        self.assertEqual([("x", 2.0), ("y", 2.0)],
+                         [(o["key"], o["stats"]["avg"])
+                          for o in result["output"]])
+        self.assertEqual(["err"], result["output_errors"])
+        self.assertEqual(summary.get_sketch_histograms(_sketch([2.0, 4.0])),
+                         result["histograms"]["total"])
+        self.assertEqual(
+            [{"key": "a",
+              "histograms": summary.get_sketch_histograms(
+                  _sketch([1.5, 3.5]))},
+             {"key": "b",
+              "histograms": summary.get_sketch_histograms(
+                  _sketch([0.0, 0.25]))}],
+            result["histograms"]["atomic"])
+        self.assertEqual([(0.0, 3, 0, 0), (1.0, 0, 0, 1), (2.0, 0, 1, 0),
+                          (4.0, 0, 1, 0)],
+                         [(r["time"], r["started"], r["completed"],
+                           r["failed"])
+                          for r in result["timeseries"]["rows"]])
+
+    def test_summarize_timeseries_window(self):
+        result = summary.ResultsSummary(timeseries_window=2.5)
+        result.add_iteration(_result(1.0, timestamp=10))
+        self.assertEqual(2.5, result.to_dict()["timeseries"]["window"])
+
+    def test_summarize_without_timestamps(self):
+        raw = [_result(1.0, a=0.5), _result(2.0, error=["e"])]
+        for r in raw:
+            del r["timestamp"]
+
+        result = summary.summarize(raw)
+
+        self.assertEqual(2, result["iterations"])
+        self.assertEqual(1, result["errors"])
+        self.assertEqual({"window": 1.0, "start": None, "rows": []},
+                         result["timeseries"])
+
+    def test_summarize_empty(self):
+        self.assertEqual({"iterations": 0, "errors": 0,
+                          "atomic": [{"name": "total", "count": 0,
+                                      "stats": None}],
+                          "stages": [], "output": [], "output_errors": [],
+                          "histograms": {"total": [], "atomic": []},
+                          "timeseries": {"window": 1.0, "start": None,
+                                         "rows": []}},
+                         summary.summarize([]))
+
+    def test_summarize_errors_only(self):
+        result = summary.summarize([_result(1.0, error=["e"], a=1.0)])
+        self.assertEqual(1, result["errors"])
+        self.assertEqual([{"name": "total", "count": 0, "stats": None}],
+                         result["atomic"])
+        self.assertEqual({"total": [], "atomic": []}, result["histograms"])
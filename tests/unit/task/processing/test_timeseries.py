@@ -0,0 +1,94 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from rally.task.processing import timeseries
+from tests.unit import test
+
+
+def _result(timestamp, duration, error=None, idle_duration=0, **atomic):
+    return {"timestamp": timestamp, "duration": duration,
+            "idle_duration": idle_duration, "error": error or [],
+            "atomic_actions": atomic}
+
+
+class ResultsTimeSeriesTestCase(test.TestCase):
+
+    def test_to_dict(self):
+        series = timeseries.ResultsTimeSeries(window=0.5)
+        for result in [_result(100.1, 0.2, a=0.1),
+                       _result(100.2, 0.2, a=0.15, b=None),
+                       _result(100.3, 0.4, a=0.3),
+                       _result(100.4, 0.2, idle_duration=0.5,
+                               error=["e"], a=0.1),
+                       _result(101.6, 0.1)]:
+            series.add_iteration(result)
+
+        result = series.to_dict()
+
+        self.assertEqual(0.5, result["window"])
+        self.assertEqual(100.0, result["start"])
+        self.assertEqual(
+            [(0.0, 4, 2, 0), (0.5, 0, 1, 0), (1.0, 0, 0, 1),
+             (1.5, 1, 1, 0)],
+            [(r["time"], r["started"], r["completed"], r["failed"])
+             for r in result["rows"]])
+        self.assertEqual({"median": 0.2, "95%ile": 0.2},
+                         result["rows"][0]["duration"])
+        self.assertEqual(
+            [{"name": "a", "stats": {"median": 0.125, "95%ile": 0.1475}}],
+            result["rows"][0]["atomic"])
+        self.assertEqual({"median": 0.4, "95%ile": 0.4},
+                         result["rows"][1]["duration"])
+        self.assertIsNone(result["rows"][2]["duration"])
+        self.assertEqual([], result["rows"][2]["atomic"])
+
+    def test_to_dict_skips_empty_windows(self):
+        series = timeseries.ResultsTimeSeries(window=1.0)
+        series.add_iteration(_result(10.5, 0.1))
+        series.add_iteration(_result(86410.5, 0.1))
+
+        result = series.to_dict()
+
+        self.assertEqual(10.0, result["start"])
+        self.assertEqual([(0.0, 1, 1), (86400.0, 1, 1)],
+                         [(r["time"], r["started"], r["completed"])
+                          for r in result["rows"]])
+
+    def test_to_dict_empty(self):
+        self.assertEqual({"window": 1.0, "start": None, "rows": []},
+                         timeseries.ResultsTimeSeries().to_dict())
+
+    def test_closed_windows(self):
+        series = timeseries.ResultsTimeSeries(window=1.0, lag=2)
+        series.add_iteration(_result(0.5, 0.1))
+        series.add_iteration(_result(3.5, 0.1))
+        self.assertEqual(set([3]), series.open_windows)
+
+        # Late results are counted, but durations of closed windows are
+        # not changed
+        series.add_iteration(_result(0.2, 0.5))
+        series.add_iteration(_result(0.9, 0.4))
+        series.add_iteration(_result(2.1, 0.1))
+        rows = series.to_dict()["rows"]
+
+        self.assertEqual([(3, 2, 0), (0, 1, 0), (1, 1, 0), (1, 1, 0)],
+                         [(r["started"], r["completed"], r["failed"])
+                          for r in rows])
+        self.assertEqual({"median": 0.1, "95%ile": 0.1}, rows[0]["duration"])
+        self.assertIsNone(rows[1]["duration"])
+        self.assertEqual({"median": 0.1, "95%ile": 0.1}, rows[2]["duration"])
+
+    def test_invalid_window(self):
+        self.assertRaises(ValueError, timeseries.ResultsTimeSeries, 0)
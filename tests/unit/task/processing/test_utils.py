@@ -27,6 +27,17 @@ class MathTestCase(test.TestCase):
         result = utils.percentile(lst, 0.1)
         self.assertEqual(result, 10.9)
 
+    def test_percentile_keeps_values(self):
+        lst = [3, 1, 2]
+        self.assertEqual(2.6, utils.percentile(lst, 0.8))
+        self.assertEqual([3, 1, 2], lst)
+
+    def test_sorted_percentile(self):
+        lst = list(range(1, 101))
+        self.assertEqual(10.9, utils.sorted_percentile(lst, 0.1))
+        self.assertEqual(50.5, utils.sorted_percentile(lst, 0.5))
+        self.assertEqual(100, utils.sorted_percentile(lst, 1))
+
     def test_percentile_value_none(self):
         result = utils.percentile(None, 0.1)
         self.assertIsNone(result)
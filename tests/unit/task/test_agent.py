@@ -0,0 +1,188 @@
+# Copyright 2015: Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import threading
+
+import mock
+from oslo_config import fixture
+
+from rally import exceptions
+from rally.task import agent
+from rally.task import runner
+from tests.unit import fakes
+from tests.unit import test
+
+
+class GetLiveAgentsTestCase(test.TestCase):
+
+    @mock.patch("rally.task.agent.timeutils.utcnow")
+    @mock.patch("rally.task.agent.db.get_workers")
+    def test_get_live_agents(self, mock_get_workers, mock_utcnow):
+        mock_utcnow.return_value = datetime.datetime(2015, 1, 1, 0, 1)
+        mock_get_workers.return_value = [{"hostname": "host1:1234"},
+                                         {"hostname": "10.0.0.2:80"}]
+
+        self.assertEqual([("host1", 1234), ("10.0.0.2", 80)],
+                         agent.get_live_agents())
+        mock_get_workers.assert_called_once_with(
+            updated_since=datetime.datetime(2015, 1, 1, 0, 0, 45))
+
+
+class AgentInitTestCase(test.TestCase):
+
+    def test_init_authkey_not_set(self):
+        self.useFixture(fixture.Config()).config(authkey=None, group="agent")
+        self.assertRaises(exceptions.AgentAuthKeyNotSet, agent.Agent,
+                          host="127.0.0.1")
+
+
+class AgentTestCase(test.TestCase):
+
+    def setUp(self):
+        super(AgentTestCase, self).setUp()
+        self.useFixture(fixture.Config()).config(authkey="secret",
+                                                 group="agent")
+        self.mock_db = mock.patch("rally.task.agent.db").start()
+        self.addCleanup(mock.patch.stopall)
+        self.agent = agent.Agent(host="127.0.0.1", address="host:1234")
+        self.server = threading.Thread(target=self.agent.serve)
+        self.server.start()
+        self.addCleanup(self.server.join)
+        self.addCleanup(self.agent.stop)
+        self.context = fakes.FakeUserContext(
+            {"task": {"uuid": "uuid"}}).context
+
+    def _connect(self):
+        return agent.connect(self.agent.listener.address)
+
+    def test_init(self):
+        self.assertEqual("host:1234", self.agent.address)
+        self.assertEqual("127.0.0.1", self.agent.listener.address[0])
+
+    @mock.patch("rally.task.agent.socket.getfqdn", return_value="fqdn")
+    def test_init_default_address(self, mock_getfqdn):
+        agent_obj = agent.Agent(host="127.0.0.1")
+        self.addCleanup(agent_obj.listener.close)
+        self.assertEqual("fqdn:%d" % agent_obj.listener.address[1],
+                         agent_obj.address)
+
+    def test_serve_and_stop(self):
+        self.agent.stop()
+        self.server.join()
+
+        self.mock_db.register_worker.assert_called_once_with(
+            {"hostname": "host:1234"})
+        self.mock_db.unregister_worker.assert_called_once_with("host:1234")
+
+    def test_stop_authkey_unset(self):
+        self.useFixture(fixture.Config()).config(authkey=None, group="agent")
+        self.agent.stop()
+        self.server.join()
+
+        self.mock_db.unregister_worker.assert_called_once_with("host:1234")
+
+    def test_stop_failed(self):
+        with mock.patch("rally.task.agent.connection.Client",
+                        side_effect=IOError("connection refused")):
+            self.assertRaises(IOError, self.agent.stop)
+        # NOTE: The agent is still serving, so it can be stopped again
+        self.assertFalse(self.agent._stopped.is_set())
+
+    def test_serve_already_registered(self):
+        self.agent.stop()
+        self.server.join()
+        self.mock_db.register_worker.side_effect = (
+            exceptions.WorkerAlreadyRegistered(worker="host:1234"))
+        self.mock_db.update_worker.reset_mock()
+
+        agent_obj = agent.Agent(host="127.0.0.1", address="host:1234")
+        server = threading.Thread(target=agent_obj.serve)
+        server.start()
+        agent_obj.stop()
+        server.join()
+
+        self.mock_db.update_worker.assert_called_once_with("host:1234")
+
+    @mock.patch("rally.task.agent.LOG")
+    def test_heartbeat_failed(self, mock_log):
+        self.agent.stop()
+        self.server.join()
+        agent_obj = agent.Agent(host="127.0.0.1", address="host:1234")
+        self.addCleanup(agent_obj.listener.close)
+        agent_obj._stopped = mock.Mock()
+        agent_obj._stopped.wait.side_effect = [False, True]
+        self.mock_db.update_worker.side_effect = Exception("db is down")
+
+        agent_obj._heartbeat()
+
+        self.mock_db.update_worker.assert_called_once_with("host:1234")
+        self.assertTrue(mock_log.warning.called)
+
+    def test_run_job(self):
+        conn = self._connect()
+        conn.send(("run", {"task": {"uuid": "uuid"},
+                           "runner": {"type": "constant", "times": 3,
+                                      "concurrency": 2},
+                           "scenario": "FakeScenario.do_it",
+                           "context": self.context,
+                           "args": {}}))
+
+        results = []
+        while True:
+            kind, data = conn.recv()
+            if kind != "results":
+                break
+            results.extend(runner._unpack_result(r) for r in data)
+        conn.close()
+
+        self.assertEqual("done", kind)
+        self.assertEqual(3, len(results))
+        for result in results:
+            self.assertIsNotNone(runner.ScenarioRunnerResult(result))
+
+    def test_run_job_failed(self):
+        conn = self._connect()
+        conn.send(("run", {"task": {"uuid": "uuid"},
+                           "runner": {"type": "constant"},
+                           "scenario": "NoSuchScenario.do_it",
+                           "context": {}, "args": {}}))
+
+        kind, data = conn.recv()
+        conn.close()
+
+        self.assertEqual("error", kind)
+        self.assertEqual("NoSuchScenario", data[0])
+
+    def test_run_job_aborted(self):
+        conn = self._connect()
+        conn.send(("run", {"task": {"uuid": "uuid"},
+                           "runner": {"type": "rps", "times": 1000,
+                                      "rps": 10},
+                           "scenario": "FakeScenario.do_it",
+                           "context": self.context,
+                           "args": {}}))
+        conn.send(("abort", None))
+
+        results = []
+        while True:
+            kind, data = conn.recv()
+            if kind != "results":
+                break
+            results.extend(data)
+        conn.close()
+
+        self.assertEqual("done", kind)
+        self.assertTrue(len(results) < 1000)
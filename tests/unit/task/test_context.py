@@ -23,6 +23,34 @@ from tests.unit import fakes
 from tests.unit import test
 
 
+class SharedFakeContext(fakes.FakeContext):
+
+    events = []
+
+    def setup(self):
+        self.events.append(("setup", self.get_name()))
+        self.context[self.get_name()] = {"config": self.config}
+
+    def cleanup(self):
+        self.events.append(("cleanup", self.get_name()))
+
+
+@context.context(name="fake_shared_users", order=1, shared_services=[])
+class FakeSharedUsersContext(SharedFakeContext):
+    pass
+
+
+@context.context(name="fake_shared_quotas", order=2,
+                 shared_services=["nova"])
+class FakeSharedQuotasContext(SharedFakeContext):
+    pass
+
+
+@context.context(name="fake_not_shared", order=3)
+class FakeNotSharedContext(SharedFakeContext):
+    pass
+
+
 class BaseContextTestCase(test.TestCase):
 
     def test_init(self):
@@ -235,3 +263,111 @@ class ContextManagerTestCase(test.TestCase):
         finally:
             mock_context_manager_setup.assert_called_once_with()
             mock_context_manager_cleanup.assert_called_once_with()
+
+
+class SharedContextsTestCase(test.TestCase):
+
+    def setUp(self):
+        super(SharedContextsTestCase, self).setUp()
+        self.shared = context.SharedContexts()
+        self.events = SharedFakeContext.events
+        del self.events[:]
+
+    def _context_obj(self, **config):
+        return {"task": "task", "admin": "admin", "scenario_name": "s",
+                "config": config}
+
+    def test__get_shareable(self):
+        ctx = self._context_obj(fake_not_shared={}, fake_shared_quotas={},
+                                fake_shared_users={"a": 1})
+        self.assertEqual(
+            [(FakeSharedUsersContext, {"a": 1}),
+             (FakeSharedQuotasContext, {})],
+            context.SharedContexts._get_shareable(ctx))
+
+    def test__get_shareable_with_cleanup(self):
+        ctx = self._context_obj(fake_shared_quotas={}, fake_shared_users={},
+                                cleanup=["nova.servers"])
+        self.assertEqual([(FakeSharedUsersContext, {})],
+                         context.SharedContexts._get_shareable(ctx))
+
+    def test_acquire(self):
+        ctx = self._context_obj(fake_not_shared={}, fake_shared_quotas={},
+                                fake_shared_users={"a": 1})
+        self.assertEqual(["fake_shared_users", "fake_shared_quotas"],
+                         self.shared.acquire(ctx))
+        self.assertEqual([("setup", "fake_shared_users"),
+                          ("setup", "fake_shared_quotas")], self.events)
+        self.assertEqual({"config": {"a": 1}}, ctx["fake_shared_users"])
+        self.assertIsNot(self.shared.context_obj["fake_shared_users"],
+                         ctx["fake_shared_users"])
+        self.assertEqual("s", self.shared.context_obj["scenario_name"])
+
+    def test_acquire_copies_nested_data(self):
+        ctx = self._context_obj(fake_shared_users={"a": {"b": 1}})
+        self.shared.acquire(ctx)
+        ctx["fake_shared_users"]["config"]["a"]["b"] = 2
+        self.shared.release()
+
+        other_ctx = self._context_obj(fake_shared_users={"a": {"b": 1}})
+        self.shared.acquire(other_ctx)
+        self.assertEqual({"config": {"a": {"b": 1}}},
+                         other_ctx["fake_shared_users"])
+        self.assertEqual({"config": {"a": {"b": 1}}},
+                         self.shared.context_obj["fake_shared_users"])
+
+    def test_acquire_reuses_contexts(self):
+        self.shared.acquire(self._context_obj(fake_shared_users={},
+                                              fake_shared_quotas={"q": 1}))
+        self.shared.release()
+        del self.events[:]
+
+        ctx = self._context_obj(fake_shared_users={},
+                                fake_shared_quotas={"q": 2})
+        self.assertEqual(["fake_shared_users", "fake_shared_quotas"],
+                         self.shared.acquire(ctx))
+        self.assertEqual([("cleanup", "fake_shared_quotas"),
+                          ("setup", "fake_shared_quotas")], self.events)
+        self.assertEqual({"config": {"q": 2}}, ctx["fake_shared_quotas"])
+        self.assertEqual([1, 1], [c["refs"] for c in self.shared._contexts])
+
+    def test_acquire_contexts_in_use(self):
+        self.shared.acquire(self._context_obj(fake_shared_users={"a": 1}))
+        self.assertRaises(exceptions.RallyException, self.shared.acquire,
+                          self._context_obj(fake_shared_users={"a": 2}))
+
+    @mock.patch("rally.task.context.LOG")
+    def test_acquire_setup_fails(self, mock_log):
+        ctx = self._context_obj(fake_shared_users={}, fake_shared_quotas={})
+        with mock.patch.object(FakeSharedQuotasContext, "setup",
+                               side_effect=exceptions.RallyException):
+            self.assertRaises(exceptions.RallyException,
+                              self.shared.acquire, ctx)
+        self.assertEqual(["fake_shared_users"],
+                         [c["name"] for c in self.shared._contexts])
+        self.assertEqual([("setup", "fake_shared_users"),
+                          ("cleanup", "fake_shared_quotas")], self.events)
+
+    @mock.patch("rally.task.context.LOG")
+    def test_cleanup(self, mock_log):
+        self.shared.acquire(self._context_obj(fake_shared_users={},
+                                              fake_shared_quotas={}))
+        self.shared.release()
+        with mock.patch.object(FakeSharedQuotasContext, "cleanup",
+                               side_effect=Exception):
+            self.shared.cleanup()
+        self.assertTrue(mock_log.exception.called)
+        self.assertEqual([("setup", "fake_shared_users"),
+                          ("setup", "fake_shared_quotas"),
+                          ("cleanup", "fake_shared_users")], self.events)
+        self.assertEqual([], self.shared._contexts)
+        self.assertIsNone(self.shared.context_obj)
+
+    def test_context_manager(self):
+        ctx = self._context_obj(fake_not_shared={}, fake_shared_users={})
+        with context.ContextManager(ctx, shared=self.shared):
+            self.assertEqual(1, self.shared._contexts[0]["refs"])
+        self.assertEqual(0, self.shared._contexts[0]["refs"])
+        self.assertEqual([("setup", "fake_shared_users"),
+                          ("setup", "fake_not_shared"),
+                          ("cleanup", "fake_not_shared")], self.events)
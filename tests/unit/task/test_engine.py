@@ -17,6 +17,8 @@
 
 import collections
 import copy
+import threading
+import time
 
 import jsonschema
 import mock
@@ -329,6 +331,29 @@ class BenchmarkEngineTestCase(test.TestCase):
 
         self.assertEqual(2, mock_log.exception.call_count)
 
+    @mock.patch("rally.task.engine.BenchmarkEngine.consume_results")
+    @mock.patch("rally.task.engine.base_scenario.Scenario")
+    @mock.patch("rally.task.engine.runner.ScenarioRunner")
+    @mock.patch("rally.task.engine.context.ContextManager")
+    @mock.patch("rally.task.engine.context.SharedContexts")
+    def test_run_share_contexts(
+            self, mock_shared_contexts, mock_context_manager,
+            mock_scenario_runner, mock_scenario, mock_consume_results):
+        config = {
+            "a.benchmark": [{"context": {"context_a": {"a": 1}}}],
+            "b.benchmark": [{"context": {"context_a": {"a": 1}}}]
+        }
+        eng = engine.BenchmarkEngine(config, mock.MagicMock(),
+                                     share_contexts=True)
+        eng.run()
+
+        shared = mock_shared_contexts.return_value
+        self.assertEqual(shared, eng.shared_contexts)
+        for call in mock_context_manager.call_args_list:
+            self.assertEqual({"shared": shared}, call[1])
+        self.assertEqual(2, mock_context_manager.call_count)
+        shared.cleanup.assert_called_once_with()
+
     @mock.patch("rally.task.engine.base_scenario.Scenario.meta")
     def test__prepare_context(self, mock_scenario_meta):
         default_context = {"a": 1, "b": 2}
@@ -378,8 +403,10 @@ class BenchmarkEngineTestCase(test.TestCase):
         self.assertEqual(result, expected_result)
         mock_scenario_meta.assert_called_once_with(name, "context")
 
+    @mock.patch("rally.task.engine.result_summary.ResultsSummary")
     @mock.patch("rally.task.sla.SLAChecker")
-    def test_consume_results(self, mock_sla_checker):
+    def test_consume_results(self, mock_sla_checker,
+                             mock_results_summary):
         mock_sla_instance = mock.MagicMock()
         mock_sla_checker.return_value = mock_sla_instance
         key = {"kw": {"fake": 2}, "name": "fake", "pos": 0}
@@ -396,12 +423,170 @@ class BenchmarkEngineTestCase(test.TestCase):
         eng.full_duration = 456
         eng.consume_results(key, task, is_done, {}, runner)
         mock_sla_checker.assert_called_once_with({"fake": 2})
+        mock_results_summary.assert_called_once_with(
+            timeseries_window=engine.CONF.benchmark.timeseries_window)
         expected_iteration_calls = [mock.call(1), mock.call(2)]
         self.assertEqual(expected_iteration_calls,
                          mock_sla_instance.add_iteration.mock_calls)
 
+    @mock.patch("rally.task.engine.result_summary.ResultsSummary")
+    def test_consume_results_waits_for_results(self, mock_results_summary):
+        key = {"kw": {}, "name": "fake", "pos": 0}
+        task = mock.MagicMock()
+        runner = mock.MagicMock()
+        runner.result_queue = collections.deque()
+        runner.result_cond = threading.Condition()
+        is_done = threading.Event()
+        eng = engine.BenchmarkEngine({}, task)
+        eng.duration = 123
+        eng.full_duration = 456
+
+        consumer = threading.Thread(
+            target=eng.consume_results,
+            args=(key, task, is_done, {}, runner))
+        consumer.start()
+        for result in ({"error": []}, {"error": []}):
+            with runner.result_cond:
+                runner.result_queue.append(result)
+                runner.result_cond.notify()
+        with runner.result_cond:
+            is_done.set()
+            runner.result_cond.notify_all()
+        consumer.join(10)
+
+        self.assertFalse(consumer.is_alive())
+        task.append_results.assert_called_once_with(
+            key, {"raw": [], "load_duration": 0, "full_duration": 0,
+                  "sla": []})
+        result_id = task.append_results.return_value
+        task.append_results_chunk.assert_called_once_with(
+            result_id, 0, [{"error": []}, {"error": []}])
+        self.assertEqual(
+            [mock.call({"error": []}), mock.call({"error": []})],
+            mock_results_summary.return_value.add_iteration.mock_calls)
+        task.update_results.assert_called_once_with(
+            result_id, {"raw": [], "load_duration": 123,
+                        "full_duration": 456, "sla": [],
+                        "summary": mock_results_summary.return_value.
+                        to_dict.return_value})
+
+    @mock.patch("rally.task.engine.result_summary.ResultsSummary")
+    def test_consume_results_in_chunks(self, mock_results_summary):
+        key = {"kw": {}, "name": "fake", "pos": 0}
+        task = mock.MagicMock()
+        runner = mock.MagicMock()
+        runner.result_queue = collections.deque(
+            [{"error": [], "i": i} for i in range(5)])
+        is_done = threading.Event()
+        is_done.set()
+        eng = engine.BenchmarkEngine({}, task)
+        eng.duration = 123
+        eng.full_duration = 456
+
+        with mock.patch("rally.task.engine.RESULTS_CHUNK_SIZE", 2):
+            eng.consume_results(key, task, is_done, {}, runner)
+
+        result_id = task.append_results.return_value
+        self.assertEqual(
+            [mock.call(result_id, 0, [{"error": [], "i": 0},
+                                      {"error": [], "i": 1}]),
+             mock.call(result_id, 1, [{"error": [], "i": 2},
+                                      {"error": [], "i": 3}]),
+             mock.call(result_id, 2, [{"error": [], "i": 4}])],
+            task.append_results_chunk.mock_calls)
+
+    @mock.patch("rally.task.engine.LOG")
+    @mock.patch("rally.task.engine.result_summary.ResultsSummary")
+    def test_consume_results_chunk_store_failure(self, mock_results_summary,
+                                                 mock_log):
+        key = {"kw": {}, "name": "fake", "pos": 0}
+        task = mock.MagicMock()
+        task.append_results_chunk.side_effect = [Exception("db"), None,
+                                                 Exception("db")]
+        runner = mock.MagicMock()
+        runner.result_queue = collections.deque(
+            [{"error": [], "i": i} for i in range(5)])
+        is_done = threading.Event()
+        is_done.set()
+        eng = engine.BenchmarkEngine({}, task)
+        eng.duration = 123
+        eng.full_duration = 456
+
+        with mock.patch("rally.task.engine.RESULTS_CHUNK_SIZE", 2):
+            eng.consume_results(key, task, is_done, {}, runner)
+
+        self.assertEqual(3, task.append_results_chunk.call_count)
+        self.assertEqual(2, mock_log.error.call_count)
+        self.assertFalse(runner.result_queue)
+        self.assertEqual(5, mock_results_summary.return_value.
+                         add_iteration.call_count)
+        self.assertTrue(task.update_results.called)
+
+    @mock.patch("rally.task.engine.time")
+    @mock.patch("rally.task.engine.result_summary.ResultsSummary")
+    def test_consume_results_chunk_interval(self, mock_results_summary,
+                                            mock_time):
+        mock_time.time.side_effect = [0, 1, 100, 101, 102]
+        key = {"kw": {}, "name": "fake", "pos": 0}
+        task = mock.MagicMock()
+        runner = mock.MagicMock()
+        runner.result_queue = collections.deque(
+            [{"error": [], "i": i} for i in range(3)])
+        is_done = threading.Event()
+        is_done.set()
+        eng = engine.BenchmarkEngine({}, task)
+        eng.duration = 123
+        eng.full_duration = 456
+
+        eng.consume_results(key, task, is_done, {}, runner)
+
+        result_id = task.append_results.return_value
+        self.assertEqual(
+            [mock.call(result_id, 0, [{"error": [], "i": 0},
+                                      {"error": [], "i": 1}]),
+             mock.call(result_id, 1, [{"error": [], "i": 2}])],
+            task.append_results_chunk.mock_calls)
+
+    @mock.patch("rally.task.engine.result_summary.ResultsSummary")
+    def test_consume_results_chunk_interval_without_results(
+            self, mock_results_summary):
+        key = {"kw": {}, "name": "fake", "pos": 0}
+        task = mock.MagicMock()
+        runner = mock.MagicMock()
+        runner.result_queue = collections.deque()
+        runner.result_cond = threading.Condition()
+        is_done = threading.Event()
+        eng = engine.BenchmarkEngine({}, task)
+        eng.duration = 123
+        eng.full_duration = 456
+
+        with mock.patch("rally.task.engine.RESULTS_CHUNK_INTERVAL", 0.01):
+            consumer = threading.Thread(
+                target=eng.consume_results,
+                args=(key, task, is_done, {}, runner))
+            consumer.start()
+            with runner.result_cond:
+                runner.result_queue.append({"error": []})
+                runner.result_cond.notify()
+            for i in range(1000):
+                if task.append_results_chunk.called:
+                    break
+                time.sleep(0.01)
+            # NOTE: The chunk is stored while the runner is still running
+            self.assertTrue(task.append_results_chunk.called)
+            with runner.result_cond:
+                is_done.set()
+                runner.result_cond.notify_all()
+            consumer.join(10)
+
+        self.assertFalse(consumer.is_alive())
+        task.append_results_chunk.assert_called_once_with(
+            task.append_results.return_value, 0, [{"error": []}])
+
+    @mock.patch("rally.task.engine.result_summary.ResultsSummary")
     @mock.patch("rally.task.sla.SLAChecker")
-    def test_consume_results_sla_failure_abort(self, mock_sla_checker):
+    def test_consume_results_sla_failure_abort(self, mock_sla_checker,
+                                               mock_results_summary):
         mock_sla_instance = mock.MagicMock()
         mock_sla_checker.return_value = mock_sla_instance
         mock_sla_instance.add_iteration.side_effect = [True, True, False,
@@ -422,8 +607,10 @@ class BenchmarkEngineTestCase(test.TestCase):
         mock_sla_checker.assert_called_once_with({"fake": 2})
         self.assertTrue(runner.abort.called)
 
+    @mock.patch("rally.task.engine.result_summary.ResultsSummary")
     @mock.patch("rally.task.sla.SLAChecker")
-    def test_consume_results_sla_failure_continue(self, mock_sla_checker):
+    def test_consume_results_sla_failure_continue(self, mock_sla_checker,
+                                                  mock_results_summary):
         mock_sla_instance = mock.MagicMock()
         mock_sla_checker.return_value = mock_sla_instance
         mock_sla_instance.add_iteration.side_effect = [True, True, False,
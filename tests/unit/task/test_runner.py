@@ -15,6 +15,8 @@
 
 import collections
 import multiprocessing
+import threading
+import time
 
 import jsonschema
 import mock
@@ -79,6 +81,17 @@ class ScenarioHelpersTestCase(test.TestCase):
         self.assertEqual(expected_context,
                          runner._get_scenario_context(context))
 
+    def test_get_scenario_context_shares_context(self):
+        context = {"admin": "admin", "some_random_key": {"nested": 1}}
+        scenario_context = runner._get_scenario_context(context)
+
+        self.assertEqual(context, scenario_context)
+        self.assertIs(context["some_random_key"],
+                      scenario_context["some_random_key"])
+        context["added_key"] = "value"
+        self.assertEqual("value", scenario_context["added_key"])
+        self.assertNotIn("users", scenario_context)
+
     def test_run_scenario_once_internal_logic(self):
         context = runner._get_scenario_context(
             fakes.FakeUserContext({}).context)
@@ -87,7 +100,7 @@ class ScenarioHelpersTestCase(test.TestCase):
         runner._run_scenario_once(args)
 
         expected_calls = [
-            mock.call(context=context),
+            mock.call(context=dict(context, iteration=2)),
             mock.call().test(),
             mock.call().idle_duration(),
             mock.call().idle_duration(),
@@ -95,6 +108,28 @@ class ScenarioHelpersTestCase(test.TestCase):
         ]
         scenario_cls.assert_has_calls(expected_calls, any_order=True)
 
+    def test_run_scenario_once_sets_iteration(self):
+        shared_context = fakes.FakeUserContext({}).context
+        context = runner._get_scenario_context(shared_context)
+        scenario_cls = mock.MagicMock()
+        runner._run_scenario_once((3, scenario_cls, "test", context, {}))
+
+        scenario_context = scenario_cls.call_args[1]["context"]
+        self.assertEqual(3, scenario_context["iteration"])
+        self.assertEqual(context["user"], scenario_context["user"])
+        self.assertNotIn("iteration", context)
+        self.assertNotIn("iteration", shared_context)
+
+    def test_run_scenario_once_iteration_offset(self):
+        shared_context = dict(fakes.FakeUserContext({}).context,
+                              iteration_offset=10)
+        context = runner._get_scenario_context(shared_context)
+        scenario_cls = mock.MagicMock()
+        runner._run_scenario_once((3, scenario_cls, "test", context, {}))
+
+        scenario_context = scenario_cls.call_args[1]["context"]
+        self.assertEqual(13, scenario_context["iteration"])
+
     @mock.patch(BASE + "rutils.Timer", side_effect=fakes.FakeTimer)
     def test_run_scenario_once_without_scenario_output(self, mock_timer):
         context = runner._get_scenario_context(
@@ -148,6 +183,147 @@ class ScenarioHelpersTestCase(test.TestCase):
                          ["Exception", "Something went wrong"])
 
 
+class ResultBatcherTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ResultBatcherTestCase, self).setUp()
+        self.result = {"duration": 1.0, "timestamp": 2.0,
+                       "idle_duration": 3.0, "error": [],
+                       "scenario_output": {"errors": "", "data": {}},
+                       "atomic_actions": {"foo": 4.0}}
+
+    def test__pack_result(self):
+        self.assertEqual((1.0, 2.0, 3.0, {"foo": 4.0}),
+                         runner._pack_result(self.result))
+        self.assertEqual(self.result,
+                         runner._unpack_result(
+                             runner._pack_result(self.result)))
+
+    def test__pack_result_with_error(self):
+        self.result["error"] = ["Exception", "msg", "traceback"]
+        self.assertEqual(self.result, runner._pack_result(self.result))
+        self.assertEqual(self.result, runner._unpack_result(self.result))
+
+    def test__pack_result_with_scenario_output(self):
+        self.result["scenario_output"]["data"]["bar"] = 5
+        self.assertEqual(self.result, runner._pack_result(self.result))
+
+    def test_put(self):
+        mock_queue = mock.MagicMock()
+        batcher = runner.ResultBatcher(mock_queue, batch_size=2,
+                                       flush_interval=100)
+        for i in range(5):
+            batcher.put(self.result)
+        packed = runner._pack_result(self.result)
+        self.assertEqual([mock.call([packed, packed])] * 2,
+                         mock_queue.put.mock_calls)
+
+        batcher.close()
+        self.assertEqual([mock.call([packed, packed])] * 2 +
+                         [mock.call([packed])],
+                         mock_queue.put.mock_calls)
+        self.assertFalse(batcher._flusher.is_alive())
+
+    def test_put_flushes_periodically(self):
+        mock_queue = mock.MagicMock()
+        batcher = runner.ResultBatcher(mock_queue, batch_size=100,
+                                       flush_interval=0.001)
+        batcher.put(self.result)
+        for i in range(1000):
+            if mock_queue.put.called:
+                break
+            time.sleep(0.01)
+        batcher.close()
+        mock_queue.put.assert_called_once_with(
+            [runner._pack_result(self.result)])
+
+    def test_close_without_results(self):
+        mock_queue = mock.MagicMock()
+        batcher = runner.ResultBatcher(mock_queue)
+        batcher.close()
+        self.assertFalse(mock_queue.put.called)
+
+
+class ScenarioThreadTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ScenarioThreadTestCase, self).setUp()
+        self.finish = threading.Event()
+        self.addCleanup(self.finish.set)
+        patcher = mock.patch(BASE + "_run_scenario_once",
+                             side_effect=self._run_scenario_once)
+        self.mock__run_scenario_once = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run_scenario_once(self, args):
+        if args[1] == "hang":
+            self.finish.wait()
+        return {"iteration": args[0]}
+
+    def test_run(self):
+        mock_queue = mock.MagicMock()
+        thread = runner.ScenarioThread(mock_queue, [(0, "ok"), (1, "ok")])
+
+        thread.start()
+        thread.join()
+
+        self.assertTrue(thread.daemon)
+        self.assertEqual([mock.call({"iteration": 0}),
+                          mock.call({"iteration": 1})],
+                         mock_queue.put.call_args_list)
+        self.assertFalse(thread.check_timeout())
+        self.assertIsNone(thread.get_time_left())
+
+    def test_check_timeout(self):
+        mock_queue = mock.MagicMock()
+        thread = runner.ScenarioThread(mock_queue, [(0, "hang"), (1, "ok")],
+                                       timeout=0.01)
+        self.assertEqual(0.01, thread.get_time_left())
+
+        thread.start()
+        thread.join(thread.get_time_left())
+        while not thread.check_timeout():
+            time.sleep(0.01)
+        self.assertTrue(thread.abandoned)
+        self.assertFalse(thread.check_timeout())
+
+        result = mock_queue.put.call_args[0][0]
+        self.assertEqual(0.01, result["duration"])
+        self.assertEqual("IterationTimeout", result["error"][0])
+        self.assertIsNotNone(runner.ScenarioRunnerResult(result))
+
+        # NOTE: the result of abandoned iteration is dropped and the thread
+        #       doesn't run the next iteration
+        self.finish.set()
+        thread.join()
+        self.assertEqual(1, mock_queue.put.call_count)
+        self.assertEqual(1, self.mock__run_scenario_once.call_count)
+
+    def test_check_timeout_not_expired(self):
+        thread = runner.ScenarioThread(mock.MagicMock(), [(0, "hang")],
+                                       timeout=100)
+        thread.start()
+        self.assertFalse(thread.check_timeout())
+        self.assertTrue(0 < thread.get_time_left() <= 100)
+
+    def test__join_threads(self):
+        mock_queue = mock.MagicMock()
+        pool = collections.deque([
+            runner.ScenarioThread(mock_queue, [(0, "hang")], timeout=0.01),
+            runner.ScenarioThread(mock_queue, [(1, "ok")]),
+            runner.ScenarioThread(mock_queue, [(2, "ok")])])
+        for thread in pool:
+            thread.start()
+        hung_threads = []
+
+        runner._join_threads(pool, hung_threads)
+
+        self.assertEqual(0, len(pool))
+        self.assertEqual(1, len(hung_threads))
+        self.assertTrue(hung_threads[0].isAlive())
+        self.assertEqual(3, mock_queue.put.call_count)
+
+
 class ScenarioRunnerResultTestCase(test.TestCase):
 
     def test_validate(self):
@@ -182,6 +358,69 @@ class ScenarioRunnerResultTestCase(test.TestCase):
         self.assertRaises(jsonschema.ValidationError,
                           runner.ScenarioRunnerResult, config)
 
+    def _get_result(self):
+        return {"duration": 1.0, "timestamp": 1, "idle_duration": 0.0,
+                "scenario_output": {"data": {"foo": 1}, "errors": ""},
+                "atomic_actions": {"foo": 1.0, "bar": None},
+                "error": ["a", "b", "c"], "stage": 0}
+
+    def test__is_valid(self):
+        self.assertTrue(runner.ScenarioRunnerResult._is_valid({}))
+        self.assertTrue(
+            runner.ScenarioRunnerResult._is_valid(self._get_result()))
+
+    def test__is_valid_failed(self):
+        invalid = [
+            ("duration", "1.0"), ("duration", True), ("timestamp", None),
+            ("idle_duration", []), ("scenario_output", []),
+            ("scenario_output", {"data": {"a": "1"}, "errors": ""}),
+            ("scenario_output", {"data": [], "errors": ""}),
+            ("scenario_output", {"errors": 1}),
+            ("scenario_output", {"data": {}, "errors": "", "a": 1}),
+            ("atomic_actions", {"foo": "1"}), ("atomic_actions", []),
+            ("error", ["a", 1]), ("error", ("a", "b")), ("stage", -1),
+            ("stage", 1.0), ("stage", False), ("foo", "bar")]
+        for key, value in invalid:
+            result = self._get_result()
+            result[key] = value
+            self.assertFalse(runner.ScenarioRunnerResult._is_valid(result),
+                             "%s: %r" % (key, value))
+            self.assertRaises(jsonschema.ValidationError,
+                              jsonschema.validate, result,
+                              runner.ScenarioRunnerResult.RESULT_SCHEMA)
+            self.assertRaises(jsonschema.ValidationError,
+                              runner.ScenarioRunnerResult, result)
+
+    @mock.patch(BASE + "logging.is_debug", return_value=True)
+    @mock.patch(BASE + "jsonschema.validate")
+    def test_validate_debug(self, mock_validate, mock_is_debug):
+        result = self._get_result()
+        runner.ScenarioRunnerResult(result)
+        mock_validate.assert_called_once_with(
+            result, runner.ScenarioRunnerResult.RESULT_SCHEMA)
+
+    @mock.patch(BASE + "logging.is_debug", return_value=False)
+    @mock.patch(BASE + "jsonschema.validate")
+    def test_validate_no_debug(self, mock_validate, mock_is_debug):
+        runner.ScenarioRunnerResult(self._get_result())
+        self.assertFalse(mock_validate.called)
+
+    @mock.patch(BASE + "logging.is_debug", return_value=False)
+    @mock.patch(BASE + "jsonschema.validate")
+    def test_validate_fast_path_many_results(self, mock_validate,
+                                             mock_is_debug):
+        results = [self._get_result() for i in range(1000)]
+        for i, result in enumerate(results):
+            result["atomic_actions"] = {"action%d" % i: 0.1}
+            result["error"] = ["Exception", "msg", "trace"] if i % 2 else []
+            result["scenario_output"] = {"data": {"x": i}, "errors": ""}
+
+        for result in results:
+            runner.ScenarioRunnerResult(result)
+        # NOTE: The full validation is too expensive to be run for each
+        #       result, so valid results must never reach it.
+        self.assertFalse(mock_validate.called)
+
 
 class ScenarioRunnerTestCase(test.TestCase):
 
@@ -256,8 +495,11 @@ class ScenarioRunnerTestCase(test.TestCase):
         process = mock.MagicMock(is_alive=mock.MagicMock(return_value=False))
         processes = 10
         process_pool = collections.deque([process] * processes)
-        mock_result_queue = mock.MagicMock(
-            empty=mock.MagicMock(return_value=True))
+        mock_result_queue = mock.MagicMock()
+        packed = (1.0, 2.0, 0.0, {})
+        mock_result_queue.get.side_effect = (
+            [{"result": 1}, None, [{"result": 2}, packed]] +
+            [None] * (processes - 1))
 
         runner_obj = serial.SerialScenarioRunner(
             mock.MagicMock(),
@@ -266,4 +508,49 @@ class ScenarioRunnerTestCase(test.TestCase):
         runner_obj._join_processes(process_pool, mock_result_queue)
 
         self.assertEqual(processes, process.join.call_count)
+        self.assertEqual([mock.call({"result": 1}), mock.call({"result": 2}),
+                          mock.call(runner._unpack_result(packed))],
+                         mock_scenario_runner__send_result.mock_calls)
+        mock_result_queue.get.assert_called_with(
+            timeout=runner_obj.WORKER_RESULT_TIMEOUT)
+        mock_result_queue.close.assert_called_once_with()
+
+    @mock.patch(BASE + "ScenarioRunner._send_result")
+    def test__join_processes_crashed_worker(
+            self, mock_scenario_runner__send_result):
+        process = mock.MagicMock()
+        process.is_alive.side_effect = [True, False, False]
+        process_pool = collections.deque([process] * 2)
+        mock_result_queue = mock.MagicMock()
+        mock_result_queue.get.side_effect = [
+            {"result": 1}, None, runner.Queue.Empty, runner.Queue.Empty]
+
+        runner_obj = serial.SerialScenarioRunner(
+            mock.MagicMock(),
+            mock.MagicMock())
+
+        runner_obj._join_processes(process_pool, mock_result_queue)
+
+        self.assertEqual(2, process.join.call_count)
+        mock_scenario_runner__send_result.assert_called_once_with(
+            {"result": 1})
         mock_result_queue.close.assert_called_once_with()
+
+    def test__worker_done(self):
+        mock_queue = mock.MagicMock()
+        runner._worker_done(mock_queue)
+        mock_queue.put.assert_called_once_with(None)
+
+    def test__send_result(self):
+        runner_obj = serial.SerialScenarioRunner(
+            mock.MagicMock(),
+            mock.MagicMock())
+        runner_obj.result_cond = mock.MagicMock()
+        result = {"duration": 1.0, "idle_duration": 0.0, "error": [],
+                  "scenario_output": {"data": {}, "errors": ""},
+                  "atomic_actions": {}, "timestamp": 1.0}
+
+        runner_obj._send_result(result)
+
+        self.assertEqual([result], list(runner_obj.result_queue))
+        runner_obj.result_cond.notify.assert_called_once_with()
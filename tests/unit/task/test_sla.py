@@ -24,7 +24,7 @@ class TestCriterion(sla.SLA):
     CONFIG_SCHEMA = {"type": "integer"}
 
     def add_iteration(self, iteration):
-        self.success = self.criterion_value == iteration
+        self.success = self.criterion_value == iteration["data"]
         return self.success
 
     def details(self):
@@ -37,19 +37,34 @@ class SLACheckerTestCase(test.TestCase):
         sla_checker = sla.SLAChecker({"sla": {"test_criterion": 42}})
 
         iteration = {"key": {"name": "fake", "pos": 0}, "data": 42}
-        self.assertTrue(sla_checker.add_iteration(iteration["data"]))
+        self.assertTrue(sla_checker.add_iteration(iteration))
         expected_result = [{"criterion": "test_criterion",
                             "detail": "detail",
                             "success": True}]
         self.assertEqual(expected_result, sla_checker.results())
 
         iteration["data"] = 43
-        self.assertFalse(sla_checker.add_iteration(iteration["data"]))
+        self.assertFalse(sla_checker.add_iteration(iteration))
         expected_result = [{"criterion": "test_criterion",
                             "detail": "detail",
                             "success": False}]
         self.assertEqual(expected_result, sla_checker.results())
 
+    def test_add_iteration_with_stages(self):
+        sla_checker = sla.SLAChecker({"sla": {"test_criterion": 42}})
+
+        self.assertTrue(sla_checker.add_iteration({"data": 42, "stage": 0}))
+        self.assertTrue(sla_checker.add_iteration({"data": 42, "stage": 0}))
+        self.assertFalse(sla_checker.add_iteration({"data": 43, "stage": 1}))
+        self.assertEqual(
+            [{"criterion": "test_criterion", "detail": "detail",
+              "success": False},
+             {"criterion": "test_criterion", "detail": "Stage 0: detail",
+              "success": True, "stage": 0},
+             {"criterion": "test_criterion", "detail": "Stage 1: detail",
+              "success": False, "stage": 1}],
+            sla_checker.results())
+
     def test_set_unexpected_failure(self):
         exc = "error;("
         sla_checker = sla.SLAChecker({"sla": {}})
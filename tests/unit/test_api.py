@@ -125,7 +125,8 @@ class TaskAPITestCase(test.TestCase):
         mock_benchmark_engine.assert_has_calls([
             mock.call("config", mock_task.return_value,
                       admin=mock_deployment_get.return_value["admin"],
-                      users=[], abort_on_sla_failure=False),
+                      users=[], abort_on_sla_failure=False,
+                      share_contexts=False),
             mock.call().validate(),
             mock.call().run()
         ])
@@ -238,24 +239,34 @@ class DeploymentAPITestCase(BaseDeploymentTestCase):
                           api.Deployment.create, self.deployment_config,
                           "fake_deployment")
 
+    @mock.patch("rally.api.users.UserGenerator.purge_pool")
     @mock.patch("rally.objects.deploy.db.deployment_delete")
     @mock.patch("rally.objects.deploy.db.deployment_update")
     @mock.patch("rally.objects.deploy.db.deployment_get")
     def test_destroy(self, mock_deployment_get,
-                     mock_deployment_update, mock_deployment_delete):
+                     mock_deployment_update, mock_deployment_delete,
+                     mock_user_generator_purge_pool):
         mock_deployment_get.return_value = self.deployment
         mock_deployment_update.return_value = self.deployment
         api.Deployment.destroy(self.deployment_uuid)
         mock_deployment_get.assert_called_once_with(self.deployment_uuid)
         mock_deployment_delete.assert_called_once_with(self.deployment_uuid)
+        self.assertEqual(
+            self.deployment_uuid,
+            mock_user_generator_purge_pool.call_args[0][0]["uuid"])
 
+    @mock.patch("rally.api.users.UserGenerator.purge_pool")
     @mock.patch("rally.objects.deploy.db.deployment_update")
     @mock.patch("rally.objects.deploy.db.deployment_get")
-    def test_recreate(self, mock_deployment_get, mock_deployment_update):
+    def test_recreate(self, mock_deployment_get, mock_deployment_update,
+                      mock_user_generator_purge_pool):
         mock_deployment_get.return_value = self.deployment
         mock_deployment_update.return_value = self.deployment
         api.Deployment.recreate(self.deployment_uuid)
         mock_deployment_get.assert_called_once_with(self.deployment_uuid)
+        self.assertEqual(
+            self.deployment_uuid,
+            mock_user_generator_purge_pool.call_args[0][0]["uuid"])
         mock_deployment_update.assert_has_calls([
             mock.call(self.deployment_uuid, self.endpoints)
         ])